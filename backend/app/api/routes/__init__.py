@@ -1,54 +1,42 @@
 """
 Version 1 API routers for enterprise pharma system
+Routers are resolved on first access (module __getattr__), so importing one
+route module no longer imports every other one with it.
 """
-from .customers import router as customers_router
-from .orders import router as orders_router
-from .inventory import router as inventory_router
-from .billing import router as billing_router
-from .payments import router as payments_router
-from .invoices import router as invoices_router
-from .order_items import router as order_items_router
-from .users import router as users_router
-from .suppliers import router as suppliers_router
-from .purchases import router as purchases_router
-from .delivery_challan import router as delivery_challan_router
-from .dashboard import router as dashboard_router
-from .stock_adjustments import router as stock_adjustments_router
-from .tax_entries import router as tax_entries_router
-from .purchase_upload import router as purchase_upload_router
-from .purchase_enhanced import router as purchase_enhanced_router
-from .sale_returns import router as sale_returns_api_router
-from .purchase_returns import router as purchase_returns_router
-from .stock_movements import router as stock_movements_router
-from .party_ledger import router as party_ledger_router
-from .credit_debit_notes import router as credit_debit_notes_router
-from .sales import router as sales_router
-from .enterprise_orders import router as enterprise_orders_router
-from .collection_center_simple import router as collection_center_router
+from importlib import import_module
 
-__all__ = [
-    "customers_router", 
-    "orders_router", 
-    "inventory_router", 
-    "billing_router", 
-    "payments_router", 
-    "invoices_router",
-    "order_items_router",
-    "users_router", 
-    "suppliers_router",
-    "purchases_router",
-    "delivery_challan_router",
-    "dashboard_router",
-    "stock_adjustments_router",
-    "tax_entries_router",
-    "purchase_upload_router",
-    "purchase_enhanced_router",
-    "sale_returns_api_router",
-    "purchase_returns_router",
-    "stock_movements_router",
-    "party_ledger_router",
-    "credit_debit_notes_router",
-    "sales_router",
-    "enterprise_orders_router",
-    "collection_center_router"
-]
\ No newline at end of file
+_ROUTER_MODULES = {
+    "customers_router": "customers",
+    "orders_router": "orders",
+    "inventory_router": "inventory",
+    "billing_router": "billing",
+    "payments_router": "payments",
+    "invoices_router": "invoices",
+    "order_items_router": "order_items",
+    "users_router": "users",
+    "suppliers_router": "suppliers",
+    "purchases_router": "purchases",
+    "delivery_challan_router": "delivery_challan",
+    "dashboard_router": "dashboard",
+    "stock_adjustments_router": "stock_adjustments",
+    "tax_entries_router": "tax_entries",
+    "purchase_upload_router": "purchase_upload",
+    "purchase_enhanced_router": "purchase_enhanced",
+    "sale_returns_api_router": "sale_returns",
+    "purchase_returns_router": "purchase_returns",
+    "stock_movements_router": "stock_movements",
+    "party_ledger_router": "party_ledger",
+    "credit_debit_notes_router": "credit_debit_notes",
+    "sales_router": "sales",
+    "enterprise_orders_router": "enterprise_orders",
+    "collection_center_router": "collection_center_simple"
+}
+
+__all__ = list(_ROUTER_MODULES)
+
+
+def __getattr__(name):
+    module_name = _ROUTER_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return import_module(f".{module_name}", __name__).router
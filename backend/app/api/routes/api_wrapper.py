@@ -9,6 +9,8 @@ from typing import List, Optional, Dict, Any
 from datetime import date, datetime
 import json
 from ...core.database import get_db
+from ...core.config import DEFAULT_ORG_ID
+from ..services.gst_period_service import GSTPeriodService, return_period
 
 router = APIRouter()
 
@@ -435,15 +437,22 @@ async def generate_gstr1(
 ):
     """
     Generate GSTR-1 data
-    Wraps: api.generate_gstr1_data()
+    Reads the GST period store (gst.gst_period_rollups / gst_period_party_totals)
     """
     try:
-        result = db.execute(
-            text("SELECT api.generate_gstr1_data(:month, :year)"),
-            {"month": month, "year": year}
-        ).scalar()
+        gstr1 = GSTPeriodService.get_gstr1(db, DEFAULT_ORG_ID, return_period(year, month))
         
-        return result if result else {"b2b": [], "b2c": [], "hsn": []}
+        return {
+            "b2b": gstr1["b2b"],
+            "b2c": gstr1["b2c_rates"],
+            "hsn": gstr1["hsn_summary"],
+            "cdnr": gstr1["credit_notes"],
+            "totals": {
+                "b2b": gstr1["b2b_totals"],
+                "b2c": gstr1["b2c_totals"],
+                "credit_notes": gstr1["credit_note_totals"]
+            }
+        }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate GSTR-1: {str(e)}")
\ No newline at end of file
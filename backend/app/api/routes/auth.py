@@ -11,13 +11,21 @@ import uuid
 
 from ...core.database import get_db
 from ...core.jwt_auth import (
-    verify_password, get_password_hash, create_access_token,
+    create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES, get_current_user_and_org,
     verify_user_org_access
 )
+from ...core.passwords import PasswordHasherBusy, password_hasher
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many password operations in progress, please retry",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/login")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -34,7 +42,15 @@ async def login(
         WHERE u.email = :email
     """), {"email": form_data.username}).fetchone()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    try:
+        # Off the event loop; new_hash is set when the stored hash has an old cost
+        valid, new_hash = await password_hasher.verify_and_update(
+            form_data.password, user.password_hash if user else None
+        )
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    
+    if not user or not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -53,12 +69,13 @@ async def login(
             detail="Organization is not active"
         )
     
-    # Update last login
+    # Update last login (and the hash, when it was made with another cost)
     db.execute(text("""
         UPDATE parties.org_users 
-        SET last_login_at = CURRENT_TIMESTAMP
+        SET last_login_at = CURRENT_TIMESTAMP,
+            password_hash = COALESCE(:new_hash, password_hash)
         WHERE user_id = :user_id
-    """), {"user_id": user.user_id})
+    """), {"user_id": user.user_id, "new_hash": new_hash})
     db.commit()
     
     # Create access token
@@ -245,7 +262,10 @@ async def register_user(
             org_id = user_data["org_id"]
         
         # Create user
-        password_hash = get_password_hash(user_data["password"])
+        try:
+            password_hash = await password_hasher.hash(user_data["password"])
+        except PasswordHasherBusy:
+            raise _hasher_busy()
         
         result = db.execute(text("""
             INSERT INTO parties.org_users (
@@ -309,14 +329,22 @@ async def change_password(
         WHERE user_id = :user_id
     """), {"user_id": current_user["user_id"]}).fetchone()
     
-    if not verify_password(password_data["current_password"], user.password_hash):
+    try:
+        valid = await password_hasher.verify(password_data["current_password"], user.password_hash if user else None)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Current password is incorrect"
         )
     
     # Update password
-    new_password_hash = get_password_hash(password_data["new_password"])
+    try:
+        new_password_hash = await password_hasher.hash(password_data["new_password"])
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     
     db.execute(text("""
         UPDATE parties.org_users
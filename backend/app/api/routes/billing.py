@@ -3,7 +3,8 @@ Billing and GST API endpoints
 Handles invoice generation, payment recording, and GST reports
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import date
@@ -16,7 +17,12 @@ from ..schemas.billing import (
     PaymentCreate, PaymentResponse,
     GSTR1Summary, InvoiceSummary
 )
+from ...core.http_cache import etag_matches, json_response, not_modified, parse_if_none_match
+from ...jobs.document_renderer import render_pool
+from ...jobs.invoice_export import run_invoice_export
 from ..services.billing_service import BillingService
+from ..services.document_render_service import DocumentRenderService
+from ..services.document_export_service import DocumentExportService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -41,6 +47,9 @@ async def generate_invoice(
         logger.info(f"Generating invoice for order {invoice_data.order_id}")
         invoice = BillingService.create_invoice_from_order(db, invoice_data, org_id)
         logger.info(f"Generated invoice {invoice.invoice_number}")
+        
+        # Pre-render the print payload so the first print is a cache hit
+        render_pool.submit("invoice", invoice.invoice_id, org_id)
         return invoice
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
@@ -321,55 +330,141 @@ async def cancel_invoice(
         logger.error(f"Error cancelling invoice: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to cancel invoice")
 
+async def build_invoice_print_payload(db: Session, invoice_id: int, org_id) -> dict:
+    """Invoice with organization details, as rendered for printing"""
+    result = db.execute(text("""
+        SELECT i.*, o.org_name, o.address as org_address,
+               o.city as org_city, o.state as org_state,
+               o.pincode as org_pincode, o.gstin as org_gstin,
+               o.phone as org_phone, o.email as org_email
+        FROM sales.invoices i
+        JOIN organizations o ON i.org_id = o.org_id
+        WHERE i.invoice_id = :invoice_id
+            AND i.org_id = :org_id
+    """), {
+        "invoice_id": invoice_id,
+        "org_id": org_id
+    }).fetchone()
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    invoice = BillingService.get_invoice(db, invoice_id)
+    
+    # Add organization details
+    invoice_dict = invoice.dict()
+    invoice_dict["organization"] = {
+        "name": result.org_name,
+        "address": result.org_address,
+        "city": result.org_city,
+        "state": result.org_state,
+        "pincode": result.org_pincode,
+        "gstin": result.org_gstin,
+        "phone": result.org_phone,
+        "email": result.org_email
+    }
+    
+    return invoice_dict
+
 @router.get("/invoices/{invoice_id}/print")
 async def get_printable_invoice(
     invoice_id: int,
     db: Session = Depends(get_db),
-    org_id: UUID = UUID(DEFAULT_ORG_ID)
+    org_id: UUID = UUID(DEFAULT_ORG_ID),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Get invoice data formatted for printing
-    Returns complete invoice data with organization details
+    Returns complete invoice data with organization details.
+    Served from the render cache with an ETag; reprints of an unchanged
+    invoice with If-None-Match get 304.
     """
     try:
-        from sqlalchemy import text
-        
-        # Get invoice with organization details
-        result = db.execute(text("""
-            SELECT i.*, o.org_name, o.address as org_address,
-                   o.city as org_city, o.state as org_state,
-                   o.pincode as org_pincode, o.gstin as org_gstin,
-                   o.phone as org_phone, o.email as org_email
-            FROM sales.invoices i
-            JOIN organizations o ON i.org_id = o.org_id
-            WHERE i.invoice_id = :invoice_id
-                AND i.org_id = :org_id
-        """), {
-            "invoice_id": invoice_id,
-            "org_id": org_id
-        }).fetchone()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="Invoice not found")
-        
-        invoice = BillingService.get_invoice(db, invoice_id)
-        
-        # Add organization details
-        invoice_dict = invoice.dict()
-        invoice_dict["organization"] = {
-            "name": result.org_name,
-            "address": result.org_address,
-            "city": result.org_city,
-            "state": result.org_state,
-            "pincode": result.org_pincode,
-            "gstin": result.org_gstin,
-            "phone": result.org_phone,
-            "email": result.org_email
-        }
-        
-        return invoice_dict
+        known = parse_if_none_match(if_none_match)
+        render = DocumentRenderService.get(db, str(org_id), "invoice", invoice_id, known)
+        
+        if render is None:
+            payload = await build_invoice_print_payload(db, invoice_id, org_id)
+            render = DocumentRenderService.store(db, str(org_id), "invoice", invoice_id, payload)
+            db.commit()
+        
+        headers = {"Link": f'<{render.pdf_url}>; rel="alternate"; type="application/pdf"'} if render.pdf_url else None
+        if etag_matches(known, render.content_hash):
+            return not_modified(render.content_hash, headers)
+        return json_response(render.content, render.content_hash, headers)
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Error getting printable invoice: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get printable invoice")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to get printable invoice")
+
+@router.post("/invoices/export")
+async def start_invoice_export(
+    background_tasks: BackgroundTasks,
+    from_date: date = Query(..., description="First invoice date"),
+    to_date: date = Query(..., description="Last invoice date"),
+    db: Session = Depends(get_db),
+    org_id: UUID = UUID(DEFAULT_ORG_ID)
+):
+    """
+    Export all invoices of a date range as one ZIP of print payloads
+    
+    - Each entry has the same shape as /invoices/{invoice_id}/print
+    - Runs in the background; poll /invoices/export/{job_id} for progress
+    """
+    try:
+        job = DocumentExportService.create_job(db, str(org_id), from_date, to_date)
+        db.commit()
+        
+        background_tasks.add_task(run_invoice_export, job["job_id"], str(org_id))
+        return job
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error starting invoice export: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start invoice export")
+
+@router.get("/invoices/export/{job_id}")
+async def get_invoice_export_status(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    org_id: UUID = UUID(DEFAULT_ORG_ID)
+):
+    """Progress of an invoice export job"""
+    try:
+        job = DocumentExportService.get_job(db, str(org_id), str(job_id))
+        if not job:
+            raise HTTPException(status_code=404, detail="Export job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting export status: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get export status")
+
+@router.get("/invoices/export/{job_id}/download")
+async def download_invoice_export(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    org_id: UUID = UUID(DEFAULT_ORG_ID)
+):
+    """Download the ZIP of a completed invoice export"""
+    try:
+        job = DocumentExportService.get_job(db, str(org_id), str(job_id))
+        if not job:
+            raise HTTPException(status_code=404, detail="Export job not found")
+        if job["status"] != "completed":
+            raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+        
+        return FileResponse(
+            job["file_path"],
+            media_type="application/zip",
+            filename=job["file_path"].rsplit("/", 1)[-1]
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error downloading export: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to download export")
@@ -2,10 +2,11 @@
 Challan to Invoice Converter API
 Enables creating invoices from delivered challans
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import date, datetime
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException
+from uuid import UUID
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from pydantic import BaseModel, Field
@@ -13,6 +14,11 @@ import logging
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ..services.gst_calculator import GSTCalculator
+from ..services.gst_party_profile_service import GSTPartyProfileService
+from ..services.challan_invoicing_service import ChallanInvoicingService, allocate_invoice_numbers
+from ..services.stock_reservation_service import StockReservationService, StockReservationError
+from ...jobs.challan_invoicing import run_challan_invoicing
 
 logger = logging.getLogger(__name__)
 
@@ -122,26 +128,51 @@ class ChallanToInvoiceService:
         
         return [dict(row._mapping) for row in result]
     
-    def _generate_invoice_number(self) -> str:
-        """Generate unique invoice number"""
-        today = datetime.now()
-        date_part = today.strftime("%Y%m%d")
-        
-        result = self.db.execute(
-            text("""
-                SELECT COUNT(*) + 1 as next_seq
-                FROM sales.invoices
-                WHERE org_id = :org_id
-                AND invoice_number LIKE :pattern
-            """),
-            {
-                "org_id": self.org_id,
-                "pattern": f"INV{date_part}%"
-            }
+    def is_interstate(self, customer_id: int) -> bool:
+        """Place of supply from the cached customer GST profile"""
+        return GSTPartyProfileService.is_interstate(self.db, self.org_id, customer_id)
+    
+    def calculate_items(
+        self,
+        challan_items: List[Dict[str, Any]],
+        is_interstate: bool
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Calculate invoice lines and totals for challan items in one batched pass"""
+        calc = GSTCalculator.calculate(
+            quantities=[item['quantity'] for item in challan_items],
+            unit_prices=[item['unit_price'] for item in challan_items],
+            gst_percents=[item.get('gst_percent') or 0 for item in challan_items],
+            discount_percents=[item.get('discount_percent') or 0 for item in challan_items],
+            interstate=is_interstate
         )
-        next_seq = result.scalar() or 1
         
-        return f"INV{date_part}{next_seq:04d}"
+        invoice_items_data = []
+        for idx, item in enumerate(challan_items):
+            line = calc.line(idx)
+            invoice_items_data.append({
+                'product_id': item['product_id'],
+                'product_name': item['product_name'],
+                'hsn_code': item.get('hsn_code'),
+                'batch_id': item.get('batch_id'),
+                'batch_number': item.get('batch_number'),
+                'quantity': item['quantity'],
+                'unit_price': item['unit_price'],
+                'mrp': item.get('mrp'),
+                'discount_percent': item.get('discount_percent') or 0,
+                'discount_amount': line['discount_amount'],
+                'gst_percent': line['gst_rate'],
+                'cgst_amount': line['cgst_amount'],
+                'sgst_amount': line['sgst_amount'],
+                'igst_amount': line['igst_amount'],
+                'taxable_amount': line['taxable_amount'],
+                'total_amount': line['total_amount']
+            })
+        
+        return invoice_items_data, calc.totals()
+    
+    def _generate_invoice_number(self) -> str:
+        """Generate unique invoice number"""
+        return allocate_invoice_numbers(self.db, self.org_id, date.today(), 1)[0]
     
     def create_invoice_from_challans(self, request: ChallanToInvoiceRequest) -> ChallanToInvoiceResponse:
         """Create invoice from delivered challans"""
@@ -158,73 +189,15 @@ class ChallanToInvoiceService:
             customer_id = first_challan['customer_id']
             customer_state = first_challan['state']
             
-            # Get organization state for GST calculation
-            org_result = self.db.execute(
-                text("""
-                    SELECT business_settings->>'state' as state
-                    FROM parties.organizations
-                    WHERE org_id = :org_id
-                """),
-                {"org_id": self.org_id}
-            )
-            org_state = org_result.scalar()
-            
-            # Calculate totals
-            subtotal = Decimal('0')
-            total_tax = Decimal('0')
-            cgst_total = Decimal('0')
-            sgst_total = Decimal('0')
-            igst_total = Decimal('0')
-            
-            is_interstate = org_state != customer_state if org_state and customer_state else False
-            
             # Calculate item-wise totals
-            invoice_items_data = []
-            for item in challan_items:
-                quantity = item['quantity']
-                unit_price = Decimal(str(item['unit_price']))
-                discount_percent = Decimal(str(item.get('discount_percent', 0)))
-                gst_percent = Decimal(str(item.get('gst_percent', 0)))
-                
-                # Calculate amounts
-                line_total = quantity * unit_price
-                discount_amount = line_total * discount_percent / 100
-                taxable_amount = line_total - discount_amount
-                
-                # Calculate GST
-                if is_interstate:
-                    igst_amount = taxable_amount * gst_percent / 100
-                    cgst_amount = sgst_amount = Decimal('0')
-                else:
-                    cgst_amount = sgst_amount = taxable_amount * gst_percent / 200
-                    igst_amount = Decimal('0')
-                
-                total_amount = taxable_amount + cgst_amount + sgst_amount + igst_amount
-                
-                subtotal += line_total
-                cgst_total += cgst_amount
-                sgst_total += sgst_amount
-                igst_total += igst_amount
-                total_tax += (cgst_amount + sgst_amount + igst_amount)
-                
-                invoice_items_data.append({
-                    'product_id': item['product_id'],
-                    'product_name': item['product_name'],
-                    'hsn_code': item.get('hsn_code'),
-                    'batch_id': item.get('batch_id'),
-                    'batch_number': item.get('batch_number'),
-                    'quantity': quantity,
-                    'unit_price': unit_price,
-                    'mrp': item.get('mrp'),
-                    'discount_percent': discount_percent,
-                    'discount_amount': discount_amount,
-                    'gst_percent': gst_percent,
-                    'cgst_amount': cgst_amount,
-                    'sgst_amount': sgst_amount,
-                    'igst_amount': igst_amount,
-                    'taxable_amount': taxable_amount,
-                    'total_amount': total_amount
-                })
+            is_interstate = self.is_interstate(customer_id)
+            invoice_items_data, totals = self.calculate_items(challan_items, is_interstate)
+            
+            subtotal = totals["subtotal"]
+            cgst_total = totals["cgst_amount"]
+            sgst_total = totals["sgst_amount"]
+            igst_total = totals["igst_amount"]
+            total_tax = totals["tax_amount"]
             
             # Apply invoice-level discount
             taxable_amount = subtotal - request.discount_amount
@@ -371,6 +344,11 @@ class ChallanToInvoiceService:
                 }
             )
             
+            # Turn the source orders' held reservations into a stock allocation
+            StockReservationService.fulfill_invoiced_orders(
+                self.db, self.org_id, [c['order_id'] for c in challans]
+            )
+            
             self.db.commit()
             
             return ChallanToInvoiceResponse(
@@ -384,6 +362,9 @@ class ChallanToInvoiceService:
         except HTTPException:
             self.db.rollback()
             raise
+        except StockReservationError as e:
+            self.db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error creating invoice from challans: {str(e)}")
@@ -403,6 +384,52 @@ async def create_invoice_from_challans(
     service = ChallanToInvoiceService(db, org_id)
     return service.create_invoice_from_challans(request)
 
+@router.post("/bulk")
+async def start_bulk_challan_invoicing(
+    background_tasks: BackgroundTasks,
+    from_date: date = Query(..., description="First challan date"),
+    to_date: date = Query(..., description="Last challan date"),
+    invoice_date: Optional[date] = Query(None, description="Date on the invoices (defaults to today)"),
+    db: Session = Depends(get_db),
+    org_id: str = DEFAULT_ORG_ID
+):
+    """
+    Invoice every delivered challan of a date range, one invoice per customer
+    
+    - Runs in the background; poll /bulk/{run_id} for progress
+    - Customers that fail are listed on the run; the rest are still invoiced
+    """
+    try:
+        run = ChallanInvoicingService.create_run(db, org_id, from_date, to_date, invoice_date)
+        db.commit()
+        
+        background_tasks.add_task(run_challan_invoicing, run["run_id"], org_id)
+        return run
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error starting bulk challan invoicing: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start bulk challan invoicing")
+
+@router.get("/bulk/{run_id}")
+async def get_bulk_challan_invoicing_status(
+    run_id: UUID,
+    db: Session = Depends(get_db),
+    org_id: str = DEFAULT_ORG_ID
+):
+    """Progress of a bulk challan invoicing run"""
+    try:
+        run = ChallanInvoicingService.get_run(db, org_id, str(run_id))
+        if not run:
+            raise HTTPException(status_code=404, detail="Challan invoicing run not found")
+        return run
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting challan invoicing status: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get challan invoicing status")
+
 @router.get("/eligible-challans")
 async def get_eligible_challans(
     customer_id: Optional[int] = None,
@@ -485,16 +512,12 @@ async def preview_invoice_from_challans(
         challans = service.get_delivered_challans(challan_id_list)
         items = service.get_challan_items(challan_id_list)
         
-        # Calculate totals (similar to create method but without inserting)
-        subtotal = sum(
-            item['quantity'] * Decimal(str(item['unit_price']))
-            for item in items
-        )
-        
-        # Simple tax calculation for preview
-        tax_rate = Decimal('18')  # Default GST
-        tax_amount = subtotal * tax_rate / 100
-        total_amount = subtotal + tax_amount
+        # Calculate totals with the same engine as the create method
+        is_interstate = service.is_interstate(challans[0]['customer_id']) if challans else False
+        _, totals = service.calculate_items(items, is_interstate)
+        subtotal = totals["subtotal"]
+        tax_amount = totals["tax_amount"]
+        total_amount = totals["total_amount"]
         
         return {
             "preview": {
@@ -14,6 +14,9 @@ import urllib.parse
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...dependencies import get_current_org
+from ..services.reminder_campaign_service import ReminderCampaignService, ReminderCampaignError
+from ..services.outbound_queue_service import OutboundQueueService
 
 logger = logging.getLogger(__name__)
 
@@ -363,6 +366,79 @@ async def generate_reminder_links(
         logger.error(f"Error generating reminder links: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/reminders/campaigns")
+async def create_reminder_campaign(
+    campaign_data: dict,
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """
+    Send payment reminders to every customer matching aging filters.
+    Body: channel ('sms', 'whatsapp', 'email'), message (with {{party_name}},
+    {{amount}}, {{days_overdue}}, {{invoice_numbers}}, {{company_name}}, ...)
+    or template_code, optional subject, filters (min_days_overdue,
+    max_days_overdue, aging_buckets, min_amount, customer_ids, max_parties)
+    and dry_run to preview the rendered messages without sending.
+    Messages are put on the outbound queue and sent by the queue workers;
+    poll the campaign for progress.
+    """
+    try:
+        if "channel" not in campaign_data:
+            raise HTTPException(status_code=400, detail="Missing required field: channel")
+
+        org = current_org.org
+        campaign = ReminderCampaignService.create_campaign(
+            db,
+            current_org["org_id"],
+            campaign_data["channel"],
+            campaign_data.get("filters") or {},
+            message_template=campaign_data.get("message"),
+            subject_template=campaign_data.get("subject"),
+            template_code=campaign_data.get("template_code"),
+            company_name=(org.org_name if org and org.org_name else "AASO Pharmaceuticals"),
+            created_by=current_org.user_id,
+            dry_run=bool(campaign_data.get("dry_run"))
+        )
+        if campaign_data.get("dry_run"):
+            return {"status": "preview", **campaign}
+
+        queued = OutboundQueueService.enqueue_reminder_deliveries(db, campaign["campaign_id"])
+        db.commit()
+
+        return {"status": "queued" if queued else "completed", **campaign}
+
+    except ReminderCampaignError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error creating reminder campaign: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/reminders/campaigns/{campaign_id}")
+async def get_reminder_campaign(
+    campaign_id: int,
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """
+    Progress of a reminder campaign: sent, failed and pending counts and
+    the latest failures
+    """
+    try:
+        campaign = ReminderCampaignService.get_campaign(db, current_org["org_id"], campaign_id)
+        if not campaign:
+            raise HTTPException(status_code=404, detail=f"Campaign {campaign_id} not found")
+        return campaign
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching reminder campaign: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/reminders/history")
 async def get_reminder_history(
     customer_id: Optional[int] = None,
@@ -3,7 +3,7 @@ Credit/Debit Note API Router
 Handles financial adjustments independent of physical returns
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
@@ -13,6 +13,10 @@ import uuid
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...core.hydration import load_values
+from ...core.http_cache import etag_matches, json_response, not_modified, parse_if_none_match
+from ...jobs.document_renderer import render_pool
+from ..services.document_render_service import DocumentRenderService
 
 logger = logging.getLogger(__name__)
 
@@ -75,9 +79,19 @@ async def get_notes(
             
         total = db.execute(text(count_query), params).scalar()
         
+        # Resolve linked invoice numbers for the whole page in one query
+        note_list = [dict(note._mapping) for note in notes]
+        linked_invoices = load_values(db, """
+            SELECT sale_id, invoice_number
+            FROM sales
+            WHERE sale_id = ANY(:ids)
+        """, [note.get("linked_invoice_id") for note in note_list], "sale_id", "invoice_number")
+        for note in note_list:
+            note.setdefault("linked_invoice_number", linked_invoices.get(note.get("linked_invoice_id")))
+        
         return {
             "total": total,
-            "notes": [dict(note._mapping) for note in notes]
+            "notes": note_list
         }
         
     except Exception as e:
@@ -183,6 +197,9 @@ async def create_credit_note(
         
         db.commit()
         
+        # Pre-render the print payload so the first print is a cache hit
+        render_pool.submit("note", note_id, DEFAULT_ORG_ID)
+        
         return {
             "status": "success",
             "note_id": note_id,
@@ -330,6 +347,9 @@ async def create_debit_note(
         
         db.commit()
         
+        # Pre-render the print payload so the first print is a cache hit
+        render_pool.submit("note", note_id, DEFAULT_ORG_ID)
+        
         return {
             "status": "success",
             "note_id": note_id,
@@ -381,38 +401,51 @@ async def get_note_detail(
         logger.error(f"Error fetching note detail: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def build_note_print_payload(db: Session, note_id: str, org_id: str) -> dict:
+    """Note with organization details, as rendered for printing"""
+    # Get organization details
+    organization = db.execute(text("""
+        SELECT * FROM parties.organizations 
+        WHERE org_id = :org_id
+    """), {"org_id": org_id}).first()
+    
+    # Get note with all details
+    note_data = await get_note_detail(str(note_id), db)
+    
+    # Format for printing; print_date is when this render was produced
+    return {
+        "organization": dict(organization._mapping) if organization else {},
+        "note": note_data,
+        "print_date": datetime.now().isoformat(),
+        "document_type": "CREDIT NOTE" if note_data["note_type"] == "credit" else "DEBIT NOTE"
+    }
+
 @router.get("/{note_id}/print")
 async def get_note_print_data(
     note_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
-    Get note data formatted for printing
+    Get note data formatted for printing (cached render, ETag / If-None-Match)
     """
     try:
-        # Get organization details
-        org_query = """
-            SELECT * FROM parties.organizations 
-            WHERE org_id = DEFAULT_ORG_ID
-        """
-        organization = db.execute(text(org_query)).first()
-        
-        # Get note with all details
-        note_data = await get_note_detail(note_id, db)
+        known = parse_if_none_match(if_none_match)
+        render = DocumentRenderService.get(db, DEFAULT_ORG_ID, "note", note_id, known)
         
-        # Format for printing
-        print_data = {
-            "organization": dict(organization._mapping) if organization else {},
-            "note": note_data,
-            "print_date": datetime.now().isoformat(),
-            "document_type": "CREDIT NOTE" if note_data["note_type"] == "credit" else "DEBIT NOTE"
-        }
+        if render is None:
+            payload = await build_note_print_payload(db, note_id, DEFAULT_ORG_ID)
+            render = DocumentRenderService.store(db, DEFAULT_ORG_ID, "note", note_id, payload)
+            db.commit()
         
-        return print_data
+        if etag_matches(known, render.content_hash):
+            return not_modified(render.content_hash)
+        return json_response(render.content, render.content_hash)
         
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Error getting print data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -532,6 +565,9 @@ async def cancel_note(
                     }
                 )
         
+        # The cached print still shows the note as active
+        DocumentRenderService.invalidate(db, "note", [note_id])
+        
         db.commit()
         
         return {
@@ -4,25 +4,32 @@ Implements GST-compliant customer management with credit tracking
 """
 from typing import Optional
 from datetime import date, datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from decimal import Decimal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
 from functools import lru_cache
 
 from ...core.database import get_db
-from ...core.config import DEFAULT_ORG_ID
+from ...core.config import DEFAULT_ORG_ID, settings
+from ...core.fast_json import dumps, project, rows_as_dicts
+from ...core.http_cache import data_version_etag, etag_matches, json_response, not_modified, parse_if_none_match
 from ..schemas.customer import (
     CustomerCreate, CustomerUpdate, CustomerResponse, CustomerListResponse,
     CustomerLedgerResponse, CustomerOutstandingResponse,
     PaymentRecord, PaymentResponse
 )
 from ..services.customer_service import CustomerService
+from ..services.gst_party_profile_service import GSTPartyProfileService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["master", "customers"])
 
+# Update fields that change a customer's GST profile
+GST_PROFILE_FIELDS = {"gstin", "state", "state_code"}
+
 # Cache the area column check result
 @lru_cache(maxsize=1)
 def check_area_column_exists() -> bool:
@@ -139,10 +146,11 @@ async def list_customers(
     city: Optional[str] = None,
     has_gstin: Optional[bool] = None,
     include_stats: bool = Query(True, description="Include business statistics"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
-    List customers with search, filter, and pagination
+    List customers with search, filter, and pagination (ETag / If-None-Match)
     
     - **search**: Search in name, primary_phone as phone, or customer code
     - **customer_type**: Filter by type (retail/wholesale/hospital/clinic/pharmacy)
@@ -153,6 +161,15 @@ async def list_customers(
     try:
         logger.info(f"Customer search request: search={search}, limit={limit}, skip={skip}, include_stats={include_stats}")
         
+        # Statistics come from orders, so they version the list too
+        token = data_version_etag(
+            db, "customers.list", ("customers", "orders") if include_stats else ("customers",),
+            org_id=DEFAULT_ORG_ID, skip=skip, limit=limit, search=search, customer_type=customer_type,
+            is_active=is_active, has_gstin=has_gstin, include_stats=include_stats
+        )
+        if etag_matches(parse_if_none_match(if_none_match), token):
+            return not_modified(token)
+        
         # Build query
         query = "SELECT * FROM parties.customers WHERE org_id = :org_id"
         count_query = "SELECT COUNT(*) FROM parties.customers WHERE org_id = :org_id"
@@ -225,17 +242,16 @@ async def list_customers(
         
         customers = []
         # Collect all customer data first
-        customer_rows = list(result)
+        customer_rows = rows_as_dicts(result)
         
         # Get statistics in batch if requested
         stats_by_customer = {}
         if include_stats:
-            customer_ids = [row.customer_id for row in customer_rows]
+            customer_ids = [row["customer_id"] for row in customer_rows]
             stats_by_customer = CustomerService.get_customers_statistics_batch(db, customer_ids)
         
         # Build customer responses
-        for row in customer_rows:
-            customer_dict = dict(row._mapping)
+        for customer_dict in customer_rows:
             
             # Map database columns to schema fields
             customer_dict["phone"] = customer_dict.pop("primary_phone", None)
@@ -247,32 +263,47 @@ async def list_customers(
             
             # Add statistics from batch lookup or default values
             if include_stats:
-                customer_stats = stats_by_customer.get(row.customer_id, {})
+                customer_stats = stats_by_customer.get(customer_dict["customer_id"], {})
                 customer_dict.update({
                     "total_orders": customer_stats.get("total_orders", 0),
-                    "total_business": customer_stats.get("total_business", 0),
+                    "total_business": customer_stats.get("total_business", Decimal("0.00")),
                     "last_order_date": customer_stats.get("last_order_date"),
-                    "outstanding_amount": customer_stats.get("outstanding_amount", 0)
+                    "outstanding_amount": customer_stats.get("outstanding_amount", Decimal("0.00"))
                 })
             else:
-                # Set default values for statistics
+                # Set default values for statistics; Decimals like the model's
+                # defaults, so both response paths encode them as "0.00"
                 customer_dict.update({
                     "total_orders": 0,
-                    "total_business": 0,
+                    "total_business": Decimal("0.00"),
                     "last_order_date": None,
-                    "outstanding_amount": 0
+                    "outstanding_amount": Decimal("0.00")
                 })
             
-            customers.append(CustomerResponse(**customer_dict))
+            if settings.FAST_JSON_RESPONSES:
+                # Our own columns: shaped like CustomerResponse, not validated row by row
+                customers.append(project(customer_dict, CustomerResponse))
+            else:
+                customers.append(CustomerResponse(**customer_dict))
         
         logger.info(f"Returning {len(customers)} customers")
         
-        return CustomerListResponse(
-            total=total,
-            page=skip // limit + 1,
-            per_page=limit,
-            customers=customers
-        )
+        if settings.FAST_JSON_RESPONSES:
+            body = dumps({
+                "total": total,
+                "page": skip // limit + 1,
+                "per_page": limit,
+                "customers": customers
+            }, like_model=True)
+        else:
+            body = CustomerListResponse(
+                total=total,
+                page=skip // limit + 1,
+                per_page=limit,
+                customers=customers
+            ).model_dump_json().encode("utf-8")
+        
+        return json_response(body, token)
         
     except Exception as e:
         logger.error(f"Error listing customers: {str(e)}")
@@ -364,6 +395,10 @@ async def update_customer(
             """
             
             db.execute(text(query), params)
+            
+            # GSTIN or state changed: re-resolve place of supply on next use
+            if GST_PROFILE_FIELDS & params.keys():
+                GSTPartyProfileService.invalidate_party(db, DEFAULT_ORG_ID, "customer", customer_id)
             db.commit()
         
         # Return updated customer
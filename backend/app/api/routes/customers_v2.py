@@ -11,6 +11,7 @@ import logging
 
 from ...core.database import get_db
 from ...core.config import settings
+from ..services.gst_party_profile_service import GSTPartyProfileService
 from ...schemas.customer import (
     CustomerCreate, CustomerUpdate, CustomerResponse, CustomerListResponse,
     CustomerAddressCreate, CustomerAddressResponse
@@ -440,6 +441,10 @@ async def update_customer(
             """
             
             db.execute(text(query), params)
+            
+            # GSTIN changed: re-resolve place of supply on next use
+            if "gst_number" in params:
+                GSTPartyProfileService.invalidate_party(db, DEFAULT_ORG_ID, "customer", customer_id)
             db.commit()
         
         # Return updated customer
@@ -10,6 +10,9 @@ import logging
 from datetime import date, datetime, timedelta
 
 from ...core.database import get_db
+from ...core.config import DEFAULT_ORG_ID
+from ...core.fast_json import fast_json, rows_as_dicts
+from ..services.expiry_calendar_service import ExpiryCalendarService
 
 logger = logging.getLogger(__name__)
 
@@ -27,26 +30,27 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
                 (SELECT COUNT(*) FROM sales.orders WHERE order_date >= CURRENT_DATE - INTERVAL '30 days') as orders_this_month,
                 (SELECT COUNT(*) FROM parties.suppliers) as total_suppliers,
                 (SELECT COALESCE(SUM(total_amount), 0) FROM sales.orders WHERE order_date >= CURRENT_DATE - INTERVAL '30 days') as revenue_this_month,
-                (SELECT COUNT(*) FROM inventory.batches WHERE quantity_available > 0) as active_batches,
-                (SELECT COUNT(*) FROM inventory.batches WHERE expiry_date <= CURRENT_DATE + INTERVAL '30 days' AND quantity_available > 0) as expiring_soon
+                (SELECT COUNT(*) FROM inventory.batches WHERE quantity_available > 0) as active_batches
         """
         
         result = db.execute(text(stats_query))
         stats = dict(result.first()._mapping)
         
+        # Expiring soon comes from the expiry calendar's monthly totals
+        expiring = ExpiryCalendarService.get_value_at_risk(
+            db, DEFAULT_ORG_ID, until_date=date.today() + timedelta(days=30)
+        )
+        stats["expiring_soon"] = expiring["batch_count"]
+        stats["expiring_soon_value"] = expiring["stock_value"]
+        
         # Get low stock alerts
         low_stock_query = """
             SELECT COUNT(*) as low_stock_products
-            FROM (
-                SELECT p.product_id, 
-                       COALESCE(SUM(b.quantity_available), 0) as total_stock,
-                       p.minimum_stock_level
-                FROM inventory.products p
-                LEFT JOIN inventory.batches b ON p.product_id = b.product_id AND b.quantity_available > 0
-                WHERE p.is_active = true
-                GROUP BY p.product_id, p.minimum_stock_level
-                HAVING COALESCE(SUM(b.quantity_available), 0) <= COALESCE(p.minimum_stock_level, 0)
-            ) as low_stock
+            FROM inventory.products p
+            LEFT JOIN inventory.product_stock_summary s 
+                ON s.org_id = p.org_id AND s.product_id = p.product_id
+            WHERE p.is_active = true
+            AND COALESCE(s.on_hand_quantity, 0) <= COALESCE(p.minimum_stock_level, 0)
         """
         
         low_stock_result = db.execute(text(low_stock_query))
@@ -82,9 +86,9 @@ def get_recent_orders(
         """
         
         result = db.execute(text(query), {"limit": limit})
-        orders = [dict(row._mapping) for row in result]
+        orders = rows_as_dicts(result)
         
-        return orders
+        return fast_json(orders)
         
     except Exception as e:
         logger.error(f"Error fetching recent orders: {str(e)}")
@@ -144,9 +148,9 @@ def get_revenue_data(
             params = {"start_date": start_date, "end_date": end_date}
         
         result = db.execute(text(query), params)
-        revenue_data = [dict(row._mapping) for row in result]
+        revenue_data = rows_as_dicts(result)
         
-        return revenue_data
+        return fast_json(revenue_data)
         
     except Exception as e:
         logger.error(f"Error fetching revenue data: {str(e)}")
@@ -179,9 +183,9 @@ def get_top_products(
         """
         
         result = db.execute(text(query), {"limit": limit, "period_days": period_days})
-        top_products = [dict(row._mapping) for row in result]
+        top_products = rows_as_dicts(result)
         
-        return top_products
+        return fast_json(top_products)
         
     except Exception as e:
         logger.error(f"Error fetching top products: {str(e)}")
@@ -197,48 +201,34 @@ def get_inventory_alerts(db: Session = Depends(get_db)):
                 p.product_id,
                 p.product_name,
                 p.brand_name,
-                COALESCE(SUM(b.quantity_available), 0) as current_stock,
+                COALESCE(s.on_hand_quantity, 0) as current_stock,
+                COALESCE(s.sellable_quantity, 0) as sellable_stock,
                 p.minimum_stock_level,
                 'low_stock' as alert_type
             FROM inventory.products p
-            LEFT JOIN inventory.batches b ON p.product_id = b.product_id AND b.quantity_available > 0
+            LEFT JOIN inventory.product_stock_summary s 
+                ON s.org_id = p.org_id AND s.product_id = p.product_id
             WHERE p.is_active = true
-            GROUP BY p.product_id, p.product_name, p.brand_name, p.minimum_stock_level
-            HAVING COALESCE(SUM(b.quantity_available), 0) <= COALESCE(p.minimum_stock_level, 0)
+            AND COALESCE(s.on_hand_quantity, 0) <= COALESCE(p.minimum_stock_level, 0)
             AND p.minimum_stock_level > 0
             ORDER BY current_stock ASC
             LIMIT 20
         """
         
-        # Expiring soon products
-        expiring_query = """
-            SELECT 
-                b.batch_id,
-                p.product_id,
-                p.product_name,
-                p.brand_name,
-                b.batch_number,
-                b.expiry_date,
-                b.quantity_available,
-                'expiring_soon' as alert_type
-            FROM inventory.batches b
-            JOIN inventory.products p ON b.product_id = p.product_id
-            WHERE b.expiry_date <= CURRENT_DATE + INTERVAL '30 days'
-            AND b.quantity_available > 0
-            ORDER BY b.expiry_date ASC
-            LIMIT 20
-        """
-        
         low_stock_result = db.execute(text(low_stock_query))
-        low_stock = [dict(row._mapping) for row in low_stock_result]
+        low_stock = rows_as_dicts(low_stock_result)
         
-        expiring_result = db.execute(text(expiring_query))
-        expiring = [dict(row._mapping) for row in expiring_result]
+        # Expiring soon products
+        expiring = ExpiryCalendarService.get_expiring_batches(
+            db, DEFAULT_ORG_ID, until_date=date.today() + timedelta(days=30), limit=20
+        )
+        for item in expiring:
+            item["alert_type"] = "expiring_soon"
         
-        return {
+        return fast_json({
             "low_stock_products": low_stock,
             "expiring_products": expiring
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error fetching inventory alerts: {str(e)}")
@@ -272,9 +262,9 @@ def get_customer_analytics(
         """
         
         result = db.execute(text(query), {"limit": limit, "period_days": period_days})
-        customer_analytics = [dict(row._mapping) for row in result]
+        customer_analytics = rows_as_dicts(result)
         
-        return customer_analytics
+        return fast_json(customer_analytics)
         
     except Exception as e:
         logger.error(f"Error fetching customer analytics: {str(e)}")
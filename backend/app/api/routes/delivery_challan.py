@@ -10,6 +10,7 @@ import logging
 from datetime import date, datetime
 
 from ...core.database import get_db
+from ...core.hydration import hydrate
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +68,22 @@ def get_delivery_challans(
         result = db.execute(text(query), params)
         challans = [dict(row._mapping) for row in result]
         
+        # Get challan items (order items) for the whole page in one query
+        challans = hydrate(db, challans, """
+            SELECT 
+                oi.order_id,
+                oi.order_item_id,
+                oi.product_id,
+                p.product_name,
+                oi.quantity,
+                oi.price,
+                (oi.quantity * oi.price) as total_amount
+            FROM sales.order_items oi
+            JOIN inventory.products p ON oi.product_id = p.product_id
+            WHERE oi.order_id = ANY(:ids)
+            ORDER BY oi.order_id, oi.order_item_id
+        """, "challan_id", child_key="order_id")
+        
         return challans
         
     except Exception as e:
@@ -13,6 +13,7 @@ import logging
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...core.hydration import hydrate
 
 logger = logging.getLogger(__name__)
 
@@ -349,6 +350,15 @@ async def list_challans(
         result = db.execute(text(query), params)
         challans = [dict(row._mapping) for row in result]
         
+        # Get challan items for the whole page in one query
+        challans = hydrate(db, challans, """
+            SELECT ci.*, p.hsn_code, p.gst_percent
+            FROM challan_items ci
+            JOIN inventory.products p ON ci.product_id = p.product_id
+            WHERE ci.challan_id = ANY(:ids)
+            ORDER BY ci.challan_id
+        """, "challan_id")
+        
         return challans
         
     except Exception as e:
@@ -5,10 +5,12 @@ Uses proper validation, transactions, and comprehensive error handling
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 import logging
+import time
 
+from ...core.audit import audit_log
 from ...core.database import get_db
 from ...core.auth import get_current_org
 from ..services.enterprise_order_service import (
@@ -33,6 +35,7 @@ router = APIRouter(
 @router.post("/", response_model=OrderCreationResponse)
 async def create_enterprise_order(
     order_request: OrderCreationRequest,
+    request: Request,
     db: Session = Depends(get_db),
     current_org = Depends(get_current_org)
 ):
@@ -59,6 +62,7 @@ async def create_enterprise_order(
     - Validates all required fields
     - Prevents data integrity issues
     """
+    started = time.perf_counter()
     try:
         org_id = current_org["org_id"]
         logger.info(f"Creating enterprise order for org {org_id}, customer {order_request.customer_id}")
@@ -68,6 +72,13 @@ async def create_enterprise_order(
         
         # Create order using enterprise service
         result = order_service.create_order(order_request)
+        audit_log.record(
+            org_id, "order", result.order_id, "Order created with invoice",
+            entity_name=result.order_number,
+            new_values={"request": order_request.dict(), "invoice_id": result.invoice_id,
+                        "total_amount": result.total_amount},
+            request=request, started=started
+        )
         
         logger.info(f"Enterprise order created successfully: {result.order_number}")
         return result
@@ -96,6 +107,7 @@ async def create_enterprise_order(
 @router.post("/quick-sale", response_model=OrderCreationResponse)
 async def create_quick_sale_compatible(
     request_data: dict,
+    request: Request,
     db: Session = Depends(get_db),
     current_org = Depends(get_current_org)
 ):
@@ -105,6 +117,7 @@ async def create_quick_sale_compatible(
     This endpoint accepts the old quick-sale format and transforms it to use
     the new enterprise service, ensuring data integrity without breaking existing clients.
     """
+    started = time.perf_counter()
     try:
         org_id = current_org["org_id"]
         logger.info(f"Processing quick-sale request for org {org_id}")
@@ -117,6 +130,13 @@ async def create_quick_sale_compatible(
         
         # Create order using enterprise service
         result = order_service.create_order(enterprise_request)
+        audit_log.record(
+            org_id, "order", result.order_id, "Quick sale created with invoice",
+            entity_name=result.order_number,
+            new_values={"request": enterprise_request.dict(), "invoice_id": result.invoice_id,
+                        "total_amount": result.total_amount},
+            request=request, started=started
+        )
         
         logger.info(f"Quick-sale compatibility order created: {result.order_number}")
         
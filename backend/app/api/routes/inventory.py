@@ -3,14 +3,16 @@ Inventory management endpoints for enterprise pharma system
 Handles batch tracking, stock movements, and expiry management
 """
 from typing import Optional, List
-from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...core.fast_json import dumps
+from ...core.http_cache import data_version_etag, etag_matches, json_response, not_modified, parse_if_none_match
 from ..schemas.inventory import (
     BatchCreate, BatchResponse, StockMovementCreate,
     StockMovementResponse, StockAdjustment,
@@ -18,6 +20,8 @@ from ..schemas.inventory import (
     StockValuation, InventoryDashboard
 )
 from ..services.inventory_service import InventoryService
+from ..services.expiry_calendar_service import ExpiryCalendarService
+from ..services.stock_summary_service import StockSummaryService
 
 logger = logging.getLogger(__name__)
 
@@ -353,13 +357,77 @@ async def get_expiry_alerts(
         logger.error(f"Error getting expiry alerts: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get expiry alerts: {str(e)}")
 
+@router.get("/expiry/value-at-risk")
+async def get_expiry_value_at_risk(
+    days_ahead: int = Query(90, ge=1, le=730),
+    include_expired: bool = Query(True, description="Include already expired stock"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stock quantity and cost value expiring within the window
+    
+    - Totals come from the monthly expiry calendar, not a batch scan
+    - Includes the per-month breakdown
+    """
+    try:
+        until_date = date.today() + timedelta(days=days_ahead)
+        from_date = None if include_expired else date.today()
+        
+        return {
+            **ExpiryCalendarService.get_value_at_risk(
+                db, DEFAULT_ORG_ID, until_date=until_date, from_date=from_date
+            ),
+            "monthly_buckets": ExpiryCalendarService.get_monthly_buckets(
+                db, DEFAULT_ORG_ID, until_date=until_date, from_date=from_date
+            )
+        }
+        
+    except Exception as e:
+        logger.error(f"Error getting expiry value at risk: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get expiry value at risk: {str(e)}")
+
+@router.post("/expiry/calendar/rebuild")
+async def rebuild_expiry_calendar(db: Session = Depends(get_db)):
+    """
+    Rebuild the expiry calendar from batch stock
+    
+    - Needed once after deployment, or to repair drift
+    """
+    try:
+        batches = ExpiryCalendarService.rebuild(db, DEFAULT_ORG_ID)
+        return {"message": "Expiry calendar rebuilt", "batches_indexed": batches}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rebuilding expiry calendar: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild expiry calendar: {str(e)}")
+
+@router.post("/stock-summary/reconcile")
+async def reconcile_stock_summary(
+    product_id: Optional[List[int]] = Query(None, description="Limit to these products"),
+    db: Session = Depends(get_db)
+):
+    """
+    Recompute the product stock summary from batches
+    
+    - Returns products whose stored availability had drifted
+    - Also runs daily from the background scheduler
+    """
+    try:
+        drifted = StockSummaryService.reconcile(db, DEFAULT_ORG_ID, product_id)
+        return {"products_corrected": len(drifted), "drifted": drifted}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error reconciling stock summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to reconcile stock summary: {str(e)}")
+
 @router.get("/valuation", response_model=StockValuation)
 async def get_stock_valuation(
     as_of_date: Optional[date] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
-    Get stock valuation report
+    Get stock valuation report (ETag / If-None-Match)
     
     - Total stock value
     - Expired stock value
@@ -367,7 +435,15 @@ async def get_stock_valuation(
     - Category-wise breakdown
     """
     try:
-        return InventoryService.get_stock_valuation(db, DEFAULT_ORG_ID, as_of_date)
+        as_of_date = as_of_date or date.today()
+        token = data_version_etag(
+            db, "inventory.valuation", ("stock", "products"), org_id=DEFAULT_ORG_ID, as_of_date=as_of_date
+        )
+        if etag_matches(parse_if_none_match(if_none_match), token):
+            return not_modified(token)
+        
+        valuation = InventoryService.get_stock_valuation(db, DEFAULT_ORG_ID, as_of_date)
+        return json_response(dumps(valuation.model_dump(), like_model=True), token)
     except Exception as e:
         logger.error(f"Error getting valuation: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get valuation: {str(e)}")
@@ -14,6 +14,9 @@ import logging
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
 from ..services.invoice_service import InvoiceService
+from ..services.gst_calculator import GSTCalculator
+from ..services.gst_party_profile_service import GSTPartyProfileService
+from ..services.document_render_service import DocumentRenderService
 
 logger = logging.getLogger(__name__)
 
@@ -451,7 +454,9 @@ async def update_invoice_pdf_status(
     """
     Update invoice with PDF URL after frontend generates it
     
-    Call this after successfully generating PDF in frontend
+    Call this after successfully generating PDF in frontend. The URL is
+    also kept on the current print render, so reprints of the same content
+    link to it until the invoice changes.
     """
     try:
         db.execute(text("""
@@ -462,6 +467,8 @@ async def update_invoice_pdf_status(
             WHERE invoice_id = :invoice_id
         """), {"invoice_id": invoice_id, "pdf_url": pdf_url})
         
+        DocumentRenderService.attach_pdf(db, "invoice", invoice_id, pdf_url)
+        
         db.commit()
         
         return {"message": "PDF URL updated successfully", "invoice_id": invoice_id}
@@ -504,78 +511,57 @@ async def calculate_invoice_totals(
     Calculate invoice totals server-side for security and consistency
     """
     try:
-        # Get customer details for GST calculations
-        customer = db.execute(text("""
-            SELECT state, state_code FROM parties.customers
-            WHERE customer_id = :customer_id
-        """), {"customer_id": request.customer_id}).first()
+        # Place of supply from the cached customer GST profile
+        customer = GSTPartyProfileService.get_customer_profile(db, DEFAULT_ORG_ID, request.customer_id)
         
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        # Get company/seller state from organization settings
-        org_state_result = db.execute(text("""
-            SELECT business_settings->>'state' as state,
-                   business_settings->>'state_code' as state_code
-            FROM parties.organizations
-            WHERE org_id = '12de5e22-eee7-4d25-b3a7-d16d01c6170f'
-        """)).first()
-        
-        # Get seller's state - if not set, treat as intrastate
-        company_state = org_state_result.state if org_state_result and org_state_result.state else None
-        company_state_code = org_state_result.state_code if org_state_result and org_state_result.state_code else None
-        
-        # Determine if interstate
-        if company_state and customer.state:
-            is_interstate = customer.state.lower() != company_state.lower()
-        else:
-            # If either state is missing, default to intrastate (CGST/SGST)
-            is_interstate = False
-        
-        subtotal = Decimal("0")
-        total_cgst = Decimal("0")
-        total_sgst = Decimal("0")
-        total_igst = Decimal("0")
+        is_interstate = customer.is_interstate
+        
+        # Fetch prices for items sent without a rate in one query
+        def item_rate(item):
+            return item.get("rate", 0) or item.get("sale_price", 0) or item.get("unit_price", 0)
+        
+        missing_rate_ids = [
+            item.get("product_id") for item in request.items
+            if not item_rate(item) and item.get("product_id")
+        ]
+        products = {}
+        if missing_rate_ids:
+            products = {
+                row.product_id: row for row in db.execute(text("""
+                    SELECT product_id, sale_price, mrp, gst_percent 
+                    FROM inventory.products 
+                    WHERE product_id = ANY(:product_ids)
+                """), {"product_ids": missing_rate_ids})
+            }
         
-        # Calculate totals for each item
+        rates = []
+        gst_percents = []
         for item in request.items:
-            # Get product details if rate not provided
-            product_id = item.get("product_id")
-            rate = Decimal(str(item.get("rate", 0) or item.get("sale_price", 0) or item.get("unit_price", 0)))
-            
-            if rate == 0 and product_id:
-                # Fetch product price from database
-                product = db.execute(text("""
-                    SELECT sale_price, mrp, gst_percent 
-                    FROM inventory.products 
-                    WHERE product_id = :product_id
-                """), {"product_id": product_id}).first()
-                
-                if product:
-                    rate = Decimal(str(product.sale_price or product.mrp or 0))
-                    gst_percent = Decimal(str(product.gst_percent or 12))
-                else:
-                    gst_percent = Decimal("12")
-            else:
-                gst_percent = Decimal(str(item.get("gst_percent", 12) or item.get("tax_rate", 12) or 12))
-            
-            quantity = Decimal(str(item.get("quantity", 0)))
-            discount_percent = Decimal(str(item.get("discount_percent", 0) or item.get("discount", 0)))
-            
-            line_total = quantity * rate
-            discount_amount = line_total * discount_percent / 100
-            taxable_amount = line_total - discount_amount
-            
-            if is_interstate:
-                igst = taxable_amount * gst_percent / 100
-                total_igst += igst
+            rate = item_rate(item)
+            if not rate and item.get("product_id"):
+                product = products.get(item.get("product_id"))
+                rate = (product.sale_price or product.mrp or 0) if product else 0
+                gst_percents.append((product.gst_percent or 12) if product else 12)
             else:
-                cgst = taxable_amount * gst_percent / 200  # Half of GST
-                sgst = taxable_amount * gst_percent / 200  # Half of GST
-                total_cgst += cgst
-                total_sgst += sgst
-            
-            subtotal += line_total
+                gst_percents.append(item.get("gst_percent", 12) or item.get("tax_rate", 12) or 12)
+            rates.append(rate)
+        
+        # Calculate all lines in one batched pass
+        totals = GSTCalculator.calculate(
+            quantities=[item.get("quantity", 0) for item in request.items],
+            unit_prices=rates,
+            gst_percents=gst_percents,
+            discount_percents=[item.get("discount_percent", 0) or item.get("discount", 0) for item in request.items],
+            interstate=is_interstate
+        ).totals()
+        
+        subtotal = totals["subtotal"]
+        total_cgst = totals["cgst_amount"]
+        total_sgst = totals["sgst_amount"]
+        total_igst = totals["igst_amount"]
         
         # Apply invoice-level discount
         invoice_discount = request.discount_amount or Decimal("0")
@@ -0,0 +1,153 @@
+"""
+Outbound Messages API Router
+SMS, WhatsApp and email sends. Endpoints only put messages on the durable
+outbound queue (or schedule them); the queue workers send them, retry
+failures with backoff and dead-letter what cannot be delivered.
+"""
+from typing import Any, Dict, List
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+import logging
+
+from ...core.database import get_db
+from ...dependencies import get_current_org
+from ..services.outbound_queue_service import OutboundQueueService, OutboundQueueError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/messages", tags=["messages"])
+
+
+@router.post("/outbound")
+def queue_outbound_message(
+    message_data: Dict[str, Any],
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """
+    Queue a message to one or more recipients.
+    Body: channel ('sms', 'whatsapp', 'email'), recipients (list), message,
+    optional subject, send_at (ISO timestamp, to schedule the send) and
+    dedupe_key (a repeated request with the same key is not sent twice).
+    """
+    try:
+        for field in ("channel", "recipients", "message"):
+            if not message_data.get(field):
+                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+        recipients = message_data["recipients"]
+        if isinstance(recipients, str):
+            recipients = [recipients]
+
+        send_at = message_data.get("send_at")
+        if send_at:
+            try:
+                send_at = datetime.fromisoformat(str(send_at).replace("Z", "+00:00"))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="send_at must be an ISO timestamp")
+            if send_at.tzinfo is None:
+                send_at = send_at.replace(tzinfo=timezone.utc)
+
+        if send_at and send_at > datetime.now(timezone.utc):
+            if current_org.user_id is None:
+                raise HTTPException(status_code=400, detail="Scheduling a message requires a signed-in user")
+            scheduled_id = OutboundQueueService.schedule(
+                db,
+                current_org["org_id"],
+                message_data["channel"],
+                recipients,
+                message_data["message"],
+                send_at,
+                created_by=current_org.user_id,
+                subject=message_data.get("subject")
+            )
+            db.commit()
+            return {"status": "scheduled", "scheduled_notification_id": scheduled_id, "send_at": send_at}
+
+        dedupe_key = message_data.get("dedupe_key")
+        message_ids = OutboundQueueService.enqueue(
+            db,
+            current_org["org_id"],
+            [
+                {
+                    "channel": message_data["channel"],
+                    "recipient": recipient,
+                    "subject": message_data.get("subject"),
+                    "body": message_data["message"],
+                    "dedupe_key": f"api:{current_org['org_id']}:{dedupe_key}:{recipient}" if dedupe_key else None
+                }
+                for recipient in recipients
+            ],
+            created_by=current_org.user_id
+        )
+        db.commit()
+        return {"status": "queued", "message_ids": message_ids, "duplicates": len(recipients) - len(message_ids)}
+
+    except OutboundQueueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error queueing outbound message: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue message: {str(e)}")
+
+
+@router.get("/outbound/stats")
+def get_outbound_queue_stats(
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """
+    The organization's queue depth per status, lag (age of the oldest due
+    message) and sends over the last minute and hour. Worker counters are
+    instance-wide and served on /health/metrics.
+    """
+    try:
+        return OutboundQueueService.queue_stats(db, current_org["org_id"])
+
+    except Exception as e:
+        logger.error(f"Error reading outbound queue stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to read queue stats: {str(e)}")
+
+
+@router.get("/outbound/dead")
+def get_dead_letters(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """Messages that could not be delivered, newest first"""
+    try:
+        messages = OutboundQueueService.dead_letters(db, current_org["org_id"], skip, limit)
+        return {"messages": messages, "count": len(messages)}
+
+    except Exception as e:
+        logger.error(f"Error fetching dead letters: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch dead letters: {str(e)}")
+
+
+@router.post("/outbound/requeue")
+def requeue_dead_letters(
+    request_data: Dict[str, List[int]],
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """Queue dead-lettered messages again. Body: message_ids"""
+    try:
+        message_ids = request_data.get("message_ids") or []
+        if not message_ids:
+            raise HTTPException(status_code=400, detail="Missing required field: message_ids")
+
+        requeued = OutboundQueueService.requeue(db, current_org["org_id"], message_ids)
+        db.commit()
+        return {"status": "queued", "requeued": requeued}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error requeueing messages: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to requeue messages: {str(e)}")
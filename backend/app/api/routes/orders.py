@@ -5,11 +5,13 @@ Handles complete order lifecycle from creation to delivery
 from typing import Optional
 from datetime import date, datetime
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
+import time
 
+from ...core.audit import audit_log
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
 from ..schemas.order import (
@@ -27,6 +29,7 @@ router = APIRouter(prefix="/orders", tags=["orders"])
 @router.post("/", response_model=OrderResponse)
 async def create_order(
     order: OrderCreate,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -37,6 +40,7 @@ async def create_order(
     - Calculates taxes and totals
     - Allocates inventory using FIFO
     """
+    started = time.perf_counter()
     try:
         # Set org_id early
         org_id = order.org_id if order.org_id else DEFAULT_ORG_ID
@@ -158,6 +162,13 @@ async def create_order(
         OrderService.allocate_inventory(db, order_id, items_dict, org_id)
         
         db.commit()
+        audit_log.record(
+            org_id, "order", order_id, "Order created",
+            entity_name=order_number,
+            new_values={"customer_id": order.customer_id, "items": items_dict,
+                        "final_amount": order_data["final_amount"]},
+            request=request, started=started
+        )
         
         # Return created order
         return await get_order(order_id, db)
@@ -7,10 +7,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
-import bcrypt
 from datetime import datetime
 
 from ...core.database import get_db
+from ...core.passwords import PasswordHasherBusy, password_hasher
 
 logger = logging.getLogger(__name__)
 
@@ -114,7 +114,8 @@ def create_org_user(user_data: dict, db: Session = Depends(get_db)):
         # Hash password if provided
         password = user_data.pop('password', None)
         if password:
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            # Shared bounded pool and configured cost, like /auth/register
+            password_hash = password_hasher.hash_blocking(password)
         else:
             password_hash = 'temp_password_hash'  # Should be set properly
         
@@ -163,6 +164,9 @@ def create_org_user(user_data: dict, db: Session = Depends(get_db)):
         
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many password operations in progress, please retry",
+                            headers={"Retry-After": "1"})
     except Exception as e:
         db.rollback()
         logger.error(f"Error creating org user: {str(e)}")
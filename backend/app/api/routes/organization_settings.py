@@ -11,6 +11,8 @@ from datetime import datetime
 
 from ...core.database import get_db
 from ...core.auth import get_current_org
+from ...core.request_context import bump_org_version
+from ..services.gst_party_profile_service import GSTPartyProfileService
 
 router = APIRouter(prefix="/organizations", tags=["organizations"])
 
@@ -161,7 +163,12 @@ async def update_organization_profile(
         if not result:
             raise HTTPException(status_code=404, detail="Organization not found")
         
+        # GSTIN or state changed: every party's place of supply depends on it
+        if "gst_number" in profile_data or "business_settings" in profile_data:
+            GSTPartyProfileService.invalidate_org(db, org_id)
+        
         db.commit()
+        bump_org_version(org_id)
         
         return {
             "success": True,
@@ -323,6 +330,7 @@ async def update_feature_settings(
         })
         
         db.commit()
+        bump_org_version(org_id)
         
         return {
             "success": True,
@@ -387,6 +395,7 @@ async def upload_organization_logo(
         })
         
         db.commit()
+        bump_org_version(org_id)
         
         return {
             "success": True,
@@ -5,12 +5,14 @@ Handles invoice payments, tracking, and reconciliation
 from typing import Optional, List
 from datetime import date
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from pydantic import BaseModel, Field
 import logging
+import time
 
+from ...core.audit import audit_log
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
 from ..services.payment_service import PaymentService
@@ -76,6 +78,7 @@ class PaymentSummaryResponse(BaseModel):
 @router.post("/", response_model=dict)
 async def create_payment(
     payment: GeneralPaymentCreate,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -85,6 +88,7 @@ async def create_payment(
     - Handles multiple payment modes
     - Creates proper payment records in payments table
     """
+    started = time.perf_counter()
     try:
         # Generate payment number if not provided
         if not payment.payment_number:
@@ -125,6 +129,11 @@ async def create_payment(
         
         result = db.execute(text(insert_query), payment_data).fetchone()
         db.commit()
+        audit_log.record(
+            payment.org_id, "payment", result.payment_id, "Payment created",
+            entity_name=result.payment_number, new_values=payment_data,
+            request=request, started=started
+        )
         
         return {
             "message": "Payment created successfully",
@@ -144,6 +153,7 @@ async def create_payment(
 @router.post("/record", response_model=PaymentResponse)
 async def record_payment(
     payment: PaymentCreate,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -153,9 +163,15 @@ async def record_payment(
     - Updates invoice payment status
     - Creates payment history record
     """
+    started = time.perf_counter()
     try:
         result = PaymentService.record_payment(db, payment.invoice_id, payment.dict())
         db.commit()
+        audit_log.record(
+            DEFAULT_ORG_ID, "payment", result["payment_id"], "Payment recorded against invoice",
+            entity_name=result["payment_reference"], new_values=payment.dict(),
+            request=request, started=started
+        )
         return PaymentResponse(**result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,7 +1,6 @@
 """
 Custom pharmaceutical invoice parser for better extraction
 """
-import pdfplumber
 import re
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
@@ -13,6 +12,8 @@ def parse_pharma_invoice(pdf_path: str) -> Dict[str, Any]:
     """
     Parse pharmaceutical invoices with custom logic
     """
+    import pdfplumber  # heavy; loaded on the first parse, not at startup
+
     try:
         with pdfplumber.open(pdf_path) as pdf:
             # Extract from first page
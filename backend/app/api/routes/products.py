@@ -2,11 +2,14 @@
 Products API Routes
 Wrapper for PostgreSQL functions
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Header, Query, HTTPException
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..schemas.product_schema import Product, ProductSearch
 from ...core.database import get_db
+from ...core.fast_json import dumps
+from ...core.http_cache import data_version_etag, etag_matches, json_response, not_modified, parse_if_none_match
 
 router = APIRouter()
 
@@ -14,21 +17,27 @@ router = APIRouter()
 async def search_products(
     q: str = Query(..., description="Search query"),
     limit: int = Query(10, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
-    Search products by name, brand, or HSN
+    Search products by name, brand, or HSN (ETag / If-None-Match)
     Wraps PostgreSQL function: api.search_products()
     """
     try:
+        # Results carry current stock, so stock changes version them too
+        token = data_version_etag(db, "products.search", ("products", "stock"), q=q, limit=limit)
+        if etag_matches(parse_if_none_match(if_none_match), token):
+            return not_modified(token)
+        
         # Call PostgreSQL function
         result = db.execute(
-            """
+            text("""
             SELECT * FROM api.search_products(
                 p_search_term := :search_term,
                 p_limit := :limit
             )
-            """,
+            """),
             {"search_term": q, "limit": limit}
         )
         
@@ -48,7 +57,7 @@ async def search_products(
                 "unit_of_measure": row.unit_of_measure or "PCS"
             })
         
-        return products
+        return json_response(dumps(products), token)
         
     except Exception as e:
         # Fallback to mock data if DB not connected
@@ -11,6 +11,7 @@ from decimal import Decimal
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ..services.stock_receipt_service import ReceiptLine, StockReceiptError, StockReceiptService
 
 logger = logging.getLogger(__name__)
 
@@ -269,106 +270,50 @@ def receive_purchase_items(
         if purchase.purchase_status == "received":
             raise HTTPException(status_code=400, detail="Purchase already received")
         
-        received_items = receive_data.get("items", [])
-        batches_created = 0
+        received = {
+            item.get("purchase_item_id"): item
+            for item in receive_data.get("items", [])
+            if item.get("received_quantity", 0) > 0
+        }
         
-        for item in received_items:
-            item_id = item.get("purchase_item_id")
-            received_qty = item.get("received_quantity", 0)
-            
-            if received_qty <= 0:
-                continue
-            
-            # Get purchase item details
-            pi = db.execute(
-                text("""
-                    SELECT * FROM purchase_items 
-                    WHERE purchase_item_id = :item_id 
-                    AND purchase_id = :purchase_id
-                """),
-                {"item_id": item_id, "purchase_id": purchase_id}
-            ).first()
-            
-            if not pi:
-                continue
-            
-            # Create batch
-            batch_id = db.execute(
-                text("""
-                    INSERT INTO inventory.batches (
-                        org_id, product_id, batch_number,
-                        manufacturing_date, expiry_date,
-                        quantity_received, quantity_available,
-                        cost_price, selling_price, mrp,
-                        supplier_id, purchase_id,
-                        purchase_invoice_number,
-                        batch_status
-                    ) VALUES (
-                        DEFAULT_ORG_ID,
-                        :product_id, :batch_number,
-                        :mfg_date, :exp_date,
-                        :qty_received, :qty_available,
-                        :cost, :selling, :mrp,
-                        :supplier_id, :purchase_id,
-                        :invoice_num,
-                        'active'
-                    ) RETURNING batch_id
-                """),
-                {
-                    "product_id": pi.product_id,
-                    "batch_number": item.get("batch_number", pi.batch_number),
-                    "mfg_date": item.get("manufacturing_date", pi.manufacturing_date),
-                    "exp_date": item.get("expiry_date", pi.expiry_date),
-                    "qty_received": received_qty,
-                    "qty_available": received_qty,
-                    "cost": pi.cost_price,
-                    "selling": pi.cost_price * Decimal("1.2"),  # Default 20% markup
-                    "mrp": pi.mrp,
-                    "supplier_id": purchase.supplier_id,
-                    "purchase_id": purchase_id,
-                    "invoice_num": purchase.supplier_invoice_number
-                }
-            ).scalar()
-            
-            # Create inventory movement
-            db.execute(
-                text("""
-                    INSERT INTO inventory.inventory_movements (
-                        org_id, movement_date, movement_type,
-                        product_id, batch_id,
-                        quantity_in, quantity_out,
-                        reference_type, reference_id, reference_number,
-                        notes
-                    ) VALUES (
-                        DEFAULT_ORG_ID,
-                        CURRENT_TIMESTAMP, 'purchase',
-                        :product_id, :batch_id,
-                        :qty_in, 0,
-                        'purchase', :purchase_id, :purchase_number,
-                        'Goods received from purchase'
-                    )
-                """),
-                {
-                    "product_id": pi.product_id,
-                    "batch_id": batch_id,
-                    "qty_in": received_qty,
-                    "purchase_id": purchase_id,
-                    "purchase_number": purchase.purchase_number
-                }
-            )
-            
-            # Update purchase item
-            db.execute(
-                text("""
-                    UPDATE purchase_items 
-                    SET received_quantity = :received_qty,
-                        item_status = 'received'
-                    WHERE purchase_item_id = :item_id
-                """),
-                {"received_qty": received_qty, "item_id": item_id}
+        # All purchase items of the GRN in one query
+        purchase_items = db.execute(
+            text("""
+                SELECT * FROM purchase_items 
+                WHERE purchase_item_id = ANY(:item_ids) 
+                AND purchase_id = :purchase_id
+            """),
+            {"item_ids": [item_id for item_id in received if item_id is not None], "purchase_id": purchase_id}
+        ).fetchall()
+        
+        lines = []
+        for pi in purchase_items:
+            item = received[pi.purchase_item_id]
+            lines.append(ReceiptLine(
+                product_id=pi.product_id,
+                quantity=item["received_quantity"],
+                batch_number=item.get("batch_number", pi.batch_number),
+                manufacturing_date=item.get("manufacturing_date", pi.manufacturing_date),
+                expiry_date=item.get("expiry_date", pi.expiry_date),
+                cost_price=pi.cost_price,
+                selling_price=pi.cost_price * Decimal("1.2") if pi.cost_price else None,  # Default 20% markup
+                mrp=pi.mrp,
+                purchase_item_id=pi.purchase_item_id
+            ))
+        
+        batches_created = 0
+        if lines:
+            receipt = StockReceiptService.receive(
+                db,
+                purchase.org_id,
+                lines,
+                supplier_id=purchase.supplier_id,
+                purchase_id=purchase_id,
+                invoice_number=purchase.supplier_invoice_number,
+                reference_number=purchase.purchase_number,
+                notes="Goods received from purchase"
             )
-            
-            batches_created += 1
+            batches_created = len(receipt["batches"])
         
         # Update purchase status
         db.execute(
@@ -396,6 +341,9 @@ def receive_purchase_items(
     except HTTPException:
         db.rollback()
         raise
+    except StockReceiptError as e:
+        db.rollback()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         db.rollback()
         logger.error(f"Error receiving purchase items: {str(e)}")
@@ -4,16 +4,19 @@ Handles returns of purchased items back to suppliers
 Matches the structure of sales returns for consistency
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
+import time
 from datetime import datetime
 from decimal import Decimal
 import uuid
 
+from ...core.audit import audit_log
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...core.hydration import hydrate, load_values
 
 logger = logging.getLogger(__name__)
 
@@ -58,8 +61,17 @@ async def get_purchase_returns(
         
         returns = db.execute(text(query), params).fetchall()
         
+        # Get items for the whole page in one query
+        data = hydrate(db, [dict(r._mapping) for r in returns], """
+            SELECT ri.*, p.product_name, p.hsn_code
+            FROM return_items ri
+            LEFT JOIN inventory.products p ON ri.product_id = p.product_id
+            WHERE ri.return_id = ANY(:ids)
+            ORDER BY ri.return_id
+        """, "return_id")
+        
         return {
-            "data": [dict(r._mapping) for r in returns],
+            "data": data,
             "total": len(returns),
             "skip": skip,
             "limit": limit
@@ -130,19 +142,21 @@ async def get_returnable_purchases(
             ).scalar()
             logger.info(f"Total purchases for supplier {supplier_id}: {total_count}")
         
+        # Check how much has already been returned, for all purchases at once.
+        # Purchase returns reference their bill through the "-INV<id>" suffix.
+        returned = load_values(db, """
+            SELECT CAST(SUBSTRING(rr.return_number FROM '-INV([0-9]+)$') AS INTEGER) as purchase_id,
+                   COALESCE(SUM(ri.return_quantity), 0) as total_returned
+            FROM return_requests rr
+            JOIN return_items ri ON rr.return_id = ri.return_id
+            WHERE rr.return_type = 'PURCHASE'
+            AND CAST(SUBSTRING(rr.return_number FROM '-INV([0-9]+)$') AS INTEGER) = ANY(:ids)
+            GROUP BY 1
+        """, [purchase.purchase_id for purchase in purchases], "purchase_id", "total_returned")
+        
         result = []
         for purchase in purchases:
-            # Check how much has already been returned
-            returned_query = """
-                SELECT COALESCE(SUM(ri.return_quantity), 0) as total_returned
-                FROM return_requests rr
-                JOIN return_items ri ON rr.return_id = ri.return_id
-                WHERE rr.return_number LIKE :invoice_pattern AND rr.return_type = 'PURCHASE'
-            """
-            total_returned = db.execute(
-                text(returned_query), 
-                {"invoice_pattern": f"%-INV{purchase.purchase_id}"}
-            ).scalar() or 0
+            total_returned = returned.get(purchase.purchase_id) or 0
             
             purchase_dict = dict(purchase._mapping)
             purchase_dict["has_returns"] = total_returned > 0
@@ -259,11 +273,13 @@ async def get_purchase_items_for_return(
 @router.post("/")
 async def create_purchase_return(
     return_data: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Create a new purchase return (RTV - Return to Vendor)
     """
+    started = time.perf_counter()
     try:
         # Validate required fields
         if not return_data.get("items") or not any(item.get("selected") and item.get("quantity", 0) > 0 for item in return_data.get("items", [])):
@@ -397,6 +413,14 @@ async def create_purchase_return(
         # For now, we'll skip ledger updates
             
         db.commit()
+        audit_log.record(
+            DEFAULT_ORG_ID, "purchase_return", return_id, "Purchase return created",
+            entity_name=return_number,
+            new_values={"purchase_id": purchase_id,
+                        "items": [item for item in return_data["items"] if item.get("selected")],
+                        "total_amount": total_amount, "debit_note_number": debit_note_no},
+            request=request, started=started
+        )
         
         return {
             "status": "success",
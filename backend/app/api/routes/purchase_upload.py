@@ -2,7 +2,7 @@
 Purchase Order Upload and Extraction API Router
 Handles PDF/image upload, parsing, and purchase order creation
 """
-from typing import List, Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from sqlalchemy import text
@@ -12,32 +12,37 @@ import os
 import tempfile
 import shutil
 from decimal import Decimal
+from functools import lru_cache
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ..services.stock_receipt_service import StockReceiptError, StockReceiptService, lines_from_parsed
 
-# Try to import bill_parser if available
-try:
-    from bill_parser import parse_pdf
-    from bill_parser.models import Invoice, InvoiceItem
-    BILL_PARSER_AVAILABLE = True
-except ImportError:
-    BILL_PARSER_AVAILABLE = False
-    parse_pdf = None
-    Invoice = None
-    InvoiceItem = None
-
-# Try to import custom parser at module level
-try:
-    from ...parsers import InvoiceParserFactory
-    CUSTOM_PARSER_AVAILABLE = True
-except ImportError:
-    # Fallback to old parser if new one not available
+# Invoice parsers pull in pdfplumber and friends, so they are imported on
+# the first upload rather than when the app starts
+@lru_cache(maxsize=None)
+def _bill_parser() -> Optional[Callable[[str], Any]]:
+    """bill_parser.parse_pdf, or None when bill_parser is not installed"""
     try:
-        from .pharma_invoice_parser import parse_pharma_invoice
-        CUSTOM_PARSER_AVAILABLE = True
+        from bill_parser import parse_pdf
+        return parse_pdf
     except ImportError:
-        CUSTOM_PARSER_AVAILABLE = False
+        return None
+
+
+@lru_cache(maxsize=None)
+def _custom_parser() -> Optional[Callable[[str], Dict[str, Any]]]:
+    """The modular invoice parser, else the older pharma parser, else None"""
+    try:
+        from ...parsers import InvoiceParserFactory
+        return InvoiceParserFactory.parse_invoice
+    except (ImportError, AttributeError):
+        # Fallback to old parser if new one not available
+        try:
+            from .pharma_invoice_parser import parse_pharma_invoice
+            return parse_pharma_invoice
+        except ImportError:
+            return None
 
 logger = logging.getLogger(__name__)
 
@@ -100,9 +105,9 @@ def get_parser_version():
     """Check if custom parser is available"""
     return {
         "status": "ok", 
-        "custom_parser": "available" if CUSTOM_PARSER_AVAILABLE else "not found",
+        "custom_parser": "available" if _custom_parser() is not None else "not found",
         "version": "1.2",
-        "module_imported": CUSTOM_PARSER_AVAILABLE
+        "module_imported": _custom_parser() is not None
     }
 
 @router.get("/check-supplier")
@@ -196,7 +201,8 @@ async def parse_purchase_invoice_safe(
         try:
             # Try to parse with bill_parser
             try:
-                if not BILL_PARSER_AVAILABLE:
+                parse_pdf = _bill_parser()
+                if parse_pdf is None:
                     raise ImportError("bill_parser not available")
                 invoice_data = parse_pdf(tmp_path)
                 
@@ -247,15 +253,10 @@ async def parse_purchase_invoice_safe(
                             continue
                 
                 # If no items found, try our custom parser
-                if not items_found and CUSTOM_PARSER_AVAILABLE:
+                if not items_found and _custom_parser() is not None:
                     logger.info("Bill parser found no items, trying custom pharma parser...")
                     try:
-                        # Use new modular parser if available
-                        if 'InvoiceParserFactory' in globals():
-                            custom_result = InvoiceParserFactory.parse_invoice(tmp_path)
-                        else:
-                            # Fallback to old parser
-                            custom_result = parse_pharma_invoice(tmp_path)
+                        custom_result = _custom_parser()(tmp_path)
                         
                         if custom_result["success"] and custom_result["extracted_data"]["items"]:
                             logger.info(f"Custom parser found {len(custom_result['extracted_data']['items'])} items")
@@ -283,15 +284,10 @@ async def parse_purchase_invoice_safe(
                 logger.warning(f"Bill parser failed: {parse_error}")
                 
                 # Try our custom parser before giving up
-                if CUSTOM_PARSER_AVAILABLE:
+                if _custom_parser() is not None:
                     try:
                         logger.info("Trying custom pharma parser as fallback...")
-                        # Use new modular parser if available
-                        if 'InvoiceParserFactory' in globals():
-                            custom_result = InvoiceParserFactory.parse_invoice(tmp_path)
-                        else:
-                            # Fallback to old parser
-                            custom_result = parse_pharma_invoice(tmp_path)
+                        custom_result = _custom_parser()(tmp_path)
                             
                         if custom_result["success"]:
                             # Check for existing supplier
@@ -374,6 +370,12 @@ async def parse_purchase_invoice(
         
         try:
             # Parse the invoice
+            parse_pdf = _bill_parser()
+            if parse_pdf is None:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Invoice parser is not available. Please try manual entry."
+                )
             invoice_data = parse_pdf(tmp_path)
             
             if not invoice_data:
@@ -660,6 +662,50 @@ def create_purchase_from_parsed(
             detail=f"Failed to create purchase order: {str(e)}"
         )
 
+@router.post("/receive-parsed")
+def receive_parsed_invoice(
+    purchase_data: dict,
+    db: Session = Depends(get_db)
+):
+    """
+    Receive stock straight from parsed/verified invoice data as one GRN
+    Items need a matched product_id; unmatched items are returned as skipped
+    """
+    try:
+        items = purchase_data.get("items", [])
+        lines = lines_from_parsed(items)
+        skipped = [item.get("description") for item in items if not item.get("product_id")]
+        if not lines:
+            raise HTTPException(status_code=400, detail="No items with a matched product to receive")
+        
+        result = StockReceiptService.receive(
+            db,
+            DEFAULT_ORG_ID,
+            lines,
+            supplier_id=purchase_data.get("supplier_id"),
+            invoice_number=purchase_data.get("invoice_number"),
+            reference_number=purchase_data.get("grn_number") or purchase_data.get("invoice_number"),
+            notes="Goods received from uploaded invoice"
+        )
+        db.commit()
+        
+        result["skipped_items"] = skipped
+        return result
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except StockReceiptError as e:
+        db.rollback()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error receiving parsed invoice: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to receive stock: {str(e)}"
+        )
+
 @router.get("/parse-history")
 def get_parse_history(
     skip: int = 0,
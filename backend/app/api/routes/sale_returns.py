@@ -3,16 +3,20 @@ Sale Return API Router
 Handles returns of sold items with inventory and ledger adjustments
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
+import time
 from datetime import datetime
 from decimal import Decimal
+import re
 import uuid
 
+from ...core.audit import audit_log
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...core.hydration import hydrate, load_values
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +36,7 @@ async def get_sale_returns(
     """
     try:
         query = """
-            SELECT sr.*, c.customer_name as party_name, 
-                   -- Extract invoice number from return items remarks
-                   (SELECT SUBSTRING(ri.remarks, 'Invoice: ([^,]+)')
-                    FROM return_items ri 
-                    WHERE ri.return_id = sr.return_id 
-                    LIMIT 1) as original_invoice_number
+            SELECT sr.*, c.customer_name as party_name
             FROM return_requests sr
             LEFT JOIN parties.customers c ON sr.customer_id = c.customer_id
             WHERE sr.return_type = 'SALES'
@@ -60,20 +59,23 @@ async def get_sale_returns(
         
         returns = db.execute(text(query), params).fetchall()
         
-        # Get items for each return
-        result = []
-        for ret in returns:
-            items_query = """
-                SELECT sri.*, p.product_name, p.hsn_code
-                FROM return_items sri
-                LEFT JOIN inventory.products p ON sri.product_id = p.product_id
-                WHERE sri.return_id = :return_id
-            """
-            items = db.execute(text(items_query), {"return_id": ret.return_id}).fetchall()
-            
-            return_dict = dict(ret._mapping)
-            return_dict["items"] = [dict(item._mapping) for item in items]
-            result.append(return_dict)
+        # Get items for the whole page in one query
+        result = hydrate(db, [dict(ret._mapping) for ret in returns], """
+            SELECT sri.*, p.product_name, p.hsn_code
+            FROM return_items sri
+            LEFT JOIN inventory.products p ON sri.product_id = p.product_id
+            WHERE sri.return_id = ANY(:ids)
+            ORDER BY sri.return_id
+        """, "return_id")
+        
+        # Extract invoice number from return items remarks
+        for return_dict in result:
+            match = next((
+                re.search(r"Invoice: ([^,]+)", item["remarks"])
+                for item in return_dict["items"]
+                if item.get("remarks") and "Invoice: " in item["remarks"]
+            ), None)
+            return_dict["original_invoice_number"] = match.group(1) if match else None
             
         # Get total count
         count_query = """
@@ -140,19 +142,18 @@ async def get_returnable_invoices(
         
         invoices = db.execute(text(query), params).fetchall()
         
+        # Check how much has already been returned, for all invoices at once
+        returned = load_values(db, """
+            SELECT sr.order_id, COALESCE(SUM(sri.return_quantity), 0) as total_returned
+            FROM return_requests sr
+            JOIN return_items sri ON sr.return_id = sri.return_id
+            WHERE sr.order_id = ANY(:ids) AND sr.return_type = 'SALES'
+            GROUP BY sr.order_id
+        """, [inv.invoice_id for inv in invoices], "order_id", "total_returned")
+        
         result = []
         for inv in invoices:
-            # Check how much has already been returned
-            returned_query = """
-                SELECT COALESCE(SUM(sri.return_quantity), 0) as total_returned
-                FROM return_requests sr
-                JOIN return_items sri ON sr.return_id = sri.return_id
-                WHERE sr.order_id = :invoice_id AND sr.return_type = 'SALES'
-            """
-            total_returned = db.execute(
-                text(returned_query), 
-                {"invoice_id": inv.invoice_id}
-            ).scalar()
+            total_returned = returned.get(inv.invoice_id, 0)
             
             invoice_dict = dict(inv._mapping)
             invoice_dict["has_returns"] = total_returned > 0
@@ -226,11 +227,13 @@ async def get_invoice_items_for_return(
 @router.post("/")
 async def create_sale_return(
     return_data: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Create a new sale return and generate credit note if customer has GST
     """
+    started = time.perf_counter()
     try:
         # Validate required fields
         required_fields = ["invoice_id", "customer_id", "return_date", "items"]
@@ -364,6 +367,14 @@ async def create_sale_return(
         # The credit adjustment functionality will be added later
             
         db.commit()
+        audit_log.record(
+            DEFAULT_ORG_ID, "sale_return", return_id, "Sale return created",
+            entity_name=return_number,
+            new_values={"invoice_id": return_data["invoice_id"], "customer_id": return_data["customer_id"],
+                        "items": return_data["items"], "total_amount": total_amount,
+                        "credit_note_number": credit_note_no},
+            request=request, started=started
+        )
         
         return {
             "status": "success",
@@ -3,7 +3,7 @@ Sales API Router
 Handles direct sales/cash sales and invoice generation
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
@@ -14,7 +14,11 @@ from pydantic import BaseModel, Field
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...core.http_cache import etag_matches, json_response, not_modified, parse_if_none_match
+from ...core.request_context import get_org_profile
+from ...jobs.document_renderer import render_pool
 from ..services.gst_service import GSTService, GSTType
+from ..services.document_render_service import DocumentRenderService
 
 logger = logging.getLogger(__name__)
 
@@ -91,10 +95,7 @@ async def create_direct_sale(
         
         # Get seller GSTIN (from request or organization default)
         if not sale_data.seller_gstin:
-            org = db.execute(
-                text("SELECT gst_number FROM parties.organizations WHERE org_id = :org_id"),
-                {"org_id": DEFAULT_ORG_ID}
-            ).first()
+            org = get_org_profile(db, DEFAULT_ORG_ID)
             seller_gstin = org.gst_number if org else "27AABCU9603R1ZM"  # Default Maharashtra GSTIN
         else:
             seller_gstin = sale_data.seller_gstin
@@ -114,7 +115,8 @@ async def create_direct_sale(
                 "other_charges": sale_data.other_charges
             },
             seller_gstin=seller_gstin,
-            buyer_gstin=sale_data.party_gst
+            buyer_gstin=sale_data.party_gst,
+            gst_type=gst_type
         )
         
         # Extract calculated values
@@ -266,6 +268,9 @@ async def create_direct_sale(
             
         db.commit()
         
+        # Pre-render the print payload so the first print is a cache hit
+        render_pool.submit("sale", invoice_id, DEFAULT_ORG_ID)
+        
         return SaleResponse(
             sale_id=str(invoice_id),  # Using invoice_id as sale_id
             invoice_number=invoice_number,
@@ -479,10 +484,7 @@ async def calculate_sale_totals(
     try:
         # Get seller GSTIN
         if not sale_data.seller_gstin:
-            org = db.execute(
-                text("SELECT gst_number FROM parties.organizations WHERE org_id = :org_id"),
-                {"org_id": DEFAULT_ORG_ID}
-            ).first()
+            org = get_org_profile(db, DEFAULT_ORG_ID)
             seller_gstin = org.gst_number if org else "27AABCU9603R1ZM"
         else:
             seller_gstin = sale_data.seller_gstin
@@ -502,7 +504,8 @@ async def calculate_sale_totals(
                 "other_charges": sale_data.other_charges
             },
             seller_gstin=seller_gstin,
-            buyer_gstin=sale_data.party_gst
+            buyer_gstin=sale_data.party_gst,
+            gst_type=gst_type
         )
         
         return {
@@ -554,46 +557,61 @@ async def get_sale_by_invoice(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def build_sale_print_payload(db: Session, sale_id: str, org_id: str) -> dict:
+    """Sale with organization details, as rendered for printing"""
+    # Get organization details
+    org = db.execute(
+        text("SELECT * FROM parties.organizations WHERE org_id = :org_id"),
+        {"org_id": org_id}
+    ).first()
+    
+    # Get sale with all details
+    sale_data = await get_sale_detail(str(sale_id), db)
+    
+    # Format for printing; print_date is when this render was produced
+    return {
+        "organization": dict(org._mapping) if org else {
+            "organization_name": "AASO Pharma",
+            "address": "123 Business Park",
+            "city": "Mumbai",
+            "state": "Maharashtra",
+            "pincode": "400001",
+            "gst_number": "27AABCU9603R1ZM",
+            "drug_license": "MH-123456",
+            "phone": "9876543210",
+            "email": "info@aasopharma.com"
+        },
+        "invoice": sale_data,
+        "print_date": datetime.now().isoformat()
+    }
+
+
 @router.post("/{sale_id}/print")
 async def get_sale_print_data(
     sale_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
-    Get sale data formatted for printing
+    Get sale data formatted for printing (cached render, ETag / If-None-Match)
     """
     try:
-        # Get organization details
-        org = db.execute(
-            text("SELECT * FROM parties.organizations WHERE org_id = :org_id"),
-            {"org_id": DEFAULT_ORG_ID}
-        ).first()
-        
-        # Get sale with all details
-        sale_data = await get_sale_detail(sale_id, db)
+        known = parse_if_none_match(if_none_match)
+        render = DocumentRenderService.get(db, DEFAULT_ORG_ID, "sale", sale_id, known)
         
-        # Format for printing
-        print_data = {
-            "organization": dict(org._mapping) if org else {
-                "organization_name": "AASO Pharma",
-                "address": "123 Business Park",
-                "city": "Mumbai",
-                "state": "Maharashtra",
-                "pincode": "400001",
-                "gst_number": "27AABCU9603R1ZM",
-                "drug_license": "MH-123456",
-                "phone": "9876543210",
-                "email": "info@aasopharma.com"
-            },
-            "invoice": sale_data,
-            "print_date": datetime.now().isoformat()
-        }
+        if render is None:
+            payload = await build_sale_print_payload(db, sale_id, DEFAULT_ORG_ID)
+            render = DocumentRenderService.store(db, DEFAULT_ORG_ID, "sale", sale_id, payload)
+            db.commit()
         
-        return print_data
+        if etag_matches(known, render.content_hash):
+            return not_modified(render.content_hash)
+        return json_response(render.content, render.content_hash)
         
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Error getting print data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
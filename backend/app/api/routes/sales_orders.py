@@ -19,6 +19,7 @@ from ..schemas.order import (
 from ..services.order_service import OrderService
 from ..services.customer_service import CustomerService
 from ..services.invoice_service import InvoiceService
+from ..services.stock_reservation_service import StockReservationService, StockReservationError
 
 logger = logging.getLogger(__name__)
 
@@ -375,8 +376,9 @@ async def approve_sales_order(
     db: Session = Depends(get_db)
 ):
     """
-    Approve sales order and allocate inventory
-    This is when inventory gets reserved
+    Approve sales order and reserve inventory
+    Stock is held against the order until it is invoiced, cancelled or the
+    reservation expires (RESERVATION_TTL_HOURS)
     """
     try:
         # Check order exists and is pending
@@ -438,20 +440,25 @@ async def approve_sales_order(
             WHERE order_id = :id AND org_id = :org_id
         """), {"id": order_id, "org_id": DEFAULT_ORG_ID})
         
-        # NOW allocate inventory
-        OrderService.allocate_inventory(db, order_id, items_dict, DEFAULT_ORG_ID)
+        # NOW reserve inventory
+        reservation = StockReservationService.reserve_order(db, DEFAULT_ORG_ID, order_id, items_dict)
         
         db.commit()
         
         return {
             "message": f"Sales order {order_id} approved successfully", 
             "status": "approved",
-            "inventory_allocated": True
+            "inventory_reserved": True,
+            "reserved_quantity": reservation["reserved_quantity"],
+            "reservation_expires_at": reservation["expires_at"]
         }
         
     except HTTPException:
         db.rollback()
         raise
+    except StockReservationError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         db.rollback()
         logger.error(f"Error approving sales order: {str(e)}")
@@ -480,6 +487,9 @@ async def convert_to_invoice(
                 detail=f"Cannot convert to invoice. Order status: {order.order_status}"
             )
         
+        # Turn the order's reservations into a stock allocation
+        StockReservationService.fulfill_order(db, DEFAULT_ORG_ID, order_id)
+        
         # Generate invoice
         invoice_data = InvoiceService.generate_invoice_for_order(
             db, 
@@ -503,6 +513,9 @@ async def convert_to_invoice(
     except HTTPException:
         db.rollback()
         raise
+    except StockReservationError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         db.rollback()
         logger.error(f"Error converting to invoice: {str(e)}")
@@ -540,6 +553,9 @@ async def convert_to_challan(
             WHERE order_id = :id
         """), {"id": order_id})
         
+        # Goods are out of the warehouse; keep the stock held until invoicing
+        StockReservationService.hold_until_invoiced(db, DEFAULT_ORG_ID, order_id)
+        
         db.commit()
         
         return {
@@ -556,6 +572,69 @@ async def convert_to_challan(
         logger.error(f"Error converting to challan: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to convert to challan: {str(e)}")
 
+@router.post("/{order_id}/cancel")
+async def cancel_sales_order(
+    order_id: int,
+    reason: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Cancel a sales order that has not been invoiced and release its reserved stock"""
+    try:
+        order = db.execute(text("""
+            SELECT order_status FROM sales.orders 
+            WHERE order_id = :id AND org_id = :org_id AND order_type = 'sales'
+            FOR UPDATE
+        """), {"id": order_id, "org_id": DEFAULT_ORG_ID}).fetchone()
+        
+        if not order:
+            raise HTTPException(status_code=404, detail=f"Sales order {order_id} not found")
+        
+        if order.order_status in ["invoiced", "cancelled"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Order cannot be cancelled. Current status: {order.order_status}"
+            )
+        
+        db.execute(text("""
+            UPDATE sales.orders
+            SET order_status = 'cancelled',
+                notes = CASE WHEN CAST(:reason AS TEXT) IS NULL THEN notes
+                             ELSE COALESCE(notes || E'\\n', '') || 'Cancelled: ' || :reason END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE order_id = :id
+        """), {"id": order_id, "reason": reason})
+        
+        released = StockReservationService.release(db, DEFAULT_ORG_ID, order_id)
+        
+        db.commit()
+        
+        return {
+            "message": f"Sales order {order_id} cancelled",
+            "status": "cancelled",
+            **released
+        }
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error cancelling sales order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to cancel sales order: {str(e)}")
+
+@router.get("/{order_id}/reservations")
+async def get_sales_order_reservations(
+    order_id: int,
+    db: Session = Depends(get_db)
+):
+    """Stock reservations held for a sales order"""
+    try:
+        reservations = StockReservationService.get_reservations(db, DEFAULT_ORG_ID, order_id)
+        return {"order_id": order_id, "reservations": reservations}
+    except Exception as e:
+        logger.error(f"Error fetching reservations: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch reservations: {str(e)}")
+
 @router.post("/validate")
 async def validate_sales_order(
     order_data: OrderCreate,
@@ -3,15 +3,20 @@ Stock Adjustments API Router (Simplified)
 Uses existing inventory_movements table for adjustments
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
+import time
 from datetime import date, datetime
 from decimal import Decimal
 
+from ...core.audit import audit_log
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...dependencies import get_current_org
+from ..services.stock_count_service import StockCountService, StockCountError
+from ...jobs.expiry_sweeper import sweep_org
 
 logger = logging.getLogger(__name__)
 
@@ -98,10 +103,11 @@ def get_stock_adjustments(
         raise HTTPException(status_code=500, detail=f"Failed to get stock adjustments: {str(e)}")
 
 @router.post("/")
-def create_stock_adjustment(adjustment_data: dict, db: Session = Depends(get_db)):
+def create_stock_adjustment(adjustment_data: dict, request: Request, db: Session = Depends(get_db)):
     """
     Create a stock adjustment using inventory movements
     """
+    started = time.perf_counter()
     try:
         # Validate batch exists
         batch = db.execute(
@@ -181,6 +187,14 @@ def create_stock_adjustment(adjustment_data: dict, db: Session = Depends(get_db)
         )
         
         db.commit()
+        audit_log.record(
+            batch.org_id, "stock_adjustment", movement_id, f"Stock adjusted ({movement_type})",
+            entity_name=batch.product_name,
+            old_values={"batch_id": batch.batch_id, "quantity_available": batch.quantity_available},
+            new_values={"batch_id": batch.batch_id, "quantity_available": new_quantity,
+                        "quantity_adjusted": quantity_adjusted, "reason": adjustment_data.get("reason")},
+            request=request, started=started
+        )
         
         return {
             "movement_id": movement_id,
@@ -199,176 +213,145 @@ def create_stock_adjustment(adjustment_data: dict, db: Session = Depends(get_db)
         raise HTTPException(status_code=500, detail=f"Failed to create stock adjustment: {str(e)}")
 
 @router.post("/physical-count")
-def process_physical_count(count_data: dict, db: Session = Depends(get_db)):
+def process_physical_count(
+    count_data: dict,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
     """
     Process physical inventory count
     Creates stock adjustments for differences
     """
+    started = time.perf_counter()
     try:
-        adjustments_created = []
-        
-        for item in count_data.get("count_items", []):
-            batch_id = item.get("batch_id")
-            counted_quantity = item.get("counted_quantity")
-            
-            # Get current quantity
-            batch = db.execute(
-                text("SELECT * FROM inventory.batches WHERE batch_id = :batch_id"),
-                {"batch_id": batch_id}
-            ).first()
-            
-            if not batch:
-                continue
-                
-            system_quantity = batch.quantity_available
-            difference = counted_quantity - system_quantity
-            
-            # Only adjust if there's a difference
-            if difference != 0:
-                movement_id = db.execute(
-                    text("""
-                        INSERT INTO inventory.inventory_movements (
-                            org_id, movement_date, movement_type,
-                            product_id, batch_id,
-                            quantity_in, quantity_out,
-                            reference_type, reference_number,
-                            notes, performed_by
-                        ) VALUES (
-                            DEFAULT_ORG_ID,
-                            :movement_date, 'stock_count',
-                            :product_id, :batch_id,
-                            :quantity_in, :quantity_out,
-                            'physical_count', :reference_number,
-                            :notes, :performed_by
-                        ) RETURNING movement_id
-                    """),
-                    {
-                        "movement_date": count_data.get("count_date", datetime.utcnow()),
-                        "product_id": batch.product_id,
-                        "batch_id": batch_id,
-                        "quantity_in": difference if difference > 0 else 0,
-                        "quantity_out": abs(difference) if difference < 0 else 0,
-                        "reference_number": count_data.get("count_reference", f"COUNT-{datetime.now().strftime('%Y%m%d')}"),
-                        "notes": f"Physical count adjustment: System {system_quantity}, Counted {counted_quantity}",
-                        "performed_by": count_data.get("counted_by")
-                    }
-                ).scalar()
-                
-                # Update batch quantity
-                db.execute(
-                    text("""
-                        UPDATE inventory.batches 
-                        SET quantity_available = :new_quantity
-                        WHERE batch_id = :batch_id
-                    """),
-                    {
-                        "new_quantity": counted_quantity,
-                        "batch_id": batch_id
-                    }
-                )
-                
-                adjustments_created.append({
-                    "movement_id": movement_id,
-                    "batch_id": batch_id,
-                    "system_quantity": system_quantity,
-                    "counted_quantity": counted_quantity,
-                    "difference": difference
-                })
-        
+        summary = StockCountService.process_count(
+            db,
+            org_id=current_org["org_id"],
+            count_items=count_data.get("count_items", []),
+            count_date=count_data.get("count_date"),
+            count_reference=count_data.get("count_reference"),
+            counted_by=count_data.get("counted_by")
+        )
         db.commit()
+        audit_log.record(
+            current_org["org_id"], "stock_adjustment", summary["reference_number"],
+            "Physical count processed", new_values=summary, request=request, started=started
+        )
         
-        return {
-            "message": "Physical count processed successfully",
-            "adjustments_created": len(adjustments_created),
-            "details": adjustments_created
-        }
+        return {"message": "Physical count processed successfully", **summary}
         
+    except StockCountError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         db.rollback()
         logger.error(f"Error processing physical count: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process physical count: {str(e)}")
 
-@router.post("/expire-batches")
-def expire_batches(db: Session = Depends(get_db)):
+@router.post("/physical-count/upload")
+async def upload_physical_count(
+    request: Request,
+    file: UploadFile = File(..., description="CSV with batch_id,counted_quantity columns"),
+    count_reference: Optional[str] = Form(None),
+    count_date: Optional[datetime] = Form(None),
+    counted_by: Optional[int] = Form(None),
+    include_details: bool = Form(False),
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
     """
-    Mark expired batches and create stock adjustments
+    Process a physical count sheet uploaded as CSV
+    Returns a diff summary; per-batch details only when requested
     """
+    started = time.perf_counter()
+    if not file.filename or not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV count files are supported")
+    
     try:
-        # Find expired batches
-        expired_batches = db.execute(
-            text("""
-                SELECT b.*, p.product_name
-                FROM inventory.batches b
-                JOIN inventory.products p ON b.product_id = p.product_id
-                WHERE b.expiry_date <= CURRENT_DATE
-                AND b.quantity_available > 0
-                AND b.batch_status != 'expired'
-            """)
-        ).fetchall()
+        count_items = StockCountService.parse_count_csv(await file.read())
+        if not count_items:
+            raise HTTPException(status_code=400, detail="Count file has no rows")
         
-        adjustments_created = []
+        summary = StockCountService.process_count(
+            db,
+            org_id=current_org["org_id"],
+            count_items=count_items,
+            count_date=count_date,
+            count_reference=count_reference,
+            counted_by=counted_by,
+            include_details=include_details
+        )
+        db.commit()
+        audit_log.record(
+            current_org["org_id"], "stock_adjustment", summary["reference_number"],
+            f"Physical count processed from {file.filename}",
+            new_values={k: v for k, v in summary.items() if k != "details"},
+            request=request, started=started
+        )
         
-        for batch in expired_batches:
-            # Create expiry movement
-            movement_id = db.execute(
-                text("""
-                    INSERT INTO inventory.inventory_movements (
-                        org_id, movement_date, movement_type,
-                        product_id, batch_id,
-                        quantity_in, quantity_out,
-                        reference_type, reference_number,
-                        notes
-                    ) VALUES (
-                        DEFAULT_ORG_ID,
-                        CURRENT_DATE, 'stock_expiry',
-                        :product_id, :batch_id,
-                        0, :quantity_out,
-                        'expiry', :reference_number,
-                        :notes
-                    ) RETURNING movement_id
-                """),
-                {
-                    "product_id": batch.product_id,
-                    "batch_id": batch.batch_id,
-                    "quantity_out": batch.quantity_available,
-                    "reference_number": f"EXP-{batch.batch_number}",
-                    "notes": f"Batch expired on {batch.expiry_date}"
-                }
-            ).scalar()
-            
-            # Update batch
-            db.execute(
-                text("""
-                    UPDATE inventory.batches 
-                    SET quantity_available = 0,
-                        batch_status = 'expired'
-                    WHERE batch_id = :batch_id
-                """),
-                {"batch_id": batch.batch_id}
-            )
-            
-            adjustments_created.append({
-                "movement_id": movement_id,
-                "batch_id": batch.batch_id,
-                "batch_number": batch.batch_number,
-                "product_name": batch.product_name,
-                "quantity_expired": batch.quantity_available,
-                "expiry_date": str(batch.expiry_date)
-            })
+        return {"message": "Physical count processed successfully", "file_name": file.filename, **summary}
         
-        db.commit()
+    except StockCountError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error processing physical count upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to process physical count: {str(e)}")
+
+@router.post("/expire-batches")
+def expire_batches(
+    as_of: Optional[date] = Query(None, description="Expiry cut-off date (default: today)"),
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """
+    Run the batch expiry sweep for the current organization now.
+    The same sweep runs on a schedule for all orgs (see app.jobs.expiry_sweeper).
+    """
+    try:
+        result = sweep_org(db, current_org["org_id"], as_of=as_of)
         
-        return {
-            "message": "Expired batches processed",
-            "batches_expired": len(adjustments_created),
-            "details": adjustments_created
-        }
+        if result["status"] == "locked":
+            raise HTTPException(status_code=409, detail="An expiry sweep is already running for this organization")
         
+        return {"message": "Expired batches processed", **result}
+        
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Error processing expired batches: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process expired batches: {str(e)}")
 
+@router.get("/expire-batches/progress")
+def get_expiry_sweep_progress(
+    limit: int = Query(10, le=100),
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """Recent expiry sweep runs for the current organization"""
+    try:
+        result = db.execute(text("""
+            SELECT sweep_date, sweep_status, last_batch_id, chunks_processed,
+                   batches_expired, quantity_expired, last_error_message,
+                   started_at, updated_at, completed_at
+            FROM inventory.expiry_sweep_progress
+            WHERE org_id = :org_id
+            ORDER BY sweep_date DESC
+            LIMIT :limit
+        """), {"org_id": current_org["org_id"], "limit": limit})
+        
+        return [dict(row._mapping) for row in result]
+        
+    except Exception as e:
+        logger.error(f"Error fetching expiry sweep progress: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get expiry sweep progress: {str(e)}")
+
 @router.get("/analytics/summary")
 def get_adjustment_analytics(
     start_date: Optional[date] = Query(None),
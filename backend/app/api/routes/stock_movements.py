@@ -7,12 +7,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 import uuid
 
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ...core.fast_json import fast_json, rows_as_dicts
+from ..services.expiry_calendar_service import ExpiryCalendarService
 
 logger = logging.getLogger(__name__)
 
@@ -63,17 +65,17 @@ async def get_stock_movements(
             
         query += " ORDER BY sm.movement_date DESC, sm.created_at DESC LIMIT :limit OFFSET :skip"
         
-        movements = db.execute(text(query), params).fetchall()
+        movements = rows_as_dicts(db.execute(text(query), params))
         
         # Get total count
         count_query = query.replace("SELECT sm.*, p.product_name, p.hsn_code", "SELECT COUNT(*)")
         count_query = count_query.split("ORDER BY")[0]
         total = db.execute(text(count_query), params).scalar()
         
-        return {
+        return fast_json({
             "total": total,
-            "movements": [dict(m._mapping) for m in movements]
-        }
+            "movements": movements
+        })
         
     except Exception as e:
         logger.error(f"Error fetching stock movements: {e}")
@@ -521,33 +523,20 @@ async def get_near_expiry_stock(
     Get products nearing expiry
     """
     try:
-        query = """
-            SELECT 
-                i.*, 
-                p.product_name,
-                p.hsn_code,
-                EXTRACT(DAY FROM i.expiry_date - CURRENT_DATE) as days_to_expiry
-            FROM inventory i
-            LEFT JOIN inventory.products p ON i.product_id = p.product_id
-            WHERE i.org_id = :org_id
-            AND i.current_stock > 0
-            AND i.expiry_date IS NOT NULL
-            AND i.expiry_date <= CURRENT_DATE + INTERVAL ':days days'
-            ORDER BY i.expiry_date ASC
-        """
-        
-        items = db.execute(
-            text(query),
-            {
-                "org_id": DEFAULT_ORG_ID,
-                "days": days
-            }
-        ).fetchall()
+        until_date = date.today() + timedelta(days=days)
+        items = ExpiryCalendarService.get_expiring_batches(
+            db, DEFAULT_ORG_ID, until_date=until_date
+        )
+        for item in items:
+            item["current_stock"] = item["quantity_available"]
         
         return {
             "days_threshold": days,
             "total_items": len(items),
-            "items": [dict(item._mapping) for item in items]
+            "value_at_risk": ExpiryCalendarService.get_value_at_risk(
+                db, DEFAULT_ORG_ID, until_date=until_date
+            ),
+            "items": items
         }
         
     except Exception as e:
@@ -569,16 +558,17 @@ async def get_low_stock_items(
                 p.hsn_code,
                 p.reorder_level,
                 p.reorder_quantity,
-                COALESCE(SUM(i.current_stock), 0) as total_stock
+                COALESCE(s.on_hand_quantity, 0) as total_stock,
+                COALESCE(s.sellable_quantity, 0) as sellable_stock,
+                COALESCE(s.reserved_quantity, 0) as reserved_stock
             FROM inventory.products p
-            LEFT JOIN inventory i ON p.product_id = i.product_id
+            LEFT JOIN inventory.product_stock_summary s 
+                ON s.org_id = p.org_id AND s.product_id = p.product_id
             WHERE p.org_id = :org_id
             AND p.reorder_level IS NOT NULL
             AND p.reorder_level > 0
-            GROUP BY p.product_id, p.product_name, p.hsn_code, 
-                     p.reorder_level, p.reorder_quantity
-            HAVING COALESCE(SUM(i.current_stock), 0) <= p.reorder_level
-            ORDER BY (COALESCE(SUM(i.current_stock), 0) / NULLIF(p.reorder_level, 0)) ASC
+            AND COALESCE(s.on_hand_quantity, 0) <= p.reorder_level
+            ORDER BY (COALESCE(s.on_hand_quantity, 0) / NULLIF(p.reorder_level, 0)) ASC
         """
         
         items = db.execute(
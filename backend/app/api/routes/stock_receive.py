@@ -15,6 +15,8 @@ from pydantic import BaseModel, Field
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
 from ...dependencies import get_current_org
+from ..services.stock_summary_service import StockSummaryService
+from ..services.stock_receipt_service import ReceiptLine, StockReceiptError, StockReceiptService
 
 # Default org ID for now
 
@@ -47,6 +49,25 @@ class StockReceiveResponse(BaseModel):
     expiry_date: datetime
     message: str
 
+class BulkStockReceiveItem(BaseModel):
+    """One GRN line"""
+    product_id: int
+    batch_number: Optional[str] = None
+    quantity: int = Field(gt=0, description="Quantity to receive")
+    cost_price: Optional[Decimal] = None
+    selling_price: Optional[Decimal] = None
+    mrp: Optional[Decimal] = None
+    expiry_date: Optional[date] = None
+    manufacturing_date: Optional[date] = None
+
+class BulkStockReceiveRequest(BaseModel):
+    """Request model for receiving a whole GRN"""
+    supplier_id: Optional[int] = None
+    purchase_invoice_number: Optional[str] = None
+    grn_number: Optional[str] = None
+    notes: Optional[str] = None
+    items: List[BulkStockReceiveItem] = Field(..., min_items=1)
+
 @router.post("/receive", response_model=StockReceiveResponse)
 async def receive_stock(
     stock_data: StockReceiveRequest,
@@ -157,6 +178,47 @@ async def receive_stock(
             detail=f"Failed to receive stock: {str(e)}"
         )
 
+@router.post("/receive/bulk")
+async def receive_stock_bulk(
+    receipt: BulkStockReceiveRequest,
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """
+    Receive a whole GRN in one transaction
+    
+    - Lines with the same product and batch number are merged
+    - A batch number already on file for the product receives into that batch
+    """
+    org_id = current_org["org_id"]
+    
+    try:
+        result = StockReceiptService.receive(
+            db,
+            org_id,
+            [ReceiptLine(**item.dict()) for item in receipt.items],
+            supplier_id=receipt.supplier_id,
+            invoice_number=receipt.purchase_invoice_number,
+            reference_number=receipt.grn_number,
+            notes=receipt.notes
+        )
+        db.commit()
+        
+        result["message"] = (
+            f"Received {result['total_quantity']} units into {len(result['batches'])} batches"
+        )
+        return result
+        
+    except StockReceiptError as e:
+        db.rollback()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to receive stock: {str(e)}"
+        )
+
 @router.get("/check/{product_id}")
 async def check_stock(
     product_id: int,
@@ -202,13 +264,16 @@ async def check_stock(
         "org_id": org_id
     }).fetchall()
     
-    # Calculate total
-    total_available = sum(batch.quantity_available for batch in batches)
+    summary = StockSummaryService.get_summary(db, org_id, product_id)
     
     return {
         "product_id": product.product_id,
         "product_name": product.product_name,
-        "total_available": total_available,
+        "total_available": summary["on_hand_quantity"],
+        "sellable_quantity": summary["sellable_quantity"],
+        "reserved_quantity": summary["reserved_quantity"],
+        "expired_quantity": summary["expired_quantity"],
+        "near_expiry_quantity": summary["near_expiry_quantity"],
         "batches": [
             {
                 "batch_id": batch.batch_id,
@@ -3,16 +3,19 @@ Stock Write-off API Router
 Handles write-off of expired, damaged, or lost inventory with ITC reversal
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
+import time
 from datetime import datetime, date
 from decimal import Decimal
 import uuid
 
+from ...core.audit import audit_log
 from ...core.database import get_db
 from ...core.config import DEFAULT_ORG_ID
+from ..services.expiry_calendar_service import ExpiryCalendarService
 
 logger = logging.getLogger(__name__)
 
@@ -42,58 +45,41 @@ async def get_expiry_report(
         # Calculate date range
         today = date.today()
         future_date = today + timedelta(days=days_ahead)
+        from_date = None if include_expired else today
         
-        query = """
-            SELECT 
-                b.batch_id,
-                b.batch_number,
-                b.expiry_date,
-                b.product_id,
-                p.product_name,
-                p.hsn_code,
-                p.gst_percent,
-                COALESCE(i.current_stock, 0) as current_stock,
-                COALESCE(b.cost_price, p.purchase_price, 0) as cost_price,
-                p.mrp,
-                CASE 
-                    WHEN b.expiry_date < :today THEN true
-                    ELSE false
-                END as is_expired,
-                DATE_PART('day', b.expiry_date - :today) as days_to_expiry
-            FROM inventory.batches b
-            JOIN inventory.products p ON b.product_id = p.product_id
-            LEFT JOIN inventory i ON (
-                i.product_id = b.product_id 
-                AND i.batch_number = b.batch_number
-                AND i.current_stock > 0
-            )
-            WHERE b.expiry_date <= :future_date
-        """
-        
-        params = {
-            "today": today,
-            "future_date": future_date
-        }
+        batches = ExpiryCalendarService.get_expiring_batches(
+            db, DEFAULT_ORG_ID, until_date=future_date, from_date=from_date
+        )
         
-        # Add filter for expired status
-        if not include_expired:
-            query += " AND b.expiry_date >= :today"
-            
-        query += " ORDER BY b.expiry_date ASC"
+        items = [
+            {
+                "batch_id": batch["batch_id"],
+                "batch_number": batch["batch_number"],
+                "expiry_date": batch["expiry_date"],
+                "product_id": batch["product_id"],
+                "product_name": batch["product_name"],
+                "hsn_code": batch["hsn_code"],
+                "current_stock": batch["quantity_available"],
+                "cost_price": batch["cost_per_unit"],
+                "stock_value": batch["stock_value"],
+                "is_expired": batch["is_expired"],
+                "days_to_expiry": batch["days_to_expiry"]
+            }
+            for batch in batches
+        ]
         
-        result = db.execute(text(query), params).fetchall()
+        value_at_risk = ExpiryCalendarService.get_value_at_risk(
+            db, DEFAULT_ORG_ID, until_date=future_date, from_date=from_date
+        )
         
-        items = []
-        for row in result:
-            item = dict(row._mapping)
-            # Only include if there's stock to write off
-            if item['current_stock'] > 0:
-                items.append(item)
-                
         return {
             "success": True,
             "items": items,
-            "total": len(items)
+            "total": len(items),
+            "value_at_risk": value_at_risk,
+            "monthly_buckets": ExpiryCalendarService.get_monthly_buckets(
+                db, DEFAULT_ORG_ID, until_date=future_date, from_date=from_date
+            )
         }
         
     except Exception as e:
@@ -103,11 +89,13 @@ async def get_expiry_report(
 @router.post("/")
 async def create_stock_writeoff(
     writeoff_data: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Create a stock write-off entry with ITC reversal tracking
     """
+    started = time.perf_counter()
     try:
         # Validate required fields
         required_fields = ["write_off_date", "reason", "items"]
@@ -266,6 +254,13 @@ async def create_stock_writeoff(
             )
         
         db.commit()
+        audit_log.record(
+            DEFAULT_ORG_ID, "stock_writeoff", writeoff_id, f"Stock written off ({reason})",
+            entity_name=writeoff_number,
+            new_values={"items": writeoff_data["items"], "total_cost_value": total_cost_value,
+                        "total_itc_reversal": total_itc_reversal},
+            request=request, started=started
+        )
         
         return {
             "success": True,
@@ -13,6 +13,7 @@ from ...core.config import DEFAULT_ORG_ID
 from ...models import Supplier
 from ...core.crud_base import create_crud
 from ...schemas.supplier import SupplierCreate, SupplierUpdate, SupplierResponse, SupplierListResponse
+from ..services.gst_party_profile_service import GSTPartyProfileService
 from uuid import UUID
 
 logger = logging.getLogger(__name__)
@@ -204,6 +205,10 @@ def update_supplier(supplier_id: int, supplier_data: SupplierUpdate, db: Session
             """
             
             db.execute(text(query), params)
+            
+            # GSTIN changed: re-resolve place of supply on next use
+            if "gst_number" in params:
+                GSTPartyProfileService.invalidate_party(db, DEFAULT_ORG_ID, "supplier", supplier_id)
             db.commit()
         
         # Return updated supplier
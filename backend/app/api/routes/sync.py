@@ -0,0 +1,61 @@
+"""
+Delta Sync API Router
+Change feeds for offline POS terminals and mobile clients: a full snapshot
+on first sync, then only the rows changed since the client's sync token.
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+import logging
+
+from ...core.database import get_db
+from ...core.fast_json import fast_json
+from ...dependencies import get_current_org
+from ..services.sync_service import SyncService, SyncTokenError, SyncTokenExpired, SYNC_ENTITIES
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("/")
+async def list_sync_feeds():
+    """Entities that can be synced"""
+    return {"entities": list(SYNC_ENTITIES)}
+
+
+@router.get("/{entity}")
+def get_sync_changes(
+    entity: str,
+    token: Optional[str] = Query(None, description="sync_token of the previous response; omit for a full sync"),
+    limit: Optional[int] = Query(None, ge=1, description="Rows per page"),
+    db: Session = Depends(get_db),
+    current_org = Depends(get_current_org)
+):
+    """
+    Rows of an entity changed since the sync token, and ids deleted since.
+    Without a token the feed starts with a full snapshot. Keep calling with
+    the returned sync_token while has_more is true; store it once has_more
+    is false and pass it on the next sync. A row may be sent again after it
+    was already received, so apply changes as upserts by id.
+    410 means the token outlived the tombstone retention: drop the local
+    copy and sync again without a token.
+    """
+    if entity not in SYNC_ENTITIES:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown sync entity '{entity}'. Available: {', '.join(SYNC_ENTITIES)}"
+        )
+
+    try:
+        page = SyncService.get_changes(db, current_org["org_id"], entity, token=token, limit=limit)
+        return fast_json(page)
+
+    except SyncTokenExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except SyncTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error reading {entity} sync feed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to read sync feed: {str(e)}")
@@ -3,7 +3,7 @@ Tax Entries API Router
 Manages GST entries, tax calculations, and compliance reporting
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
@@ -11,6 +11,10 @@ from datetime import date, datetime
 from decimal import Decimal
 
 from ...core.database import get_db
+from ...core.config import DEFAULT_ORG_ID
+from ...core.fast_json import dumps, fast_json, rows_as_dicts
+from ...core.http_cache import data_version_etag, etag_matches, json_response, not_modified, parse_if_none_match
+from ..services.gst_period_service import GSTPeriodService, return_period
 
 logger = logging.getLogger(__name__)
 
@@ -66,9 +70,9 @@ def get_tax_entries(
         params.update({"limit": limit, "skip": skip})
         
         result = db.execute(text(query), params)
-        entries = [dict(row._mapping) for row in result]
+        entries = rows_as_dicts(result)
         
-        return entries
+        return fast_json(entries)
         
     except Exception as e:
         logger.error(f"Error fetching tax entries: {str(e)}")
@@ -248,137 +252,158 @@ def calculate_tax(calculation_data: dict, db: Session = Depends(get_db)):
 def get_gstr1_summary(
     month: int = Query(..., description="Month (1-12)"),
     year: int = Query(..., description="Year"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Get GSTR-1 summary for the specified month"""
+    """Get GSTR-1 summary for the specified month from the GST period store (ETag / If-None-Match)"""
     try:
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
+        token = data_version_etag(
+            db, "gst.gstr1", ("gst_periods", "customers"), org_id=DEFAULT_ORG_ID, month=month, year=year
+        )
+        if etag_matches(parse_if_none_match(if_none_match), token):
+            return not_modified(token)
         
-        # B2B Supplies
-        b2b_query = """
-            SELECT 
-                c.gst_number as customer_gstin,
-                c.customer_name,
-                COUNT(DISTINCT te.invoice_number) as invoice_count,
-                SUM(te.taxable_amount) as taxable_value,
-                SUM(te.cgst_amount) as cgst,
-                SUM(te.sgst_amount) as sgst,
-                SUM(te.igst_amount) as igst,
-                SUM(te.total_tax_amount) as total_tax
-            FROM tax_entries te
-            JOIN parties.customers c ON te.party_id = c.customer_id
-            WHERE te.entry_type = 'sales'
-            AND te.entry_date >= :start_date
-            AND te.entry_date <= :end_date
-            AND c.gst_number IS NOT NULL
-            GROUP BY c.gst_number, c.customer_name
-            ORDER BY taxable_value DESC
-        """
+        gstr1 = GSTPeriodService.get_gstr1(db, DEFAULT_ORG_ID, return_period(year, month))
         
-        b2b_result = db.execute(text(b2b_query), {"start_date": start_date, "end_date": end_date})
-        b2b_supplies = [dict(row._mapping) for row in b2b_result]
+        # B2B Supplies
+        b2b_supplies = [
+            {
+                "customer_gstin": party["counterparty_gstin"],
+                "customer_name": party["customer_name"],
+                "invoice_count": party["document_count"],
+                "taxable_value": party["taxable_value"],
+                "cgst": party["cgst_amount"],
+                "sgst": party["sgst_amount"],
+                "igst": party["igst_amount"],
+                "total_tax": party["total_tax"]
+            }
+            for party in gstr1["b2b"]
+        ]
         
         # B2C Supplies
-        b2c_query = """
-            SELECT 
-                COUNT(DISTINCT te.invoice_number) as invoice_count,
-                SUM(te.taxable_amount) as taxable_value,
-                SUM(te.cgst_amount) as cgst,
-                SUM(te.sgst_amount) as sgst,
-                SUM(te.igst_amount) as igst,
-                SUM(te.total_tax_amount) as total_tax
-            FROM tax_entries te
-            LEFT JOIN parties.customers c ON te.party_id = c.customer_id
-            WHERE te.entry_type = 'sales'
-            AND te.entry_date >= :start_date
-            AND te.entry_date <= :end_date
-            AND (c.gst_number IS NULL OR c.gst_number = '')
-        """
-        
-        b2c_result = db.execute(text(b2c_query), {"start_date": start_date, "end_date": end_date})
-        b2c_summary = dict(b2c_result.first()._mapping)
+        b2c = gstr1["b2c_totals"]
+        b2c_summary = {
+            "invoice_count": b2c["document_count"],
+            "taxable_value": b2c["taxable_value"],
+            "cgst": b2c["cgst_amount"],
+            "sgst": b2c["sgst_amount"],
+            "igst": b2c["igst_amount"],
+            "total_tax": b2c["total_tax"]
+        }
         
         # HSN Summary
-        hsn_query = """
-            SELECT 
-                te.hsn_code,
-                te.product_description,
-                COUNT(*) as transaction_count,
-                SUM(te.taxable_amount) as taxable_value,
-                AVG(te.cgst_rate + te.sgst_rate + te.igst_rate) as avg_tax_rate,
-                SUM(te.total_tax_amount) as total_tax
-            FROM tax_entries te
-            WHERE te.entry_type = 'sales'
-            AND te.entry_date >= :start_date
-            AND te.entry_date <= :end_date
-            GROUP BY te.hsn_code, te.product_description
-            ORDER BY taxable_value DESC
-        """
-        
-        hsn_result = db.execute(text(hsn_query), {"start_date": start_date, "end_date": end_date})
-        hsn_summary = [dict(row._mapping) for row in hsn_result]
+        hsn_summary = [
+            {
+                "hsn_code": entry["hsn_code"],
+                "product_description": entry["product_description"],
+                "transaction_count": entry["document_count"],
+                "quantity": entry["quantity"],
+                "taxable_value": entry["taxable_value"],
+                "avg_tax_rate": entry["gst_rate"],
+                "total_tax": entry["total_tax"]
+            }
+            for entry in gstr1["hsn_summary"]
+        ]
         
-        return {
+        return json_response(dumps({
             "month": month,
             "year": year,
             "b2b_supplies": b2b_supplies,
             "b2c_summary": b2c_summary,
             "hsn_summary": hsn_summary,
+            "credit_notes": gstr1["credit_notes"],
             "generated_on": datetime.utcnow()
-        }
+        }), token)
         
     except Exception as e:
         logger.error(f"Error generating GSTR-1 summary: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate GSTR-1 summary: {str(e)}")
 
+@router.get("/gstr3b/summary")
+def get_gstr3b_summary(
+    month: int = Query(..., description="Month (1-12)"),
+    year: int = Query(..., description="Year"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Get GSTR-3B summary for the specified month from the GST period store (ETag / If-None-Match)"""
+    try:
+        token = data_version_etag(db, "gst.gstr3b", ("gst_periods",), org_id=DEFAULT_ORG_ID, month=month, year=year)
+        if etag_matches(parse_if_none_match(if_none_match), token):
+            return not_modified(token)
+        
+        gstr3b = GSTPeriodService.get_gstr3b(db, DEFAULT_ORG_ID, return_period(year, month))
+        return json_response(dumps({
+            "month": month,
+            "year": year,
+            **gstr3b,
+            "generated_on": datetime.utcnow()
+        }), token)
+        
+    except Exception as e:
+        logger.error(f"Error generating GSTR-3B summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate GSTR-3B summary: {str(e)}")
+
+@router.post("/gst-periods/recompute")
+def recompute_gst_period(
+    month: int = Query(..., description="Month (1-12)"),
+    year: int = Query(..., description="Year"),
+    db: Session = Depends(get_db)
+):
+    """Rebuild the GST period store for a month from source documents"""
+    try:
+        period = return_period(year, month)
+        lines = GSTPeriodService.recompute(db, DEFAULT_ORG_ID, period)
+        return {
+            "month": month,
+            "year": year,
+            "ledger_lines": lines,
+            "message": f"GST period {period:%m-%Y} recomputed"
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error recomputing GST period: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to recompute GST period: {str(e)}")
+
 @router.get("/gstr2/summary")
 def get_gstr2_summary(
     month: int = Query(..., description="Month (1-12)"),
     year: int = Query(..., description="Year"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Get GSTR-2 (Purchase) summary for the specified month"""
+    """Get GSTR-2 (Purchase) summary for the specified month from the GST period store (ETag / If-None-Match)"""
     try:
-        from datetime import timedelta
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
-        
-        # Purchase Summary
-        purchase_query = """
-            SELECT 
-                s.gstin as supplier_gstin,
-                s.supplier_name,
-                COUNT(DISTINCT te.invoice_number) as invoice_count,
-                SUM(te.taxable_amount) as taxable_value,
-                SUM(te.cgst_amount) as cgst,
-                SUM(te.sgst_amount) as sgst,
-                SUM(te.igst_amount) as igst,
-                SUM(te.total_tax_amount) as total_tax
-            FROM tax_entries te
-            JOIN suppliers s ON te.party_id = s.supplier_id
-            WHERE te.entry_type = 'purchase'
-            AND te.entry_date >= :start_date
-            AND te.entry_date <= :end_date
-            GROUP BY s.gstin, s.supplier_name
-            ORDER BY taxable_value DESC
-        """
+        token = data_version_etag(
+            db, "gst.gstr2", ("gst_periods", "suppliers"), org_id=DEFAULT_ORG_ID, month=month, year=year
+        )
+        if etag_matches(parse_if_none_match(if_none_match), token):
+            return not_modified(token)
         
-        purchase_result = db.execute(text(purchase_query), {"start_date": start_date, "end_date": end_date})
-        purchases = [dict(row._mapping) for row in purchase_result]
+        gstr2 = GSTPeriodService.get_gstr2(db, DEFAULT_ORG_ID, return_period(year, month))
         
-        return {
+        purchases = [
+            {
+                "supplier_gstin": party["counterparty_gstin"],
+                "supplier_name": party["supplier_name"],
+                "invoice_count": party["document_count"],
+                "taxable_value": party["taxable_value"],
+                "cgst": party["cgst_amount"],
+                "sgst": party["sgst_amount"],
+                "igst": party["igst_amount"],
+                "total_tax": party["total_tax"]
+            }
+            for party in gstr2["purchases"]
+        ]
+        
+        return json_response(dumps({
             "month": month,
             "year": year,
             "purchases": purchases,
+            "debit_notes": gstr2["debit_notes"],
             "generated_on": datetime.utcnow()
-        }
+        }), token)
         
     except Exception as e:
         logger.error(f"Error generating GSTR-2 summary: {str(e)}")
@@ -4,7 +4,7 @@ Handles invoice creation, payment recording, and GST reports
 """
 from typing import Dict
 from datetime import date, timedelta
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from uuid import UUID
@@ -16,6 +16,9 @@ from ..schemas.billing import (
     GSTType, InvoiceStatus, GSTR1Summary,
     InvoiceSummary
 )
+from .gst_calculator import GSTCalculator
+from .gst_party_profile_service import GSTPartyProfileService
+from .gst_period_service import GSTPeriodService
 
 logger = logging.getLogger(__name__)
 
@@ -58,26 +61,17 @@ class BillingService:
         gst_type: GSTType
     ) -> Dict[str, Decimal]:
         """Calculate GST amounts based on type"""
-        total_gst = (taxable_amount * gst_percent / 100).quantize(
-            Decimal("0.01"), rounding=ROUND_HALF_UP
-        )
-        
-        if gst_type == GSTType.CGST_SGST:
-            # Within state - split equally
-            cgst = (total_gst / 2).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            sgst = total_gst - cgst  # Ensure total matches
-            return {
-                "cgst_amount": cgst,
-                "sgst_amount": sgst,
-                "igst_amount": Decimal("0")
-            }
-        else:
-            # Inter-state - full IGST
-            return {
-                "cgst_amount": Decimal("0"),
-                "sgst_amount": Decimal("0"),
-                "igst_amount": total_gst
-            }
+        line = GSTCalculator.calculate(
+            quantities=[1],
+            unit_prices=[taxable_amount],
+            gst_percents=[gst_percent],
+            interstate=gst_type == GSTType.IGST
+        ).line(0)
+        return {
+            "cgst_amount": line["cgst_amount"],
+            "sgst_amount": line["sgst_amount"],
+            "igst_amount": line["igst_amount"]
+        }
     
     @staticmethod
     def create_invoice_from_order(
@@ -132,13 +126,9 @@ class BillingService:
                 WHERE oi.order_id = :order_id
             """), {"order_id": invoice_data.order_id}).fetchall()
             
-            # Determine GST type based on state
-            org_state = db.execute(text("""
-                SELECT state FROM parties.organizations
-                WHERE org_id = :org_id
-            """), {"org_id": org_id}).scalar()
-            
-            gst_type = GSTType.CGST_SGST if org_state == order.state else GSTType.IGST
+            # Determine GST type from the cached customer GST profile
+            is_interstate = GSTPartyProfileService.is_interstate(db, str(org_id), order.customer_id)
+            gst_type = GSTType.IGST if is_interstate else GSTType.CGST_SGST
             
             # Create invoice
             result = db.execute(text("""
@@ -208,14 +198,19 @@ class BillingService:
             
             invoice_id = result.scalar()
             
+            # Calculate all item taxes in one batched pass
+            item_calc = GSTCalculator.calculate(
+                quantities=[item.quantity for item in items],
+                unit_prices=[item.unit_price for item in items],
+                gst_percents=[item.gst_rate or 0 for item in items],
+                discount_amounts=[item.discount_amount or 0 for item in items],
+                interstate=gst_type == GSTType.IGST
+            )
+            
             # Insert invoice items
-            for item in items:
-                taxable = Decimal(str(item.quantity * item.unit_price - item.discount_amount))
-                gst_amounts = BillingService.calculate_gst_amounts(
-                    taxable, 
-                    Decimal(str(item.gst_rate or 0)),
-                    gst_type
-                )
+            for idx, item in enumerate(items):
+                gst_amounts = item_calc.line(idx)
+                taxable = gst_amounts["taxable_amount"]
                 
                 db.execute(text("""
                     INSERT INTO invoice_items (
@@ -248,7 +243,7 @@ class BillingService:
                     "sgst_amount": gst_amounts["sgst_amount"],
                     "igst_amount": gst_amounts["igst_amount"],
                     "taxable_amount": taxable,
-                    "total_amount": taxable + sum(gst_amounts.values())
+                    "total_amount": gst_amounts["total_amount"]
                 })
             
             db.commit()
@@ -389,64 +384,41 @@ class BillingService:
         from_date: date,
         to_date: date
     ) -> GSTR1Summary:
-        """Generate GSTR-1 summary for outward supplies"""
-        # B2B supplies (with GSTIN)
-        b2b = db.execute(text("""
-            SELECT 
-                COUNT(*) as invoice_count,
-                COALESCE(SUM(taxable_amount), 0) as taxable_value,
-                COALESCE(SUM(cgst_amount), 0) as cgst,
-                COALESCE(SUM(sgst_amount), 0) as sgst,
-                COALESCE(SUM(igst_amount), 0) as igst
-            FROM sales.invoices
-            WHERE org_id = :org_id
-                AND invoice_date BETWEEN :from_date AND :to_date
-                AND invoice_status NOT IN ('draft', 'cancelled')
-                AND customer_gstin IS NOT NULL
-        """), {
-            "org_id": org_id,
-            "from_date": from_date,
-            "to_date": to_date
-        }).fetchone()
+        """
+        Generate GSTR-1 summary for outward supplies from the GST period
+        store; covers every return month touched by the date range
+        """
+        sections = GSTPeriodService.get_section_totals(
+            db, str(org_id),
+            from_date.replace(day=1),
+            to_date.replace(day=1)
+        )
+        b2b = sections.get("b2b", {})
+        b2c = sections.get("b2c", {})
+        zero = Decimal("0")
         
-        # B2C supplies (without GSTIN)
-        b2c = db.execute(text("""
-            SELECT 
-                COUNT(*) as invoice_count,
-                COALESCE(SUM(taxable_amount), 0) as taxable_value,
-                COALESCE(SUM(cgst_amount), 0) as cgst,
-                COALESCE(SUM(sgst_amount), 0) as sgst,
-                COALESCE(SUM(igst_amount), 0) as igst
-            FROM sales.invoices
-            WHERE org_id = :org_id
-                AND invoice_date BETWEEN :from_date AND :to_date
-                AND invoice_status NOT IN ('draft', 'cancelled')
-                AND customer_gstin IS NULL
-        """), {
-            "org_id": org_id,
-            "from_date": from_date,
-            "to_date": to_date
-        }).fetchone()
+        b2b_tax = sum((b2b.get(c, zero) for c in ("cgst_amount", "sgst_amount", "igst_amount", "cess_amount")), zero)
+        b2c_tax = sum((b2c.get(c, zero) for c in ("cgst_amount", "sgst_amount", "igst_amount", "cess_amount")), zero)
         
         period = from_date.strftime("%m-%Y")
         
         return GSTR1Summary(
             period=period,
-            b2b_invoices=b2b.invoice_count,
-            b2b_taxable_value=b2b.taxable_value,
-            b2b_cgst=b2b.cgst,
-            b2b_sgst=b2b.sgst,
-            b2b_igst=b2b.igst,
-            b2c_invoices=b2c.invoice_count,
-            b2c_taxable_value=b2c.taxable_value,
-            b2c_cgst=b2c.cgst,
-            b2c_sgst=b2c.sgst,
-            b2c_igst=b2c.igst,
-            nil_rated_supplies=Decimal("0"),
-            exempted_supplies=Decimal("0"),
-            total_invoices=b2b.invoice_count + b2c.invoice_count,
-            total_taxable_value=b2b.taxable_value + b2c.taxable_value,
-            total_tax=b2b.cgst + b2b.sgst + b2b.igst + b2c.cgst + b2c.sgst + b2c.igst
+            b2b_invoices=b2b.get("document_count", 0),
+            b2b_taxable_value=b2b.get("taxable_value", zero),
+            b2b_cgst=b2b.get("cgst_amount", zero),
+            b2b_sgst=b2b.get("sgst_amount", zero),
+            b2b_igst=b2b.get("igst_amount", zero),
+            b2c_invoices=b2c.get("document_count", 0),
+            b2c_taxable_value=b2c.get("taxable_value", zero),
+            b2c_cgst=b2c.get("cgst_amount", zero),
+            b2c_sgst=b2c.get("sgst_amount", zero),
+            b2c_igst=b2c.get("igst_amount", zero),
+            nil_rated_supplies=zero,
+            exempted_supplies=zero,
+            total_invoices=b2b.get("document_count", 0) + b2c.get("document_count", 0),
+            total_taxable_value=b2b.get("taxable_value", zero) + b2c.get("taxable_value", zero),
+            total_tax=b2b_tax + b2c_tax
         )
     
     @staticmethod
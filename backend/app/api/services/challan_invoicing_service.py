@@ -0,0 +1,421 @@
+"""
+Challan invoicing service
+Bulk conversion of delivered challans into invoices, one invoice per
+customer. A chunk of customers is converted with a fixed number of
+statements: challans and their items are read in two batched queries,
+every invoice's lines go through one GSTCalculator pass, invoice numbers
+are allocated as a block, and invoices, invoice items and the challan
+links are written by one data-modifying statement.
+
+Runs are recorded in sales.challan_invoicing_runs; the job driving the
+chunks is app.jobs.challan_invoicing.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import json
+import logging
+
+from .gst_calculator import GSTCalculator, from_paise
+from .gst_party_profile_service import GSTPartyProfileService
+from .stock_reservation_service import StockReservationService
+
+logger = logging.getLogger(__name__)
+
+RUN_COLUMNS = """
+    run_id, org_id, from_date, to_date, invoice_date, status,
+    total_customers, processed_customers, failed_customers,
+    invoices_created, challans_invoiced, failures, error_message,
+    created_at, started_at, completed_at
+"""
+
+
+def allocate_invoice_numbers(db: Session, org_id: str, invoice_date: date, count: int) -> List[str]:
+    """
+    Reserve `count` consecutive INV<yyyymmdd><seq> numbers.
+    Allocation is serialized per org until the caller's transaction ends.
+    """
+    prefix = f"INV{invoice_date:%Y%m%d}"
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext('invoice_number:' || :org_id))"),
+        {"org_id": org_id}
+    )
+    last_seq = db.execute(text("""
+        SELECT COALESCE(MAX(
+            CASE WHEN substr(invoice_number, :prefix_length + 1) ~ '^[0-9]+$'
+                 THEN substr(invoice_number, :prefix_length + 1)::INTEGER END
+        ), 0)
+        FROM sales.invoices
+        WHERE org_id = :org_id
+        AND invoice_number LIKE :pattern
+    """), {"org_id": org_id, "prefix_length": len(prefix), "pattern": f"{prefix}%"}).scalar()
+    return [f"{prefix}{seq:04d}" for seq in range(last_seq + 1, last_seq + 1 + count)]
+
+
+class ChallanInvoicingService:
+    """Service class for bulk challan to invoice conversion"""
+
+    @staticmethod
+    def eligible_customers(db: Session, org_id: str, from_date: date, to_date: date) -> List[int]:
+        """Customers with delivered, uninvoiced challans in the date range"""
+        result = db.execute(text("""
+            SELECT DISTINCT customer_id
+            FROM challans
+            WHERE org_id = :org_id
+            AND status = 'delivered'
+            AND invoice_id IS NULL
+            AND challan_date BETWEEN :from_date AND :to_date
+            ORDER BY customer_id
+        """), {"org_id": org_id, "from_date": from_date, "to_date": to_date})
+        return [row.customer_id for row in result]
+
+    @staticmethod
+    def convert_customers(
+        db: Session,
+        org_id: str,
+        customer_ids: List[int],
+        from_date: date,
+        to_date: date,
+        invoice_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Invoice every eligible challan of the given customers, one invoice
+        per customer, and fulfil the stock reservations of source orders left
+        with no uninvoiced challan. The caller commits; the challans stay
+        locked until then.
+        """
+        invoice_date = invoice_date or date.today()
+
+        challans = db.execute(text("""
+            SELECT
+                c.challan_id, c.order_id, c.customer_id,
+                o.customer_name, o.billing_address,
+                cust.gstin, cust.state, cust.state_code
+            FROM challans c
+            JOIN sales.orders o ON c.order_id = o.order_id
+            JOIN parties.customers cust ON c.customer_id = cust.customer_id
+            WHERE c.org_id = :org_id
+            AND c.customer_id = ANY(:customer_ids)
+            AND c.status = 'delivered'
+            AND c.invoice_id IS NULL
+            AND c.challan_date BETWEEN :from_date AND :to_date
+            ORDER BY c.customer_id, c.challan_date, c.challan_id
+            FOR UPDATE OF c
+        """), {
+            "org_id": org_id,
+            "customer_ids": customer_ids,
+            "from_date": from_date,
+            "to_date": to_date
+        }).fetchall()
+        if not challans:
+            return {"invoices": 0, "challans": 0, "invoice_ids": []}
+
+        items = db.execute(text("""
+            SELECT
+                ci.challan_id, ci.product_id, ci.product_name,
+                ci.batch_id, ci.batch_number,
+                ci.dispatched_quantity AS quantity, ci.unit_price,
+                p.hsn_code, p.gst_percent, p.mrp,
+                oi.discount_percent
+            FROM challan_items ci
+            JOIN inventory.products p ON ci.product_id = p.product_id
+            LEFT JOIN sales.order_items oi ON ci.order_item_id = oi.order_item_id
+            WHERE ci.challan_id = ANY(:challan_ids)
+            ORDER BY ci.challan_id, ci.challan_item_id
+        """), {"challan_ids": [c.challan_id for c in challans]}).fetchall()
+
+        # One invoice per customer that has something to bill
+        customer_of_challan = {c.challan_id: c.customer_id for c in challans}
+        billed = sorted({customer_of_challan[item.challan_id] for item in items})
+        if not billed:
+            return {"invoices": 0, "challans": 0, "invoice_ids": []}
+        invoice_of_customer = {customer_id: k for k, customer_id in enumerate(billed)}
+        first_challan = {}
+        for challan in challans:
+            first_challan.setdefault(challan.customer_id, challan)
+
+        interstate = [GSTPartyProfileService.is_interstate(db, org_id, customer_id) for customer_id in billed]
+        calc = GSTCalculator.calculate(
+            quantities=[item.quantity for item in items],
+            unit_prices=[item.unit_price for item in items],
+            gst_percents=[item.gst_percent or 0 for item in items],
+            discount_percents=[item.discount_percent or 0 for item in items],
+            interstate=interstate,
+            invoice_index=[invoice_of_customer[customer_of_challan[item.challan_id]] for item in items]
+        )
+        invoice_numbers = allocate_invoice_numbers(db, org_id, invoice_date, len(billed))
+        totals = [calc.totals(k) for k in range(len(billed))]
+        heads = [first_challan[customer_id] for customer_id in billed]
+        invoiced_challans = [c for c in challans if c.customer_id in invoice_of_customer]
+
+        result = db.execute(text("""
+            WITH new_invoices AS (
+                INSERT INTO sales.invoices (
+                    org_id, invoice_number, invoice_date,
+                    customer_id, customer_name, customer_gstin,
+                    billing_address, billing_name, billing_city,
+                    billing_state, billing_pincode,
+                    subtotal_amount, discount_amount, taxable_amount,
+                    cgst_amount, sgst_amount, igst_amount,
+                    total_tax_amount, total_amount,
+                    payment_status, invoice_status,
+                    gst_type, place_of_supply, notes,
+                    order_id
+                )
+                SELECT
+                    :org_id, v.invoice_number, :invoice_date,
+                    v.customer_id, v.customer_name, v.customer_gstin,
+                    v.billing_address, v.customer_name, '',
+                    v.billing_state, '',
+                    v.subtotal_amount, v.discount_amount, v.taxable_amount,
+                    v.cgst_amount, v.sgst_amount, v.igst_amount,
+                    v.total_tax_amount, v.total_amount,
+                    'unpaid', 'generated',
+                    v.gst_type, v.place_of_supply, :notes,
+                    v.order_id
+                FROM unnest(
+                    CAST(:invoice_numbers AS TEXT[]),
+                    CAST(:customer_ids AS INTEGER[]),
+                    CAST(:customer_names AS TEXT[]),
+                    CAST(:customer_gstins AS TEXT[]),
+                    CAST(:billing_addresses AS TEXT[]),
+                    CAST(:billing_states AS TEXT[]),
+                    CAST(:subtotal_amounts AS NUMERIC[]),
+                    CAST(:discount_amounts AS NUMERIC[]),
+                    CAST(:taxable_amounts AS NUMERIC[]),
+                    CAST(:cgst_amounts AS NUMERIC[]),
+                    CAST(:sgst_amounts AS NUMERIC[]),
+                    CAST(:igst_amounts AS NUMERIC[]),
+                    CAST(:total_tax_amounts AS NUMERIC[]),
+                    CAST(:total_amounts AS NUMERIC[]),
+                    CAST(:gst_types AS TEXT[]),
+                    CAST(:places_of_supply AS TEXT[]),
+                    CAST(:order_ids AS INTEGER[])
+                ) AS v(invoice_number, customer_id, customer_name, customer_gstin,
+                       billing_address, billing_state,
+                       subtotal_amount, discount_amount, taxable_amount,
+                       cgst_amount, sgst_amount, igst_amount,
+                       total_tax_amount, total_amount,
+                       gst_type, place_of_supply, order_id)
+                RETURNING invoice_id, invoice_number
+            ),
+            new_items AS (
+                INSERT INTO invoice_items (
+                    invoice_id, product_id, product_name,
+                    hsn_code, batch_id, batch_number,
+                    quantity, unit_price, mrp,
+                    discount_percent, discount_amount,
+                    gst_percent, cgst_amount, sgst_amount,
+                    igst_amount, taxable_amount, total_amount
+                )
+                SELECT
+                    n.invoice_id, i.product_id, i.product_name,
+                    i.hsn_code, i.batch_id, i.batch_number,
+                    i.quantity, i.unit_price, i.mrp,
+                    i.discount_percent, i.discount_amount,
+                    i.gst_percent, i.cgst_amount, i.sgst_amount,
+                    i.igst_amount, i.taxable_amount, i.total_amount
+                FROM unnest(
+                    CAST(:item_invoice_numbers AS TEXT[]),
+                    CAST(:item_product_ids AS INTEGER[]),
+                    CAST(:item_product_names AS TEXT[]),
+                    CAST(:item_hsn_codes AS TEXT[]),
+                    CAST(:item_batch_ids AS INTEGER[]),
+                    CAST(:item_batch_numbers AS TEXT[]),
+                    CAST(:item_quantities AS NUMERIC[]),
+                    CAST(:item_unit_prices AS NUMERIC[]),
+                    CAST(:item_mrps AS NUMERIC[]),
+                    CAST(:item_discount_percents AS NUMERIC[]),
+                    CAST(:item_discount_amounts AS NUMERIC[]),
+                    CAST(:item_gst_percents AS NUMERIC[]),
+                    CAST(:item_cgst_amounts AS NUMERIC[]),
+                    CAST(:item_sgst_amounts AS NUMERIC[]),
+                    CAST(:item_igst_amounts AS NUMERIC[]),
+                    CAST(:item_taxable_amounts AS NUMERIC[]),
+                    CAST(:item_total_amounts AS NUMERIC[])
+                ) AS i(invoice_number, product_id, product_name,
+                       hsn_code, batch_id, batch_number,
+                       quantity, unit_price, mrp,
+                       discount_percent, discount_amount,
+                       gst_percent, cgst_amount, sgst_amount,
+                       igst_amount, taxable_amount, total_amount)
+                JOIN new_invoices n ON n.invoice_number = i.invoice_number
+                RETURNING 1
+            ),
+            linked AS (
+                UPDATE challans c
+                SET invoice_id = n.invoice_id,
+                    invoiced_at = CURRENT_TIMESTAMP
+                FROM unnest(
+                    CAST(:challan_ids AS INTEGER[]),
+                    CAST(:challan_invoice_numbers AS TEXT[])
+                ) AS x(challan_id, invoice_number)
+                JOIN new_invoices n ON n.invoice_number = x.invoice_number
+                WHERE c.challan_id = x.challan_id
+                RETURNING 1
+            )
+            SELECT
+                (SELECT array_agg(invoice_id ORDER BY invoice_id) FROM new_invoices) AS invoice_ids,
+                (SELECT COUNT(*) FROM new_items) AS items,
+                (SELECT COUNT(*) FROM linked) AS challans
+        """), {
+            "org_id": org_id,
+            "invoice_date": invoice_date,
+            "notes": f"Bulk invoice from delivered challans ({from_date} to {to_date})",
+            "invoice_numbers": invoice_numbers,
+            "customer_ids": billed,
+            "customer_names": [head.customer_name for head in heads],
+            "customer_gstins": [head.gstin for head in heads],
+            "billing_addresses": [head.billing_address or '' for head in heads],
+            "billing_states": [head.state or '' for head in heads],
+            "subtotal_amounts": [t["subtotal"] for t in totals],
+            "discount_amounts": [t["discount_amount"] for t in totals],
+            "taxable_amounts": [t["taxable_amount"] for t in totals],
+            "cgst_amounts": [t["cgst_amount"] for t in totals],
+            "sgst_amounts": [t["sgst_amount"] for t in totals],
+            "igst_amounts": [t["igst_amount"] for t in totals],
+            "total_tax_amounts": [t["tax_amount"] for t in totals],
+            "total_amounts": [t["total_amount"] for t in totals],
+            "gst_types": ["igst" if flag else "cgst_sgst" for flag in interstate],
+            "places_of_supply": [head.state_code or '09' for head in heads],
+            "order_ids": [head.order_id for head in heads],
+            "item_invoice_numbers": [
+                invoice_numbers[invoice_of_customer[customer_of_challan[item.challan_id]]] for item in items
+            ],
+            "item_product_ids": [item.product_id for item in items],
+            "item_product_names": [item.product_name for item in items],
+            "item_hsn_codes": [item.hsn_code for item in items],
+            "item_batch_ids": [item.batch_id for item in items],
+            "item_batch_numbers": [item.batch_number for item in items],
+            "item_quantities": [item.quantity for item in items],
+            "item_unit_prices": [item.unit_price for item in items],
+            "item_mrps": [item.mrp for item in items],
+            "item_discount_percents": [item.discount_percent or 0 for item in items],
+            "item_discount_amounts": [from_paise(v) for v in calc.discount_amount],
+            "item_gst_percents": calc.gst_rate,
+            "item_cgst_amounts": [from_paise(v) for v in calc.cgst_amount],
+            "item_sgst_amounts": [from_paise(v) for v in calc.sgst_amount],
+            "item_igst_amounts": [from_paise(v) for v in calc.igst_amount],
+            "item_taxable_amounts": [from_paise(v) for v in calc.taxable_amount],
+            "item_total_amounts": [from_paise(v) for v in calc.total_amount],
+            "challan_ids": [c.challan_id for c in invoiced_challans],
+            "challan_invoice_numbers": [
+                invoice_numbers[invoice_of_customer[c.customer_id]] for c in invoiced_challans
+            ]
+        }).first()
+
+        # Source orders now fully invoiced give up their held stock as an allocation
+        StockReservationService.fulfill_invoiced_orders(
+            db, org_id, [c.order_id for c in invoiced_challans]
+        )
+
+        return {
+            "invoices": len(billed),
+            "challans": result.challans,
+            "items": result.items,
+            "invoice_ids": list(result.invoice_ids or [])
+        }
+
+    # Run bookkeeping
+
+    @staticmethod
+    def create_run(
+        db: Session,
+        org_id: str,
+        from_date: date,
+        to_date: date,
+        invoice_date: Optional[date] = None,
+        requested_by: Optional[int] = None
+    ) -> Dict[str, Any]:
+        if to_date < from_date:
+            raise ValueError("to_date must not be before from_date")
+
+        row = db.execute(text(f"""
+            INSERT INTO sales.challan_invoicing_runs (
+                org_id, from_date, to_date, invoice_date, requested_by
+            ) VALUES (
+                :org_id, :from_date, :to_date, :invoice_date, :requested_by
+            )
+            RETURNING {RUN_COLUMNS}
+        """), {
+            "org_id": org_id,
+            "from_date": from_date,
+            "to_date": to_date,
+            "invoice_date": invoice_date or date.today(),
+            "requested_by": requested_by
+        }).first()
+        return ChallanInvoicingService._run_dict(row)
+
+    @staticmethod
+    def get_run(db: Session, org_id: str, run_id: str) -> Optional[Dict[str, Any]]:
+        row = db.execute(text(f"""
+            SELECT {RUN_COLUMNS}
+            FROM sales.challan_invoicing_runs
+            WHERE run_id = :run_id AND org_id = :org_id
+        """), {"run_id": run_id, "org_id": org_id}).first()
+        return ChallanInvoicingService._run_dict(row) if row else None
+
+    @staticmethod
+    def mark_started(db: Session, run_id: str, total_customers: int):
+        db.execute(text("""
+            UPDATE sales.challan_invoicing_runs
+            SET status = 'running',
+                total_customers = :total_customers,
+                started_at = CURRENT_TIMESTAMP
+            WHERE run_id = :run_id
+        """), {"run_id": run_id, "total_customers": total_customers})
+
+    @staticmethod
+    def record_progress(
+        db: Session,
+        run_id: str,
+        processed: int,
+        invoices: int,
+        challans: int,
+        failures: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Add one chunk's counts; `failures` are the customers that could not be invoiced"""
+        failures = failures or []
+        db.execute(text("""
+            UPDATE sales.challan_invoicing_runs
+            SET processed_customers = processed_customers + :processed,
+                failed_customers = failed_customers + :failed,
+                invoices_created = invoices_created + :invoices,
+                challans_invoiced = challans_invoiced + :challans,
+                failures = failures || CAST(:failures AS JSONB)
+            WHERE run_id = :run_id
+        """), {
+            "run_id": run_id,
+            "processed": processed,
+            "failed": len(failures),
+            "invoices": invoices,
+            "challans": challans,
+            "failures": json.dumps(failures, default=str)
+        })
+
+    @staticmethod
+    def mark_finished(db: Session, run_id: str, error_message: Optional[str] = None):
+        db.execute(text("""
+            UPDATE sales.challan_invoicing_runs
+            SET status = CASE
+                    WHEN CAST(:error_message AS TEXT) IS NOT NULL THEN 'failed'
+                    WHEN failed_customers > 0 THEN 'completed_with_errors'
+                    ELSE 'completed'
+                END,
+                error_message = :error_message,
+                completed_at = CURRENT_TIMESTAMP
+            WHERE run_id = :run_id
+        """), {"run_id": run_id, "error_message": error_message})
+
+    @staticmethod
+    def _run_dict(row) -> Dict[str, Any]:
+        run = dict(row._mapping)
+        run["run_id"] = str(run["run_id"])
+        run["org_id"] = str(run["org_id"])
+        total = run["total_customers"]
+        run["progress_percent"] = (
+            round(100 * (run["processed_customers"] + run["failed_customers"]) / total, 1)
+            if total else (100.0 if run["status"].startswith("completed") else 0.0)
+        )
+        return run
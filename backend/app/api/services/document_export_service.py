@@ -0,0 +1,107 @@
+"""
+Document export service
+Bookkeeping for bulk print exports (sales.document_export_jobs): creating
+a job, recording progress as chunks are written and reading its status.
+The export itself runs in app.jobs.invoice_export.
+"""
+from typing import Any, Dict, Optional
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = """
+    job_id, org_id, document_type, from_date, to_date, status,
+    total_documents, processed_documents, failed_documents,
+    file_path, byte_size, error_message, created_at, started_at, completed_at
+"""
+
+
+class DocumentExportService:
+    """Service class for bulk document export jobs"""
+
+    @staticmethod
+    def create_job(
+        db: Session,
+        org_id: str,
+        from_date: date,
+        to_date: date,
+        requested_by: Optional[int] = None
+    ) -> Dict[str, Any]:
+        if to_date < from_date:
+            raise ValueError("to_date must not be before from_date")
+
+        row = db.execute(text(f"""
+            INSERT INTO sales.document_export_jobs (
+                org_id, document_type, from_date, to_date, requested_by
+            ) VALUES (
+                :org_id, 'invoice', :from_date, :to_date, :requested_by
+            )
+            RETURNING {JOB_COLUMNS}
+        """), {
+            "org_id": org_id,
+            "from_date": from_date,
+            "to_date": to_date,
+            "requested_by": requested_by
+        }).first()
+        return DocumentExportService._job_dict(row)
+
+    @staticmethod
+    def get_job(db: Session, org_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        row = db.execute(text(f"""
+            SELECT {JOB_COLUMNS}
+            FROM sales.document_export_jobs
+            WHERE job_id = :job_id AND org_id = :org_id
+        """), {"job_id": job_id, "org_id": org_id}).first()
+        return DocumentExportService._job_dict(row) if row else None
+
+    @staticmethod
+    def mark_started(db: Session, job_id: str, total_documents: int, file_path: str):
+        db.execute(text("""
+            UPDATE sales.document_export_jobs
+            SET status = 'running',
+                total_documents = :total_documents,
+                file_path = :file_path,
+                started_at = CURRENT_TIMESTAMP
+            WHERE job_id = :job_id
+        """), {"job_id": job_id, "total_documents": total_documents, "file_path": file_path})
+
+    @staticmethod
+    def record_progress(db: Session, job_id: str, processed: int, failed: int):
+        """Add one chunk's counts"""
+        db.execute(text("""
+            UPDATE sales.document_export_jobs
+            SET processed_documents = processed_documents + :processed,
+                failed_documents = failed_documents + :failed
+            WHERE job_id = :job_id
+        """), {"job_id": job_id, "processed": processed, "failed": failed})
+
+    @staticmethod
+    def mark_finished(
+        db: Session,
+        job_id: str,
+        byte_size: Optional[int] = None,
+        error_message: Optional[str] = None
+    ):
+        db.execute(text("""
+            UPDATE sales.document_export_jobs
+            SET status = CASE WHEN CAST(:error_message AS TEXT) IS NULL THEN 'completed' ELSE 'failed' END,
+                byte_size = :byte_size,
+                error_message = :error_message,
+                completed_at = CURRENT_TIMESTAMP
+            WHERE job_id = :job_id
+        """), {"job_id": job_id, "byte_size": byte_size, "error_message": error_message})
+
+    @staticmethod
+    def _job_dict(row) -> Dict[str, Any]:
+        job = dict(row._mapping)
+        job["job_id"] = str(job["job_id"])
+        job["org_id"] = str(job["org_id"])
+        total = job["total_documents"]
+        job["progress_percent"] = (
+            round(100 * (job["processed_documents"] + job["failed_documents"]) / total, 1)
+            if total else (100.0 if job["status"] == "completed" else 0.0)
+        )
+        return job
@@ -0,0 +1,219 @@
+"""
+Document render service
+Stores the print payload of invoices, sales and notes once, content-
+addressed by the SHA-256 of its encoded bytes, so reprints are a single
+indexed read and an unchanged document is answered with 304.
+
+sales.document_renders maps a document to its current content hash;
+sales.document_render_blobs holds each distinct body once. Renders are
+deleted when the document changes (invoice triggers, note cancellation)
+and rebuilt on the next print or by the render worker pool.
+"""
+from typing import Any, Dict, Iterable, Optional, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when a print payload changes shape so old renders are not reused
+RENDER_FORMAT_VERSION = 1
+
+DOCUMENT_TYPES = ("invoice", "sale", "note")
+
+# Renders keyed by sales.invoices.invoice_id
+INVOICE_DOCUMENT_TYPES = ("invoice", "sale")
+
+
+@dataclass(frozen=True)
+class DocumentRender:
+    """Current render of one document; `content` is None when the caller already has it"""
+    document_type: str
+    document_id: str
+    content_hash: str
+    content: Optional[bytes]
+    pdf_url: Optional[str] = None
+    rendered_at: Optional[datetime] = None
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Canonical JSON encoding: identical payloads give identical bytes"""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def content_address(content: bytes) -> str:
+    digest = hashlib.sha256(f"v{RENDER_FORMAT_VERSION}:".encode("ascii"))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+class DocumentRenderService:
+    """Service class for cached document renders"""
+
+    @staticmethod
+    def get(
+        db: Session,
+        org_id: str,
+        document_type: str,
+        document_id: Any,
+        known_hashes: Sequence[str] = ()
+    ) -> Optional[DocumentRender]:
+        """
+        Current render, or None when the document has not been rendered since
+        it last changed. The body is not read when its hash is in `known_hashes`
+        (the client's If-None-Match).
+        """
+        known = [h for h in known_hashes if h != "*"]
+        row = db.execute(text("""
+            SELECT r.content_hash, r.pdf_url, r.rendered_at,
+                   CASE WHEN :any_hash OR r.content_hash = ANY(:known)
+                        THEN NULL ELSE b.content END AS content
+            FROM sales.document_renders r
+            JOIN sales.document_render_blobs b ON b.content_hash = r.content_hash
+            WHERE r.org_id = :org_id
+            AND r.document_type = :document_type
+            AND r.document_id = :document_id
+        """), {
+            "org_id": str(org_id),
+            "document_type": document_type,
+            "document_id": str(document_id),
+            "known": known,
+            "any_hash": "*" in known_hashes
+        }).first()
+        if not row:
+            return None
+
+        return DocumentRender(
+            document_type=document_type,
+            document_id=str(document_id),
+            content_hash=row.content_hash,
+            content=bytes(row.content) if row.content is not None else None,
+            pdf_url=row.pdf_url,
+            rendered_at=row.rendered_at
+        )
+
+    @staticmethod
+    def store(
+        db: Session,
+        org_id: str,
+        document_type: str,
+        document_id: Any,
+        payload: Dict[str, Any],
+        render_ms: Optional[int] = None,
+        expected_version: Optional[str] = None
+    ) -> Optional[DocumentRender]:
+        """
+        Encode, hash and save a payload as the document's current render.
+        With `expected_version` (the source_version read before the payload
+        was built) nothing is stored and None is returned when the document
+        changed meanwhile, so a slow background render cannot overwrite the
+        invalidation of a newer edit.
+        """
+        if expected_version is not None:
+            current_version = DocumentRenderService.source_version(db, document_type, document_id, lock=True)
+            if current_version != expected_version:
+                logger.info(f"Skipping stale render of {document_type} {document_id}")
+                return None
+
+        content = encode_payload(payload)
+        content_hash = content_address(content)
+
+        db.execute(text("""
+            INSERT INTO sales.document_render_blobs (content_hash, content, byte_size)
+            VALUES (:content_hash, :content, :byte_size)
+            ON CONFLICT (content_hash) DO NOTHING
+        """), {"content_hash": content_hash, "content": content, "byte_size": len(content)})
+
+        # A PDF made for the same content stays valid
+        row = db.execute(text("""
+            INSERT INTO sales.document_renders (
+                document_type, document_id, org_id, content_hash, render_ms
+            ) VALUES (
+                :document_type, :document_id, :org_id, :content_hash, :render_ms
+            )
+            ON CONFLICT (org_id, document_type, document_id) DO UPDATE SET
+                content_hash = EXCLUDED.content_hash,
+                render_ms = EXCLUDED.render_ms,
+                rendered_at = CURRENT_TIMESTAMP,
+                pdf_url = CASE
+                    WHEN sales.document_renders.content_hash = EXCLUDED.content_hash
+                    THEN sales.document_renders.pdf_url
+                END
+            RETURNING pdf_url, rendered_at
+        """), {
+            "document_type": document_type,
+            "document_id": str(document_id),
+            "org_id": org_id,
+            "content_hash": content_hash,
+            "render_ms": render_ms
+        }).first()
+
+        return DocumentRender(
+            document_type=document_type,
+            document_id=str(document_id),
+            content_hash=content_hash,
+            content=content,
+            pdf_url=row.pdf_url,
+            rendered_at=row.rendered_at
+        )
+
+    @staticmethod
+    def source_version(db: Session, document_type: str, document_id: Any, lock: bool = False) -> Optional[str]:
+        """
+        Row version of the invoice behind an invoice or sale render: the
+        invoice's xmin plus the count and newest xmin of its lines. None for
+        other document types. With `lock` the invoice row is share-locked, so
+        it cannot change before the caller commits.
+        """
+        if document_type not in INVOICE_DOCUMENT_TYPES:
+            return None
+        row = db.execute(text(f"""
+            SELECT i.xmin::TEXT AS invoice_xmin,
+                   (SELECT COUNT(*) || ':' || COALESCE(MAX(ii.xmin::TEXT::BIGINT), 0)
+                    FROM sales.invoice_items ii
+                    WHERE ii.invoice_id = i.invoice_id) AS items_version
+            FROM sales.invoices i
+            WHERE i.invoice_id = CAST(:document_id AS INTEGER)
+            {"FOR SHARE OF i" if lock else ""}
+        """), {"document_id": str(document_id)}).first()
+        if not row:
+            return None
+        return f"{row.invoice_xmin}:{row.items_version}"
+
+    @staticmethod
+    def invalidate(db: Session, document_type: str, document_ids: Iterable[Any]) -> int:
+        """Drop renders in the caller's transaction; blobs are collected later"""
+        result = db.execute(text("""
+            DELETE FROM sales.document_renders
+            WHERE document_type = :document_type
+            AND document_id = ANY(:document_ids)
+        """), {"document_type": document_type, "document_ids": [str(i) for i in document_ids]})
+        return result.rowcount
+
+    @staticmethod
+    def attach_pdf(db: Session, document_type: str, document_id: Any, pdf_url: str) -> bool:
+        """Record the PDF generated for the current render; False when there is none"""
+        result = db.execute(text("""
+            UPDATE sales.document_renders
+            SET pdf_url = :pdf_url
+            WHERE document_type = :document_type
+            AND document_id = :document_id
+        """), {"document_type": document_type, "document_id": str(document_id), "pdf_url": pdf_url})
+        return result.rowcount > 0
+
+    @staticmethod
+    def collect_garbage(db: Session, retain_hours: int) -> int:
+        """Delete blobs no render points to, once older than `retain_hours`"""
+        result = db.execute(text("""
+            DELETE FROM sales.document_render_blobs b
+            WHERE b.created_at < CURRENT_TIMESTAMP - make_interval(hours => :retain_hours)
+            AND NOT EXISTS (
+                SELECT 1 FROM sales.document_renders r
+                WHERE r.content_hash = b.content_hash
+            )
+        """), {"retain_hours": retain_hours})
+        return result.rowcount
@@ -16,6 +16,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from pydantic import BaseModel, Field, validator
 
+from .challan_invoicing_service import allocate_invoice_numbers
+from .gst_calculator import GSTCalculator
+from .gst_party_profile_service import GSTPartyProfileService
+
 logger = logging.getLogger(__name__)
 
 class OrderStatus(str, Enum):
@@ -460,7 +464,7 @@ class EnterpriseOrderService:
     
     def _validate_and_process_items(self, items: List[OrderItemRequest], customer: CustomerInfo) -> List[OrderItem]:
         """Validate all items with comprehensive product and batch information"""
-        processed_items = []
+        validated_lines = []
         
         for item_request in items:
             # Get comprehensive product info
@@ -491,14 +495,10 @@ class EnterpriseOrderService:
             if product.prescription_required:
                 self.logger.warning(f"Product {product.product_name} requires prescription")
             
-            # Calculate comprehensive line totals
-            processed_item = self._calculate_item_totals(
-                product, batch_info, item_request, customer
-            )
-            
-            processed_items.append(processed_item)
+            validated_lines.append((product, batch_info, item_request))
         
-        return processed_items
+        # Calculate comprehensive line totals for all items in one pass
+        return self._calculate_item_totals(validated_lines, customer)
     
     def _get_comprehensive_product_info(self, product_id: int) -> ProductInfo:
         """Get comprehensive product information with all fields"""
@@ -512,21 +512,11 @@ class EnterpriseOrderService:
                 p.pack_size, p.pack_quantity, p.unit_count,
                 p.base_uom_code, p.sale_uom_code, p.barcode,
                 p.minimum_stock_level,
-                COALESCE(SUM(b.quantity_available), 0) as available_stock
+                COALESCE(s.sellable_quantity, 0) as available_stock
             FROM inventory.products p
-            LEFT JOIN inventory.batches b ON p.product_id = b.product_id 
-                AND b.org_id = :org_id
-                AND b.quantity_available > 0
-                AND (b.expiry_date IS NULL OR b.expiry_date > CURRENT_DATE)
+            LEFT JOIN inventory.product_stock_summary s ON s.product_id = p.product_id
+                AND s.org_id = :org_id
             WHERE p.product_id = :product_id
-            GROUP BY p.product_id, p.product_code, p.product_name, p.generic_name,
-                     p.manufacturer, p.category_id, p.hsn_code,
-                     p.gst_percent, p.cgst_percent, p.sgst_percent, p.igst_percent,
-                     p.sale_price, p.mrp, p.purchase_price,
-                     p.drug_schedule, p.prescription_required,
-                     p.pack_size, p.pack_quantity, p.unit_count,
-                     p.base_uom_code, p.sale_uom_code, p.barcode,
-                     p.minimum_stock_level
         """), {
             "product_id": product_id,
             "org_id": self.org_id
@@ -640,65 +630,57 @@ class EnterpriseOrderService:
             is_near_expiry=result.is_near_expiry
         )
     
-    def _calculate_item_totals(self, product: ProductInfo, batch_info: Optional[BatchInfo], 
-                              item_request: OrderItemRequest, customer: CustomerInfo) -> OrderItem:
+    def _calculate_item_totals(self, lines: List[Tuple[ProductInfo, Optional[BatchInfo], OrderItemRequest]],
+                              customer: CustomerInfo) -> List[OrderItem]:
         """Calculate comprehensive item totals with all tax calculations"""
         
-        # Determine unit price
-        unit_price = item_request.unit_price or (batch_info.selling_price if batch_info else None) or product.sale_price
-        if not unit_price:
-            unit_price = product.mrp
+        # Determine unit prices
+        unit_prices = []
+        for product, batch_info, item_request in lines:
+            unit_price = item_request.unit_price or (batch_info.selling_price if batch_info else None) or product.sale_price
+            if not unit_price:
+                unit_price = product.mrp
+            unit_prices.append(unit_price)
         
-        # Calculate base amounts
-        quantity = item_request.quantity
-        line_total = quantity * unit_price
-        discount_amount = line_total * item_request.discount_percent / 100
-        taxable_amount = line_total - discount_amount
-        
-        # Determine if interstate transaction
-        is_interstate = self._is_interstate_transaction(customer)
-        
-        # Calculate GST amounts
-        gst_percent = product.gst_percent
-        total_tax = taxable_amount * gst_percent / 100
-        
-        if is_interstate:
-            cgst_amount = Decimal('0')
-            sgst_amount = Decimal('0')
-            igst_amount = total_tax
-        else:
-            cgst_amount = total_tax / 2
-            sgst_amount = total_tax / 2
-            igst_amount = Decimal('0')
+        # Calculate base amounts and GST for every line in one batched pass
+        calc = GSTCalculator.calculate(
+            quantities=[item_request.quantity for _, _, item_request in lines],
+            unit_prices=unit_prices,
+            gst_percents=[product.gst_percent for product, _, _ in lines],
+            discount_percents=[item_request.discount_percent for _, _, item_request in lines],
+            interstate=self._is_interstate_transaction(customer)
+        )
         
-        total_price = taxable_amount + total_tax
+        items = []
+        for idx, (product, batch_info, item_request) in enumerate(lines):
+            line = calc.line(idx)
+            quantity = item_request.quantity
+            items.append(OrderItem(
+                product_id=product.product_id,
+                product_info=product,
+                batch_info=batch_info,
+                quantity=quantity,
+                base_quantity=quantity * (product.pack_quantity or 1),
+                uom_code=item_request.uom_code or product.sale_uom_code,
+                unit_price=unit_prices[idx],
+                mrp=product.mrp,
+                discount_percent=item_request.discount_percent,
+                discount_amount=line["discount_amount"],
+                taxable_amount=line["taxable_amount"],
+                tax_percent=product.gst_percent,
+                tax_amount=line["tax_amount"],
+                cgst_amount=line["cgst_amount"],
+                sgst_amount=line["sgst_amount"],
+                igst_amount=line["igst_amount"],
+                line_total=line["taxable_amount"],
+                total_price=line["total_amount"]
+            ))
         
-        return OrderItem(
-            product_id=product.product_id,
-            product_info=product,
-            batch_info=batch_info,
-            quantity=quantity,
-            base_quantity=quantity * (product.pack_quantity or 1),
-            uom_code=item_request.uom_code or product.sale_uom_code,
-            unit_price=unit_price,
-            mrp=product.mrp,
-            discount_percent=item_request.discount_percent,
-            discount_amount=discount_amount,
-            taxable_amount=taxable_amount,
-            tax_percent=gst_percent,
-            tax_amount=total_tax,
-            cgst_amount=cgst_amount,
-            sgst_amount=sgst_amount,
-            igst_amount=igst_amount,
-            line_total=taxable_amount,
-            total_price=total_price
-        )
+        return items
     
     def _is_interstate_transaction(self, customer: CustomerInfo) -> bool:
-        """Determine if transaction is interstate"""
-        company_state = "Karnataka"  # Could be configurable
-        customer_state = customer.state or ""
-        return customer_state.lower() != company_state.lower()
+        """Determine if transaction is interstate from the cached party GST profile"""
+        return GSTPartyProfileService.is_interstate(self.db, self.org_id, customer.customer_id)
     
     def _calculate_comprehensive_totals(self, items: List[OrderItem], 
                                       request: OrderCreationRequest, 
@@ -966,7 +948,7 @@ class EnterpriseOrderService:
                                     request: OrderCreationRequest) -> Tuple[int, str]:
         """Create comprehensive invoice with all fields"""
         
-        invoice_number = f"INV{datetime.now().strftime('%Y%m%d')}{order_id:04d}"
+        invoice_number = allocate_invoice_numbers(self.db, self.org_id, date.today(), 1)[0]
         
         # Determine GST type and place of supply
         is_interstate = self._is_interstate_transaction(customer)
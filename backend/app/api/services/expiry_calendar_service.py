@@ -0,0 +1,175 @@
+"""
+Expiry calendar service layer
+Reads near-expiry stock and value at risk from the month-bucketed
+inventory.expiry_calendar instead of scanning inventory.batches.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value: date) -> date:
+    """First day of the month containing `value`"""
+    return value.replace(day=1)
+
+
+def next_month(value: date) -> date:
+    """First day of the month after the one containing `value`"""
+    return (month_start(value) + timedelta(days=32)).replace(day=1)
+
+
+class ExpiryCalendarService:
+    """Service class for expiry-window queries"""
+
+    @staticmethod
+    def _window(from_date: Optional[date], until_date: date) -> Dict[str, Any]:
+        """
+        Split [from_date, until_date] into fully covered months, answered from
+        the monthly totals, and partially covered edge months, answered from
+        the per-batch rows with an exact expiry_date filter.
+        """
+        partial_months = set()
+
+        if from_date is None or from_date == month_start(from_date):
+            full_from = from_date
+        else:
+            full_from = next_month(from_date)
+            partial_months.add(month_start(from_date))
+
+        if next_month(until_date) - timedelta(days=1) == until_date:
+            full_until = next_month(until_date)
+        else:
+            full_until = month_start(until_date)
+            partial_months.add(month_start(until_date))
+
+        return {
+            "from_date": from_date,
+            "until_date": until_date,
+            "first_month": month_start(from_date) if from_date else None,
+            "last_month": month_start(until_date),
+            "full_from": full_from,
+            "full_until": full_until,
+            "partial_months": sorted(partial_months)
+        }
+
+    @staticmethod
+    def get_value_at_risk(
+        db: Session,
+        org_id: str,
+        until_date: date,
+        from_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Batch count, quantity and cost value of stock expiring in the window.
+        `from_date=None` includes everything already expired.
+        """
+        window = ExpiryCalendarService._window(from_date, until_date)
+        result = db.execute(text("""
+            SELECT
+                COALESCE(SUM(batch_count), 0) AS batch_count,
+                COALESCE(SUM(quantity), 0) AS quantity,
+                COALESCE(SUM(stock_value), 0) AS stock_value
+            FROM (
+                SELECT batch_count, quantity, stock_value
+                FROM inventory.expiry_calendar_months
+                WHERE org_id = :org_id
+                AND expiry_month >= COALESCE(CAST(:full_from AS DATE), '-infinity'::DATE)
+                AND expiry_month < :full_until
+                UNION ALL
+                SELECT 1, quantity_available, stock_value
+                FROM inventory.expiry_calendar
+                WHERE org_id = :org_id
+                AND expiry_month = ANY(CAST(:partial_months AS DATE[]))
+                AND expiry_date >= COALESCE(CAST(:from_date AS DATE), '-infinity'::DATE)
+                AND expiry_date <= :until_date
+            ) window_totals
+        """), {"org_id": org_id, **window}).first()
+
+        return {
+            "from_date": from_date,
+            "until_date": until_date,
+            "batch_count": int(result.batch_count),
+            "quantity": result.quantity,
+            "stock_value": result.stock_value
+        }
+
+    @staticmethod
+    def get_monthly_buckets(
+        db: Session,
+        org_id: str,
+        until_date: date,
+        from_date: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Monthly expiry totals for every bucket the window touches"""
+        window = ExpiryCalendarService._window(from_date, until_date)
+        result = db.execute(text("""
+            SELECT expiry_month, batch_count, quantity, stock_value
+            FROM inventory.expiry_calendar_months
+            WHERE org_id = :org_id
+            AND expiry_month >= COALESCE(CAST(:first_month AS DATE), '-infinity'::DATE)
+            AND expiry_month <= :last_month
+            AND batch_count > 0
+            ORDER BY expiry_month
+        """), {"org_id": org_id, **window})
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def get_expiring_batches(
+        db: Session,
+        org_id: str,
+        until_date: date,
+        from_date: Optional[date] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Batches with stock expiring in the window, earliest first.
+        Reads a contiguous (org_id, expiry_month) range of the calendar and
+        joins products only for the rows returned.
+        """
+        window = ExpiryCalendarService._window(from_date, until_date)
+        query = """
+            SELECT
+                ec.batch_id,
+                b.batch_number,
+                ec.expiry_date,
+                ec.product_id,
+                p.product_name,
+                p.product_code,
+                p.hsn_code,
+                ec.quantity_available,
+                ec.cost_per_unit,
+                ec.stock_value,
+                ec.expiry_date - CURRENT_DATE AS days_to_expiry,
+                ec.expiry_date < CURRENT_DATE AS is_expired
+            FROM inventory.expiry_calendar ec
+            JOIN inventory.batches b ON b.batch_id = ec.batch_id
+            JOIN inventory.products p ON p.product_id = ec.product_id
+            WHERE ec.org_id = :org_id
+            AND ec.expiry_month >= COALESCE(CAST(:first_month AS DATE), '-infinity'::DATE)
+            AND ec.expiry_month <= :last_month
+            AND ec.expiry_date >= COALESCE(CAST(:from_date AS DATE), '-infinity'::DATE)
+            AND ec.expiry_date <= :until_date
+            ORDER BY ec.expiry_month, ec.expiry_date, p.product_name
+        """
+        params = {"org_id": org_id, **window}
+        if limit:
+            query += " LIMIT :limit"
+            params["limit"] = limit
+
+        result = db.execute(text(query), params)
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def rebuild(db: Session, org_id: str) -> int:
+        """Rebuild one org's calendar from batch stock; returns batches indexed"""
+        batches = db.execute(
+            text("SELECT rebuild_expiry_calendar(CAST(:org_id AS UUID))"),
+            {"org_id": org_id}
+        ).scalar()
+        db.commit()
+        logger.info(f"Rebuilt expiry calendar for org {org_id}: {batches} batches")
+        return batches
@@ -0,0 +1,269 @@
+"""
+Batched GST calculator
+Computes line and invoice totals for every line of one or many invoices in
+a single pass over columnar inputs (quantity, unit price, discount, GST %).
+
+All arithmetic is done on integers: quantities in thousandths, prices in
+hundredths of a paisa, percentages in basis points and amounts in paise.
+Each line is rounded to the paisa once per step (base, discount, tax) with
+ROUND_HALF_UP; intra-state tax is split so that CGST + SGST always equals
+the rounded line tax. Decimals are only built when results are read.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Union
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+
+QTY_PLACES = 3      # quantity in thousandths
+PRICE_PLACES = 4    # unit price in 1/10000 rupee (hundredths of a paisa)
+RATE_PLACES = 2     # percentages in basis points
+
+# base = qty * price is in 10^-(3+4) rupees; paise are 10^-2
+_BASE_DIVISOR = 10 ** (QTY_PLACES + PRICE_PLACES - 2)
+_PERCENT_DIVISOR = 100 * 10 ** RATE_PLACES
+
+_DECIMAL_SCALES = {places: Decimal(10 ** places) for places in range(5)}
+
+AMOUNT_FIELDS = (
+    "base_amount", "discount_amount", "taxable_amount",
+    "cgst_amount", "sgst_amount", "igst_amount", "tax_amount", "total_amount"
+)
+
+
+def _scaled(value: Any, places: int) -> int:
+    """Convert Decimal / int / float / str to an integer with `places` implied decimals"""
+    if type(value) is Decimal:
+        scaled = value * _DECIMAL_SCALES[places]
+        whole = int(scaled)
+        return whole if whole == scaled else int(scaled.to_integral_value(ROUND_HALF_UP))
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value * 10 ** places
+    if isinstance(value, float):
+        return int(round(value * 10 ** places))
+    return _scaled(Decimal(str(value)), places)
+
+
+def _column(values: Sequence[Any], places: int, memo: bool = False) -> List[int]:
+    """
+    Scale a column of values. With `memo`, each distinct value is converted
+    once (for low-cardinality columns such as GST and discount rates).
+    """
+    if not memo:
+        return [_scaled(value, places) for value in values]
+    cache: Dict[Any, int] = {}
+    column = []
+    for value in values:
+        scaled = cache.get(value)
+        if scaled is None:
+            scaled = cache[value] = _scaled(value, places)
+        column.append(scaled)
+    return column
+
+
+def to_paise(value: Any) -> int:
+    return _scaled(value, 2)
+
+
+def from_paise(paise: int) -> Decimal:
+    return Decimal(paise).scaleb(-2)
+
+
+def _div_round(numerator: int, divisor: int) -> int:
+    """Integer division rounded half away from zero (ROUND_HALF_UP)"""
+    quotient, remainder = divmod(abs(numerator), divisor)
+    if remainder * 2 >= divisor:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+@dataclass
+class GSTBatchResult:
+    """Columnar line results in paise plus per-invoice totals"""
+    invoice_index: List[int]
+    gst_rate: List[Decimal]
+    interstate: List[bool]
+    exempt: bool = False
+    base_amount: List[int] = field(default_factory=list)
+    discount_amount: List[int] = field(default_factory=list)
+    taxable_amount: List[int] = field(default_factory=list)
+    cgst_amount: List[int] = field(default_factory=list)
+    sgst_amount: List[int] = field(default_factory=list)
+    igst_amount: List[int] = field(default_factory=list)
+    tax_amount: List[int] = field(default_factory=list)
+    total_amount: List[int] = field(default_factory=list)
+    invoice_totals: List[Dict[str, int]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.invoice_index)
+
+    def line(self, i: int) -> Dict[str, Any]:
+        """One line as Decimals, with the split rates applied"""
+        rate = self.gst_rate[i]
+        zero = Decimal("0")
+        if self.exempt:
+            split = (zero, zero, zero)
+        elif self.interstate[self.invoice_index[i]]:
+            split = (zero, zero, rate)
+        else:
+            split = (rate / 2, rate / 2, zero)
+        return {
+            **{name: from_paise(getattr(self, name)[i]) for name in AMOUNT_FIELDS},
+            "gst_rate": rate,
+            "cgst_rate": split[0],
+            "sgst_rate": split[1],
+            "igst_rate": split[2]
+        }
+
+    def lines(self) -> List[Dict[str, Any]]:
+        return [self.line(i) for i in range(len(self))]
+
+    def totals(self, invoice: int = 0) -> Dict[str, Any]:
+        """Invoice totals as Decimals ("subtotal" is the pre-discount base)"""
+        totals = self.invoice_totals[invoice]
+        return {
+            "line_count": totals["line_count"],
+            "subtotal": from_paise(totals["base_amount"]),
+            **{name: from_paise(totals[name]) for name in AMOUNT_FIELDS[1:]}
+        }
+
+
+class GSTCalculator:
+    """
+    Single tax engine for invoices, orders, challan conversion and previews.
+    Callers pass columns for all lines at once; `invoice_index` assigns each
+    line to an invoice (all lines belong to invoice 0 when omitted).
+    """
+
+    @staticmethod
+    def calculate(
+        quantities: Sequence[Any],
+        unit_prices: Sequence[Any],
+        gst_percents: Sequence[Any],
+        discount_percents: Optional[Sequence[Any]] = None,
+        discount_amounts: Optional[Sequence[Any]] = None,
+        interstate: Union[bool, Sequence[bool]] = False,
+        invoice_index: Optional[Sequence[int]] = None,
+        exempt: bool = False
+    ) -> GSTBatchResult:
+        """
+        Compute line and invoice totals in one pass.
+
+        A positive discount percent wins over a discount amount on the same
+        line. `interstate` is one flag for every invoice or one per invoice;
+        `exempt` zeroes tax for export / SEZ supplies.
+        """
+        n = len(quantities)
+        if invoice_index is None:
+            invoice_index = [0] * n
+        invoice_count = (max(invoice_index) + 1) if n else 1
+        if isinstance(interstate, bool):
+            interstate = [interstate] * invoice_count
+
+        rates = [
+            r if type(r) is Decimal else Decimal(str(r or 0))
+            for r in gst_percents
+        ]
+        result = GSTBatchResult(invoice_index=list(invoice_index), gst_rate=rates,
+                                interstate=list(interstate), exempt=exempt)
+
+        # Columnar conversion to scaled integers
+        qty_col = _column(quantities, QTY_PLACES)
+        price_col = _column(unit_prices, PRICE_PLACES)
+        rate_col = [0] * n if exempt else _column(rates, RATE_PLACES, memo=True)
+        disc_pct_col = _column(discount_percents, RATE_PLACES, memo=True) if discount_percents else [0] * n
+        disc_amt_col = _column(discount_amounts, 2, memo=True) if discount_amounts else [0] * n
+
+        base_col = result.base_amount
+        discount_col = result.discount_amount
+        taxable_col = result.taxable_amount
+        cgst_col = result.cgst_amount
+        sgst_col = result.sgst_amount
+        igst_col = result.igst_amount
+        tax_col = result.tax_amount
+        total_col = result.total_amount
+
+        # Per-invoice running totals, one list per amount
+        sums = {name: [0] * invoice_count for name in AMOUNT_FIELDS}
+        sum_base = sums["base_amount"]
+        sum_discount = sums["discount_amount"]
+        sum_taxable = sums["taxable_amount"]
+        sum_cgst = sums["cgst_amount"]
+        sum_sgst = sums["sgst_amount"]
+        sum_igst = sums["igst_amount"]
+        sum_tax = sums["tax_amount"]
+        line_counts = [0] * invoice_count
+
+        half_base = _BASE_DIVISOR // 2
+        half_percent = _PERCENT_DIVISOR // 2
+
+        for i in range(n):
+            # Round half up to the paisa; the negative branches cover credit lines
+            amount = qty_col[i] * price_col[i]
+            base = (amount + half_base) // _BASE_DIVISOR if amount >= 0 else _div_round(amount, _BASE_DIVISOR)
+
+            discount_bp = disc_pct_col[i]
+            if discount_bp > 0:
+                amount = base * discount_bp
+                discount = (amount + half_percent) // _PERCENT_DIVISOR if amount >= 0 else _div_round(amount, _PERCENT_DIVISOR)
+            else:
+                discount = disc_amt_col[i]
+            taxable = base - discount
+
+            amount = taxable * rate_col[i]
+            tax = (amount + half_percent) // _PERCENT_DIVISOR if amount >= 0 else _div_round(amount, _PERCENT_DIVISOR)
+
+            invoice = invoice_index[i]
+            if interstate[invoice]:
+                cgst = sgst = 0
+                igst = tax
+            else:
+                cgst = (tax + 1) // 2 if tax >= 0 else _div_round(tax, 2)
+                sgst = tax - cgst
+                igst = 0
+
+            base_col.append(base)
+            discount_col.append(discount)
+            taxable_col.append(taxable)
+            cgst_col.append(cgst)
+            sgst_col.append(sgst)
+            igst_col.append(igst)
+            tax_col.append(tax)
+            total_col.append(taxable + tax)
+
+            line_counts[invoice] += 1
+            sum_base[invoice] += base
+            sum_discount[invoice] += discount
+            sum_taxable[invoice] += taxable
+            sum_cgst[invoice] += cgst
+            sum_sgst[invoice] += sgst
+            sum_igst[invoice] += igst
+            sum_tax[invoice] += tax
+
+        sums["total_amount"] = [taxable + tax for taxable, tax in zip(sum_taxable, sum_tax)]
+        result.invoice_totals = [
+            {"line_count": line_counts[k], **{name: sums[name][k] for name in AMOUNT_FIELDS}}
+            for k in range(invoice_count)
+        ]
+        return result
+
+    @staticmethod
+    def calculate_items(
+        items: List[Dict[str, Any]],
+        interstate: bool = False,
+        exempt: bool = False
+    ) -> GSTBatchResult:
+        """
+        Column-extract a list of item dicts (quantity, unit_price,
+        discount_percent, discount_amount, tax_percent or gst_percent) and
+        calculate them as one invoice
+        """
+        return GSTCalculator.calculate(
+            quantities=[item.get("quantity") for item in items],
+            unit_prices=[item.get("unit_price") for item in items],
+            gst_percents=[item.get("tax_percent") or item.get("gst_percent") for item in items],
+            discount_percents=[item.get("discount_percent") for item in items],
+            discount_amounts=[item.get("discount_amount") for item in items],
+            interstate=interstate,
+            exempt=exempt
+        )
@@ -0,0 +1,255 @@
+"""
+GST party profile service
+Resolves a party's GST identity once: GSTIN format and check digit, the
+state code it registers in and, for customers and suppliers, whether
+supplies with the organization are intra- or inter-state.
+
+Profiles are persisted on the party row (gst_state_code,
+gstin_checksum_valid, supply_type; organizations carry gst_state_code) and
+held in a per-process LRU, so place-of-supply checks on the order,
+challan and billing paths are a field comparison. Rows written before the
+columns existed are filled lazily, in the caller's transaction.
+"""
+from typing import Any, Dict, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import re
+import logging
+
+from ...core.cache import TTLCache
+from ...core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INTRA_STATE = "intra_state"
+INTER_STATE = "inter_state"
+
+GSTIN_PATTERN = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$')
+GSTIN_CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Party tables: (table, id column, fallback state code when there is no GSTIN)
+PARTY_TABLES = {
+    "customer": ("parties.customers", "customer_id", "state_code"),
+    "supplier": ("parties.suppliers", "supplier_id", "NULL"),
+}
+
+
+@dataclass(frozen=True)
+class GSTINInfo:
+    """Result of parsing one GSTIN"""
+    gstin: str
+    format_valid: bool
+    checksum_valid: bool
+    state_code: Optional[str]
+
+    @property
+    def valid(self) -> bool:
+        return self.format_valid and self.checksum_valid
+
+
+@dataclass(frozen=True)
+class PartyGSTProfile:
+    """GST identity of an organization, customer or supplier"""
+    party_type: str
+    party_id: Any
+    gstin: Optional[str]
+    gstin_valid: bool
+    state_code: Optional[str]
+    supply_type: str = INTRA_STATE
+
+    @property
+    def is_interstate(self) -> bool:
+        return self.supply_type == INTER_STATE
+
+    @property
+    def is_registered(self) -> bool:
+        return bool(self.gstin) and self.gstin_valid
+
+
+def gstin_check_digit(gstin: str) -> str:
+    """Mod-36 check character over the first 14 GSTIN characters"""
+    total = 0
+    for position, char in enumerate(gstin[:14]):
+        product = GSTIN_CHARSET.index(char) * (2 if position % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARSET[(36 - total % 36) % 36]
+
+
+@lru_cache(maxsize=4096)
+def parse_gstin(gstin: str) -> GSTINInfo:
+    """Validate format, state code and check digit of a GSTIN (cached per value)"""
+    from .gst_service import GSTService
+
+    normalized = (gstin or "").strip().upper()
+    format_valid = bool(GSTIN_PATTERN.match(normalized)) and normalized[:2] in GSTService.STATE_CODES
+    checksum_valid = format_valid and gstin_check_digit(normalized) == normalized[14]
+    return GSTINInfo(
+        gstin=normalized,
+        format_valid=format_valid,
+        checksum_valid=checksum_valid,
+        state_code=normalized[:2] if format_valid else None
+    )
+
+
+def resolve_supply_type(org_state_code: Optional[str], party_state_code: Optional[str]) -> str:
+    """Inter-state only when both state codes are known and differ"""
+    if org_state_code and party_state_code and org_state_code != party_state_code:
+        return INTER_STATE
+    return INTRA_STATE
+
+
+class GSTPartyProfileService:
+    """Service class for cached party GST profiles"""
+
+    _profiles = TTLCache(maxsize=settings.GST_PROFILE_CACHE_SIZE, ttl=settings.GST_PROFILE_CACHE_TTL)
+
+    @staticmethod
+    def get_org_profile(db: Session, org_id: str) -> Optional[PartyGSTProfile]:
+        """The organization's own GSTIN and state code"""
+        return GSTPartyProfileService._profiles.get_or_load(
+            ("organization", str(org_id), None),
+            lambda: GSTPartyProfileService._load_org(db, str(org_id))
+        )
+
+    @staticmethod
+    def get_customer_profile(db: Session, org_id: str, customer_id: int) -> Optional[PartyGSTProfile]:
+        return GSTPartyProfileService.get_party_profile(db, org_id, "customer", customer_id)
+
+    @staticmethod
+    def get_supplier_profile(db: Session, org_id: str, supplier_id: int) -> Optional[PartyGSTProfile]:
+        return GSTPartyProfileService.get_party_profile(db, org_id, "supplier", supplier_id)
+
+    @staticmethod
+    def get_party_profile(
+        db: Session,
+        org_id: str,
+        party_type: str,
+        party_id: int
+    ) -> Optional[PartyGSTProfile]:
+        """Customer or supplier profile; None when the party does not exist"""
+        return GSTPartyProfileService._profiles.get_or_load(
+            (party_type, str(org_id), party_id),
+            lambda: GSTPartyProfileService._load_party(db, str(org_id), party_type, party_id)
+        )
+
+    @staticmethod
+    def is_interstate(db: Session, org_id: str, customer_id: int) -> bool:
+        """Place-of-supply check for a sale to `customer_id`"""
+        profile = GSTPartyProfileService.get_customer_profile(db, org_id, customer_id)
+        return profile.is_interstate if profile else False
+
+    @staticmethod
+    def _load_org(db: Session, org_id: str) -> Optional[PartyGSTProfile]:
+        row = db.execute(text("""
+            SELECT gst_number, gst_state_code,
+                   business_settings->>'state_code' AS settings_state_code
+            FROM parties.organizations
+            WHERE org_id = :org_id
+        """), {"org_id": org_id}).first()
+        if not row:
+            return None
+
+        info = parse_gstin(row.gst_number) if row.gst_number else None
+        state_code = row.gst_state_code
+        if state_code is None:
+            state_code = (info.state_code if info else None) or row.settings_state_code
+            if state_code:
+                db.execute(text("""
+                    UPDATE parties.organizations SET gst_state_code = :state_code
+                    WHERE org_id = :org_id
+                """), {"state_code": state_code, "org_id": org_id})
+
+        return PartyGSTProfile(
+            party_type="organization",
+            party_id=org_id,
+            gstin=info.gstin if info else None,
+            gstin_valid=bool(info and info.valid),
+            state_code=state_code
+        )
+
+    @staticmethod
+    def _load_party(db: Session, org_id: str, party_type: str, party_id: int) -> Optional[PartyGSTProfile]:
+        table, id_column, state_code_column = PARTY_TABLES[party_type]
+        row = db.execute(text(f"""
+            SELECT gst_number, {state_code_column} AS state_code, gst_state_code, gstin_checksum_valid, supply_type
+            FROM {table}
+            WHERE {id_column} = :party_id AND org_id = :org_id
+        """), {"party_id": party_id, "org_id": org_id}).first()
+        if not row:
+            return None
+
+        info = parse_gstin(row.gst_number) if row.gst_number else None
+        if row.supply_type is not None:
+            return PartyGSTProfile(
+                party_type=party_type,
+                party_id=party_id,
+                gstin=info.gstin if info else None,
+                gstin_valid=bool(row.gstin_checksum_valid),
+                state_code=row.gst_state_code,
+                supply_type=row.supply_type
+            )
+
+        # Not resolved yet: derive once and persist on the row
+        org = GSTPartyProfileService.get_org_profile(db, org_id)
+        state_code = (info.state_code if info else None) or row.state_code
+        profile = PartyGSTProfile(
+            party_type=party_type,
+            party_id=party_id,
+            gstin=info.gstin if info else None,
+            gstin_valid=bool(info and info.valid),
+            state_code=state_code,
+            supply_type=resolve_supply_type(org.state_code if org else None, state_code)
+        )
+        if info and not info.valid:
+            logger.warning(f"Invalid GSTIN on {party_type} {party_id}: {info.gstin}")
+
+        db.execute(text(f"""
+            UPDATE {table}
+            SET gst_state_code = :state_code,
+                gstin_checksum_valid = :gstin_valid,
+                supply_type = :supply_type
+            WHERE {id_column} = :party_id AND org_id = :org_id
+        """), {
+            "state_code": profile.state_code,
+            "gstin_valid": profile.gstin_valid,
+            "supply_type": profile.supply_type,
+            "party_id": party_id,
+            "org_id": org_id
+        })
+        return profile
+
+    @staticmethod
+    def invalidate_party(db: Session, org_id: str, party_type: str, party_id: int) -> None:
+        """
+        Forget a party's profile after its GSTIN or state changed; the row is
+        re-resolved on next use. Runs in the caller's transaction.
+        """
+        table, id_column, _ = PARTY_TABLES[party_type]
+        db.execute(text(f"""
+            UPDATE {table}
+            SET gst_state_code = NULL, gstin_checksum_valid = NULL, supply_type = NULL
+            WHERE {id_column} = :party_id AND org_id = :org_id
+        """), {"party_id": party_id, "org_id": org_id})
+        GSTPartyProfileService._profiles.invalidate((party_type, str(org_id), party_id))
+
+    @staticmethod
+    def invalidate_org(db: Session, org_id: str) -> None:
+        """Forget the org profile and every party supply type that depends on it"""
+        db.execute(text("""
+            UPDATE parties.organizations SET gst_state_code = NULL WHERE org_id = :org_id
+        """), {"org_id": org_id})
+        for table, _, _ in PARTY_TABLES.values():
+            db.execute(text(f"""
+                UPDATE {table} SET supply_type = NULL
+                WHERE org_id = :org_id AND supply_type IS NOT NULL
+            """), {"org_id": org_id})
+        GSTPartyProfileService._profiles.invalidate_where(lambda key: key[1] == str(org_id))
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        return {
+            "profiles": GSTPartyProfileService._profiles.stats(),
+            "gstins": parse_gstin.cache_info()._asdict()
+        }
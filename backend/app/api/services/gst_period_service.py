@@ -0,0 +1,253 @@
+"""
+GST period service layer
+Reads GSTR-1 / GSTR-3B figures from the pre-aggregated period store
+(gst.gst_period_rollups and gst.gst_period_party_totals). The store is kept
+current by triggers as invoices, credit notes and supplier documents post;
+`recompute` rebuilds a month from source documents for corrections.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import date
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
+
+TAX_COLUMNS = ("taxable_value", "igst_amount", "cgst_amount", "sgst_amount", "cess_amount")
+
+OUTWARD_SECTIONS = ("b2b", "b2c")
+CREDIT_NOTE_SECTIONS = ("cdnr", "cdnur")
+
+
+def return_period(year: int, month: int) -> date:
+    """First day of the GST return month"""
+    return date(year, month, 1)
+
+
+def _zero_totals() -> Dict[str, Any]:
+    return {"document_count": 0, "document_value": Decimal("0"), **{c: Decimal("0") for c in TAX_COLUMNS}}
+
+
+def _add(totals: Dict[str, Any], row: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    totals["document_count"] += sign * (row.get("document_count") or 0)
+    totals["document_value"] += sign * (row.get("document_value") or Decimal("0"))
+    for column in TAX_COLUMNS:
+        totals[column] += sign * (row.get(column) or Decimal("0"))
+    return totals
+
+
+def _total_tax(row: Dict[str, Any]) -> Decimal:
+    return row["igst_amount"] + row["cgst_amount"] + row["sgst_amount"] + row["cess_amount"]
+
+
+class GSTPeriodService:
+    """Service class for GST return figures"""
+
+    @staticmethod
+    def get_party_totals(
+        db: Session,
+        org_id: str,
+        from_period: date,
+        to_period: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Per-section, per-GSTIN totals for one month or a range of months"""
+        result = db.execute(text("""
+            SELECT
+                t.section,
+                t.counterparty_gstin,
+                SUM(t.document_count) AS document_count,
+                SUM(t.document_value) AS document_value,
+                SUM(t.taxable_value) AS taxable_value,
+                SUM(t.igst_amount) AS igst_amount,
+                SUM(t.cgst_amount) AS cgst_amount,
+                SUM(t.sgst_amount) AS sgst_amount,
+                SUM(t.cess_amount) AS cess_amount
+            FROM gst.gst_period_party_totals t
+            WHERE t.org_id = :org_id
+            AND t.return_period BETWEEN :from_period AND :to_period
+            GROUP BY t.section, t.counterparty_gstin
+            HAVING SUM(t.document_count) <> 0
+            ORDER BY t.section, SUM(t.taxable_value) DESC
+        """), {"org_id": org_id, "from_period": from_period, "to_period": to_period or from_period})
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def get_rate_rollups(db: Session, org_id: str, period: date) -> List[Dict[str, Any]]:
+        """Per-section HSN and rate totals for one month, GSTINs folded together"""
+        result = db.execute(text("""
+            SELECT
+                r.section,
+                r.hsn_code,
+                r.gst_rate,
+                h.description AS product_description,
+                SUM(r.document_count) AS document_count,
+                SUM(r.quantity) AS quantity,
+                SUM(r.taxable_value) AS taxable_value,
+                SUM(r.igst_amount) AS igst_amount,
+                SUM(r.cgst_amount) AS cgst_amount,
+                SUM(r.sgst_amount) AS sgst_amount,
+                SUM(r.cess_amount) AS cess_amount
+            FROM gst.gst_period_rollups r
+            LEFT JOIN gst.hsn_sac_codes h ON h.code = r.hsn_code
+            WHERE r.org_id = :org_id
+            AND r.return_period = :period
+            GROUP BY r.section, r.hsn_code, r.gst_rate, h.description
+            HAVING SUM(r.document_count) <> 0
+            ORDER BY r.section, SUM(r.taxable_value) DESC
+        """), {"org_id": org_id, "period": period})
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def _party_names(db: Session, org_id: str, gstins: List[str], table: str = "customers") -> Dict[str, str]:
+        gstins = [g for g in gstins if g]
+        if not gstins:
+            return {}
+        name_column, id_column = {
+            "customers": ("customer_name", "customer_id"),
+            "suppliers": ("supplier_name", "supplier_id")
+        }[table]
+        result = db.execute(text(f"""
+            SELECT DISTINCT ON (gst_number) gst_number, {name_column} AS party_name
+            FROM parties.{table}
+            WHERE org_id = :org_id AND gst_number = ANY(:gstins)
+            ORDER BY gst_number, {id_column}
+        """), {"org_id": org_id, "gstins": gstins})
+        return {row.gst_number: row.party_name for row in result}
+
+    @staticmethod
+    def get_gstr1(db: Session, org_id: str, period: date) -> Dict[str, Any]:
+        """GSTR-1 for one month: B2B by GSTIN, B2C by rate, HSN summary and credit notes"""
+        parties = GSTPeriodService.get_party_totals(db, org_id, period)
+        rates = GSTPeriodService.get_rate_rollups(db, org_id, period)
+        names = GSTPeriodService._party_names(
+            db, org_id,
+            [p["counterparty_gstin"] for p in parties if p["section"] in ("b2b", "cdnr")]
+        )
+
+        b2b = []
+        b2c_totals = _zero_totals()
+        credit_notes = []
+        credit_note_totals = _zero_totals()
+        for party in parties:
+            if party["section"] == "b2b":
+                b2b.append({**party, "customer_name": names.get(party["counterparty_gstin"]),
+                            "total_tax": _total_tax(party)})
+            elif party["section"] == "b2c":
+                _add(b2c_totals, party)
+            elif party["section"] in CREDIT_NOTE_SECTIONS:
+                credit_notes.append({**party, "customer_name": names.get(party["counterparty_gstin"]),
+                                     "total_tax": _total_tax(party)})
+                _add(credit_note_totals, party)
+
+        b2c_rates = [
+            {**row, "total_tax": _total_tax(row)}
+            for row in rates if row["section"] == "b2c"
+        ]
+
+        hsn = {}
+        for row in rates:
+            if row["section"] not in OUTWARD_SECTIONS:
+                continue
+            key = (row["hsn_code"], row["gst_rate"])
+            entry = hsn.setdefault(key, {
+                "hsn_code": row["hsn_code"],
+                "gst_rate": row["gst_rate"],
+                "product_description": row["product_description"],
+                "quantity": Decimal("0"),
+                **_zero_totals()
+            })
+            entry["quantity"] += row["quantity"] or Decimal("0")
+            _add(entry, row)
+        hsn_summary = sorted(hsn.values(), key=lambda e: e["taxable_value"], reverse=True)
+        for entry in hsn_summary:
+            entry["total_tax"] = _total_tax(entry)
+
+        b2b_totals = _zero_totals()
+        for party in b2b:
+            _add(b2b_totals, party)
+
+        return {
+            "return_period": period,
+            "b2b": b2b,
+            "b2b_totals": {**b2b_totals, "total_tax": _total_tax(b2b_totals)},
+            "b2c_totals": {**b2c_totals, "total_tax": _total_tax(b2c_totals)},
+            "b2c_rates": b2c_rates,
+            "hsn_summary": hsn_summary,
+            "credit_notes": credit_notes,
+            "credit_note_totals": {**credit_note_totals, "total_tax": _total_tax(credit_note_totals)}
+        }
+
+    @staticmethod
+    def get_gstr2(db: Session, org_id: str, period: date) -> Dict[str, Any]:
+        """GSTR-2 for one month: inward supplies and debit notes by supplier GSTIN"""
+        parties = [
+            p for p in GSTPeriodService.get_party_totals(db, org_id, period)
+            if p["section"] in ("itc", "itc_reversal")
+        ]
+        names = GSTPeriodService._party_names(
+            db, org_id, [p["counterparty_gstin"] for p in parties], table="suppliers"
+        )
+
+        purchases = []
+        debit_notes = []
+        for party in parties:
+            entry = {**party, "supplier_name": names.get(party["counterparty_gstin"]),
+                     "total_tax": _total_tax(party)}
+            (purchases if party["section"] == "itc" else debit_notes).append(entry)
+
+        return {"return_period": period, "purchases": purchases, "debit_notes": debit_notes}
+
+    @staticmethod
+    def get_section_totals(
+        db: Session,
+        org_id: str,
+        from_period: date,
+        to_period: Optional[date] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Totals per section ('b2b', 'b2c', 'cdnr', ...) across GSTINs"""
+        sections: Dict[str, Dict[str, Any]] = {}
+        for party in GSTPeriodService.get_party_totals(db, org_id, from_period, to_period):
+            _add(sections.setdefault(party["section"], _zero_totals()), party)
+        return sections
+
+    @staticmethod
+    def get_gstr3b(db: Session, org_id: str, period: date) -> Dict[str, Any]:
+        """
+        GSTR-3B for one month: outward supplies net of credit notes (3.1),
+        eligible ITC net of reversals (4) and the tax payable per head
+        """
+        sections = GSTPeriodService.get_section_totals(db, org_id, period)
+        empty = _zero_totals()
+
+        outward = _zero_totals()
+        for name in OUTWARD_SECTIONS:
+            _add(outward, sections.get(name, empty))
+        for name in CREDIT_NOTE_SECTIONS:
+            _add(outward, sections.get(name, empty), sign=-1)
+
+        itc = _add(_zero_totals(), sections.get("itc", empty))
+        _add(itc, sections.get("itc_reversal", empty), sign=-1)
+
+        payable = {
+            head: max(outward[head] - itc[head], Decimal("0"))
+            for head in ("igst_amount", "cgst_amount", "sgst_amount", "cess_amount")
+        }
+
+        return {
+            "return_period": period,
+            "outward_supplies": {**outward, "total_tax": _total_tax(outward)},
+            "eligible_itc": {**itc, "total_tax": _total_tax(itc)},
+            "tax_payable": {**payable, "total_tax": sum(payable.values(), Decimal("0"))}
+        }
+
+    @staticmethod
+    def recompute(db: Session, org_id: str, period: date) -> int:
+        """Rebuild one month from source documents; returns ledger lines written"""
+        lines = db.execute(
+            text("SELECT recompute_gst_period(CAST(:org_id AS UUID), :period)"),
+            {"org_id": org_id, "period": period}
+        ).scalar()
+        db.commit()
+        logger.info(f"Recomputed GST period {period:%Y-%m} for org {org_id}: {lines} lines")
+        return lines
@@ -3,12 +3,14 @@ GST Service Module
 Handles GST calculations based on Indian tax laws
 Follows industry-standard logic from Marg ERP, Vyapar, Tally
 """
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 from enum import Enum
-import re
 import logging
 
+from .gst_calculator import GSTCalculator, GSTBatchResult
+from .gst_party_profile_service import parse_gstin
+
 logger = logging.getLogger(__name__)
 
 
@@ -75,25 +77,9 @@ class GSTService:
         """
         if not gstin:
             return False
-            
-        # Remove any spaces and convert to uppercase
-        gstin = gstin.strip().upper()
         
-        # Check length
-        if len(gstin) != 15:
-            return False
-            
-        # Check pattern
-        pattern = r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$'
-        if not re.match(pattern, gstin):
-            return False
-            
-        # Check if state code is valid
-        state_code = gstin[:2]
-        if state_code not in GSTService.STATE_CODES:
-            return False
-            
-        return True
+        # Pattern and state code checks are cached per GSTIN value
+        return parse_gstin(gstin).format_valid
     
     @staticmethod
     def extract_state_code(gstin: str) -> Optional[str]:
@@ -103,14 +89,13 @@ class GSTService:
         """
         if not gstin:
             return None
-            
-        gstin = gstin.strip().upper()
         
-        if not GSTService.validate_gstin(gstin):
-            logger.warning(f"Invalid GSTIN format: {gstin}")
+        info = parse_gstin(gstin)
+        if not info.format_valid:
+            logger.warning(f"Invalid GSTIN format: {info.gstin}")
             return None
             
-        return gstin[:2]
+        return info.state_code
     
     @staticmethod
     def get_state_name(state_code: str) -> Optional[str]:
@@ -248,51 +233,48 @@ class GSTService:
         Returns:
             Dictionary with all calculations
         """
-        quantity = Decimal(str(item_data.get("quantity", 0)))
-        unit_price = Decimal(str(item_data.get("unit_price", 0)))
-        discount_percent = Decimal(str(item_data.get("discount_percent", 0)))
-        discount_amount = Decimal(str(item_data.get("discount_amount", 0)))
-        gst_rate = override_gst_rate or Decimal(str(item_data.get("tax_percent", 0)))
-        
-        # Calculate base amount
-        base_amount = quantity * unit_price
-        
-        # Apply discount
-        if discount_percent > 0:
-            discount_amount = (base_amount * discount_percent / 100).quantize(Decimal("0.01"))
-        
-        taxable_amount = base_amount - discount_amount
-        
-        # Calculate GST
-        gst_amounts = GSTService.calculate_gst_amounts(taxable_amount, gst_rate, gst_type)
-        
-        # Total amount including tax
-        total_amount = taxable_amount + gst_amounts["total_tax"]
-        
-        return {
-            "quantity": quantity,
-            "unit_price": unit_price,
-            "base_amount": base_amount,
-            "discount_percent": discount_percent,
-            "discount_amount": discount_amount,
-            "taxable_amount": taxable_amount,
-            "gst_rate": gst_rate,
-            "cgst_rate": gst_amounts["cgst_rate"],
-            "sgst_rate": gst_amounts["sgst_rate"],
-            "igst_rate": gst_amounts["igst_rate"],
-            "cgst_amount": gst_amounts["cgst_amount"],
-            "sgst_amount": gst_amounts["sgst_amount"],
-            "igst_amount": gst_amounts["igst_amount"],
-            "tax_amount": gst_amounts["total_tax"],
-            "total_amount": total_amount
-        }
+        item = dict(item_data)
+        if override_gst_rate is not None:
+            item["tax_percent"] = override_gst_rate
+        calc = GSTCalculator.calculate_items(
+            [item],
+            interstate=gst_type == GSTType.IGST,
+            exempt=gst_type == GSTType.EXEMPT
+        )
+        return GSTService._item_results([item], calc)[0]
+    
+    @staticmethod
+    def _item_results(items: List[Dict], calc: GSTBatchResult) -> List[Dict[str, any]]:
+        """Shape batched line results as per-item calculation dicts"""
+        results = []
+        for i, item in enumerate(items):
+            line = calc.line(i)
+            results.append({
+                "quantity": item.get("quantity", 0),
+                "unit_price": item.get("unit_price", 0),
+                "base_amount": line["base_amount"],
+                "discount_percent": item.get("discount_percent", 0),
+                "discount_amount": line["discount_amount"],
+                "taxable_amount": line["taxable_amount"],
+                "gst_rate": line["gst_rate"],
+                "cgst_rate": line["cgst_rate"],
+                "sgst_rate": line["sgst_rate"],
+                "igst_rate": line["igst_rate"],
+                "cgst_amount": line["cgst_amount"],
+                "sgst_amount": line["sgst_amount"],
+                "igst_amount": line["igst_amount"],
+                "tax_amount": line["tax_amount"],
+                "total_amount": line["total_amount"]
+            })
+        return results
     
     @staticmethod
     def calculate_invoice_gst(
         invoice_data: Dict,
         seller_gstin: str,
         buyer_gstin: Optional[str] = None,
-        is_export: bool = False
+        is_export: bool = False,
+        gst_type: Optional[GSTType] = None
     ) -> Dict[str, any]:
         """
         Calculate GST for entire invoice
@@ -305,36 +287,35 @@ class GSTService:
             seller_gstin: Seller's GSTIN
             buyer_gstin: Buyer's GSTIN (optional for B2C)
             is_export: Is this an export invoice
+            gst_type: Already-determined GST type (skips the GSTIN lookup)
             
         Returns:
             Complete invoice calculation with GST breakup
         """
         # Determine GST type
-        gst_type = GSTService.determine_gst_type(
-            seller_gstin=seller_gstin,
-            buyer_gstin=buyer_gstin,
-            is_export=is_export
-        )
+        if gst_type is None:
+            gst_type = GSTService.determine_gst_type(
+                seller_gstin=seller_gstin,
+                buyer_gstin=buyer_gstin,
+                is_export=is_export
+            )
         
-        # Process items
-        items_calculated = []
-        subtotal = Decimal("0")
-        total_discount = Decimal("0")
-        total_taxable = Decimal("0")
-        total_cgst = Decimal("0")
-        total_sgst = Decimal("0")
-        total_igst = Decimal("0")
+        # Process all items in one batched pass
+        items = invoice_data.get("items", [])
+        calc = GSTCalculator.calculate_items(
+            items,
+            interstate=gst_type == GSTType.IGST,
+            exempt=gst_type == GSTType.EXEMPT
+        )
+        items_calculated = GSTService._item_results(items, calc)
+        totals = calc.totals()
         
-        for item in invoice_data.get("items", []):
-            item_calc = GSTService.calculate_item_gst(item, gst_type)
-            items_calculated.append(item_calc)
-            
-            subtotal += item_calc["base_amount"]
-            total_discount += item_calc["discount_amount"]
-            total_taxable += item_calc["taxable_amount"]
-            total_cgst += item_calc["cgst_amount"]
-            total_sgst += item_calc["sgst_amount"]
-            total_igst += item_calc["igst_amount"]
+        subtotal = totals["subtotal"]
+        total_discount = totals["discount_amount"]
+        total_taxable = totals["taxable_amount"]
+        total_cgst = totals["cgst_amount"]
+        total_sgst = totals["sgst_amount"]
+        total_igst = totals["igst_amount"]
         
         # Apply overall discount if any
         overall_discount = Decimal(str(invoice_data.get("discount_amount", 0)))
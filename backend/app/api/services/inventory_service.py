@@ -16,6 +16,7 @@ from ..schemas.inventory import (
     CurrentStock, ExpiryAlert,
     StockValuation, InventoryDashboard
 )
+from .expiry_calendar_service import ExpiryCalendarService
 
 logger = logging.getLogger(__name__)
 
@@ -312,30 +313,16 @@ class InventoryService:
         """Get products expiring within specified days"""
         cutoff_date = date.today() + timedelta(days=days_ahead)
         
-        result = db.execute(text("""
-            SELECT 
-                b.batch_id, b.product_id, p.product_name, p.product_code,
-                b.batch_number, b.expiry_date, b.quantity_available,
-                b.quantity_available * b.cost_price as stock_value,
-                b.expiry_date - CURRENT_DATE as days_to_expiry
-            FROM inventory.batches b
-            JOIN inventory.products p ON b.product_id = p.product_id
-            WHERE b.org_id = :org_id
-                AND b.quantity_available > 0
-                AND b.expiry_date <= :cutoff_date
-            ORDER BY b.expiry_date, p.product_name
-        """), {
-            "org_id": org_id,
-            "cutoff_date": cutoff_date
-        })
+        batches = ExpiryCalendarService.get_expiring_batches(
+            db, str(org_id), until_date=cutoff_date
+        )
         
         alerts = []
-        for row in result:
-            alert = dict(row._mapping)
-            alert["alert_level"] = InventoryService.get_expiry_alert_level(
-                alert["days_to_expiry"]
+        for batch in batches:
+            batch["alert_level"] = InventoryService.get_expiry_alert_level(
+                batch["days_to_expiry"]
             )
-            alerts.append(ExpiryAlert(**alert))
+            alerts.append(ExpiryAlert(**batch))
         
         return alerts
     
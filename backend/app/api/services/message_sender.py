@@ -0,0 +1,340 @@
+"""
+Async outbound message sender
+Bulk sends (the outbound queue workers) go through one shared httpx.AsyncClient,
+so connections to each provider are pooled and kept alive instead of a new
+blocking `requests.post` (and TLS handshake) per message as in messaging.py.
+Every provider has a token bucket sized from MESSAGE_RATE_LIMITS, so a
+campaign never bursts past what the provider accepts. 429s, 5xx responses
+and network errors are retried with exponential backoff and jitter,
+honouring Retry-After; other 4xx responses fail the message at once.
+
+Providers are chosen per channel from the same SMS_PROVIDER,
+WHATSAPP_PROVIDER and EMAIL_PROVIDER variables as messaging.py. "stub"
+posts every channel to MESSAGING_STUB_URL, for local runs against
+benchmarks/stub_message_provider.py. Email through smtp or ses goes through
+messaging.EmailService on a worker thread; any other email provider fails
+the message permanently.
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import os
+import random
+import time
+
+from ...core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PROVIDERS = {
+    "sms": ("SMS_PROVIDER", "twilio"),
+    "whatsapp": ("WHATSAPP_PROVIDER", "twilio"),
+    "email": ("EMAIL_PROVIDER", "smtp"),
+}
+
+EMAIL_PROVIDERS = ("smtp", "ses")  # sent through messaging.EmailService
+
+
+@dataclass
+class OutboundMessage:
+    key: Any  # caller's id for the message, returned on its result
+    channel: str  # 'sms', 'whatsapp', 'email'
+    recipient: str
+    body: str
+    subject: Optional[str] = None
+    template_name: Optional[str] = None  # WATI template messages
+    parameters: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class DeliveryResult:
+    key: Any
+    status: str  # 'sent' or 'failed'
+    provider: str
+    message_id: Optional[str] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    retryable: bool = False  # failed, but a later attempt may succeed
+
+
+class RetryableSendError(Exception):
+    """Provider throttled the message or was unreachable; worth another attempt"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentSendError(Exception):
+    """Provider rejected the message; retrying will not help"""
+
+
+class TokenBucket:
+    """
+    `rate` sends per second with up to `burst` saved up. A caller that finds
+    the bucket empty reserves the next free slot and sleeps until it, so
+    waiters are served in order without polling.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waited_seconds = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            wait = -self.tokens / self.rate
+            self.waited_seconds += wait
+            await asyncio.sleep(wait)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, Optional[float]]]:
+    """{provider: (rate, burst)} from "twilio=10,msg91=50:100" """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        provider, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        if float(rate or 0) > 0:
+            limits[provider.strip()] = (float(rate), float(burst) if burst else None)
+    return limits
+
+
+def provider_for(channel: str) -> str:
+    env_name, default = CHANNEL_PROVIDERS[channel]
+    return os.getenv(env_name, default)
+
+
+def _international(phone: str) -> str:
+    return phone if phone.startswith("+") else f"+{phone}"
+
+
+def build_request(provider: str, message: OutboundMessage) -> Tuple[str, Dict[str, Any], str]:
+    """(url, httpx request kwargs, response field holding the message id)"""
+    channel = message.channel
+    if provider == "stub":
+        return f"{settings.MESSAGING_STUB_URL.rstrip('/')}/messages", {"json": {
+            "channel": channel,
+            "to": message.recipient,
+            "subject": message.subject,
+            "body": message.body
+        }}, "message_id"
+
+    if provider == "twilio" and channel in ("sms", "whatsapp"):
+        account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+        if channel == "whatsapp":
+            sender = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
+            recipient = f"whatsapp:{_international(message.recipient)}"
+        else:
+            sender = os.getenv("TWILIO_PHONE_NUMBER")
+            recipient = _international(message.recipient)
+        return f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json", {
+            "data": {"To": recipient, "From": sender, "Body": message.body},
+            "auth": (account_sid, os.getenv("TWILIO_AUTH_TOKEN"))
+        }, "sid"
+
+    if provider == "msg91" and channel == "sms":
+        return "https://api.msg91.com/api/v5/flow/", {
+            "json": {
+                "sender": os.getenv("MSG91_SENDER_ID", "AASOPH"),
+                "route": "4",  # Transactional route
+                "country": "91",
+                "sms": [{"message": message.body, "to": [message.recipient.replace("+91", "")]}]
+            },
+            "headers": {"authkey": os.getenv("MSG91_API_KEY")}
+        }, "request_id"
+
+    if provider == "wati" and channel == "whatsapp":
+        base_url = os.getenv("WATI_BASE_URL", "https://api.wati.io")
+        phone = message.recipient.lstrip("+")
+        if message.template_name:
+            url = f"{base_url}/api/v1/sendTemplateMessage"
+            payload = {"whatsappNumber": phone, "templateName": message.template_name,
+                       "parameters": message.parameters}
+        else:
+            url = f"{base_url}/api/v1/sendSessionMessage"
+            payload = {"whatsappNumber": phone, "messageText": message.body}
+        return url, {
+            "json": payload,
+            "headers": {"Authorization": f"Bearer {os.getenv('WATI_API_KEY')}"}
+        }, "messageId"
+
+    raise PermanentSendError(f"Provider {provider} cannot send {channel} messages")
+
+
+def _retry_after(response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+class MessageSender:
+    """
+    Sends OutboundMessages concurrently over pooled connections. The HTTP
+    client is created on first use (inside the running event loop) and
+    closed on shutdown.
+    """
+
+    def __init__(self, rate_limits: Optional[str] = None):
+        self.rate_limits = parse_rate_limits(
+            settings.MESSAGE_RATE_LIMITS if rate_limits is None else rate_limits
+        )
+        self._client = None
+        self._email_service = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    def _http(self):
+        if self._client is None:
+            import httpx  # first bulk send only, not at app start-up
+            self._client = httpx.AsyncClient(
+                timeout=settings.MESSAGE_HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.MESSAGE_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.MESSAGE_HTTP_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+
+    def _bucket(self, provider: str) -> Optional[TokenBucket]:
+        if provider not in self._buckets and provider in self.rate_limits:
+            self._buckets[provider] = TokenBucket(*self.rate_limits[provider])
+        return self._buckets.get(provider)
+
+    def _send_email(self, message: OutboundMessage) -> Dict[str, Any]:
+        if self._email_service is None:
+            from .messaging import EmailService
+            self._email_service = EmailService()
+        return self._email_service.send([message.recipient], message.subject or "", message.body)
+
+    async def _attempt(self, provider: str, message: OutboundMessage) -> Optional[str]:
+        """One delivery attempt; the provider's message id on success"""
+        if message.channel == "email" and provider != "stub":
+            if provider not in EMAIL_PROVIDERS:
+                raise PermanentSendError(f"Email provider {provider} not configured")
+            result = await asyncio.to_thread(self._send_email, message)
+            if result.get("status") != "success":
+                raise RetryableSendError(f"{provider}: {result.get('message')}")
+            return result.get("message_id")
+
+        import httpx
+        url, request, id_field = build_request(provider, message)
+        try:
+            response = await self._http().post(url, **request)
+        except httpx.TransportError as e:
+            raise RetryableSendError(f"{provider}: {type(e).__name__} {e}")
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableSendError(f"{provider} HTTP {response.status_code}", _retry_after(response))
+        if response.status_code >= 400:
+            raise PermanentSendError(f"{provider} HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            message_id = response.json().get(id_field)
+        except ValueError:
+            message_id = None
+        return str(message_id) if message_id is not None else None
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(settings.MESSAGE_RETRY_MAX_MS, settings.MESSAGE_RETRY_BASE_MS * 2 ** (attempt - 1)) / 1000
+        delay = random.uniform(delay / 2, delay)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, settings.MESSAGE_RETRY_MAX_MS / 1000))
+        return delay
+
+    async def send(self, message: OutboundMessage, max_attempts: Optional[int] = None) -> DeliveryResult:
+        """Send one message, retrying throttled and transient failures"""
+        max_attempts = max_attempts or settings.MESSAGE_MAX_ATTEMPTS
+        provider = provider_for(message.channel)
+        bucket = self._bucket(provider)
+        attempts = 0
+        self.in_flight += 1
+        try:
+            while True:
+                attempts += 1
+                if bucket is not None:
+                    await bucket.acquire()
+                try:
+                    message_id = await self._attempt(provider, message)
+                    self.sent += 1
+                    return DeliveryResult(message.key, "sent", provider, message_id, attempts)
+                except RetryableSendError as e:
+                    if attempts < max_attempts:
+                        self.retries += 1
+                        await asyncio.sleep(self._backoff(attempts, e.retry_after))
+                        continue
+                    error, retryable = str(e), True
+                except PermanentSendError as e:
+                    error, retryable = str(e), False
+                except Exception as e:
+                    error, retryable = str(e), True
+                self.failed += 1
+                return DeliveryResult(message.key, "failed", provider, None, attempts, error, retryable)
+        finally:
+            self.in_flight -= 1
+
+    async def send_all(
+        self,
+        messages: Iterable[OutboundMessage],
+        on_results: Optional[Callable[[List[DeliveryResult]], Awaitable[Any]]] = None,
+        batch_size: int = 200,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None
+    ) -> List[DeliveryResult]:
+        """
+        Send every message with up to `concurrency` in flight. on_results,
+        if given, is awaited with the results in batches of batch_size as
+        they come in, so the caller can record statuses in bulk.
+        max_attempts=1 leaves retrying to the caller (the outbound queue).
+        """
+        messages = list(messages)
+        pending = iter(messages)
+        results: List[DeliveryResult] = []
+        unreported: List[DeliveryResult] = []
+
+        async def worker():
+            for message in pending:
+                result = await self.send(message, max_attempts)
+                results.append(result)
+                if on_results is not None:
+                    unreported.append(result)
+                    if len(unreported) >= batch_size:
+                        batch = unreported[:]
+                        unreported.clear()
+                        await on_results(batch)
+
+        workers = min(concurrency or settings.MESSAGE_SEND_CONCURRENCY, len(messages))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if on_results is not None and unreported:
+            await on_results(unreported[:])
+        return results
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rate_limited_wait_seconds": {
+                provider: round(bucket.waited_seconds, 1) for provider, bucket in self._buckets.items()
+            }
+        }
+
+
+message_sender = MessageSender()
@@ -5,8 +5,6 @@ import os
 import logging
 from typing import Dict, Optional, List
 import requests
-from twilio.rest import Client as TwilioClient
-import boto3
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -19,6 +17,7 @@ class SMSService:
         self.provider = os.getenv("SMS_PROVIDER", "twilio")
         
         if self.provider == "twilio":
+            from twilio.rest import Client as TwilioClient  # only when the provider is in use
             self.client = TwilioClient(
                 os.getenv("TWILIO_ACCOUNT_SID"),
                 os.getenv("TWILIO_AUTH_TOKEN")
@@ -104,6 +103,7 @@ class WhatsAppService:
         self.provider = os.getenv("WHATSAPP_PROVIDER", "twilio")
         
         if self.provider == "twilio":
+            from twilio.rest import Client as TwilioClient  # only when the provider is in use
             self.client = TwilioClient(
                 os.getenv("TWILIO_ACCOUNT_SID"),
                 os.getenv("TWILIO_AUTH_TOKEN")
@@ -206,6 +206,7 @@ class EmailService:
             self.from_name = os.getenv("FROM_NAME", "AASO Pharmaceuticals")
             
         elif self.provider == "ses":
+            import boto3  # only when the provider is in use
             self.ses_client = boto3.client(
                 'ses',
                 region_name=os.getenv("AWS_REGION", "ap-south-1"),
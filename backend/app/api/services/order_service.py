@@ -13,6 +13,7 @@ import logging
 from ..schemas.order import (
     ReturnRequest
 )
+from .stock_summary_service import StockSummaryService
 
 logger = logging.getLogger(__name__)
 
@@ -110,12 +111,7 @@ class OrderService:
                     continue
             else:
                 # Check overall stock
-                stock = db.execute(text("""
-                    SELECT COALESCE(SUM(quantity_available), 0) as total_stock
-                    FROM inventory.batches
-                    WHERE product_id = :product_id AND org_id = :org_id
-                        AND (expiry_date IS NULL OR expiry_date > CURRENT_DATE)
-                """), {"product_id": item['product_id'], "org_id": org_id}).scalar()
+                stock = StockSummaryService.get_sellable_quantity(db, org_id, item['product_id'])
                 
                 if stock < item['quantity']:
                     validation_results.append({
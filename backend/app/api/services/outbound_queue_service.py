@@ -0,0 +1,399 @@
+"""
+Outbound message queue service layer
+SMS, WhatsApp and email messages are inserted into
+system_config.outbound_messages in the caller's transaction and sent later
+by the queue workers (app.jobs.outbound_queue_worker), so a slow or failing
+provider never holds up an API call and no message is lost with it.
+
+Scheduled sends are kept in system_config.scheduled_notifications (with
+notification_type set to the channel) until they are due; the workers then
+move them onto the queue.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import json
+import logging
+
+from ...core.config import settings
+from .message_sender import CHANNEL_PROVIDERS, DeliveryResult
+from .reminder_campaign_service import ReminderCampaignService
+
+logger = logging.getLogger(__name__)
+
+CLAIM_COLUMNS = """
+    message_id, channel, recipient, subject, body, template_name, parameters,
+    source_type, source_id, attempts,
+    EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - next_attempt_at) AS lag_seconds
+"""
+
+
+class OutboundQueueError(ValueError):
+    """Raised when a message cannot be queued"""
+
+
+class OutboundQueueService:
+    """Service class for the durable outbound message queue"""
+
+    @staticmethod
+    def enqueue(
+        db: Session,
+        org_id: str,
+        messages: List[Dict[str, Any]],
+        source_type: str = "api",
+        created_by: Optional[int] = None
+    ) -> List[int]:
+        """
+        Queue messages (dicts with channel, recipient, body and optionally
+        subject, template_name, parameters, source_id, dedupe_key) in one
+        insert. Returns the new message ids; a dedupe_key already queued
+        is skipped. Commit is up to the caller.
+        """
+        for message in messages:
+            if message.get("channel") not in CHANNEL_PROVIDERS:
+                raise OutboundQueueError(
+                    f"Unknown channel '{message.get('channel')}'. Available: {', '.join(CHANNEL_PROVIDERS)}"
+                )
+            if not message.get("recipient") or not message.get("body"):
+                raise OutboundQueueError("Every message needs a recipient and a body")
+        if not messages:
+            return []
+
+        result = db.execute(text("""
+            INSERT INTO system_config.outbound_messages (
+                org_id, channel, recipient, subject, body, template_name, parameters,
+                source_type, source_id, dedupe_key, max_attempts, created_by
+            )
+            SELECT :org_id, m.channel, m.recipient, m.subject, m.body, m.template_name,
+                   CAST(m.parameters AS JSONB), :source_type, m.source_id, m.dedupe_key,
+                   :max_attempts, :created_by
+            FROM unnest(
+                CAST(:channels AS TEXT[]), CAST(:recipients AS TEXT[]), CAST(:subjects AS TEXT[]),
+                CAST(:bodies AS TEXT[]), CAST(:template_names AS TEXT[]), CAST(:parameters AS TEXT[]),
+                CAST(:source_ids AS BIGINT[]), CAST(:dedupe_keys AS TEXT[])
+            ) AS m(channel, recipient, subject, body, template_name, parameters, source_id, dedupe_key)
+            ON CONFLICT (dedupe_key) DO NOTHING
+            RETURNING message_id
+        """), {
+            "org_id": org_id,
+            "source_type": source_type,
+            "max_attempts": settings.OUTBOUND_QUEUE_MAX_ATTEMPTS,
+            "created_by": created_by,
+            "channels": [m["channel"] for m in messages],
+            "recipients": [m["recipient"] for m in messages],
+            "subjects": [m.get("subject") for m in messages],
+            "bodies": [m["body"] for m in messages],
+            "template_names": [m.get("template_name") for m in messages],
+            "parameters": [json.dumps(m.get("parameters") or []) for m in messages],
+            "source_ids": [m.get("source_id") for m in messages],
+            "dedupe_keys": [m.get("dedupe_key") for m in messages]
+        })
+        return [row.message_id for row in result]
+
+    @staticmethod
+    def schedule(
+        db: Session,
+        org_id: str,
+        channel: str,
+        recipients: List[str],
+        body: str,
+        send_at: datetime,
+        created_by: int,
+        subject: Optional[str] = None
+    ) -> int:
+        """Store a send for later in scheduled_notifications; returns its id"""
+        if channel not in CHANNEL_PROVIDERS:
+            raise OutboundQueueError(f"Unknown channel '{channel}'. Available: {', '.join(CHANNEL_PROVIDERS)}")
+        return db.execute(text("""
+            INSERT INTO system_config.scheduled_notifications (
+                org_id, scheduled_for, notification_type, notification_category,
+                title, message, notification_data, created_by
+            ) VALUES (
+                :org_id, :send_at, :channel, 'outbound_message',
+                :subject, :body, CAST(:data AS JSONB), :created_by
+            )
+            RETURNING scheduled_notification_id
+        """), {
+            "org_id": org_id,
+            "send_at": send_at,
+            "channel": channel,
+            "subject": subject or "",
+            "body": body,
+            "data": json.dumps({"recipients": recipients}),
+            "created_by": created_by
+        }).scalar()
+
+    @staticmethod
+    def enqueue_reminder_deliveries(db: Session, campaign_id: int) -> int:
+        """
+        Queue a campaign's pending deliveries. A delivery whose message was
+        dead-lettered and has since been reset to pending is queued afresh.
+        """
+        return db.execute(text("""
+            WITH queued AS (
+                INSERT INTO system_config.outbound_messages (
+                    org_id, channel, recipient, subject, body,
+                    source_type, source_id, dedupe_key, max_attempts
+                )
+                SELECT org_id, channel, recipient, subject, message,
+                       'reminder_delivery', delivery_id, 'reminder_delivery:' || delivery_id, :max_attempts
+                FROM financial.reminder_deliveries
+                WHERE campaign_id = :campaign_id AND status = 'pending'
+                ON CONFLICT (dedupe_key) DO UPDATE
+                SET status = 'queued',
+                    attempts = 0,
+                    next_attempt_at = CURRENT_TIMESTAMP,
+                    last_error = NULL
+                WHERE system_config.outbound_messages.status = 'dead'
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM queued
+        """), {"campaign_id": campaign_id, "max_attempts": settings.OUTBOUND_QUEUE_MAX_ATTEMPTS}).scalar()
+
+    @staticmethod
+    def promote_scheduled(db: Session, limit: int) -> int:
+        """
+        Move due scheduled sends onto the queue, one message per recipient:
+        those listed in notification_data.recipients plus the target users'
+        mobile numbers or emails
+        """
+        return db.execute(text("""
+            WITH due AS (
+                SELECT scheduled_notification_id, org_id, notification_type, title, message,
+                       notification_data, target_users
+                FROM system_config.scheduled_notifications
+                WHERE status = 'pending'
+                AND scheduled_for <= CURRENT_TIMESTAMP
+                AND notification_type IN ('sms', 'whatsapp', 'email')
+                ORDER BY scheduled_for
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            ),
+            queued AS (
+                INSERT INTO system_config.outbound_messages (
+                    org_id, channel, recipient, subject, body,
+                    source_type, source_id, dedupe_key, max_attempts
+                )
+                SELECT d.org_id, d.notification_type, r.recipient, NULLIF(d.title, ''), d.message,
+                       'scheduled_notification', d.scheduled_notification_id,
+                       'scheduled_notification:' || d.scheduled_notification_id || ':' || r.recipient,
+                       :max_attempts
+                FROM due d
+                CROSS JOIN LATERAL (
+                    SELECT jsonb_array_elements_text(
+                        COALESCE(d.notification_data->'recipients', '[]'::jsonb)
+                    ) AS recipient
+                    UNION
+                    SELECT CASE WHEN d.notification_type = 'email' THEN u.email ELSE u.mobile_number END
+                    FROM master.org_users u
+                    WHERE u.user_id = ANY(COALESCE(d.target_users, '{}'))
+                ) r
+                WHERE COALESCE(r.recipient, '') <> ''
+                ON CONFLICT (dedupe_key) DO NOTHING
+                RETURNING 1
+            ),
+            promoted AS (
+                UPDATE system_config.scheduled_notifications s
+                SET status = 'sent', sent_at = CURRENT_TIMESTAMP -- handed to the queue
+                FROM due
+                WHERE s.scheduled_notification_id = due.scheduled_notification_id
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM queued
+        """), {"limit": limit, "max_attempts": settings.OUTBOUND_QUEUE_MAX_ATTEMPTS}).scalar()
+
+    @staticmethod
+    def release_expired_leases(db: Session) -> int:
+        """Put messages of workers that stopped mid-send back on the queue"""
+        return db.execute(text("""
+            UPDATE system_config.outbound_messages
+            SET status = 'queued', locked_until = NULL, locked_by = NULL
+            WHERE status = 'sending' AND locked_until < CURRENT_TIMESTAMP
+        """)).rowcount
+
+    @staticmethod
+    def claim(db: Session, worker_id: str, limit: int, lease_seconds: int) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` due messages to this worker. SKIP LOCKED lets
+        concurrent workers claim disjoint batches without waiting.
+        """
+        result = db.execute(text(f"""
+            WITH claimed AS (
+                SELECT message_id
+                FROM system_config.outbound_messages
+                WHERE status = 'queued' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE system_config.outbound_messages m
+            SET status = 'sending',
+                attempts = m.attempts + 1,
+                locked_by = :worker_id,
+                locked_until = CURRENT_TIMESTAMP + make_interval(secs => :lease_seconds)
+            FROM claimed
+            WHERE m.message_id = claimed.message_id
+            RETURNING {CLAIM_COLUMNS}
+        """), {"worker_id": worker_id, "limit": limit, "lease_seconds": lease_seconds})
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def complete(db: Session, worker_id: str, results: List[DeliveryResult]) -> Dict[str, int]:
+        """
+        Record a claimed batch's results in one statement: sent, back on the
+        queue with exponential backoff, or dead once max_attempts is used up
+        (or the provider rejected the message outright). Reminder deliveries
+        behind the finished messages are updated in the same transaction.
+        """
+        if not results:
+            return {"sent": 0, "retrying": 0, "dead": 0}
+
+        finished = db.execute(text("""
+            WITH r AS (
+                SELECT * FROM unnest(
+                    CAST(:message_ids AS BIGINT[]), CAST(:sent AS BOOLEAN[]), CAST(:retryable AS BOOLEAN[]),
+                    CAST(:providers AS TEXT[]), CAST(:provider_message_ids AS TEXT[]), CAST(:errors AS TEXT[])
+                ) AS r(message_id, sent, retryable, provider, provider_message_id, error)
+            )
+            UPDATE system_config.outbound_messages m
+            SET status = CASE
+                    WHEN r.sent THEN 'sent'
+                    WHEN r.retryable AND m.attempts < m.max_attempts THEN 'queued'
+                    ELSE 'dead'
+                END,
+                next_attempt_at = CASE
+                    WHEN NOT r.sent AND r.retryable AND m.attempts < m.max_attempts
+                    THEN CURRENT_TIMESTAMP + make_interval(secs =>
+                        LEAST(:retry_max, :retry_base * power(2, m.attempts - 1)) * (0.5 + random() / 2))
+                    ELSE m.next_attempt_at
+                END,
+                locked_until = NULL,
+                locked_by = NULL,
+                provider = r.provider,
+                provider_message_id = r.provider_message_id,
+                last_error = r.error,
+                sent_at = CASE WHEN r.sent THEN CURRENT_TIMESTAMP END
+            FROM r
+            WHERE m.message_id = r.message_id
+            AND m.status = 'sending'
+            AND m.locked_by = :worker_id
+            RETURNING m.message_id, m.status, m.source_type, m.source_id, m.attempts,
+                      m.provider, m.provider_message_id, m.last_error
+        """), {
+            "worker_id": worker_id,
+            "retry_base": settings.OUTBOUND_QUEUE_RETRY_BASE_SECONDS,
+            "retry_max": settings.OUTBOUND_QUEUE_RETRY_MAX_SECONDS,
+            "message_ids": [r.key for r in results],
+            "sent": [r.status == "sent" for r in results],
+            "retryable": [r.retryable for r in results],
+            "providers": [r.provider for r in results],
+            "provider_message_ids": [r.message_id for r in results],
+            "errors": [r.error for r in results]
+        }).fetchall()
+
+        reminders = [
+            DeliveryResult(
+                key=row.source_id,
+                status="sent" if row.status == "sent" else "failed",
+                provider=row.provider,
+                message_id=row.provider_message_id,
+                attempts=row.attempts,
+                error=row.last_error
+            )
+            for row in finished
+            if row.source_type == "reminder_delivery" and row.status in ("sent", "dead")
+        ]
+        ReminderCampaignService.record_results(db, reminders)
+
+        counts = {"sent": 0, "retrying": 0, "dead": 0}
+        for row in finished:
+            counts["retrying" if row.status == "queued" else row.status] += 1
+        return counts
+
+    @staticmethod
+    def requeue(db: Session, org_id: str, message_ids: List[int]) -> int:
+        """
+        Give dead-lettered messages a fresh set of attempts. Reminder
+        deliveries behind them go back to pending and come off their
+        campaign's failed count, as ReminderCampaignService.reset_failed
+        does, so the new result is recorded when it arrives.
+        """
+        return db.execute(text("""
+            WITH requeued AS (
+                UPDATE system_config.outbound_messages
+                SET status = 'queued', attempts = 0, next_attempt_at = CURRENT_TIMESTAMP, last_error = NULL
+                WHERE org_id = :org_id AND message_id = ANY(:message_ids) AND status = 'dead'
+                RETURNING source_type, source_id
+            ),
+            reset AS (
+                UPDATE financial.reminder_deliveries d
+                SET status = 'pending', last_error = NULL
+                FROM requeued q
+                WHERE q.source_type = 'reminder_delivery'
+                AND d.delivery_id = q.source_id
+                AND d.status = 'failed'
+                RETURNING d.campaign_id
+            ),
+            campaigns AS (
+                UPDATE financial.reminder_campaigns c
+                SET failed_count = c.failed_count - r.deliveries,
+                    status = 'sending', completed_at = NULL
+                FROM (SELECT campaign_id, COUNT(*) AS deliveries FROM reset GROUP BY campaign_id) r
+                WHERE c.campaign_id = r.campaign_id
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM requeued
+        """), {"org_id": org_id, "message_ids": message_ids}).scalar()
+
+    @staticmethod
+    def dead_letters(db: Session, org_id: str, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        result = db.execute(text("""
+            SELECT message_id, channel, recipient, subject, source_type, source_id,
+                   attempts, provider, last_error, created_at
+            FROM system_config.outbound_messages
+            WHERE org_id = :org_id AND status = 'dead'
+            ORDER BY created_at DESC
+            LIMIT :limit OFFSET :skip
+        """), {"org_id": org_id, "skip": skip, "limit": limit})
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def queue_stats(db: Session, org_id: str) -> Dict[str, Any]:
+        """
+        One organization's depth per status, how far behind its messages are
+        (age of the oldest due one) and its sends over the last minute and hour
+        """
+        rows = db.execute(text("""
+            SELECT status, COUNT(*) AS messages,
+                   EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MIN(next_attempt_at)) FILTER (
+                       WHERE status = 'queued' AND next_attempt_at <= CURRENT_TIMESTAMP
+                   ) AS oldest_due_seconds,
+                   COUNT(*) FILTER (
+                       WHERE status = 'queued' AND next_attempt_at <= CURRENT_TIMESTAMP
+                   ) AS due
+            FROM system_config.outbound_messages
+            WHERE org_id = :org_id AND status <> 'sent'
+            GROUP BY status
+        """), {"org_id": org_id}).fetchall()
+        sent = db.execute(text("""
+            SELECT COUNT(*) FILTER (WHERE sent_at > CURRENT_TIMESTAMP - INTERVAL '1 minute') AS last_minute,
+                   COUNT(*) AS last_hour
+            FROM system_config.outbound_messages
+            WHERE org_id = :org_id AND status = 'sent' AND sent_at > CURRENT_TIMESTAMP - INTERVAL '1 hour'
+        """), {"org_id": org_id}).first()
+        scheduled = db.execute(text("""
+            SELECT COUNT(*) FROM system_config.scheduled_notifications
+            WHERE org_id = :org_id AND status = 'pending' AND notification_type IN ('sms', 'whatsapp', 'email')
+        """), {"org_id": org_id}).scalar()
+
+        depth = {row.status: row.messages for row in rows}
+        queued = next((row for row in rows if row.status == "queued"), None)
+        return {
+            "depth": depth,
+            "due": queued.due if queued else 0,
+            "lag_seconds": round(float(queued.oldest_due_seconds), 1) if queued and queued.oldest_due_seconds else 0,
+            "scheduled": scheduled,
+            "sent_last_minute": sent.last_minute,
+            "sent_last_hour": sent.last_hour
+        }
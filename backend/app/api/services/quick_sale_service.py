@@ -0,0 +1,379 @@
+"""
+Quick sale service
+Counter sales in a fixed number of round-trips, whatever the basket size:
+customer, products and candidate batches are read in three batched
+queries (batches locked FOR UPDATE), prices, GST and FEFO allocation are
+computed in memory, and the order, its items, the batch decrements, the
+invoice and the payment are written by one data-modifying statement.
+
+With ORDER_EXECUTION_MODE=procedure the whole pipeline (validation, FEFO
+allocation, number generation and inserts) runs inside Postgres as a
+single api.place_order() call; this module only shapes its JSONB payload
+and result.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import json
+import logging
+
+from ...core.config import settings
+from .challan_invoicing_service import allocate_invoice_numbers
+from .gst_calculator import GSTCalculator, from_paise
+from .gst_party_profile_service import GSTPartyProfileService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GST_PERCENT = Decimal("12")
+
+EXECUTION_MODES = ("python", "procedure")
+
+
+class QuickSaleError(ValueError):
+    """A quick sale the counter must correct (unknown customer/product, short stock)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class QuickSaleLine:
+    product_id: int
+    quantity: int
+    unit_price: Optional[Decimal] = None
+    discount_percent: Optional[Decimal] = None
+
+
+class QuickSaleService:
+    """Service class for single round-trip counter sales"""
+
+    @staticmethod
+    def _load(db: Session, org_id: str, customer_id: int, product_ids: List[int]):
+        customer = db.execute(text("""
+            SELECT customer_id, customer_name, gst_number, state, state_code,
+                   primary_phone, address, city, pincode
+            FROM parties.customers
+            WHERE customer_id = :customer_id AND org_id = :org_id
+        """), {"customer_id": customer_id, "org_id": org_id}).first()
+        if not customer:
+            raise QuickSaleError("Customer not found", status_code=404)
+
+        products = {
+            row.product_id: row for row in db.execute(text("""
+                SELECT product_id, product_name, mrp, sale_price, gst_percent, hsn_code
+                FROM inventory.products
+                WHERE product_id = ANY(:product_ids)
+            """), {"product_ids": product_ids})
+        }
+        missing = [pid for pid in product_ids if pid not in products]
+        if missing:
+            raise QuickSaleError(f"Product {missing[0]} not found", status_code=404)
+
+        # Sellable batches in FEFO order, locked until commit. Stock reserved
+        # for approved orders is not free to sell.
+        batches: Dict[int, List[List[int]]] = {pid: [] for pid in product_ids}
+        for row in db.execute(text("""
+            SELECT batch_id, product_id,
+                   quantity_available - COALESCE(quantity_reserved, 0) AS free_quantity
+            FROM inventory.batches
+            WHERE product_id = ANY(:product_ids)
+                AND org_id = :org_id
+                AND quantity_available > COALESCE(quantity_reserved, 0)
+                AND (expiry_date IS NULL OR expiry_date > CURRENT_DATE)
+            ORDER BY product_id, expiry_date ASC, batch_id ASC
+            FOR UPDATE
+        """), {"product_ids": product_ids, "org_id": org_id}):
+            batches[row.product_id].append([row.batch_id, row.free_quantity])
+
+        return customer, products, batches
+
+    @staticmethod
+    def _allocate(lines: Sequence[QuickSaleLine], products, batches) -> Dict[int, int]:
+        """FEFO allocation per line in basket order; returns quantity per batch"""
+        allocations: Dict[int, int] = {}
+        for line in lines:
+            candidates = batches[line.product_id]
+            available = sum(qty for _, qty in candidates)
+            if available < line.quantity:
+                raise QuickSaleError(
+                    f"Insufficient stock for {products[line.product_id].product_name}. Available: {available}"
+                )
+            remaining = line.quantity
+            for candidate in candidates:
+                if remaining <= 0:
+                    break
+                take = min(remaining, candidate[1])
+                if take <= 0:
+                    continue
+                candidate[1] -= take
+                allocations[candidate[0]] = allocations.get(candidate[0], 0) + take
+                remaining -= take
+        return allocations
+
+    @staticmethod
+    def create_sale(
+        db: Session,
+        org_id: str,
+        customer_id: int,
+        lines: Sequence[QuickSaleLine],
+        payment_mode: str = "cash",
+        payment_amount: Optional[Decimal] = None,
+        discount_amount: Optional[Decimal] = None,
+        notes: Optional[str] = None,
+        mode: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create order, items, stock allocation, invoice and payment.
+        The caller commits; nothing is written when validation fails.
+        `mode` overrides settings.ORDER_EXECUTION_MODE.
+        """
+        if not lines:
+            raise QuickSaleError("At least one item is required")
+        org_id = str(org_id)
+        mode = mode or settings.ORDER_EXECUTION_MODE
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown order execution mode: {mode}")
+        if mode == "procedure":
+            return QuickSaleService._create_sale_in_database(
+                db, org_id, customer_id, lines, payment_mode, payment_amount, discount_amount, notes
+            )
+        product_ids = sorted({line.product_id for line in lines})
+
+        customer, products, batches = QuickSaleService._load(db, org_id, customer_id, product_ids)
+        allocations = QuickSaleService._allocate(lines, products, batches)
+        is_interstate = GSTPartyProfileService.is_interstate(db, org_id, customer_id)
+
+        unit_prices = [
+            line.unit_price or products[line.product_id].sale_price or products[line.product_id].mrp
+            for line in lines
+        ]
+        gst_percents = [products[line.product_id].gst_percent or DEFAULT_GST_PERCENT for line in lines]
+        calc = GSTCalculator.calculate(
+            quantities=[line.quantity for line in lines],
+            unit_prices=unit_prices,
+            gst_percents=gst_percents,
+            discount_percents=[line.discount_percent or 0 for line in lines],
+            interstate=is_interstate
+        )
+        totals = calc.totals()
+
+        invoice_discount = Decimal(str(discount_amount or 0))
+        final_amount = totals["total_amount"] - invoice_discount
+        paid_amount = Decimal(str(payment_amount)) if payment_amount is not None else final_amount
+        fully_paid = paid_amount >= final_amount
+        payment_mode = (payment_mode or "cash").lower()
+
+        # Order numbers are the day's MAX + 1: one allocation per org at a time
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext('order_number:' || :org_id))"),
+            {"org_id": org_id}
+        )
+        invoice_number = allocate_invoice_numbers(db, org_id, date.today(), 1)[0]
+        result = db.execute(text("""
+            WITH order_number AS (
+                SELECT 'ORD' || to_char(CURRENT_DATE, 'YYYYMMDD') || lpad((COALESCE(MAX(
+                    CASE WHEN right(order_number, 6) ~ '^[0-9]{6}$' THEN right(order_number, 6)::INTEGER END
+                ), 0) + 1)::TEXT, 6, '0') AS value
+                FROM sales.orders
+                WHERE org_id = :org_id
+                AND order_number LIKE 'ORD' || to_char(CURRENT_DATE, 'YYYYMMDD') || '%'
+            ),
+            new_order AS (
+                INSERT INTO sales.orders (
+                    org_id, customer_id, customer_name, customer_phone, order_number, order_type, order_status,
+                    order_date, delivery_date,
+                    subtotal_amount, discount_amount, tax_amount, final_amount,
+                    paid_amount, payment_mode, payment_status,
+                    notes, created_at, updated_at
+                )
+                SELECT
+                    :org_id, :customer_id, :customer_name, :customer_phone, value, 'sales', 'confirmed',
+                    CURRENT_DATE, CURRENT_DATE,
+                    :subtotal, :discount_amount, :tax_amount, :final_amount,
+                    :paid_amount, :payment_mode, :payment_status,
+                    :notes, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                FROM order_number
+                RETURNING order_id
+            ),
+            new_items AS (
+                INSERT INTO sales.order_items (
+                    order_id, product_id, quantity, selling_price,
+                    discount_percent, discount_amount,
+                    tax_percent, tax_amount,
+                    total_price
+                )
+                SELECT o.order_id, i.product_id, i.quantity, i.selling_price,
+                       i.discount_percent, i.discount_amount,
+                       i.tax_percent, i.tax_amount,
+                       i.total_price
+                FROM new_order o
+                CROSS JOIN unnest(
+                    CAST(:product_ids AS INTEGER[]),
+                    CAST(:quantities AS INTEGER[]),
+                    CAST(:selling_prices AS NUMERIC[]),
+                    CAST(:discount_percents AS NUMERIC[]),
+                    CAST(:discount_amounts AS NUMERIC[]),
+                    CAST(:tax_percents AS NUMERIC[]),
+                    CAST(:tax_amounts AS NUMERIC[]),
+                    CAST(:total_prices AS NUMERIC[])
+                ) AS i(product_id, quantity, selling_price, discount_percent,
+                       discount_amount, tax_percent, tax_amount, total_price)
+                RETURNING 1
+            ),
+            stock_out AS (
+                UPDATE inventory.batches b
+                SET quantity_available = b.quantity_available - a.quantity,
+                    quantity_sold = b.quantity_sold + a.quantity,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM unnest(
+                    CAST(:batch_ids AS INTEGER[]),
+                    CAST(:batch_quantities AS INTEGER[])
+                ) AS a(batch_id, quantity)
+                WHERE b.batch_id = a.batch_id
+                RETURNING 1
+            ),
+            new_invoice AS (
+                INSERT INTO sales.invoices (
+                    org_id, invoice_number, order_id, customer_id,
+                    customer_name, customer_gstin,
+                    billing_name, billing_address, billing_city, billing_state, billing_pincode,
+                    invoice_date, due_date,
+                    gst_type, place_of_supply,
+                    subtotal_amount, discount_amount, taxable_amount,
+                    cgst_amount, sgst_amount, igst_amount, total_tax_amount,
+                    total_amount, paid_amount, invoice_status,
+                    created_at, updated_at
+                )
+                SELECT
+                    :org_id, :invoice_number, order_id, :customer_id,
+                    :customer_name, :customer_gstin,
+                    :customer_name, :billing_address, :billing_city, :billing_state, :billing_pincode,
+                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP,
+                    :gst_type, :place_of_supply,
+                    :subtotal, :discount_amount, :taxable_amount,
+                    :cgst_amount, :sgst_amount, :igst_amount, :tax_amount,
+                    :final_amount, :paid_amount, :invoice_status,
+                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                FROM new_order
+                RETURNING invoice_id, invoice_number, order_id
+            ),
+            payment AS (
+                INSERT INTO invoice_payments (
+                    payment_reference, invoice_id,
+                    payment_date, payment_mode, amount, payment_amount,
+                    notes
+                )
+                SELECT 'PAY-' || invoice_number, invoice_id,
+                       CURRENT_DATE, :payment_mode, :paid_amount, :paid_amount,
+                       'Quick sale payment'
+                FROM new_invoice
+                WHERE :paid_amount > 0
+                RETURNING 1
+            )
+            SELECT invoice_id, invoice_number, order_id,
+                   (SELECT COUNT(*) FROM new_items) AS item_count,
+                   (SELECT COUNT(*) FROM stock_out) AS batches_updated
+            FROM new_invoice
+        """), {
+            "org_id": org_id,
+            "invoice_number": invoice_number,
+            "customer_id": customer_id,
+            "customer_name": customer.customer_name,
+            "customer_phone": customer.primary_phone,
+            "customer_gstin": customer.gst_number or "",
+            "billing_address": customer.address or "N/A",
+            "billing_city": customer.city or "N/A",
+            "billing_state": customer.state or "Karnataka",
+            "billing_pincode": customer.pincode or "000000",
+            "place_of_supply": customer.state_code or "29",
+            "gst_type": "igst" if is_interstate else "cgst_sgst",
+            "subtotal": totals["subtotal"],
+            "discount_amount": totals["discount_amount"] + invoice_discount,
+            "taxable_amount": totals["taxable_amount"],
+            "cgst_amount": totals["cgst_amount"],
+            "sgst_amount": totals["sgst_amount"],
+            "igst_amount": totals["igst_amount"],
+            "tax_amount": totals["tax_amount"],
+            "final_amount": final_amount,
+            "paid_amount": paid_amount,
+            "payment_mode": payment_mode,
+            "payment_status": "paid" if fully_paid else ("partial" if paid_amount > 0 else "pending"),
+            "invoice_status": "paid" if fully_paid else "generated",
+            "notes": notes or "",
+            "product_ids": [line.product_id for line in lines],
+            "quantities": [line.quantity for line in lines],
+            "selling_prices": unit_prices,
+            "discount_percents": [line.discount_percent or 0 for line in lines],
+            "discount_amounts": [from_paise(v) for v in calc.discount_amount],
+            "tax_percents": gst_percents,
+            "tax_amounts": [from_paise(v) for v in calc.tax_amount],
+            "total_prices": [from_paise(v) for v in calc.total_amount],
+            "batch_ids": list(allocations),
+            "batch_quantities": list(allocations.values())
+        }).first()
+
+        return {
+            "order_id": result.order_id,
+            "invoice_id": result.invoice_id,
+            "invoice_number": result.invoice_number,
+            "total_amount": final_amount,
+            "paid_amount": paid_amount,
+            "item_count": result.item_count,
+            "batches_updated": result.batches_updated
+        }
+
+    @staticmethod
+    def _create_sale_in_database(
+        db: Session,
+        org_id: str,
+        customer_id: int,
+        lines: Sequence[QuickSaleLine],
+        payment_mode: str,
+        payment_amount: Optional[Decimal],
+        discount_amount: Optional[Decimal],
+        notes: Optional[str]
+    ) -> Dict[str, Any]:
+        """Run the sale as one api.place_order() call"""
+        payload = {
+            "org_id": org_id,
+            "customer_id": customer_id,
+            "items": [
+                {
+                    "product_id": line.product_id,
+                    "quantity": line.quantity,
+                    "unit_price": line.unit_price,
+                    "discount_percent": line.discount_percent
+                }
+                for line in lines
+            ],
+            "payment_mode": payment_mode,
+            "payment_amount": payment_amount,
+            "discount_amount": discount_amount,
+            "notes": notes
+        }
+        result = db.execute(
+            text("SELECT api.place_order(CAST(:payload AS JSONB))"),
+            {"payload": json.dumps(payload, default=str)}
+        ).scalar()
+
+        if not result.get("success"):
+            # P0001: validation raised by the function, P0002: customer/product not found
+            if result.get("sqlstate") == "P0002":
+                raise QuickSaleError(result["error"], status_code=404)
+            if result.get("sqlstate") == "P0001":
+                raise QuickSaleError(result["error"])
+            raise RuntimeError(result.get("error") or "api.place_order failed")
+
+        return {
+            "order_id": result["order_id"],
+            "invoice_id": result["invoice_id"],
+            "invoice_number": result["invoice_number"],
+            "total_amount": Decimal(str(result["total_amount"])),
+            "paid_amount": Decimal(str(result["paid_amount"])),
+            "item_count": result["item_count"],
+            "batches_updated": result["batches_updated"]
+        }
@@ -0,0 +1,370 @@
+"""
+Reminder campaign service layer
+Bulk payment reminders. Parties are picked from open receivables by aging
+filters in one query and each gets its message rendered from a template.
+The campaign is stored with one delivery row per party; the rows are put
+on the outbound message queue and their statuses are recorded in bulk as
+the queue workers finish them.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import json
+import logging
+import re
+
+from .message_sender import CHANNEL_PROVIDERS, DeliveryResult
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Where each channel's recipient comes from on parties.customers
+CHANNEL_RECIPIENTS = {
+    "sms": "c.primary_phone",
+    "whatsapp": "COALESCE(NULLIF(c.whatsapp_number, ''), c.primary_phone)",
+    "email": "c.primary_email",
+}
+
+# Same buckets as the collection center outstanding list (days overdue)
+AGING_BUCKETS = {
+    "current": (None, 30),
+    "30-60": (31, 60),
+    "61-90": (61, 90),
+    "90+": (91, None),
+}
+
+DAYS_OVERDUE = "GREATEST(CURRENT_DATE - COALESCE(o.due_date, o.document_date), 0)"
+
+
+class ReminderCampaignError(ValueError):
+    """Raised when a campaign request cannot be built"""
+
+
+class ReminderCampaignService:
+    """Service class for bulk reminder campaigns"""
+
+    @staticmethod
+    def render(template: str, variables: Dict[str, Any]) -> str:
+        """Fill {{name}} placeholders; unknown names are left as they are"""
+        return PLACEHOLDER.sub(
+            lambda m: str(variables[m.group(1)]) if m.group(1) in variables else m.group(0),
+            template
+        )
+
+    @staticmethod
+    def normalize_phone(phone: Optional[str]) -> Optional[str]:
+        """+<country><number>, assuming India when there is no country code"""
+        if not phone:
+            return None
+        phone = phone.replace(" ", "").replace("-", "")
+        if not phone.startswith("+"):
+            if not phone.startswith("91"):
+                phone = "91" + phone
+            phone = "+" + phone
+        return phone
+
+    @staticmethod
+    def resolve_template(db: Session, org_id: str, template_code: str) -> Tuple[Optional[str], str]:
+        """(subject, text body) of an org's active template"""
+        row = db.execute(text("""
+            SELECT subject_template, COALESCE(body_template_text, body_template_html) AS body
+            FROM system_config.email_templates
+            WHERE org_id = :org_id AND template_code = :template_code AND is_active = TRUE
+            ORDER BY language = 'en' DESC
+            LIMIT 1
+        """), {"org_id": org_id, "template_code": template_code}).first()
+        if not row:
+            raise ReminderCampaignError(f"Template '{template_code}' not found")
+        return row.subject_template, row.body
+
+    @staticmethod
+    def select_parties(
+        db: Session,
+        org_id: str,
+        channel: str,
+        filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Customers with open receivables matching the aging filters, one row
+        each with their totals. Filters: min_days_overdue, max_days_overdue,
+        aging_buckets (of AGING_BUCKETS), min_amount, customer_ids,
+        max_parties. Day and bucket filters apply to the oldest open bill.
+        """
+        params: Dict[str, Any] = {"org_id": org_id, "min_amount": filters.get("min_amount") or 0}
+        where = ""
+        having = ["SUM(o.outstanding_amount) >= :min_amount"]
+
+        if filters.get("customer_ids"):
+            where += " AND o.customer_id = ANY(:customer_ids)"
+            params["customer_ids"] = [int(cid) for cid in filters["customer_ids"]]
+        if filters.get("min_days_overdue") is not None:
+            having.append(f"MAX({DAYS_OVERDUE}) >= :min_days_overdue")
+            params["min_days_overdue"] = int(filters["min_days_overdue"])
+        if filters.get("max_days_overdue") is not None:
+            having.append(f"MAX({DAYS_OVERDUE}) <= :max_days_overdue")
+            params["max_days_overdue"] = int(filters["max_days_overdue"])
+        if filters.get("aging_buckets"):
+            ranges = []
+            for i, bucket in enumerate(filters["aging_buckets"]):
+                if bucket not in AGING_BUCKETS:
+                    raise ReminderCampaignError(
+                        f"Unknown aging bucket '{bucket}'. Available: {', '.join(AGING_BUCKETS)}"
+                    )
+                low, high = AGING_BUCKETS[bucket]
+                bounds = []
+                if low is not None:
+                    bounds.append(f"MAX({DAYS_OVERDUE}) >= :bucket_low_{i}")
+                    params[f"bucket_low_{i}"] = low
+                if high is not None:
+                    bounds.append(f"MAX({DAYS_OVERDUE}) <= :bucket_high_{i}")
+                    params[f"bucket_high_{i}"] = high
+                ranges.append("(" + " AND ".join(bounds) + ")")
+            having.append("(" + " OR ".join(ranges) + ")")
+
+        limit = ""
+        if filters.get("max_parties"):
+            limit = "LIMIT :max_parties"
+            params["max_parties"] = int(filters["max_parties"])
+
+        result = db.execute(text(f"""
+            SELECT
+                c.customer_id AS party_id,
+                c.customer_name AS party_name,
+                {CHANNEL_RECIPIENTS[channel]} AS recipient,
+                SUM(o.outstanding_amount) AS total_outstanding,
+                COUNT(*) AS bill_count,
+                MAX({DAYS_OVERDUE}) AS max_days_overdue,
+                MIN(COALESCE(o.due_date, o.document_date)) AS oldest_due_date,
+                STRING_AGG(o.document_number, ', ' ORDER BY o.document_date) AS invoice_numbers
+            FROM financial.customer_outstanding o
+            JOIN parties.customers c ON c.customer_id = o.customer_id
+            WHERE o.org_id = :org_id
+            AND o.status IN ('open', 'partial')
+            AND o.outstanding_amount > 0
+            {where}
+            GROUP BY c.customer_id
+            HAVING {" AND ".join(having)}
+            ORDER BY max_days_overdue DESC, total_outstanding DESC
+            {limit}
+        """), params)
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def create_campaign(
+        db: Session,
+        org_id: str,
+        channel: str,
+        filters: Dict[str, Any],
+        message_template: Optional[str] = None,
+        subject_template: Optional[str] = None,
+        template_code: Optional[str] = None,
+        company_name: str = "AASO Pharmaceuticals",
+        created_by: Optional[int] = None,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Select, render and store a campaign. Returns the campaign id and
+        counts; the caller queues its deliveries. With dry_run nothing is
+        stored and the first rendered messages are returned as a preview.
+        """
+        if channel not in CHANNEL_PROVIDERS:
+            raise ReminderCampaignError(f"Unknown channel '{channel}'. Available: {', '.join(CHANNEL_PROVIDERS)}")
+        if template_code:
+            template_subject, message_template = ReminderCampaignService.resolve_template(db, org_id, template_code)
+            subject_template = subject_template or template_subject
+        if not message_template:
+            raise ReminderCampaignError("Either message or template_code is required")
+        if channel == "email" and not subject_template:
+            subject_template = "Payment reminder from {{company_name}}"
+
+        drafts = []
+        skipped = 0
+        for party in ReminderCampaignService.select_parties(db, org_id, channel, filters):
+            recipient = party["recipient"]
+            if channel != "email":
+                recipient = ReminderCampaignService.normalize_phone(recipient)
+            if not recipient:
+                skipped += 1
+                continue
+
+            variables = {
+                "party_name": party["party_name"],
+                "amount": f"₹{party['total_outstanding']:.2f}",
+                "outstanding_amount": f"{party['total_outstanding']:.2f}",
+                "days_overdue": party["max_days_overdue"],
+                "bill_count": party["bill_count"],
+                "invoice_numbers": party["invoice_numbers"] or "",
+                "oldest_due_date": party["oldest_due_date"],
+                "company_name": company_name
+            }
+            drafts.append({
+                "customer_id": party["party_id"],
+                "party_name": party["party_name"],
+                "recipient": recipient,
+                "subject": ReminderCampaignService.render(subject_template, variables) if subject_template else None,
+                "message": ReminderCampaignService.render(message_template, variables),
+                "amount": party["total_outstanding"],
+                "days": party["max_days_overdue"]
+            })
+
+        if dry_run:
+            return {"total_count": len(drafts), "skipped_no_contact": skipped, "preview": drafts[:20]}
+
+        campaign_id = db.execute(text("""
+            INSERT INTO financial.reminder_campaigns (
+                org_id, channel, template_code, message_template, subject_template,
+                filters, status, total_count, created_by, completed_at
+            ) VALUES (
+                :org_id, :channel, :template_code, :message_template, :subject_template,
+                CAST(:filters AS JSONB), :status, :total_count, :created_by,
+                CASE WHEN :total_count = 0 THEN CURRENT_TIMESTAMP END
+            )
+            RETURNING campaign_id
+        """), {
+            "org_id": org_id,
+            "channel": channel,
+            "template_code": template_code,
+            "message_template": message_template,
+            "subject_template": subject_template,
+            "filters": json.dumps(filters, default=str),
+            "status": "queued" if drafts else "completed",
+            "total_count": len(drafts),
+            "created_by": created_by
+        }).scalar()
+
+        if drafts:
+            db.execute(text("""
+                INSERT INTO financial.reminder_deliveries (
+                    campaign_id, org_id, customer_id, channel, recipient,
+                    subject, message, outstanding_amount, days_overdue
+                )
+                SELECT :campaign_id, :org_id, d.customer_id, :channel, d.recipient,
+                       d.subject, d.message, d.amount, d.days
+                FROM unnest(
+                    CAST(:customer_ids AS INTEGER[]), CAST(:recipients AS TEXT[]),
+                    CAST(:subjects AS TEXT[]), CAST(:messages AS TEXT[]),
+                    CAST(:amounts AS NUMERIC[]), CAST(:days AS INTEGER[])
+                ) AS d(customer_id, recipient, subject, message, amount, days)
+            """), {
+                "campaign_id": campaign_id,
+                "org_id": org_id,
+                "channel": channel,
+                "customer_ids": [d["customer_id"] for d in drafts],
+                "recipients": [d["recipient"] for d in drafts],
+                "subjects": [d["subject"] for d in drafts],
+                "messages": [d["message"] for d in drafts],
+                "amounts": [d["amount"] for d in drafts],
+                "days": [d["days"] for d in drafts]
+            })
+
+        return {
+            "campaign_id": campaign_id,
+            "total_count": len(drafts),
+            "skipped_no_contact": skipped
+        }
+
+    @staticmethod
+    def reset_failed(db: Session, campaign_id: int) -> int:
+        """Put a campaign's failed deliveries back to pending so they can be queued again"""
+        return db.execute(text("""
+            WITH reset AS (
+                UPDATE financial.reminder_deliveries
+                SET status = 'pending', last_error = NULL
+                WHERE campaign_id = :campaign_id AND status = 'failed'
+                RETURNING 1
+            )
+            UPDATE financial.reminder_campaigns
+            SET failed_count = failed_count - (SELECT COUNT(*) FROM reset),
+                status = 'queued', completed_at = NULL
+            WHERE campaign_id = :campaign_id AND EXISTS (SELECT 1 FROM reset)
+            RETURNING (SELECT COUNT(*) FROM reset)
+        """), {"campaign_id": campaign_id}).scalar() or 0
+
+    @staticmethod
+    def record_results(db: Session, results: List[DeliveryResult]) -> int:
+        """
+        Store final delivery results (keyed by delivery_id, possibly from
+        several campaigns) and each campaign's counters in one statement. A
+        campaign is completed once every delivery has been sent or failed.
+        """
+        if not results:
+            return 0
+        return db.execute(text("""
+            WITH r AS (
+                SELECT * FROM unnest(
+                    CAST(:delivery_ids AS BIGINT[]), CAST(:statuses AS TEXT[]),
+                    CAST(:providers AS TEXT[]), CAST(:message_ids AS TEXT[]),
+                    CAST(:attempts AS INTEGER[]), CAST(:errors AS TEXT[])
+                ) AS r(delivery_id, status, provider, message_id, attempts, error)
+            ),
+            updated AS (
+                UPDATE financial.reminder_deliveries d
+                SET status = r.status,
+                    provider = r.provider,
+                    provider_message_id = r.message_id,
+                    attempts = d.attempts + r.attempts,
+                    last_error = r.error,
+                    sent_at = CASE WHEN r.status = 'sent' THEN CURRENT_TIMESTAMP END
+                FROM r
+                WHERE d.delivery_id = r.delivery_id
+                AND d.status = 'pending'
+                RETURNING d.campaign_id, d.status
+            ),
+            counts AS (
+                SELECT campaign_id,
+                       COUNT(*) FILTER (WHERE status = 'sent') AS sent,
+                       COUNT(*) FILTER (WHERE status = 'failed') AS failed
+                FROM updated
+                GROUP BY campaign_id
+            ),
+            campaigns AS (
+                UPDATE financial.reminder_campaigns c
+                SET sent_count = c.sent_count + counts.sent,
+                    failed_count = c.failed_count + counts.failed,
+                    status = CASE
+                        WHEN c.sent_count + c.failed_count + counts.sent + counts.failed >= c.total_count
+                        THEN 'completed' ELSE 'sending'
+                    END,
+                    completed_at = CASE
+                        WHEN c.sent_count + c.failed_count + counts.sent + counts.failed >= c.total_count
+                        THEN CURRENT_TIMESTAMP
+                    END
+                FROM counts
+                WHERE c.campaign_id = counts.campaign_id
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM updated
+        """), {
+            "delivery_ids": [r.key for r in results],
+            "statuses": [r.status for r in results],
+            "providers": [r.provider for r in results],
+            "message_ids": [r.message_id for r in results],
+            "attempts": [r.attempts for r in results],
+            "errors": [r.error for r in results]
+        }).scalar() or 0
+
+    @staticmethod
+    def get_campaign(db: Session, org_id: str, campaign_id: int) -> Optional[Dict[str, Any]]:
+        """Campaign with its counters and the latest delivery failures"""
+        row = db.execute(text("""
+            SELECT campaign_id, channel, template_code, filters, status,
+                   total_count, sent_count, failed_count,
+                   total_count - sent_count - failed_count AS pending_count,
+                   created_at, completed_at
+            FROM financial.reminder_campaigns
+            WHERE campaign_id = :campaign_id AND org_id = :org_id
+        """), {"campaign_id": campaign_id, "org_id": org_id}).first()
+        if not row:
+            return None
+
+        failures = db.execute(text("""
+            SELECT d.delivery_id, d.customer_id, c.customer_name, d.recipient,
+                   d.provider, d.attempts, d.last_error
+            FROM financial.reminder_deliveries d
+            JOIN parties.customers c ON c.customer_id = d.customer_id
+            WHERE d.campaign_id = :campaign_id AND d.status = 'failed'
+            ORDER BY d.delivery_id
+            LIMIT 50
+        """), {"campaign_id": campaign_id})
+        return {**dict(row._mapping), "failures": [dict(f._mapping) for f in failures]}
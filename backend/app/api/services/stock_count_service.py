@@ -0,0 +1,211 @@
+"""
+Stock count service layer
+Processes physical inventory counts as set-based operations
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import csv
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StockCountError(ValueError):
+    """Raised when count input cannot be parsed"""
+
+
+class StockCountService:
+    """Service class for physical stock count processing"""
+
+    STAGING_TABLE = "stock_count_staging"
+
+    @staticmethod
+    def parse_count_csv(content: bytes) -> List[Dict[str, Any]]:
+        """
+        Parse an uploaded count sheet.
+        Expects a header row with `batch_id` and `counted_quantity` columns;
+        any other columns are ignored.
+        """
+        try:
+            decoded = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise StockCountError("Count file must be UTF-8 encoded CSV")
+
+        reader = csv.DictReader(io.StringIO(decoded))
+        fields = {(name or "").strip().lower() for name in (reader.fieldnames or [])}
+        missing = {"batch_id", "counted_quantity"} - fields
+        if missing:
+            raise StockCountError(f"Count file is missing columns: {', '.join(sorted(missing))}")
+
+        items = []
+        for line_no, row in enumerate(reader, start=2):
+            row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            if not row.get("batch_id") and not row.get("counted_quantity"):
+                continue
+            items.append(StockCountService._normalize_item(row, line_no))
+        return items
+
+    @staticmethod
+    def _normalize_item(item: Dict[str, Any], line_no: int) -> Dict[str, Any]:
+        """Coerce one count line to (batch_id, counted_quantity)"""
+        try:
+            batch_id = int(item.get("batch_id"))
+            counted_quantity = Decimal(str(item.get("counted_quantity")))
+        except (TypeError, ValueError, InvalidOperation):
+            raise StockCountError(f"Invalid count line {line_no}: {item}")
+        if counted_quantity < 0:
+            raise StockCountError(f"Negative counted quantity on line {line_no}")
+        return {"batch_id": batch_id, "counted_quantity": counted_quantity}
+
+    @staticmethod
+    def _load_staging(db: Session, items: Iterable[Dict[str, Any]]) -> int:
+        """
+        Create the per-transaction staging table and COPY the count into it.
+        The table is dropped automatically when the transaction ends.
+        """
+        db.execute(text(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {StockCountService.STAGING_TABLE} (
+                batch_id INTEGER NOT NULL,
+                counted_quantity NUMERIC(15,3) NOT NULL
+            ) ON COMMIT DROP
+        """))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        rows = 0
+        for item in items:
+            writer.writerow([item["batch_id"], item["counted_quantity"]])
+            rows += 1
+        buffer.seek(0)
+
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {StockCountService.STAGING_TABLE} (batch_id, counted_quantity) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+        return rows
+
+    @staticmethod
+    def process_count(
+        db: Session,
+        org_id: str,
+        count_items: List[Dict[str, Any]],
+        count_date: Optional[datetime] = None,
+        count_reference: Optional[str] = None,
+        counted_by: Optional[int] = None,
+        include_details: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Diff a physical count against inventory.batches and post adjustments.
+
+        Lines for the same batch are summed (a batch counted on two shelves).
+        Movements and batch quantities are written with one statement each,
+        so the cost is independent of the number of counted batches.
+        """
+        items = [
+            StockCountService._normalize_item(item, index)
+            for index, item in enumerate(count_items, start=1)
+        ]
+        staged_rows = StockCountService._load_staging(db, items)
+
+        params = {
+            "org_id": org_id,
+            "movement_date": count_date or datetime.utcnow(),
+            "reference_number": count_reference or f"COUNT-{datetime.now().strftime('%Y%m%d')}",
+            "performed_by": counted_by
+        }
+
+        staged = db.execute(text(f"""
+            SELECT
+                COUNT(DISTINCT s.batch_id) FILTER (WHERE b.batch_id IS NOT NULL) AS matched,
+                COUNT(DISTINCT s.batch_id) FILTER (WHERE b.batch_id IS NULL) AS unmatched
+            FROM {StockCountService.STAGING_TABLE} s
+            LEFT JOIN inventory.batches b
+                ON b.batch_id = s.batch_id AND b.org_id = :org_id
+        """), params).first()
+        matched, unmatched = staged.matched or 0, staged.unmatched or 0
+
+        result = db.execute(text(f"""
+            WITH counted AS (
+                SELECT batch_id, SUM(counted_quantity) AS counted_quantity
+                FROM {StockCountService.STAGING_TABLE}
+                GROUP BY batch_id
+            ),
+            diff AS (
+                SELECT
+                    b.batch_id, b.product_id, b.batch_number,
+                    b.quantity_available AS system_quantity,
+                    c.counted_quantity,
+                    c.counted_quantity - b.quantity_available AS difference
+                FROM counted c
+                JOIN inventory.batches b
+                    ON b.batch_id = c.batch_id AND b.org_id = :org_id
+                WHERE c.counted_quantity <> b.quantity_available
+                FOR UPDATE OF b
+            ),
+            moved AS (
+                INSERT INTO inventory.inventory_movements (
+                    org_id, movement_date, movement_type,
+                    product_id, batch_id,
+                    quantity_in, quantity_out,
+                    reference_type, reference_number,
+                    notes, performed_by
+                )
+                SELECT
+                    :org_id, :movement_date, 'stock_count',
+                    d.product_id, d.batch_id,
+                    GREATEST(d.difference, 0), GREATEST(-d.difference, 0),
+                    'physical_count', :reference_number,
+                    'Physical count adjustment: System ' || d.system_quantity
+                        || ', Counted ' || d.counted_quantity,
+                    :performed_by
+                FROM diff d
+                RETURNING movement_id, batch_id
+            ),
+            updated AS (
+                UPDATE inventory.batches b
+                SET quantity_available = d.counted_quantity,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM diff d
+                WHERE b.batch_id = d.batch_id
+                RETURNING b.batch_id
+            )
+            SELECT
+                m.movement_id, d.batch_id, d.batch_number, d.product_id,
+                d.system_quantity, d.counted_quantity, d.difference
+            FROM diff d
+            JOIN moved m ON m.batch_id = d.batch_id
+            ORDER BY d.batch_id
+        """), params)
+        adjustments = [dict(row._mapping) for row in result]
+
+        surplus = sum((a["difference"] for a in adjustments if a["difference"] > 0), Decimal("0"))
+        shortage = sum((-a["difference"] for a in adjustments if a["difference"] < 0), Decimal("0"))
+
+        summary = {
+            "lines_received": staged_rows,
+            "batches_counted": matched,
+            "batches_unmatched": unmatched,
+            "batches_unchanged": matched - len(adjustments),
+            "adjustments_created": len(adjustments),
+            "surplus_quantity": surplus,
+            "shortage_quantity": shortage,
+            "net_difference": surplus - shortage,
+            "reference_number": params["reference_number"]
+        }
+        if include_details:
+            summary["details"] = adjustments
+
+        logger.info(
+            f"Physical count {params['reference_number']}: "
+            f"{len(adjustments)} adjustments from {staged_rows} lines"
+        )
+        return summary
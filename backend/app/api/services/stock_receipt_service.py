@@ -0,0 +1,315 @@
+"""
+Stock receipt service
+Posts a whole goods receipt (GRN) with set-based statements in one
+transaction: lines are merged per (product_id, batch_number) in memory,
+products are checked in one query, and the batch upserts, the purchase
+movements and the purchase item statuses are written by one
+data-modifying statement, whatever the number of lines.
+
+A batch number already on file for the product is received into that
+batch instead of failing the receipt.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHELF_LIFE_DAYS = 730
+
+
+class StockReceiptError(ValueError):
+    """A receipt that cannot be posted as sent (unknown product, bad quantity)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class ReceiptLine:
+    product_id: int
+    quantity: int
+    batch_number: Optional[str] = None
+    expiry_date: Optional[date] = None
+    manufacturing_date: Optional[date] = None
+    cost_price: Optional[Decimal] = None
+    selling_price: Optional[Decimal] = None
+    mrp: Optional[Decimal] = None
+    purchase_item_id: Optional[int] = None
+
+
+@dataclass
+class _MergedLine:
+    product_id: int
+    batch_number: str
+    quantity: int
+    expiry_date: Optional[date]
+    manufacturing_date: Optional[date]
+    cost_price: Optional[Decimal]
+    selling_price: Optional[Decimal]
+    mrp: Optional[Decimal]
+    purchase_item_ids: List[int] = field(default_factory=list)
+
+
+def _as_date(value: Any) -> Optional[date]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _as_decimal(value: Any) -> Optional[Decimal]:
+    if value is None or value == "":
+        return None
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def lines_from_parsed(items: Sequence[Dict[str, Any]]) -> List[ReceiptLine]:
+    """Receipt lines from purchase_upload's parsed invoice items (matched products only)"""
+    return [
+        ReceiptLine(
+            product_id=int(item["product_id"]),
+            quantity=int(item.get("quantity") or 0) + int(item.get("free_quantity") or 0),
+            batch_number=item.get("batch_number") or None,
+            expiry_date=_as_date(item.get("expiry_date")),
+            cost_price=_as_decimal(item.get("rate")),
+            mrp=_as_decimal(item.get("mrp"))
+        )
+        for item in items
+        if item.get("product_id")
+    ]
+
+
+class StockReceiptService:
+    """Service class for bulk goods receipts"""
+
+    @staticmethod
+    def merge_lines(lines: Sequence[ReceiptLine]) -> List[_MergedLine]:
+        """
+        One line per (product_id, batch_number), quantities summed; the
+        first line's dates and prices win. Lines without a batch number
+        share one generated batch per product.
+        """
+        today = date.today().strftime("%Y%m%d")
+        merged: Dict[tuple, _MergedLine] = {}
+        for line in lines:
+            if line.quantity <= 0:
+                raise StockReceiptError(f"Quantity for product {line.product_id} must be greater than zero")
+            batch_number = (line.batch_number or "").strip() or f"RCV-{today}-{line.product_id}"
+            key = (line.product_id, batch_number)
+            current = merged.get(key)
+            if current is None:
+                current = merged[key] = _MergedLine(
+                    product_id=line.product_id,
+                    batch_number=batch_number,
+                    quantity=0,
+                    expiry_date=_as_date(line.expiry_date),
+                    manufacturing_date=_as_date(line.manufacturing_date),
+                    cost_price=line.cost_price,
+                    selling_price=line.selling_price,
+                    mrp=line.mrp
+                )
+            current.quantity += line.quantity
+            if line.purchase_item_id is not None:
+                current.purchase_item_ids.append(line.purchase_item_id)
+        return list(merged.values())
+
+    @staticmethod
+    def receive(
+        db: Session,
+        org_id: str,
+        lines: Sequence[ReceiptLine],
+        supplier_id: Optional[int] = None,
+        purchase_id: Optional[int] = None,
+        invoice_number: Optional[str] = None,
+        reference_number: Optional[str] = None,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Post the receipt; the caller commits.
+        Returns one entry per batch touched plus merge counts.
+        """
+        if not lines:
+            raise StockReceiptError("At least one item is required")
+        org_id = str(org_id)
+        merged = StockReceiptService.merge_lines(lines)
+        product_ids = sorted({line.product_id for line in merged})
+
+        products = {
+            row.product_id: row for row in db.execute(text("""
+                SELECT product_id, product_name, mrp, sale_price, purchase_price
+                FROM inventory.products
+                WHERE product_id = ANY(:product_ids) AND org_id = :org_id
+            """), {"product_ids": product_ids, "org_id": org_id})
+        }
+        missing = [pid for pid in product_ids if pid not in products]
+        if missing:
+            raise StockReceiptError(f"Product with ID {missing[0]} not found", status_code=404)
+
+        # Defaults as for a single receive: 2 years shelf life, prices from the product
+        default_expiry = date.today() + timedelta(days=DEFAULT_SHELF_LIFE_DAYS)
+        for line in merged:
+            product = products[line.product_id]
+            product_mrp = product.mrp or Decimal("0")
+            line.expiry_date = line.expiry_date or default_expiry
+            line.mrp = line.mrp or product.mrp
+            line.cost_price = line.cost_price or product.purchase_price or (product_mrp * Decimal("0.7"))
+            line.selling_price = line.selling_price or product.sale_price or (product_mrp * Decimal("0.9"))
+
+        # purchase item -> received quantity and the batch it went into
+        item_ids: List[int] = []
+        item_quantities: List[int] = []
+        item_batches: List[str] = []
+        item_expiries: List[date] = []
+        received_per_item: Dict[int, int] = {}
+        for line in lines:
+            if line.purchase_item_id is not None:
+                received_per_item[line.purchase_item_id] = (
+                    received_per_item.get(line.purchase_item_id, 0) + line.quantity
+                )
+        for line in merged:
+            for item_id in line.purchase_item_ids:
+                if item_id in item_ids:
+                    continue  # split over batches: the item keeps its first batch
+                item_ids.append(item_id)
+                item_quantities.append(received_per_item[item_id])
+                item_batches.append(line.batch_number)
+                item_expiries.append(line.expiry_date)
+
+        result = db.execute(text("""
+            WITH incoming AS (
+                SELECT *
+                FROM unnest(
+                    CAST(:product_ids AS INTEGER[]),
+                    CAST(:batch_numbers AS TEXT[]),
+                    CAST(:quantities AS INTEGER[]),
+                    CAST(:expiry_dates AS DATE[]),
+                    CAST(:manufacturing_dates AS DATE[]),
+                    CAST(:cost_prices AS NUMERIC[]),
+                    CAST(:selling_prices AS NUMERIC[]),
+                    CAST(:mrps AS NUMERIC[])
+                ) AS l(product_id, batch_number, quantity, expiry_date,
+                       manufacturing_date, cost_price, selling_price, mrp)
+            ),
+            upserted AS (
+                INSERT INTO inventory.batches (
+                    org_id, product_id, batch_number,
+                    manufacturing_date, expiry_date,
+                    quantity_received, quantity_available, quantity_sold,
+                    quantity_damaged, quantity_returned,
+                    cost_price, selling_price, mrp,
+                    supplier_id, purchase_id, purchase_invoice_number,
+                    batch_status, notes,
+                    created_at, updated_at
+                )
+                SELECT
+                    :org_id, product_id, batch_number,
+                    manufacturing_date, expiry_date,
+                    quantity, quantity, 0, 0, 0,
+                    cost_price, selling_price, mrp,
+                    :supplier_id, :purchase_id, :invoice_number,
+                    'active', :notes,
+                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                FROM incoming
+                ON CONFLICT (org_id, product_id, batch_number) DO UPDATE
+                SET quantity_received = inventory.batches.quantity_received + EXCLUDED.quantity_received,
+                    quantity_available = inventory.batches.quantity_available + EXCLUDED.quantity_available,
+                    batch_status = 'active',
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING batch_id, product_id, batch_number, quantity_available, expiry_date,
+                          (xmax = 0) AS created
+            ),
+            moved AS (
+                INSERT INTO inventory.inventory_movements (
+                    org_id, movement_date, movement_type,
+                    product_id, batch_id,
+                    quantity_in, quantity_out,
+                    reference_type, reference_id, reference_number,
+                    notes
+                )
+                SELECT
+                    :org_id, CURRENT_TIMESTAMP, 'purchase',
+                    u.product_id, u.batch_id,
+                    i.quantity, 0,
+                    CASE WHEN CAST(:purchase_id AS INTEGER) IS NULL THEN 'stock_receive' ELSE 'purchase' END,
+                    :purchase_id, :reference_number,
+                    'Goods received'
+                FROM upserted u
+                JOIN incoming i ON i.product_id = u.product_id AND i.batch_number = u.batch_number
+                RETURNING 1
+            ),
+            items AS (
+                UPDATE purchase_items pi
+                SET received_quantity = x.quantity,
+                    batch_number = x.batch_number,
+                    expiry_date = x.expiry_date,
+                    item_status = 'received'
+                FROM unnest(
+                    CAST(:item_ids AS INTEGER[]),
+                    CAST(:item_quantities AS INTEGER[]),
+                    CAST(:item_batches AS TEXT[]),
+                    CAST(:item_expiries AS DATE[])
+                ) AS x(purchase_item_id, quantity, batch_number, expiry_date)
+                WHERE pi.purchase_item_id = x.purchase_item_id
+                AND pi.purchase_id = :purchase_id
+                RETURNING 1
+            )
+            SELECT u.batch_id, u.product_id, u.batch_number, u.quantity_available,
+                   u.expiry_date, u.created, i.quantity AS quantity_received,
+                   (SELECT COUNT(*) FROM moved) AS movements,
+                   (SELECT COUNT(*) FROM items) AS items_updated
+            FROM upserted u
+            JOIN incoming i ON i.product_id = u.product_id AND i.batch_number = u.batch_number
+            ORDER BY u.batch_id
+        """), {
+            "org_id": org_id,
+            "supplier_id": supplier_id,
+            "purchase_id": purchase_id,
+            "invoice_number": invoice_number,
+            "reference_number": reference_number or invoice_number,
+            "notes": notes,
+            "product_ids": [line.product_id for line in merged],
+            "batch_numbers": [line.batch_number for line in merged],
+            "quantities": [line.quantity for line in merged],
+            "expiry_dates": [line.expiry_date for line in merged],
+            "manufacturing_dates": [line.manufacturing_date for line in merged],
+            "cost_prices": [line.cost_price for line in merged],
+            "selling_prices": [line.selling_price for line in merged],
+            "mrps": [line.mrp for line in merged],
+            "item_ids": item_ids,
+            "item_quantities": item_quantities,
+            "item_batches": item_batches,
+            "item_expiries": item_expiries
+        }).fetchall()
+
+        batches = [
+            {
+                "batch_id": row.batch_id,
+                "batch_number": row.batch_number,
+                "product_id": row.product_id,
+                "product_name": products[row.product_id].product_name,
+                "quantity_received": row.quantity_received,
+                "quantity_available": row.quantity_available,
+                "expiry_date": row.expiry_date,
+                "created": row.created
+            }
+            for row in result
+        ]
+        return {
+            "lines_received": len(lines),
+            "lines_merged": len(lines) - len(merged),
+            "batches_created": sum(1 for b in batches if b["created"]),
+            "batches_updated": sum(1 for b in batches if not b["created"]),
+            "movements_created": result[0].movements if result else 0,
+            "purchase_items_updated": result[0].items_updated if result else 0,
+            "total_quantity": sum(line.quantity for line in merged),
+            "batches": batches
+        }
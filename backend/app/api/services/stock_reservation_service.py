@@ -0,0 +1,387 @@
+"""
+Stock reservation service layer
+Reserves batch stock for approved sales orders, releases it on cancellation
+or expiry and converts it to an allocation when the order is invoiced.
+
+Open reservations live in inventory.stock_reservations. A trigger on that
+table keeps inventory.batches.quantity_reserved in step, and the batch
+trigger rolls it up into inventory.product_stock_summary, so availability
+checks read a single counter per product.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+
+from ...core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ("active", "partial")
+
+
+class StockReservationError(ValueError):
+    """Raised when an order cannot be fully reserved"""
+
+    def __init__(self, message: str, shortages: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.shortages = shortages or []
+
+
+class StockReservationService:
+    """Service class for order stock reservations"""
+
+    @staticmethod
+    def _reserve_lines(
+        db: Session,
+        org_id: str,
+        reference_type: str,
+        reference_id: int,
+        lines: List[Dict[str, Any]],
+        expires_at: Optional[datetime],
+        reserved_by: Optional[int],
+        priority: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Reserve a set of (product, optional batch, quantity) lines in one
+        statement: lock candidate batches, spread each line over them in
+        FEFO order with a running total and insert the reservation rows.
+        Returns requested vs reserved quantity per line.
+        """
+        result = db.execute(text("""
+            WITH requested AS (
+                SELECT product_id, batch_id, SUM(quantity) AS quantity
+                FROM unnest(
+                    CAST(:product_ids AS INTEGER[]),
+                    CAST(:batch_ids AS INTEGER[]),
+                    CAST(:quantities AS NUMERIC[])
+                ) AS r(product_id, batch_id, quantity)
+                GROUP BY product_id, batch_id
+            ),
+            locked AS (
+                SELECT b.batch_id, b.product_id, b.expiry_date, b.created_at,
+                       b.quantity_available - COALESCE(b.quantity_reserved, 0) AS free_quantity
+                FROM inventory.batches b
+                WHERE b.org_id = :org_id
+                AND b.product_id IN (SELECT product_id FROM requested)
+                AND b.quantity_available > COALESCE(b.quantity_reserved, 0)
+                AND (b.expiry_date IS NULL OR b.expiry_date > CURRENT_DATE)
+                AND COALESCE(b.batch_status, 'active') != 'expired'
+                FOR UPDATE OF b
+            ),
+            candidates AS (
+                SELECT
+                    r.product_id,
+                    r.batch_id AS requested_batch_id,
+                    r.quantity AS requested_quantity,
+                    l.batch_id,
+                    l.free_quantity,
+                    SUM(l.free_quantity) OVER (
+                        PARTITION BY r.product_id, r.batch_id
+                        ORDER BY l.expiry_date NULLS LAST, l.created_at, l.batch_id
+                    ) - l.free_quantity AS covered_before
+                FROM requested r
+                JOIN locked l ON l.product_id = r.product_id
+                    AND (r.batch_id IS NULL OR l.batch_id = r.batch_id)
+            ),
+            allocated AS (
+                SELECT product_id, requested_batch_id, batch_id,
+                       LEAST(free_quantity, requested_quantity - covered_before) AS quantity
+                FROM candidates
+                WHERE covered_before < requested_quantity
+            ),
+            reserved AS (
+                INSERT INTO inventory.stock_reservations (
+                    org_id, product_id, batch_id,
+                    reserved_quantity, reference_type, reference_id,
+                    expires_at, priority, reserved_by
+                )
+                SELECT
+                    :org_id, product_id, batch_id,
+                    quantity, :reference_type, :reference_id,
+                    :expires_at, :priority, :reserved_by
+                FROM allocated
+                RETURNING reservation_id
+            )
+            SELECT
+                r.product_id,
+                r.batch_id,
+                r.quantity AS requested_quantity,
+                COALESCE(SUM(a.quantity), 0) AS reserved_quantity
+            FROM requested r
+            LEFT JOIN allocated a ON a.product_id = r.product_id
+                AND a.requested_batch_id IS NOT DISTINCT FROM r.batch_id
+            GROUP BY r.product_id, r.batch_id, r.quantity
+        """), {
+            "org_id": org_id,
+            "product_ids": [line["product_id"] for line in lines],
+            "batch_ids": [line.get("batch_id") for line in lines],
+            "quantities": [Decimal(str(line["quantity"])) for line in lines],
+            "reference_type": reference_type,
+            "reference_id": reference_id,
+            "expires_at": expires_at,
+            "priority": priority,
+            "reserved_by": reserved_by
+        })
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def reserve_order(
+        db: Session,
+        org_id: str,
+        order_id: int,
+        items: List[Dict[str, Any]],
+        ttl_hours: Optional[int] = None,
+        reserved_by: Optional[int] = None,
+        priority: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Reserve stock for every order line, all or nothing.
+
+        Lines pinned to a batch are reserved first, then the remaining lines
+        are reserved FEFO across the product's batches, so a pinned line never
+        competes with an unpinned one for the same stock. Raises
+        StockReservationError listing the short lines; the caller rolls back.
+        """
+        ttl_hours = settings.RESERVATION_TTL_HOURS if ttl_hours is None else ttl_hours
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=ttl_hours) if ttl_hours else None
+
+        pinned = [item for item in items if item.get("batch_id")]
+        unpinned = [item for item in items if not item.get("batch_id")]
+
+        lines = []
+        for group in (pinned, unpinned):
+            if group:
+                lines.extend(StockReservationService._reserve_lines(
+                    db, org_id, "order", order_id, group, expires_at, reserved_by, priority
+                ))
+
+        shortages = [
+            {**line, "shortfall": line["requested_quantity"] - line["reserved_quantity"]}
+            for line in lines
+            if line["reserved_quantity"] < line["requested_quantity"]
+        ]
+        if shortages:
+            details = "; ".join(
+                f"Product {line['product_id']}"
+                + (f" batch {line['batch_id']}" if line["batch_id"] else "")
+                + f": requested {line['requested_quantity']}, available {line['reserved_quantity']}"
+                for line in shortages
+            )
+            raise StockReservationError(f"Insufficient stock to reserve: {details}", shortages)
+
+        return {
+            "order_id": order_id,
+            "expires_at": expires_at,
+            "lines": lines,
+            "reserved_quantity": sum((line["reserved_quantity"] for line in lines), Decimal("0"))
+        }
+
+    @staticmethod
+    def release(
+        db: Session,
+        org_id: str,
+        reference_id: int,
+        reference_type: str = "order",
+        status: str = "cancelled"
+    ) -> Dict[str, Any]:
+        """Close a reference's open reservations; the trigger returns the stock"""
+        result = db.execute(text("""
+            UPDATE inventory.stock_reservations
+            SET reservation_status = :status
+            WHERE org_id = :org_id
+            AND reference_type = :reference_type
+            AND reference_id = :reference_id
+            AND reservation_status IN ('active', 'partial')
+            RETURNING reserved_quantity - COALESCE(fulfilled_quantity, 0) AS released_quantity
+        """), {
+            "org_id": org_id,
+            "reference_type": reference_type,
+            "reference_id": reference_id,
+            "status": status
+        }).fetchall()
+
+        return {
+            "reservations_released": len(result),
+            "released_quantity": sum((row.released_quantity for row in result), Decimal("0"))
+        }
+
+    @staticmethod
+    def hold_until_invoiced(db: Session, org_id: str, order_id: int) -> int:
+        """Clear the expiry on an order's reservations once its goods have shipped"""
+        result = db.execute(text("""
+            UPDATE inventory.stock_reservations
+            SET expires_at = NULL
+            WHERE org_id = :org_id
+            AND reference_type = 'order'
+            AND reference_id = :order_id
+            AND reservation_status IN ('active', 'partial')
+        """), {"org_id": org_id, "order_id": order_id})
+        return result.rowcount
+
+    @staticmethod
+    def fulfill_order(db: Session, org_id: str, order_id: int) -> Dict[str, Any]:
+        """
+        Convert an order's open reservations into an allocation: deduct the
+        reserved quantities from their batches and mark the reservations
+        fulfilled, in one statement.
+
+        If any of the order's reservations has lapsed, all of them are
+        released and every line is reserved again from current stock, so
+        the order is either allocated in full or StockReservationError is
+        raised. Orders approved before reservations existed have no
+        reservation rows; OrderService.allocate_inventory already deducted
+        their stock, so nothing is deducted again.
+        """
+        # Locking the rows keeps the expirer (SKIP LOCKED) off them until commit
+        state = db.execute(text("""
+            WITH reservations AS (
+                SELECT reservation_status, expires_at
+                FROM inventory.stock_reservations
+                WHERE org_id = :org_id
+                AND reference_type = 'order'
+                AND reference_id = :order_id
+                FOR UPDATE
+            )
+            SELECT
+                COUNT(*) AS reservations,
+                COUNT(*) FILTER (
+                    WHERE reservation_status = 'expired'
+                    OR (reservation_status IN ('active', 'partial') AND expires_at <= CURRENT_TIMESTAMP)
+                ) AS lapsed
+            FROM reservations
+        """), {"org_id": org_id, "order_id": order_id}).first()
+
+        if not state.reservations:
+            logger.info(f"Order {order_id} has no reservations (allocated at approval); nothing to deduct")
+            return {"reservations_fulfilled": 0, "allocated_quantity": Decimal("0"), "batches_allocated": 0}
+
+        if state.lapsed:
+            StockReservationService.release(db, org_id, order_id, status="expired")
+            items = db.execute(text("""
+                SELECT product_id, batch_id, quantity
+                FROM sales.order_items
+                WHERE order_id = :order_id
+            """), {"order_id": order_id}).fetchall()
+            StockReservationService.reserve_order(
+                db, org_id, order_id, [dict(item._mapping) for item in items], ttl_hours=0
+            )
+
+        result = db.execute(text("""
+            WITH open_reservations AS (
+                SELECT reservation_id, batch_id,
+                       reserved_quantity - COALESCE(fulfilled_quantity, 0) AS quantity
+                FROM inventory.stock_reservations
+                WHERE org_id = :org_id
+                AND reference_type = 'order'
+                AND reference_id = :order_id
+                AND reservation_status IN ('active', 'partial')
+                AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+                FOR UPDATE
+            ),
+            fulfilled AS (
+                UPDATE inventory.stock_reservations s
+                SET fulfilled_quantity = s.reserved_quantity,
+                    reservation_status = 'fulfilled'
+                FROM open_reservations o
+                WHERE s.reservation_id = o.reservation_id
+                RETURNING s.reservation_id
+            ),
+            per_batch AS (
+                SELECT batch_id, SUM(quantity) AS quantity
+                FROM open_reservations
+                GROUP BY batch_id
+            ),
+            allocated AS (
+                UPDATE inventory.batches b
+                SET quantity_available = b.quantity_available - p.quantity,
+                    quantity_sold = COALESCE(b.quantity_sold, 0) + p.quantity,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM per_batch p
+                WHERE b.batch_id = p.batch_id
+                RETURNING b.batch_id
+            )
+            SELECT
+                COUNT(*) AS reservations_fulfilled,
+                COALESCE(SUM(quantity), 0) AS allocated_quantity,
+                (SELECT COUNT(*) FROM allocated) AS batches_allocated
+            FROM open_reservations
+        """), {"org_id": org_id, "order_id": order_id}).first()
+
+        return dict(result._mapping)
+
+    @staticmethod
+    def fulfill_invoiced_orders(db: Session, org_id: str, order_ids: List[int]) -> List[int]:
+        """
+        Fulfil the reservations of orders invoiced through challans, in the
+        caller's transaction. An order is fulfilled once none of its challans
+        is left uninvoiced; until then its stock stays held. Returns the
+        orders fulfilled.
+        """
+        if not order_ids:
+            return []
+
+        ready = db.execute(text("""
+            SELECT o.order_id
+            FROM unnest(CAST(:order_ids AS INTEGER[])) AS o(order_id)
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM challans c
+                WHERE c.org_id = :org_id
+                AND c.order_id = o.order_id
+                AND c.invoice_id IS NULL
+                AND c.status <> 'cancelled'
+            )
+            ORDER BY o.order_id
+        """), {"org_id": org_id, "order_ids": sorted(set(order_ids))}).fetchall()
+
+        fulfilled = []
+        for row in ready:
+            StockReservationService.fulfill_order(db, org_id, row.order_id)
+            fulfilled.append(row.order_id)
+        return fulfilled
+
+    @staticmethod
+    def get_reservations(db: Session, org_id: str, order_id: int) -> List[Dict[str, Any]]:
+        """All reservations for an order, newest first"""
+        result = db.execute(text("""
+            SELECT r.reservation_id, r.product_id, p.product_name,
+                   r.batch_id, b.batch_number, b.expiry_date,
+                   r.reserved_quantity, r.fulfilled_quantity,
+                   r.reservation_status, r.reservation_date, r.expires_at
+            FROM inventory.stock_reservations r
+            JOIN inventory.products p ON p.product_id = r.product_id
+            LEFT JOIN inventory.batches b ON b.batch_id = r.batch_id
+            WHERE r.org_id = :org_id
+            AND r.reference_type = 'order'
+            AND r.reference_id = :order_id
+            ORDER BY r.reservation_id DESC
+        """), {"org_id": org_id, "order_id": order_id})
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def expire_stale(db: Session, org_id: Optional[str] = None, limit: int = 1000) -> int:
+        """
+        Expire up to `limit` open reservations past their TTL and commit.
+        Returns the number expired; callers loop until it drops below limit.
+        """
+        result = db.execute(text("""
+            WITH stale AS (
+                SELECT reservation_id
+                FROM inventory.stock_reservations
+                WHERE reservation_status IN ('active', 'partial')
+                AND expires_at <= CURRENT_TIMESTAMP
+                AND (CAST(:org_id AS UUID) IS NULL OR org_id = CAST(:org_id AS UUID))
+                ORDER BY expires_at
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE inventory.stock_reservations s
+            SET reservation_status = 'expired'
+            FROM stale
+            WHERE s.reservation_id = stale.reservation_id
+        """), {"org_id": org_id, "limit": limit})
+        db.commit()
+        return result.rowcount
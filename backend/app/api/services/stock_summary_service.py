@@ -0,0 +1,97 @@
+"""
+Stock summary service layer
+Product-level availability from inventory.product_stock_summary, which is
+kept current by a trigger on inventory.batches.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLUMNS = """
+    on_hand_quantity, sellable_quantity, reserved_quantity,
+    expired_quantity, near_expiry_quantity, batch_count, updated_at
+"""
+
+EMPTY_SUMMARY = {
+    "on_hand_quantity": Decimal("0"),
+    "sellable_quantity": Decimal("0"),
+    "reserved_quantity": Decimal("0"),
+    "expired_quantity": Decimal("0"),
+    "near_expiry_quantity": Decimal("0"),
+    "batch_count": 0,
+    "updated_at": None
+}
+
+
+class StockSummaryService:
+    """Service class for product stock availability"""
+
+    @staticmethod
+    def get_summary(db: Session, org_id: str, product_id: int) -> Dict[str, Any]:
+        """Stock summary for one product (zeros if it never had stock)"""
+        row = db.execute(text(f"""
+            SELECT product_id, {SUMMARY_COLUMNS}
+            FROM inventory.product_stock_summary
+            WHERE org_id = :org_id AND product_id = :product_id
+        """), {"org_id": org_id, "product_id": product_id}).first()
+
+        if not row:
+            return {"product_id": product_id, **EMPTY_SUMMARY}
+        return dict(row._mapping)
+
+    @staticmethod
+    def get_summaries(
+        db: Session,
+        org_id: str,
+        product_ids: Iterable[int]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Stock summaries for several products in one primary-key probe"""
+        product_ids = list({int(pid) for pid in product_ids})
+        if not product_ids:
+            return {}
+
+        result = db.execute(text(f"""
+            SELECT product_id, {SUMMARY_COLUMNS}
+            FROM inventory.product_stock_summary
+            WHERE org_id = :org_id AND product_id = ANY(:product_ids)
+        """), {"org_id": org_id, "product_ids": product_ids})
+
+        summaries = {pid: {"product_id": pid, **EMPTY_SUMMARY} for pid in product_ids}
+        for row in result:
+            summaries[row.product_id] = dict(row._mapping)
+        return summaries
+
+    @staticmethod
+    def get_sellable_quantity(db: Session, org_id: str, product_id: int) -> Decimal:
+        """Unexpired, unreserved quantity for one product"""
+        quantity = db.execute(text("""
+            SELECT sellable_quantity
+            FROM inventory.product_stock_summary
+            WHERE org_id = :org_id AND product_id = :product_id
+        """), {"org_id": org_id, "product_id": product_id}).scalar()
+        return quantity or Decimal("0")
+
+    @staticmethod
+    def reconcile(
+        db: Session,
+        org_id: str,
+        product_ids: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recompute summary rows from batches and return the products that had
+        drifted. Also re-buckets expired / near-expiry stock as dates pass.
+        """
+        result = db.execute(text("""
+            SELECT product_id, stored_sellable, actual_sellable, stored_on_hand, actual_on_hand
+            FROM refresh_product_stock_summary(CAST(:org_id AS UUID), CAST(:product_ids AS INTEGER[]))
+        """), {"org_id": org_id, "product_ids": product_ids})
+        drifted = [dict(row._mapping) for row in result]
+        db.commit()
+
+        if drifted:
+            logger.warning(f"Stock summary drift for org {org_id}: {len(drifted)} products corrected")
+        return drifted
@@ -0,0 +1,246 @@
+"""
+API usage logging
+Per-request metrics (endpoint template, org, status, latency, request and
+response bytes) for system_config.api_usage_log, kept off the request
+path: the ASGI middleware only appends to an in-memory buffer, and a
+background task drains it every API_USAGE_FLUSH_INTERVAL_MS with one
+multi-row insert per batch.
+
+The buffer is bounded; when the database falls behind, the oldest
+entries are dropped and counted rather than slowing requests down.
+Values one row could fail the whole insert on are cleaned at flush time:
+client addresses that are not IPs and org ids that are not UUIDs are
+written as NULL, as are orgs and users that no longer exist.
+Monthly partitions are maintained by app.jobs.api_usage_partitions.
+"""
+from typing import Any, Dict, List, Optional
+from collections import deque
+from datetime import datetime, timezone
+import asyncio
+import ipaddress
+import logging
+import time
+import uuid
+
+from sqlalchemy import text
+
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Probes and docs are not worth a row each
+EXCLUDED_PATHS = {"/", "/health", "/health/metrics", "/docs", "/redoc", "/openapi.json"}
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+
+def tag_request(request: Any, org_id: Any = None, user_id: Any = None, user_name: Optional[str] = None):
+    """Attribute the current request to an org / user for usage and audit logging"""
+    if org_id is not None:
+        request.state.org_id = str(org_id)
+    if user_id is not None and str(user_id).isdigit():
+        request.state.user_id = int(user_id)
+    if user_name:
+        request.state.user_name = user_name
+
+
+def _valid_ip(value: Optional[str]) -> Optional[str]:
+    """The client address if it casts to INET; test clients and proxies send other strings"""
+    try:
+        return str(ipaddress.ip_address(value)) if value else None
+    except ValueError:
+        return None
+
+
+def _valid_uuid(value: Optional[str]) -> Optional[str]:
+    try:
+        return str(uuid.UUID(str(value))) if value else None
+    except ValueError:
+        return None
+
+
+class ApiUsageRecorder:
+    """Bounded buffer of request metrics and its periodic flusher"""
+
+    def __init__(self, enabled: bool, buffer_size: int, flush_interval_ms: int, batch_size: int):
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def record(self, entry: Dict[str, Any]):
+        # deque.append is atomic; a full deque silently evicts the oldest entry
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(entry)
+        self.recorded += 1
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def flush(self) -> int:
+        """Write everything buffered so far; blocking, run off the event loop"""
+        written = 0
+        while True:
+            batch = self._drain()
+            if not batch:
+                return written
+            db = SessionLocal()
+            try:
+                db.execute(text("""
+                    INSERT INTO system_config.api_usage_log (
+                        org_id, endpoint, method, user_id, ip_address, user_agent,
+                        request_timestamp, response_time_ms, status_code,
+                        request_size_bytes, response_size_bytes, error_occurred,
+                        created_at
+                    )
+                    SELECT o.org_id, u.endpoint, u.method, ou.user_id, u.ip_address, u.user_agent,
+                           u.request_timestamp, u.response_time_ms, u.status_code,
+                           u.request_size_bytes, u.response_size_bytes, u.status_code >= 500,
+                           u.request_timestamp
+                    FROM unnest(
+                        CAST(:org_ids AS UUID[]),
+                        CAST(:endpoints AS TEXT[]),
+                        CAST(:methods AS TEXT[]),
+                        CAST(:user_ids AS INTEGER[]),
+                        CAST(:ip_addresses AS INET[]),
+                        CAST(:user_agents AS TEXT[]),
+                        CAST(:request_timestamps AS TIMESTAMPTZ[]),
+                        CAST(:response_times AS INTEGER[]),
+                        CAST(:status_codes AS INTEGER[]),
+                        CAST(:request_sizes AS INTEGER[]),
+                        CAST(:response_sizes AS INTEGER[])
+                    ) AS u(org_id, endpoint, method, user_id, ip_address, user_agent,
+                           request_timestamp, response_time_ms, status_code,
+                           request_size_bytes, response_size_bytes)
+                    -- An org or user that no longer resolves is logged as NULL
+                    -- rather than failing the foreign key for the whole batch
+                    LEFT JOIN master.organizations o ON o.org_id = u.org_id
+                    LEFT JOIN master.org_users ou ON ou.user_id = u.user_id
+                """), {
+                    "org_ids": [_valid_uuid(e["org_id"]) for e in batch],
+                    "endpoints": [e["endpoint"] for e in batch],
+                    "methods": [e["method"] for e in batch],
+                    "user_ids": [e["user_id"] for e in batch],
+                    "ip_addresses": [_valid_ip(e["ip_address"]) for e in batch],
+                    "user_agents": [e["user_agent"] for e in batch],
+                    "request_timestamps": [e["request_timestamp"] for e in batch],
+                    "response_times": [e["response_time_ms"] for e in batch],
+                    "status_codes": [e["status_code"] for e in batch],
+                    "request_sizes": [e["request_size_bytes"] for e in batch],
+                    "response_sizes": [e["response_size_bytes"] for e in batch]
+                })
+                db.commit()
+                written += len(batch)
+                self.written += len(batch)
+            except Exception as e:
+                # Typically a missing partition; the batch is dropped, not retried forever
+                db.rollback()
+                self.failed_batches += 1
+                self.dropped += len(batch)
+                logger.error(f"API usage flush of {len(batch)} entries failed: {str(e)}")
+                return written
+            finally:
+                db.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"API usage flusher failed: {str(e)}")
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="api_usage_flush")
+
+    async def stop(self):
+        """Stop the flusher and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.enabled:
+            await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, int]:
+        return {"buffered": len(self._buffer), "recorded": self.recorded, "written": self.written,
+                "dropped": self.dropped, "failed_batches": self.failed_batches}
+
+
+api_usage_recorder = ApiUsageRecorder(
+    enabled=settings.API_USAGE_LOG_ENABLED,
+    buffer_size=settings.API_USAGE_BUFFER_SIZE,
+    flush_interval_ms=settings.API_USAGE_FLUSH_INTERVAL_MS,
+    batch_size=settings.API_USAGE_FLUSH_BATCH_SIZE
+)
+
+
+class ApiUsageMiddleware:
+    """
+    Pure ASGI middleware: counts body bytes as they stream through and
+    records one entry when the response is done. Nothing touches the
+    database on the request path.
+    """
+
+    def __init__(self, app, recorder: ApiUsageRecorder = api_usage_recorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.enabled or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_timestamp = datetime.now(timezone.utc)
+        counts = {"status": 500, "request_bytes": 0, "response_bytes": 0}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                counts["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                counts["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                counts["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            # FastAPI routes set scope["route"]; keep the template, not the concrete path
+            route = scope.get("route")
+            state = scope.get("state") or {}
+            headers = dict(scope.get("headers") or [])
+            client = scope.get("client")
+            self.recorder.record({
+                "org_id": state.get("org_id"),
+                "user_id": state.get("user_id"),
+                "endpoint": getattr(route, "path", None) or UNMATCHED_ENDPOINT,
+                "method": scope["method"],
+                "ip_address": client[0] if client else None,
+                "user_agent": headers.get(b"user-agent", b"").decode("latin-1")[:500] or None,
+                "request_timestamp": request_timestamp,
+                "response_time_ms": int((time.perf_counter() - started) * 1000),
+                "status_code": counts["status"],
+                "request_size_bytes": counts["request_bytes"],
+                "response_size_bytes": counts["response_bytes"]
+            })
@@ -0,0 +1,333 @@
+"""
+Audit log writer
+Business events (orders, payments, stock adjustments, write-offs, returns)
+for system_config.audit_logs, recorded without adding work to the request:
+routes enqueue an event after their commit, and a background task writes
+the queue every AUDIT_FLUSH_INTERVAL_MS, one transaction per org.
+
+Entries of an org form a hash chain: current_audit_hash is the SHA-256 of
+the entry's fields plus previous_audit_hash. The chain is extended by a
+single writer per org at a time (an advisory lock taken by the flush), so
+the head is read once per batch rather than once per event, and workers
+in other processes append to the same chain. compute_audit_hash() is what
+app.jobs.audit_chain_verifier recomputes.
+
+Failed batches are retried up to AUDIT_MAX_ATTEMPTS times before the
+events are logged and given up on.
+"""
+from typing import Any, Dict, List, Optional
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Fields covered by current_audit_hash, besides previous_audit_hash
+HASHED_FIELDS = (
+    "org_id", "activity_timestamp", "activity_type", "entity_type", "entity_id",
+    "action_performed", "old_values", "new_values", "user_id", "result_status"
+)
+
+
+def _json_safe(values: Optional[Dict[str, Any]]) -> Optional[Any]:
+    """Values as they will read back from JSONB (Decimals and dates become strings)"""
+    if values is None:
+        return None
+    return json.loads(json.dumps(values, default=str))
+
+
+def compute_audit_hash(previous_hash: Optional[str], entry: Dict[str, Any]) -> str:
+    """Chain hash of one entry; entry holds HASHED_FIELDS as stored"""
+    payload = {name: entry.get(name) for name in HASHED_FIELDS}
+    timestamp = payload["activity_timestamp"]
+    if isinstance(timestamp, datetime):
+        payload["activity_timestamp"] = timestamp.astimezone(timezone.utc).isoformat(timespec="microseconds")
+    payload["org_id"] = str(payload["org_id"]).lower()  # as a UUID column reads back
+    payload["previous_audit_hash"] = previous_hash or ""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class AuditEvent:
+    org_id: str
+    entity_type: str
+    entity_id: Optional[str]
+    action_performed: str
+    activity_type: str = "create"
+    entity_name: Optional[str] = None
+    old_values: Optional[Any] = None
+    new_values: Optional[Any] = None
+    user_id: Optional[int] = None
+    user_name: str = "system"
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    request_method: Optional[str] = None
+    request_url: Optional[str] = None
+    module_name: Optional[str] = None
+    result_status: str = "success"
+    execution_time_ms: Optional[int] = None
+    activity_timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    attempts: int = 0
+
+    def hashed_fields(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in HASHED_FIELDS}
+
+
+class AuditLogWriter:
+    """In-process audit queue and its batched, hash-chaining flusher"""
+
+    def __init__(self, enabled: bool, max_queue: int, flush_interval_ms: int,
+                 batch_size: int, max_attempts: int):
+        self.enabled = enabled
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._queue: deque = deque()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def record(
+        self,
+        org_id: Any,
+        entity_type: str,
+        entity_id: Any,
+        action: str,
+        activity_type: str = "create",
+        entity_name: Optional[str] = None,
+        old_values: Optional[Dict[str, Any]] = None,
+        new_values: Optional[Dict[str, Any]] = None,
+        request: Any = None,
+        started: Optional[float] = None,
+        result_status: str = "success"
+    ):
+        """
+        Enqueue one event; call after the change is committed.
+        request supplies the user (tagged by the auth dependencies) and
+        request details; started is a time.perf_counter() reading taken
+        when the handler began.
+        """
+        if not self.enabled:
+            return
+        event = AuditEvent(
+            org_id=str(org_id).lower(),
+            entity_type=entity_type,
+            entity_id=None if entity_id is None else str(entity_id),
+            action_performed=action,
+            activity_type=activity_type,
+            entity_name=entity_name,
+            old_values=_json_safe(old_values),
+            new_values=_json_safe(new_values),
+            result_status=result_status,
+            execution_time_ms=int((time.perf_counter() - started) * 1000) if started is not None else None
+        )
+        if request is not None:
+            state = request.state
+            event.user_id = getattr(state, "user_id", None)
+            event.user_name = getattr(state, "user_name", None) or (
+                f"user:{event.user_id}" if event.user_id is not None else "system"
+            )
+            event.ip_address = request.client.host if request.client else None
+            event.user_agent = request.headers.get("user-agent")
+            event.request_method = request.method
+            event.request_url = request.url.path
+            route = request.scope.get("route")
+            event.module_name = getattr(getattr(route, "endpoint", None), "__module__", None)
+
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            logger.error(f"Audit queue full, dropped {entity_type} {entity_id} {action}")
+            return
+        self._queue.append(event)
+
+    def _drain(self) -> List[AuditEvent]:
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def _write_org(self, org_id: str, events: List[AuditEvent]):
+        """Extend one org's chain with events, in one transaction"""
+        db = SessionLocal()
+        try:
+            # Serialises chain extension per org across processes
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"audit_chain:{org_id}"})
+            previous = db.execute(text("""
+                SELECT current_audit_hash
+                FROM system_config.audit_logs
+                WHERE org_id = :org_id AND current_audit_hash IS NOT NULL
+                ORDER BY audit_id DESC
+                LIMIT 1
+            """), {"org_id": org_id}).scalar()
+
+            previous_hashes = []
+            current_hashes = []
+            for event in events:
+                current = compute_audit_hash(previous, event.hashed_fields())
+                previous_hashes.append(previous)
+                current_hashes.append(current)
+                previous = current
+
+            db.execute(text("""
+                INSERT INTO system_config.audit_logs (
+                    org_id, activity_timestamp, activity_type,
+                    entity_type, entity_id, entity_name,
+                    action_performed, old_values, new_values,
+                    user_id, user_name,
+                    ip_address, user_agent, request_method, request_url,
+                    module_name, result_status, execution_time_ms,
+                    previous_audit_hash, current_audit_hash
+                )
+                SELECT
+                    :org_id, e.activity_timestamp, e.activity_type,
+                    e.entity_type, e.entity_id, e.entity_name,
+                    e.action_performed, CAST(e.old_values AS JSONB), CAST(e.new_values AS JSONB),
+                    e.user_id, e.user_name,
+                    e.ip_address, e.user_agent, e.request_method, e.request_url,
+                    e.module_name, e.result_status, e.execution_time_ms,
+                    e.previous_audit_hash, e.current_audit_hash
+                FROM unnest(
+                    CAST(:timestamps AS TIMESTAMPTZ[]),
+                    CAST(:activity_types AS TEXT[]),
+                    CAST(:entity_types AS TEXT[]),
+                    CAST(:entity_ids AS TEXT[]),
+                    CAST(:entity_names AS TEXT[]),
+                    CAST(:actions AS TEXT[]),
+                    CAST(:old_values AS TEXT[]),
+                    CAST(:new_values AS TEXT[]),
+                    CAST(:user_ids AS INTEGER[]),
+                    CAST(:user_names AS TEXT[]),
+                    CAST(:ip_addresses AS INET[]),
+                    CAST(:user_agents AS TEXT[]),
+                    CAST(:request_methods AS TEXT[]),
+                    CAST(:request_urls AS TEXT[]),
+                    CAST(:module_names AS TEXT[]),
+                    CAST(:result_statuses AS TEXT[]),
+                    CAST(:execution_times AS INTEGER[]),
+                    CAST(:previous_hashes AS TEXT[]),
+                    CAST(:current_hashes AS TEXT[])
+                ) WITH ORDINALITY AS e(
+                    activity_timestamp, activity_type, entity_type, entity_id, entity_name,
+                    action_performed, old_values, new_values, user_id, user_name,
+                    ip_address, user_agent, request_method, request_url,
+                    module_name, result_status, execution_time_ms,
+                    previous_audit_hash, current_audit_hash, position
+                )
+                ORDER BY e.position
+            """), {
+                "org_id": org_id,
+                "timestamps": [e.activity_timestamp for e in events],
+                "activity_types": [e.activity_type for e in events],
+                "entity_types": [e.entity_type for e in events],
+                "entity_ids": [e.entity_id for e in events],
+                "entity_names": [e.entity_name for e in events],
+                "actions": [e.action_performed for e in events],
+                "old_values": [None if e.old_values is None else json.dumps(e.old_values) for e in events],
+                "new_values": [None if e.new_values is None else json.dumps(e.new_values) for e in events],
+                "user_ids": [e.user_id for e in events],
+                "user_names": [e.user_name for e in events],
+                "ip_addresses": [e.ip_address for e in events],
+                "user_agents": [e.user_agent for e in events],
+                "request_methods": [e.request_method for e in events],
+                "request_urls": [e.request_url for e in events],
+                "module_names": [e.module_name for e in events],
+                "result_statuses": [e.result_status for e in events],
+                "execution_times": [e.execution_time_ms for e in events],
+                "previous_hashes": previous_hashes,
+                "current_hashes": current_hashes
+            })
+            db.commit()
+            self.written += len(events)
+        except Exception as e:
+            db.rollback()
+            self.failed_batches += 1
+            retry = []
+            for event in events:
+                event.attempts += 1
+                if event.attempts < self.max_attempts:
+                    retry.append(event)
+                else:
+                    self.dropped += 1
+                    logger.error(f"Audit event given up after {event.attempts} attempts: "
+                                 f"{json.dumps(event.__dict__, default=str)}")
+            # Back at the front, in order, for the next flush
+            self._queue.extendleft(reversed(retry))
+            logger.error(f"Audit flush of {len(events)} events for org {org_id} failed: {str(e)}")
+            raise
+        finally:
+            db.close()
+
+    def flush(self) -> int:
+        """Write what is queued now; blocking, run off the event loop"""
+        with self._flush_lock:
+            written = 0
+            pending = len(self._queue)
+            while pending > 0:
+                batch = self._drain()
+                if not batch:
+                    break
+                pending -= len(batch)
+                by_org: Dict[str, List[AuditEvent]] = {}
+                for event in batch:
+                    by_org.setdefault(event.org_id, []).append(event)
+                for org_id, events in by_org.items():
+                    try:
+                        self._write_org(org_id, events)
+                        written += len(events)
+                    except Exception:
+                        continue  # requeued; other orgs still get written
+            return written
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Audit flusher failed: {str(e)}")
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="audit_flush")
+
+    async def stop(self):
+        """Stop the flusher and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.enabled:
+            await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": len(self._queue), "written": self.written,
+                "dropped": self.dropped, "failed_batches": self.failed_batches}
+
+
+audit_log = AuditLogWriter(
+    enabled=settings.AUDIT_LOG_ENABLED,
+    max_queue=settings.AUDIT_QUEUE_SIZE,
+    flush_interval_ms=settings.AUDIT_FLUSH_INTERVAL_MS,
+    batch_size=settings.AUDIT_FLUSH_BATCH_SIZE,
+    max_attempts=settings.AUDIT_MAX_ATTEMPTS
+)
@@ -1,19 +1,9 @@
 """
 Authentication utilities
 """
-from fastapi import Depends, HTTPException, status
-from .jwt_auth import oauth2_scheme, jwt, SECRET_KEY, ALGORITHM
+from fastapi import Depends
+from .request_context import RequestContext, get_request_context
 
-from .config import DEFAULT_ORG_ID
-async def get_current_org(token: str = Depends(oauth2_scheme)) -> str:
-    """Get current organization ID from token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        org_id = payload.get("org_id")
-        if not org_id:
-            # Return default org ID for testing
-            return DEFAULT_ORG_ID
-        return org_id
-    except:
-        # Return default org ID for testing
-        return DEFAULT_ORG_ID
\ No newline at end of file
+async def get_current_org(context: RequestContext = Depends(get_request_context)) -> RequestContext:
+    """Get current organization context from token (default org when absent or invalid)"""
+    return context
@@ -49,6 +49,103 @@ class Settings:
     DEFAULT_PAGE_SIZE: int = 50
     MAX_PAGE_SIZE: int = 100
 
+    # Opt-in orjson encoding for large list endpoints (app.core.fast_json)
+    FAST_JSON_RESPONSES: bool = os.environ.get("FAST_JSON_RESPONSES", "False").lower() == "true"
+
+    # Response compression and ETags for list and report endpoints
+    GZIP_ENABLED: bool = os.environ.get("GZIP_ENABLED", "True").lower() == "true"
+    GZIP_MINIMUM_SIZE: int = int(os.environ.get("GZIP_MINIMUM_SIZE", 1024))  # bytes; smaller bodies go as is
+    GZIP_COMPRESS_LEVEL: int = int(os.environ.get("GZIP_COMPRESS_LEVEL", 6))
+    DATA_VERSION_COMPACT_INTERVAL_MINUTES: int = int(os.environ.get("DATA_VERSION_COMPACT_INTERVAL_MINUTES", 1440))
+
+    # Delta sync feed for offline POS and mobile clients (/sync/{entity})
+    SYNC_PAGE_SIZE: int = int(os.environ.get("SYNC_PAGE_SIZE", 500))  # rows per page by default
+    SYNC_MAX_PAGE_SIZE: int = int(os.environ.get("SYNC_MAX_PAGE_SIZE", 5000))
+    SYNC_TOKEN_RETENTION_DAYS: int = int(os.environ.get("SYNC_TOKEN_RETENTION_DAYS", 30))  # older tokens resync in full
+    SYNC_TOMBSTONE_PRUNE_INTERVAL_MINUTES: int = int(os.environ.get("SYNC_TOMBSTONE_PRUNE_INTERVAL_MINUTES", 1440))
+    
+    # Background job settings
+    SCHEDULER_ENABLED: bool = os.environ.get("SCHEDULER_ENABLED", "True").lower() == "true"
+    EXPIRY_SWEEP_INTERVAL_MINUTES: int = int(os.environ.get("EXPIRY_SWEEP_INTERVAL_MINUTES", 360))
+    EXPIRY_SWEEP_CHUNK_SIZE: int = int(os.environ.get("EXPIRY_SWEEP_CHUNK_SIZE", 500))
+    STOCK_SUMMARY_RECONCILE_INTERVAL_MINUTES: int = int(os.environ.get("STOCK_SUMMARY_RECONCILE_INTERVAL_MINUTES", 1440))
+    RESERVATION_EXPIRY_INTERVAL_MINUTES: int = int(os.environ.get("RESERVATION_EXPIRY_INTERVAL_MINUTES", 15))
+
+    # Stock reservation settings
+    RESERVATION_TTL_HOURS: int = int(os.environ.get("RESERVATION_TTL_HOURS", 48))  # 0 = never expire
+
+    # Order placement: "python" runs the pipeline from the service layer,
+    # "procedure" makes one api.place_order() call
+    ORDER_EXECUTION_MODE: str = os.environ.get("ORDER_EXECUTION_MODE", "python").lower()
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", 12))  # changing it rehashes on next login
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get("PASSWORD_HASH_WORKERS", 4))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 64))
+
+    # Token claims and org profile caches (per process)
+    TOKEN_CACHE_SIZE: int = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+    TOKEN_CACHE_MAX_TTL: int = int(os.environ.get("TOKEN_CACHE_MAX_TTL", 3600))  # seconds, capped by exp
+    ORG_PROFILE_CACHE_SIZE: int = int(os.environ.get("ORG_PROFILE_CACHE_SIZE", 1000))
+    ORG_PROFILE_CACHE_TTL: int = int(os.environ.get("ORG_PROFILE_CACHE_TTL", 300))  # seconds
+
+    # GST party profile cache (per process)
+    GST_PROFILE_CACHE_SIZE: int = int(os.environ.get("GST_PROFILE_CACHE_SIZE", 10000))
+    GST_PROFILE_CACHE_TTL: int = int(os.environ.get("GST_PROFILE_CACHE_TTL", 3600))  # seconds
+
+    # Printable document renders
+    RENDER_WORKERS: int = int(os.environ.get("RENDER_WORKERS", 2))  # 0 = render on first print only
+    RENDER_BLOB_RETENTION_HOURS: int = int(os.environ.get("RENDER_BLOB_RETENTION_HOURS", 168))
+    RENDER_GC_INTERVAL_MINUTES: int = int(os.environ.get("RENDER_GC_INTERVAL_MINUTES", 1440))
+
+    # Bulk invoice exports
+    EXPORT_DIR: str = os.environ.get("EXPORT_DIR", "/tmp/pharma_exports")
+    EXPORT_WORKERS: int = int(os.environ.get("EXPORT_WORKERS", 4))
+    EXPORT_CHUNK_SIZE: int = int(os.environ.get("EXPORT_CHUNK_SIZE", 200))
+
+    # Bulk challan invoicing
+    CHALLAN_INVOICING_CHUNK_SIZE: int = int(os.environ.get("CHALLAN_INVOICING_CHUNK_SIZE", 50))  # customers
+
+    # Outbound messages (app.api.services.message_sender)
+    MESSAGE_SEND_CONCURRENCY: int = int(os.environ.get("MESSAGE_SEND_CONCURRENCY", 50))  # messages in flight
+    MESSAGE_HTTP_MAX_CONNECTIONS: int = int(os.environ.get("MESSAGE_HTTP_MAX_CONNECTIONS", 100))
+    MESSAGE_HTTP_TIMEOUT_SECONDS: float = float(os.environ.get("MESSAGE_HTTP_TIMEOUT_SECONDS", 10))
+    MESSAGE_MAX_ATTEMPTS: int = int(os.environ.get("MESSAGE_MAX_ATTEMPTS", 4))
+    MESSAGE_RETRY_BASE_MS: int = int(os.environ.get("MESSAGE_RETRY_BASE_MS", 500))  # doubled per attempt
+    MESSAGE_RETRY_MAX_MS: int = int(os.environ.get("MESSAGE_RETRY_MAX_MS", 30000))
+    # messages/second per provider, "provider=rate[:burst]"; 0 or missing = unlimited
+    MESSAGE_RATE_LIMITS: str = os.environ.get(
+        "MESSAGE_RATE_LIMITS", "twilio=10,msg91=50,wati=20,smtp=5,ses=14"
+    )
+    MESSAGING_STUB_URL: str = os.environ.get("MESSAGING_STUB_URL", "http://127.0.0.1:8025")  # *_PROVIDER=stub
+
+    # Outbound message queue (system_config.outbound_messages)
+    OUTBOUND_QUEUE_WORKERS: int = int(os.environ.get("OUTBOUND_QUEUE_WORKERS", 2))  # in-process; 0 = run app.jobs.outbound_queue_worker separately
+    OUTBOUND_QUEUE_BATCH_SIZE: int = int(os.environ.get("OUTBOUND_QUEUE_BATCH_SIZE", 100))  # messages per claim
+    OUTBOUND_QUEUE_POLL_INTERVAL_MS: int = int(os.environ.get("OUTBOUND_QUEUE_POLL_INTERVAL_MS", 1000))  # when idle
+    OUTBOUND_QUEUE_LEASE_SECONDS: int = int(os.environ.get("OUTBOUND_QUEUE_LEASE_SECONDS", 300))
+    OUTBOUND_QUEUE_MAX_ATTEMPTS: int = int(os.environ.get("OUTBOUND_QUEUE_MAX_ATTEMPTS", 8))  # then dead-lettered
+    OUTBOUND_QUEUE_RETRY_BASE_SECONDS: int = int(os.environ.get("OUTBOUND_QUEUE_RETRY_BASE_SECONDS", 30))  # doubled per attempt
+    OUTBOUND_QUEUE_RETRY_MAX_SECONDS: int = int(os.environ.get("OUTBOUND_QUEUE_RETRY_MAX_SECONDS", 3600))
+    OUTBOUND_QUEUE_RETENTION_DAYS: int = int(os.environ.get("OUTBOUND_QUEUE_RETENTION_DAYS", 30))  # sent messages
+    OUTBOUND_QUEUE_PURGE_INTERVAL_MINUTES: int = int(os.environ.get("OUTBOUND_QUEUE_PURGE_INTERVAL_MINUTES", 1440))
+
+    # API usage logging (system_config.api_usage_log)
+    API_USAGE_LOG_ENABLED: bool = os.environ.get("API_USAGE_LOG_ENABLED", "True").lower() == "true"
+    API_USAGE_FLUSH_INTERVAL_MS: int = int(os.environ.get("API_USAGE_FLUSH_INTERVAL_MS", 2000))
+    API_USAGE_BUFFER_SIZE: int = int(os.environ.get("API_USAGE_BUFFER_SIZE", 50000))  # entries
+    API_USAGE_FLUSH_BATCH_SIZE: int = int(os.environ.get("API_USAGE_FLUSH_BATCH_SIZE", 5000))  # rows per insert
+    API_USAGE_RETENTION_MONTHS: int = int(os.environ.get("API_USAGE_RETENTION_MONTHS", 6))
+    API_USAGE_PARTITION_MONTHS_AHEAD: int = int(os.environ.get("API_USAGE_PARTITION_MONTHS_AHEAD", 2))
+    API_USAGE_PARTITION_INTERVAL_MINUTES: int = int(os.environ.get("API_USAGE_PARTITION_INTERVAL_MINUTES", 1440))
+
+    # Audit trail (system_config.audit_logs)
+    AUDIT_LOG_ENABLED: bool = os.environ.get("AUDIT_LOG_ENABLED", "True").lower() == "true"
+    AUDIT_FLUSH_INTERVAL_MS: int = int(os.environ.get("AUDIT_FLUSH_INTERVAL_MS", 1000))
+    AUDIT_QUEUE_SIZE: int = int(os.environ.get("AUDIT_QUEUE_SIZE", 100000))  # events
+    AUDIT_FLUSH_BATCH_SIZE: int = int(os.environ.get("AUDIT_FLUSH_BATCH_SIZE", 1000))  # events per flush round
+    AUDIT_MAX_ATTEMPTS: int = int(os.environ.get("AUDIT_MAX_ATTEMPTS", 5))
+
 
 settings = Settings()
 
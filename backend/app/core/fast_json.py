@@ -0,0 +1,124 @@
+"""
+Fast JSON responses
+Large list endpoints otherwise build a dict per row, run it through
+jsonable_encoder and (with a response_model) validate every row with
+pydantic before serializing. Routes that opt in send trusted query rows
+straight to JSON bytes instead: orjson when it is installed, the stdlib
+encoder otherwise. No response_model validation happens on this path,
+so use it only for rows the route's own SQL produced.
+
+Encoded values match what FastAPI would have sent: Decimals become ints
+or floats like jsonable_encoder does, or strings (with UTC as "Z") for
+endpoints whose response_model is a pydantic model.
+
+The fast path is off by default; FAST_JSON_RESPONSES=true turns it on.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Type
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from uuid import UUID
+import json
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from .config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _decimal_number(value: Decimal):
+    # Same rule as fastapi.encoders.decimal_encoder
+    return int(value) if value.as_tuple().exponent >= 0 else float(value)
+
+
+def _number_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return _decimal_number(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _string_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    return _number_default(value)
+
+
+def _stdlib_default(decimal_default, utc_z: bool):
+    def default(value: Any) -> Any:
+        if isinstance(value, (datetime, date, time)):
+            encoded = value.isoformat()
+            if utc_z and encoded.endswith("+00:00"):
+                encoded = encoded[:-6] + "Z"
+            return encoded
+        if isinstance(value, UUID):
+            return str(value)
+        return decimal_default(value)
+    return default
+
+
+def dumps(payload: Any, like_model: bool = False) -> bytes:
+    """
+    JSON bytes of payload. like_model encodes Decimals as strings and UTC
+    datetimes with "Z", as a pydantic response_model serializes them.
+    """
+    decimal_default = _string_default if like_model else _number_default
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS | (orjson.OPT_UTC_Z if like_model else 0)
+        return orjson.dumps(payload, default=decimal_default, option=options)
+    return json.dumps(
+        payload, default=_stdlib_default(decimal_default, like_model), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def rows_as_dicts(result: Iterable) -> List[Dict[str, Any]]:
+    """Rows of a text() query as plain dicts, without a RowMapping per row"""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+@lru_cache(maxsize=None)
+def _model_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    return {
+        name: None if field.is_required() else field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+    }
+
+
+def project(row: Dict[str, Any], model: Type[BaseModel]) -> Dict[str, Any]:
+    """The fields of model taken from row (model defaults for missing ones), unvalidated"""
+    return {name: row.get(name, default) for name, default in _model_defaults(model).items()}
+
+
+def fast_json_response(
+    payload: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    like_model: bool = False
+) -> Response:
+    return Response(
+        content=dumps(payload, like_model=like_model),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers
+    )
+
+
+def fast_json(payload: Any, like_model: bool = False) -> Any:
+    """
+    For a route that opts in: the encoded response, or payload unchanged
+    (FastAPI's standard path) when FAST_JSON_RESPONSES is off
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return payload
+    return fast_json_response(payload, like_model=like_model)
@@ -0,0 +1,85 @@
+"""
+HTTP conditional responses
+Strong ETags over pre-serialized bodies. A request whose If-None-Match
+matches the current ETag is answered with 304 and no body, so callers can
+check the tag before loading or sending the content.
+
+For list and report endpoints the tag comes from data_version_etag(): the
+change counters of the tables the response reads (system_config.data_versions,
+bumped by statement triggers) plus the request parameters. Reading the
+counters is one index lookup, done before the main query; since the
+counters commit with the data, a tag never runs ahead of the body it is
+sent with.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import json
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..version import VERSION
+
+# Clients may keep a copy but must revalidate on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(token: str) -> str:
+    return f'"{token}"'
+
+
+def parse_if_none_match(header: Optional[str]) -> List[str]:
+    """Bare entity tags from an If-None-Match header ("*" is kept as is)"""
+    if not header:
+        return []
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag:
+            tags.append(tag)
+    return tags
+
+
+def etag_matches(known_tags: List[str], token: str) -> bool:
+    return "*" in known_tags or token in known_tags
+
+
+def not_modified(token: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": make_etag(token), "Cache-Control": CACHE_CONTROL, **(headers or {})}
+    )
+
+
+def json_response(body: bytes, token: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Send an already-encoded JSON body with its ETag"""
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": make_etag(token), "Cache-Control": CACHE_CONTROL, **(headers or {})}
+    )
+
+
+def data_version_etag(db: Session, name: str, resources: Sequence[str], **params: Any) -> str:
+    """
+    ETag token for response name built from the tables behind resources
+    (see the trigger_data_version_* triggers) with the given parameters
+    """
+    rows = db.execute(text("""
+        SELECT resource, SUM(version) AS version
+        FROM system_config.data_versions
+        WHERE resource = ANY(:resources)
+        GROUP BY resource
+    """), {"resources": list(resources)}).fetchall()
+    versions = {row.resource: int(row.version) for row in rows}
+    key = json.dumps({
+        "name": name,
+        "app": VERSION,  # a new release may change the body for the same data
+        "versions": [versions.get(resource, 0) for resource in sorted(resources)],
+        "params": params
+    }, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
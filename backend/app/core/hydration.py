@@ -0,0 +1,74 @@
+"""
+List hydration helpers
+Load the children of a page of parent documents in one query instead of one
+query per parent. Child queries take the page's keys as `:ids` and filter
+with `= ANY(:ids)`; rows are grouped in Python and attached to the parents.
+"""
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+
+def load_children(
+    db: Session,
+    query: str,
+    ids: List[Any],
+    key: str,
+    params: Optional[Dict[str, Any]] = None
+) -> Dict[Any, List[Dict[str, Any]]]:
+    """
+    Run a child query once for all `ids` and group its rows by `key`.
+    The query must filter on `= ANY(:ids)` and select the `key` column.
+    """
+    ids = list(dict.fromkeys(i for i in ids if i is not None))
+    if not ids:
+        return {}
+
+    grouped: Dict[Any, List[Dict[str, Any]]] = {}
+    for row in db.execute(text(query), {**(params or {}), "ids": ids}):
+        child = dict(row._mapping)
+        grouped.setdefault(child[key], []).append(child)
+    return grouped
+
+
+def load_values(
+    db: Session,
+    query: str,
+    ids: List[Any],
+    key: str,
+    value: str,
+    params: Optional[Dict[str, Any]] = None
+) -> Dict[Any, Any]:
+    """
+    Run a per-parent lookup or aggregate once for all `ids` and return
+    {key: value}. The query must filter on `= ANY(:ids)` and return at most
+    one row per key.
+    """
+    ids = list(dict.fromkeys(i for i in ids if i is not None))
+    if not ids:
+        return {}
+
+    result = db.execute(text(query), {**(params or {}), "ids": ids})
+    return {row._mapping[key]: row._mapping[value] for row in result}
+
+
+def hydrate(
+    db: Session,
+    parents: List[Dict[str, Any]],
+    query: str,
+    parent_key: str,
+    field: str = "items",
+    child_key: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Attach children to each parent dict under `field` (an empty list when
+    a parent has none). `child_key` defaults to `parent_key`.
+    """
+    children = load_children(
+        db, query, [parent[parent_key] for parent in parents],
+        child_key or parent_key, params
+    )
+    for parent in parents:
+        parent[field] = children.get(parent[parent_key], [])
+    return parents
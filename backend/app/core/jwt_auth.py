@@ -1,31 +1,48 @@
 """
 JWT Authentication utilities
+Decoded claims are cached per process by token digest until the token's
+exp, so a token is verified once rather than on every request.
 """
 import os
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 
+from .api_usage import tag_request
+from .cache import TTLCache
+from .config import settings
+
 # Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; hashes at any other cost are flagged for rehash
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v2/auth/token")
 
+# Verified claims by SHA-256 of the token
+_claims_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash"""
+    """Verify a password against a hash (blocking; async code uses core.passwords)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
+    """Hash a password (blocking; async code uses core.passwords)"""
     return pwd_context.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -39,7 +56,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user_and_org(token: str = Depends(oauth2_scheme)):
+def decode_token(token: str) -> Dict[str, Any]:
+    """Verify a token and return its claims; raises JWTError when invalid or expired"""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = _claims_cache.get(key)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        exp = claims.get("exp")
+        ttl = settings.TOKEN_CACHE_MAX_TTL if exp is None else min(exp - time.time(), settings.TOKEN_CACHE_MAX_TTL)
+        if ttl > 0:
+            _claims_cache.set(key, claims, ttl=ttl)
+    return claims
+
+async def get_current_user_and_org(request: Request, token: str = Depends(oauth2_scheme)):
     """Get current user and organization from token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,11 +76,12 @@ async def get_current_user_and_org(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         org_id: str = payload.get("org_id")
         if username is None:
             raise credentials_exception
+        tag_request(request, org_id, payload.get("user_id"), payload.get("email"))
         return {"username": username, "org_id": org_id}
     except JWTError:
         raise credentials_exception
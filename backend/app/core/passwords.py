@@ -0,0 +1,125 @@
+"""
+Password hashing off the event loop
+bcrypt is deliberately slow (~250 ms at cost 12), so hashing and
+verification run on a small dedicated thread pool (bcrypt releases the
+GIL) instead of inside async handlers. The pool is bounded: when more
+than PASSWORD_HASH_MAX_PENDING operations are waiting, new ones are
+refused with PasswordHasherBusy rather than queueing without limit.
+
+Hashes made with a different cost than BCRYPT_ROUNDS are flagged by
+verify_and_update() so login can store a fresh hash transparently.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+from .config import settings
+from .jwt_auth import pwd_context
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Too many hash operations waiting; the caller should retry later"""
+
+
+class PasswordHasher:
+    """Bounded pool for bcrypt work, with queue depth and timing metrics"""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0  # submitted, not finished (queued + running)
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_pending_seen = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Too many password operations in progress")
+            self.pending += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                wait_ms = (started - submitted) * 1000
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.pending -= 1
+                    self.completed += 1
+                    self.total_run_ms += (time.perf_counter() - started) * 1000
+
+        return self._get_executor().submit(run)
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(pwd_context.hash, password))
+
+    async def verify(self, password: str, password_hash: Optional[str]) -> bool:
+        if not password_hash:
+            return False
+        return await asyncio.wrap_future(self._submit(pwd_context.verify, password, password_hash))
+
+    async def verify_and_update(self, password: str, password_hash: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored hash uses an outdated cost"""
+        if not password_hash:
+            return False, None
+        return await asyncio.wrap_future(
+            self._submit(pwd_context.verify_and_update, password, password_hash)
+        )
+
+    def hash_blocking(self, password: str) -> str:
+        """For sync handlers (already on a worker thread): same pool, same bound"""
+        return self._submit(pwd_context.hash, password).result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "max_pending": self.max_pending,
+                "max_pending_seen": self.max_pending_seen,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_ms / done, 2),
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "avg_run_ms": round(self.total_run_ms / done, 2)
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
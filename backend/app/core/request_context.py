@@ -0,0 +1,149 @@
+"""
+Request context
+One dependency for "who is calling and for which org": the token is
+verified once per process (claims cached by jwt_auth.decode_token until
+exp) and the org's profile (state code, GSTIN, business settings) is
+served from a per-process cache instead of re-querying organizations.
+
+Org profiles are keyed by (org_id, version); organization_settings bumps
+the version on every update, which retires the cached profile in this
+process at once. Other workers pick the change up within
+ORG_PROFILE_CACHE_TTL.
+"""
+from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
+import threading
+
+from fastapi import Depends, Request
+from jose import JWTError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .api_usage import tag_request
+from .cache import TTLCache
+from .config import DEFAULT_ORG_ID, settings
+from .database import get_db
+from .jwt_auth import _claims_cache, decode_token, oauth2_scheme
+
+_org_profiles = TTLCache(maxsize=settings.ORG_PROFILE_CACHE_SIZE, ttl=settings.ORG_PROFILE_CACHE_TTL)
+_org_versions: Dict[str, int] = {}
+_versions_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class OrgProfile:
+    """The organization fields most routes need"""
+    org_id: str
+    org_name: Optional[str]
+    gst_number: Optional[str]
+    state_code: Optional[str]
+    business_settings: Dict[str, Any]
+    version: int
+
+
+def _load_org_profile(db: Session, org_id: str, version: int) -> Optional[OrgProfile]:
+    row = db.execute(text("""
+        SELECT org_name, gst_number, gst_state_code, business_settings
+        FROM parties.organizations
+        WHERE org_id = :org_id
+    """), {"org_id": org_id}).first()
+    if not row:
+        return None
+    business_settings = row.business_settings or {}
+    state_code = (
+        row.gst_state_code
+        or (row.gst_number[:2] if row.gst_number else None)
+        or business_settings.get("state_code")
+    )
+    return OrgProfile(
+        org_id=org_id,
+        org_name=row.org_name,
+        gst_number=row.gst_number,
+        state_code=state_code,
+        business_settings=business_settings,
+        version=version
+    )
+
+
+def get_org_profile(db: Session, org_id: Any) -> Optional[OrgProfile]:
+    """Cached profile of an organization; None when it does not exist"""
+    org_id = str(org_id)
+    version = _org_versions.get(org_id, 0)
+    return _org_profiles.get_or_load(
+        (org_id, version),
+        lambda: _load_org_profile(db, org_id, version)
+    )
+
+
+def bump_org_version(org_id: Any) -> int:
+    """Retire the cached profile of an org after its row changed"""
+    org_id = str(org_id)
+    with _versions_lock:
+        version = _org_versions.get(org_id, 0) + 1
+        _org_versions[org_id] = version
+    _org_profiles.invalidate_where(lambda key: key[0] == org_id)
+    return version
+
+
+@dataclass
+class RequestContext:
+    """
+    Caller and org of the current request. Supports current_org["org_id"]
+    and current_org.get(...) like the dicts the org dependencies returned.
+    """
+    org_id: str
+    claims: Dict[str, Any] = field(default_factory=dict)
+    user_id: Optional[int] = None
+    user_name: Optional[str] = None
+    role: Optional[str] = None
+    authenticated: bool = False
+    db: Optional[Session] = field(default=None, repr=False)
+    _org: Any = field(default=None, repr=False)
+
+    @property
+    def org(self) -> Optional[OrgProfile]:
+        """Org profile, loaded from the cache on first use"""
+        if self._org is None and self.db is not None:
+            self._org = get_org_profile(self.db, self.org_id)
+        return self._org
+
+    def __getitem__(self, key: str) -> Any:
+        if key.startswith("_") or not hasattr(self, key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Unset fields read as missing, as they did in the old dicts
+        value = getattr(self, key, None) if not key.startswith("_") else None
+        return default if value is None else value
+
+
+async def get_request_context(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> RequestContext:
+    """Resolve the caller from the bearer token; invalid tokens fall back to the default org"""
+    claims: Dict[str, Any] = {}
+    if token:
+        try:
+            claims = decode_token(token)
+        except JWTError:
+            claims = {}
+
+    user_id = claims.get("user_id")
+    context = RequestContext(
+        org_id=str(claims.get("org_id") or DEFAULT_ORG_ID),
+        claims=claims,
+        user_id=int(user_id) if user_id is not None and str(user_id).isdigit() else None,
+        user_name=claims.get("email") or claims.get("sub"),
+        role=claims.get("role"),
+        authenticated=bool(claims),
+        db=db
+    )
+    tag_request(request, context.org_id, context.user_id, context.user_name)
+    return context
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {"claims": _claims_cache.stats(), "org_profiles": _org_profiles.stats()}
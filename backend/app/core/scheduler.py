@@ -0,0 +1,67 @@
+"""
+In-process periodic job scheduler
+Started and stopped from the FastAPI lifespan
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PeriodicJob:
+    """A blocking callable run every `interval_seconds` in a worker thread"""
+    name: str
+    func: Callable[[], object]
+    interval_seconds: float
+    initial_delay: float = 0
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class JobScheduler:
+    """Runs registered jobs on the event loop without blocking requests"""
+
+    def __init__(self):
+        self._jobs: Dict[str, PeriodicJob] = {}
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], object],
+        interval_seconds: float,
+        initial_delay: float = 0
+    ):
+        """Register a job; re-registering a name replaces it"""
+        self._jobs[name] = PeriodicJob(name, func, interval_seconds, initial_delay)
+
+    async def _run(self, job: PeriodicJob):
+        await asyncio.sleep(job.initial_delay)
+        while True:
+            try:
+                await asyncio.to_thread(job.func)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduled job {job.name} failed: {str(e)}")
+            await asyncio.sleep(job.interval_seconds)
+
+    def start(self):
+        """Start all registered jobs on the running loop"""
+        for job in self._jobs.values():
+            if job.task is None or job.task.done():
+                job.task = asyncio.create_task(self._run(job), name=f"job:{job.name}")
+                logger.info(f"Scheduled job {job.name} every {job.interval_seconds}s")
+
+    async def stop(self):
+        """Cancel running jobs and wait for them to exit"""
+        tasks = [job.task for job in self._jobs.values() if job.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            job.task = None
+
+
+scheduler = JobScheduler()
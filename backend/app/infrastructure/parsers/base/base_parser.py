@@ -3,7 +3,6 @@ Base invoice parser class
 """
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
-import pdfplumber
 import re
 from datetime import datetime, timedelta
 import logging
@@ -43,6 +42,8 @@ class BaseInvoiceParser(ABC):
     
     def parse(self, pdf_path: str) -> Dict[str, Any]:
         """Main parsing method"""
+        import pdfplumber  # heavy; loaded on the first parse, not at startup
+
         try:
             with pdfplumber.open(pdf_path) as pdf:
                 # Extract text and tables from all pages
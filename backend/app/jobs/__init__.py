@@ -0,0 +1,4 @@
+"""
+Background jobs
+Each job can run from the lifespan scheduler or as `python -m app.jobs.<name>`
+"""
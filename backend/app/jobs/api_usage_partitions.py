@@ -0,0 +1,62 @@
+"""
+API usage log partition maintenance
+Creates the monthly partitions of system_config.api_usage_log ahead of
+time and drops the ones past retention, so the usage flusher never hits
+a missing partition and the log does not grow without bound.
+
+Usage:
+    python -m app.jobs.api_usage_partitions [--months-ahead N] [--retention-months N]
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+import argparse
+import json
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def run_api_usage_partition_maintenance(
+    months_ahead: Optional[int] = None,
+    retention_months: Optional[int] = None
+) -> Dict[str, Any]:
+    """Create upcoming api_usage_log partitions and drop expired ones"""
+    months_ahead = settings.API_USAGE_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    retention_months = settings.API_USAGE_RETENTION_MONTHS if retention_months is None else retention_months
+    db = SessionLocal()
+    try:
+        changes = db.execute(text("""
+            SELECT partition_name, change
+            FROM system_config.maintain_api_usage_partitions(:months_ahead, :retention_months)
+        """), {"months_ahead": months_ahead, "retention_months": retention_months}).fetchall()
+        db.commit()
+
+        created = [row.partition_name for row in changes if row.change == "created"]
+        dropped = [row.partition_name for row in changes if row.change == "dropped"]
+        if created or dropped:
+            logger.info(f"API usage partitions: created {created}, dropped {dropped}")
+        return {"status": "completed", "created": created, "dropped": dropped}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"API usage partition maintenance failed: {str(e)}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the monthly partitions of the API usage log")
+    parser.add_argument("--months-ahead", type=int, help="Months to create beyond the current one")
+    parser.add_argument("--retention-months", type=int, help="Months of history to keep")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_api_usage_partition_maintenance(args.months_ahead, args.retention_months)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Bulk challan invoicing
+Converts every delivered, uninvoiced challan of a date range into invoices,
+one per customer, for month-end billing.
+
+Customers are converted a chunk at a time with set-based statements
+(ChallanInvoicingService.convert_customers), one transaction per chunk.
+When a chunk fails, its customers are retried one by one so a single bad
+customer does not hold back the rest; customers that still fail are
+recorded on the run. Progress is committed per chunk to
+sales.challan_invoicing_runs.
+
+Usage:
+    python -m app.jobs.challan_invoicing --from 2024-03-01 --to 2024-03-31 \\
+        [--invoice-date 2024-03-31] [--org-id UUID] [--chunk-size N]
+    python -m app.jobs.challan_invoicing --run-id UUID
+"""
+from typing import Any, Dict, List, Optional
+from datetime import date
+from sqlalchemy.orm import Session
+import argparse
+import json
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..api.services.challan_invoicing_service import ChallanInvoicingService
+
+logger = logging.getLogger(__name__)
+
+
+def _convert_chunk(db: Session, run: Dict[str, Any], org_id: str, customer_ids: List[int]) -> Dict[str, Any]:
+    """Convert one chunk, falling back to one transaction per customer on failure"""
+    args = (run["from_date"], run["to_date"], run["invoice_date"])
+    try:
+        counts = ChallanInvoicingService.convert_customers(db, org_id, customer_ids, *args)
+        db.commit()
+        return {"invoices": counts["invoices"], "challans": counts["challans"], "failures": []}
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Chunk of {len(customer_ids)} customers failed, retrying one by one: {str(e)}")
+
+    invoices = challans = 0
+    failures = []
+    for customer_id in customer_ids:
+        try:
+            counts = ChallanInvoicingService.convert_customers(db, org_id, [customer_id], *args)
+            db.commit()
+            invoices += counts["invoices"]
+            challans += counts["challans"]
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Invoicing challans of customer {customer_id} failed: {str(e)}")
+            failures.append({"customer_id": customer_id, "error": str(e)})
+    return {"invoices": invoices, "challans": challans, "failures": failures}
+
+
+def run_challan_invoicing(
+    run_id: str,
+    org_id: Optional[str] = None,
+    chunk_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """Run one queued challan invoicing run to completion"""
+    org_id = org_id or settings.DEFAULT_ORG_ID
+    chunk_size = chunk_size or settings.CHALLAN_INVOICING_CHUNK_SIZE
+    db = SessionLocal()
+    try:
+        run = ChallanInvoicingService.get_run(db, org_id, run_id)
+        if run is None:
+            raise ValueError(f"Challan invoicing run {run_id} not found")
+
+        customer_ids = ChallanInvoicingService.eligible_customers(db, org_id, run["from_date"], run["to_date"])
+        ChallanInvoicingService.mark_started(db, run_id, len(customer_ids))
+        db.commit()
+
+        invoices = challans = failed = 0
+        for start in range(0, len(customer_ids), chunk_size):
+            chunk = customer_ids[start:start + chunk_size]
+            counts = _convert_chunk(db, run, org_id, chunk)
+            invoices += counts["invoices"]
+            challans += counts["challans"]
+            failed += len(counts["failures"])
+            ChallanInvoicingService.record_progress(
+                db, run_id, len(chunk) - len(counts["failures"]),
+                counts["invoices"], counts["challans"], counts["failures"]
+            )
+            db.commit()
+
+        ChallanInvoicingService.mark_finished(db, run_id)
+        db.commit()
+        logger.info(
+            f"Challan invoicing {run_id}: {invoices} invoices from {challans} challans, "
+            f"{failed} customers failed"
+        )
+        return {"run_id": run_id, "status": "completed", "invoices_created": invoices,
+                "challans_invoiced": challans, "failed_customers": failed}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Challan invoicing {run_id} failed: {str(e)}")
+        try:
+            ChallanInvoicingService.mark_finished(db, run_id, error_message=str(e))
+            db.commit()
+        except Exception:
+            db.rollback()
+        return {"run_id": run_id, "status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoice delivered challans in bulk, one invoice per customer")
+    parser.add_argument("--run-id", help="Run an existing queued run")
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat, help="First challan date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat, help="Last challan date (YYYY-MM-DD)")
+    parser.add_argument("--invoice-date", type=date.fromisoformat, help="Date on the invoices (default: today)")
+    parser.add_argument("--org-id", help="Organization to invoice (default: DEFAULT_ORG_ID)")
+    parser.add_argument("--chunk-size", type=int, help="Customers per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    org_id = args.org_id or settings.DEFAULT_ORG_ID
+    run_id = args.run_id
+    if not run_id:
+        if not (args.from_date and args.to_date):
+            parser.error("--from and --to are required without --run-id")
+        db = SessionLocal()
+        try:
+            run = ChallanInvoicingService.create_run(db, org_id, args.from_date, args.to_date, args.invoice_date)
+            db.commit()
+            run_id = run["run_id"]
+        finally:
+            db.close()
+
+    result = run_challan_invoicing(run_id, org_id, args.chunk_size)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Data version compaction
+system_config.data_versions keeps one counter row per resource and
+writing backend. This folds the rows of backends that have gone away into
+one row per resource, so reading a version stays a handful of rows. The
+summed versions, and with them every ETag, are unchanged.
+
+Usage:
+    python -m app.jobs.data_version_compactor
+"""
+from typing import Any, Dict
+from sqlalchemy import text
+import argparse
+import json
+import logging
+
+from ..core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def run_data_version_compaction() -> Dict[str, Any]:
+    """Fold data_versions rows of ended backends into slot 0"""
+    db = SessionLocal()
+    try:
+        folded = db.execute(text("SELECT system_config.compact_data_versions()")).scalar()
+        db.commit()
+        if folded:
+            logger.info(f"Data versions: folded {folded} rows of ended backends")
+        return {"status": "completed", "rows_folded": folded}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Data version compaction failed: {str(e)}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def main():
+    argparse.ArgumentParser(description="Compact the per-backend data version counters").parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_data_version_compaction()
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Document renderer
+Builds print payloads off the request path. After an invoice, sale or note
+is committed the route hands it to `render_pool`, a small process pool, so
+the first print is already a cache hit; worker processes open their own
+database sessions. The same module backfills renders for recent invoices
+and collects blobs no render points to any more.
+
+Usage:
+    python -m app.jobs.document_renderer --document-type invoice --document-id 42
+    python -m app.jobs.document_renderer --backfill-days 1 [--org-id UUID]
+    python -m app.jobs.document_renderer --gc
+"""
+from typing import Any, Dict, Optional, Set, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import threading
+import time
+
+from sqlalchemy import text
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..api.services.document_render_service import DocumentRenderService
+
+logger = logging.getLogger(__name__)
+
+# document_type -> (module, async builder(db, document_id, org_id) -> payload)
+RENDER_BUILDERS = {
+    "invoice": ("app.api.routes.billing", "build_invoice_print_payload"),
+    "sale": ("app.api.routes.sales", "build_sale_print_payload"),
+    "note": ("app.api.routes.credit_debit_notes", "build_note_print_payload"),
+}
+
+
+def render_document(document_type: str, document_id: Any, org_id: str) -> Dict[str, Any]:
+    """Build and store one document's render in its own transaction"""
+    module_name, builder_name = RENDER_BUILDERS[document_type]
+    builder = getattr(importlib.import_module(module_name), builder_name)
+
+    db = SessionLocal()
+    try:
+        version = DocumentRenderService.source_version(db, document_type, document_id)
+        started = time.perf_counter()
+        payload = asyncio.run(builder(db, document_id, org_id))
+        render_ms = int((time.perf_counter() - started) * 1000)
+        render = DocumentRenderService.store(
+            db, org_id, document_type, document_id, payload, render_ms, expected_version=version
+        )
+        db.commit()
+        if render is None:
+            # Changed while rendering; the next print renders the new version
+            return {"document_type": document_type, "document_id": str(document_id), "status": "stale"}
+        return {
+            "document_type": document_type,
+            "document_id": str(document_id),
+            "status": "completed",
+            "content_hash": render.content_hash,
+            "render_ms": render_ms
+        }
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Rendering {document_type} {document_id} failed: {str(e)}")
+        return {"document_type": document_type, "document_id": str(document_id),
+                "status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+class RenderPool:
+    """
+    Process pool for post-commit rendering, started on first use.
+    A document already queued is not queued again; with no workers
+    configured, documents are rendered on their first print instead.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: workers must not inherit the parent's open DB connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, document_type: str, document_id: Any, org_id: Any) -> Optional[Future]:
+        if self.max_workers <= 0:
+            return None
+        key = (document_type, str(document_id))
+        with self._lock:
+            if key in self._in_flight:
+                return None
+            self._in_flight.add(key)
+            self.submitted += 1
+            future = self._get_executor().submit(render_document, document_type, document_id, str(org_id))
+        future.add_done_callback(lambda f: self._done(key, f))
+        return future
+
+    def _done(self, key: Tuple[str, str], future: Future):
+        with self._lock:
+            self._in_flight.discard(key)
+            failed = future.exception() is not None or future.result().get("status") not in ("completed", "stale")
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"workers": self.max_workers, "in_flight": len(self._in_flight),
+                    "submitted": self.submitted, "completed": self.completed, "failed": self.failed}
+
+
+render_pool = RenderPool(settings.RENDER_WORKERS)
+
+
+def run_render_backfill(days: int = 1, org_id: Optional[str] = None) -> Dict[str, Any]:
+    """Render invoices from the last `days` days that have no current render"""
+    db = SessionLocal()
+    try:
+        rows = db.execute(text("""
+            SELECT i.invoice_id, i.org_id
+            FROM sales.invoices i
+            WHERE i.invoice_date >= CURRENT_DATE - :days
+            AND (CAST(:org_id AS UUID) IS NULL OR i.org_id = CAST(:org_id AS UUID))
+            AND NOT EXISTS (
+                SELECT 1 FROM sales.document_renders r
+                WHERE r.org_id = i.org_id
+                AND r.document_type = 'invoice'
+                AND r.document_id = i.invoice_id::TEXT
+            )
+            ORDER BY i.invoice_id
+        """), {"days": days, "org_id": org_id}).fetchall()
+        db.commit()
+    finally:
+        db.close()
+
+    results = [render_document("invoice", row.invoice_id, str(row.org_id)) for row in rows]
+    failed = sum(1 for r in results if r["status"] != "completed")
+    return {"status": "completed", "rendered": len(results) - failed, "failed": failed}
+
+
+def run_render_gc(retain_hours: Optional[int] = None) -> Dict[str, Any]:
+    """Delete render blobs that no document points to"""
+    retain_hours = settings.RENDER_BLOB_RETENTION_HOURS if retain_hours is None else retain_hours
+    db = SessionLocal()
+    try:
+        deleted = DocumentRenderService.collect_garbage(db, retain_hours)
+        db.commit()
+        if deleted:
+            logger.info(f"Deleted {deleted} unreferenced render blobs")
+        return {"status": "completed", "blobs_deleted": deleted}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Render blob collection failed: {str(e)}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render printable documents and collect old renders")
+    parser.add_argument("--document-type", choices=sorted(RENDER_BUILDERS), help="Render one document")
+    parser.add_argument("--document-id", help="Id of the document to render")
+    parser.add_argument("--org-id", help="Organization of the document(s)")
+    parser.add_argument("--backfill-days", type=int, help="Render invoices from the last N days")
+    parser.add_argument("--gc", action="store_true", help="Delete unreferenced render blobs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.document_type:
+        if not args.document_id:
+            parser.error("--document-id is required with --document-type")
+        result = render_document(args.document_type, args.document_id, args.org_id or settings.DEFAULT_ORG_ID)
+    elif args.backfill_days is not None:
+        result = run_render_backfill(args.backfill_days, args.org_id)
+    elif args.gc:
+        result = run_render_gc()
+    else:
+        parser.error("one of --document-type, --backfill-days or --gc is required")
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Batch expiry sweeper
+Moves expired batch stock out of inventory, one org and one chunk at a time.
+
+Each chunk writes its stock_expiry movements with INSERT ... SELECT and zeroes
+the batches with UPDATE ... FROM in a single statement, then advances the
+org's row in inventory.expiry_sweep_progress in the same transaction. A sweep
+interrupted mid-way resumes after the last committed batch_id; running again
+after a completed sweep restarts from the first batch.
+
+Usage:
+    python -m app.jobs.expiry_sweeper [--org-id UUID] [--as-of YYYY-MM-DD] [--chunk-size N]
+"""
+from typing import Any, Dict, List, Optional
+from datetime import date
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import argparse
+import json
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def _orgs_with_expired_stock(db: Session, as_of: date) -> List[str]:
+    """Orgs that have at least one batch left to expire"""
+    result = db.execute(text("""
+        SELECT DISTINCT org_id
+        FROM inventory.batches
+        WHERE expiry_date <= :as_of
+        AND quantity_available > 0
+        AND batch_status != 'expired'
+    """), {"as_of": as_of})
+    return [str(row.org_id) for row in result]
+
+
+def _start_or_resume(db: Session, org_id: str, as_of: date) -> Dict[str, Any]:
+    """
+    Get the progress row for this org and cut-off, creating it if needed.
+    A running or failed sweep resumes after its last batch; a completed one
+    starts over from the first batch, since stock received or corrected
+    since then may have expired at the same cut-off.
+    """
+    progress = db.execute(text("""
+        INSERT INTO inventory.expiry_sweep_progress (org_id, sweep_date)
+        VALUES (:org_id, :as_of)
+        ON CONFLICT (org_id, sweep_date) DO UPDATE
+        SET last_batch_id = CASE
+                WHEN inventory.expiry_sweep_progress.sweep_status = 'completed' THEN 0
+                ELSE inventory.expiry_sweep_progress.last_batch_id
+            END,
+            completed_at = CASE
+                WHEN inventory.expiry_sweep_progress.sweep_status = 'completed' THEN NULL
+                ELSE inventory.expiry_sweep_progress.completed_at
+            END,
+            sweep_status = 'running',
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING last_batch_id, sweep_status, batches_expired, quantity_expired, chunks_processed
+    """), {"org_id": org_id, "as_of": as_of}).first()
+    db.commit()
+    return dict(progress._mapping)
+
+
+def _sweep_chunk(
+    db: Session,
+    org_id: str,
+    as_of: date,
+    after_batch_id: int,
+    chunk_size: int
+) -> Dict[str, Any]:
+    """Expire the next chunk of batches for one org; the caller holds the org's sweep lock"""
+    chunk = db.execute(text("""
+        WITH chunk AS (
+            SELECT b.batch_id, b.product_id, b.batch_number,
+                   b.quantity_available, b.expiry_date
+            FROM inventory.batches b
+            WHERE b.org_id = :org_id
+            AND b.batch_id > :after_batch_id
+            AND b.expiry_date <= :as_of
+            AND b.quantity_available > 0
+            AND b.batch_status != 'expired'
+            ORDER BY b.batch_id
+            LIMIT :chunk_size
+            FOR UPDATE OF b
+        ),
+        moved AS (
+            INSERT INTO inventory.inventory_movements (
+                org_id, movement_date, movement_type,
+                product_id, batch_id,
+                quantity_in, quantity_out,
+                reference_type, reference_number,
+                notes
+            )
+            SELECT
+                :org_id, CURRENT_DATE, 'stock_expiry',
+                c.product_id, c.batch_id,
+                0, c.quantity_available,
+                'expiry', 'EXP-' || c.batch_number,
+                'Batch expired on ' || c.expiry_date
+            FROM chunk c
+            RETURNING movement_id
+        ),
+        expired AS (
+            UPDATE inventory.batches b
+            SET quantity_available = 0,
+                batch_status = 'expired',
+                updated_at = CURRENT_TIMESTAMP
+            FROM chunk c
+            WHERE b.batch_id = c.batch_id
+            RETURNING b.batch_id
+        )
+        SELECT
+            COUNT(*) AS batches,
+            COALESCE(MAX(batch_id), :after_batch_id) AS last_batch_id,
+            COALESCE(SUM(quantity_available), 0) AS quantity
+        FROM chunk
+    """), {
+        "org_id": org_id,
+        "as_of": as_of,
+        "after_batch_id": after_batch_id,
+        "chunk_size": chunk_size
+    }).first()
+
+    db.execute(text("""
+        UPDATE inventory.expiry_sweep_progress
+        SET last_batch_id = :last_batch_id,
+            chunks_processed = chunks_processed + 1,
+            batches_expired = batches_expired + :batches,
+            quantity_expired = quantity_expired + :quantity,
+            sweep_status = CASE WHEN :batches < :chunk_size THEN 'completed' ELSE 'running' END,
+            completed_at = CASE WHEN :batches < :chunk_size THEN CURRENT_TIMESTAMP END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE org_id = :org_id AND sweep_date = :as_of
+    """), {
+        "org_id": org_id,
+        "as_of": as_of,
+        "last_batch_id": chunk.last_batch_id,
+        "batches": chunk.batches,
+        "quantity": chunk.quantity,
+        "chunk_size": chunk_size
+    })
+    db.commit()
+    return dict(chunk._mapping)
+
+
+def sweep_org(
+    db: Session,
+    org_id: str,
+    as_of: Optional[date] = None,
+    chunk_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run (or resume) the expiry sweep for one org until it has no batches left.
+    The org's sweep lock is a session-level advisory lock held for the whole
+    sweep on a connection of its own, since every chunk commit hands the
+    session's connection back to the pool.
+    """
+    as_of = as_of or date.today()
+    chunk_size = chunk_size or settings.EXPIRY_SWEEP_CHUNK_SIZE
+    lock_key = {"key": f"expiry_sweep:{org_id}"}
+
+    lock_conn = db.get_bind().connect()
+    try:
+        locked = lock_conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), lock_key).scalar()
+        lock_conn.commit()
+        if not locked:
+            logger.info(f"Expiry sweep for org {org_id} is running elsewhere, skipping")
+            return {"org_id": org_id, "status": "locked"}
+
+        try:
+            return _sweep_org_locked(db, org_id, as_of, chunk_size)
+        finally:
+            try:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), lock_key)
+                lock_conn.commit()
+            except Exception:
+                # Drop the connection rather than pool it with the lock held
+                lock_conn.invalidate()
+                raise
+    finally:
+        lock_conn.close()
+
+
+def _sweep_org_locked(db: Session, org_id: str, as_of: date, chunk_size: int) -> Dict[str, Any]:
+    progress = _start_or_resume(db, org_id, as_of)
+    last_batch_id = progress["last_batch_id"]
+    batches_expired = 0
+    quantity_expired = Decimal("0")
+
+    try:
+        while True:
+            chunk = _sweep_chunk(db, org_id, as_of, last_batch_id, chunk_size)
+            batches_expired += chunk["batches"]
+            quantity_expired += chunk["quantity"]
+            last_batch_id = chunk["last_batch_id"]
+            if chunk["batches"] < chunk_size:
+                break
+    except Exception as e:
+        db.rollback()
+        db.execute(text("""
+            UPDATE inventory.expiry_sweep_progress
+            SET sweep_status = 'failed',
+                last_error_message = :error,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE org_id = :org_id AND sweep_date = :as_of
+        """), {"org_id": org_id, "as_of": as_of, "error": str(e)})
+        db.commit()
+        raise
+
+    logger.info(
+        f"Expiry sweep for org {org_id}: {batches_expired} batches, "
+        f"{quantity_expired} units expired"
+    )
+    return {
+        "org_id": org_id,
+        "status": "completed",
+        "sweep_date": str(as_of),
+        "batches_expired": batches_expired,
+        "quantity_expired": quantity_expired,
+        "last_batch_id": last_batch_id
+    }
+
+
+def run_expiry_sweep(
+    org_id: Optional[str] = None,
+    as_of: Optional[date] = None,
+    chunk_size: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Sweep one org, or every org with expired stock; failures are isolated per org"""
+    as_of = as_of or date.today()
+    db = SessionLocal()
+    try:
+        org_ids = [org_id] if org_id else _orgs_with_expired_stock(db, as_of)
+        db.commit()
+
+        results = []
+        for current_org in org_ids:
+            try:
+                results.append(sweep_org(db, current_org, as_of, chunk_size))
+            except Exception as e:
+                logger.error(f"Expiry sweep failed for org {current_org}: {str(e)}")
+                results.append({"org_id": current_org, "status": "failed", "error": str(e)})
+        return results
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expire stock in batches past their expiry date")
+    parser.add_argument("--org-id", help="Only sweep this organization")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="Expiry cut-off date (default: today)")
+    parser.add_argument("--chunk-size", type=int, help="Batches per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = run_expiry_sweep(args.org_id, args.as_of, args.chunk_size)
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
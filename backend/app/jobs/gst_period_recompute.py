@@ -0,0 +1,92 @@
+"""
+GST period recompute
+Rebuilds the GST period store (ledger, rollups and party totals) for a
+return month from source documents. Use after back-dated corrections,
+bulk imports that bypassed the posting triggers, or to verify the store.
+Months from before the store existed are filled in with --from, which
+recomputes every month from that one up to --to (default: this month).
+
+Usage:
+    python -m app.jobs.gst_period_recompute --period YYYY-MM [--org-id UUID]
+    python -m app.jobs.gst_period_recompute --from YYYY-MM [--to YYYY-MM] [--org-id UUID]
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from sqlalchemy import text
+import argparse
+import json
+import logging
+
+from ..core.database import SessionLocal
+from ..api.services.gst_period_service import GSTPeriodService, return_period
+
+logger = logging.getLogger(__name__)
+
+
+def run_gst_period_recompute(year: int, month: int, org_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Recompute one month for one org, or for every org; failures are isolated per org"""
+    period = return_period(year, month)
+    db = SessionLocal()
+    try:
+        if org_id:
+            org_ids = [org_id]
+        else:
+            org_ids = [
+                str(row.org_id) for row in
+                db.execute(text("SELECT DISTINCT org_id FROM sales.invoices"))
+            ]
+            db.commit()
+
+        results = []
+        for current_org in org_ids:
+            try:
+                lines = GSTPeriodService.recompute(db, current_org, period)
+                results.append({"org_id": current_org, "status": "completed", "ledger_lines": lines})
+            except Exception as e:
+                db.rollback()
+                logger.error(f"GST period recompute failed for org {current_org}: {str(e)}")
+                results.append({"org_id": current_org, "status": "failed", "error": str(e)})
+        return results
+    finally:
+        db.close()
+
+
+def run_gst_period_backfill(
+    start_year: int,
+    start_month: int,
+    end_year: int,
+    end_month: int,
+    org_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Recompute every month from start to end inclusive; each month commits on its own"""
+    results = []
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        for result in run_gst_period_recompute(year, month, org_id):
+            results.append({"period": f"{year:04d}-{month:02d}", **result})
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the GST period store for a return month")
+    months = parser.add_mutually_exclusive_group(required=True)
+    months.add_argument("--period", help="Return month as YYYY-MM")
+    months.add_argument("--from", dest="start", help="Backfill from this month (YYYY-MM)")
+    parser.add_argument("--to", dest="end", help="With --from, last month to backfill (default: this month)")
+    parser.add_argument("--org-id", help="Only recompute this organization")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.period:
+        period = datetime.strptime(args.period, "%Y-%m")
+        results = run_gst_period_recompute(period.year, period.month, args.org_id)
+    else:
+        start = datetime.strptime(args.start, "%Y-%m")
+        end = datetime.strptime(args.end, "%Y-%m") if args.end else datetime.now()
+        results = run_gst_period_backfill(start.year, start.month, end.year, end.month, args.org_id)
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
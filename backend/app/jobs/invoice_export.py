@@ -0,0 +1,211 @@
+"""
+Invoice export
+Writes every invoice of a date range into one ZIP of print payloads, the
+same JSON `/billing/invoices/{id}/print` returns, for month-end and audit
+requests.
+
+Invoice ids are streamed from a server-side cursor in chunks. Each chunk
+reuses renders already in the render cache, renders the rest in a process
+pool (storing them in the cache as a side effect), and is written to the
+ZIP before the next chunk is read, so memory is bounded by the chunk size.
+Progress is committed per chunk to sales.document_export_jobs.
+
+Usage:
+    python -m app.jobs.invoice_export --from 2024-03-01 --to 2024-03-31 [--org-id UUID]
+    python -m app.jobs.invoice_export --job-id UUID
+"""
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import zipfile
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..api.services.document_export_service import DocumentExportService
+from .document_renderer import render_document
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FIELDS = ["invoice_id", "invoice_number", "invoice_date", "file_name", "content_hash", "pdf_url", "status"]
+
+
+def _export_path(job: Dict[str, Any]) -> str:
+    file_name = f"invoices_{job['from_date']:%Y%m%d}_{job['to_date']:%Y%m%d}_{job['job_id']}.zip"
+    return os.path.join(settings.EXPORT_DIR, file_name)
+
+
+def _safe_name(invoice_number: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "-" for c in invoice_number)
+
+
+def _cached_renders(db: Session, org_id: str, invoice_ids: List[int]) -> Dict[str, Any]:
+    """Current render (hash, pdf_url, content) of each invoice that has one"""
+    rows = db.execute(text("""
+        SELECT r.document_id, r.content_hash, r.pdf_url, b.content
+        FROM sales.document_renders r
+        JOIN sales.document_render_blobs b ON b.content_hash = r.content_hash
+        WHERE r.org_id = :org_id
+        AND r.document_type = 'invoice'
+        AND r.document_id = ANY(:document_ids)
+    """), {"org_id": org_id, "document_ids": [str(i) for i in invoice_ids]})
+    return {row.document_id: row for row in rows}
+
+
+def _export_chunk(
+    db: Session,
+    executor: ProcessPoolExecutor,
+    org_id: str,
+    chunk: List[Any],
+    archive: zipfile.ZipFile,
+    manifest: csv.DictWriter
+) -> Dict[str, int]:
+    invoice_ids = [row.invoice_id for row in chunk]
+
+    cached = _cached_renders(db, org_id, invoice_ids)
+    db.commit()
+    missing = [i for i in invoice_ids if str(i) not in cached]
+    if missing:
+        list(executor.map(render_document, repeat("invoice"), missing, repeat(org_id)))
+        cached.update(_cached_renders(db, org_id, missing))
+        db.commit()
+
+    processed = failed = 0
+    for row in chunk:
+        render = cached.get(str(row.invoice_id))
+        file_name = f"{_safe_name(row.invoice_number or str(row.invoice_id))}.json"
+        if render is None:
+            failed += 1
+            manifest.writerow({"invoice_id": row.invoice_id, "invoice_number": row.invoice_number,
+                               "invoice_date": row.invoice_date, "status": "failed"})
+            continue
+        archive.writestr(file_name, bytes(render.content))
+        manifest.writerow({
+            "invoice_id": row.invoice_id,
+            "invoice_number": row.invoice_number,
+            "invoice_date": row.invoice_date,
+            "file_name": file_name,
+            "content_hash": render.content_hash,
+            "pdf_url": render.pdf_url,
+            "status": "exported"
+        })
+        processed += 1
+    return {"processed": processed, "failed": failed}
+
+
+def run_invoice_export(job_id: str, org_id: Optional[str] = None) -> Dict[str, Any]:
+    """Run one queued export job to completion"""
+    org_id = org_id or settings.DEFAULT_ORG_ID
+    db = SessionLocal()
+    cursor_db = SessionLocal()
+    path = None
+    try:
+        job = DocumentExportService.get_job(db, org_id, job_id)
+        if job is None:
+            raise ValueError(f"Export job {job_id} not found")
+
+        params = {"org_id": org_id, "from_date": job["from_date"], "to_date": job["to_date"]}
+        total = db.execute(text("""
+            SELECT COUNT(*) FROM sales.invoices
+            WHERE org_id = :org_id
+            AND invoice_date BETWEEN :from_date AND :to_date
+        """), params).scalar()
+
+        os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+        path = _export_path(job)
+        DocumentExportService.mark_started(db, job_id, total, path)
+        db.commit()
+
+        # Server-side cursor in its own session, so per-chunk commits do not close it
+        invoices = cursor_db.execute(text("""
+            SELECT invoice_id, invoice_number, invoice_date
+            FROM sales.invoices
+            WHERE org_id = :org_id
+            AND invoice_date BETWEEN :from_date AND :to_date
+            ORDER BY invoice_date, invoice_id
+        """), params, execution_options={"stream_results": True, "yield_per": settings.EXPORT_CHUNK_SIZE})
+
+        processed = failed = 0
+        with tempfile.TemporaryFile("w+", newline="") as manifest_file, \
+                zipfile.ZipFile(path + ".part", "w", compression=zipfile.ZIP_DEFLATED) as archive, \
+                ProcessPoolExecutor(max_workers=settings.EXPORT_WORKERS,
+                                    mp_context=multiprocessing.get_context("spawn")) as executor:
+            manifest = csv.DictWriter(manifest_file, fieldnames=MANIFEST_FIELDS)
+            manifest.writeheader()
+
+            for chunk in invoices.partitions(settings.EXPORT_CHUNK_SIZE):
+                counts = _export_chunk(db, executor, org_id, chunk, archive, manifest)
+                processed += counts["processed"]
+                failed += counts["failed"]
+                DocumentExportService.record_progress(db, job_id, counts["processed"], counts["failed"])
+                db.commit()
+
+            manifest_file.seek(0)
+            with archive.open("manifest.csv", "w") as entry:
+                for line in manifest_file:
+                    entry.write(line.encode("utf-8"))
+
+        os.replace(path + ".part", path)
+        byte_size = os.path.getsize(path)
+        DocumentExportService.mark_finished(db, job_id, byte_size=byte_size)
+        db.commit()
+        logger.info(f"Exported {processed} invoices ({failed} failed) to {path}")
+        return {"job_id": job_id, "status": "completed", "exported": processed,
+                "failed": failed, "file_path": path, "byte_size": byte_size}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Invoice export {job_id} failed: {str(e)}")
+        if path and os.path.exists(path + ".part"):
+            os.remove(path + ".part")
+        try:
+            DocumentExportService.mark_finished(db, job_id, error_message=str(e))
+            db.commit()
+        except Exception:
+            db.rollback()
+        return {"job_id": job_id, "status": "failed", "error": str(e)}
+    finally:
+        cursor_db.close()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a date range of invoices as a ZIP of print payloads")
+    parser.add_argument("--job-id", help="Run an existing queued job")
+    parser.add_argument("--from", dest="from_date", help="First invoice date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", help="Last invoice date (YYYY-MM-DD)")
+    parser.add_argument("--org-id", help="Organization to export (default: DEFAULT_ORG_ID)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    org_id = args.org_id or settings.DEFAULT_ORG_ID
+    job_id = args.job_id
+    if not job_id:
+        if not (args.from_date and args.to_date):
+            parser.error("--from and --to are required without --job-id")
+        db = SessionLocal()
+        try:
+            job = DocumentExportService.create_job(
+                db, org_id,
+                datetime.strptime(args.from_date, "%Y-%m-%d").date(),
+                datetime.strptime(args.to_date, "%Y-%m-%d").date()
+            )
+            db.commit()
+            job_id = job["job_id"]
+        finally:
+            db.close()
+
+    result = run_invoice_export(job_id, org_id)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
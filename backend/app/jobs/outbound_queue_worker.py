@@ -0,0 +1,239 @@
+"""
+Outbound queue workers
+OUTBOUND_QUEUE_WORKERS asyncio tasks drain system_config.outbound_messages.
+Each loop moves due scheduled sends onto the queue, releases leases of
+workers that died mid-send, claims a batch of due messages with
+FOR UPDATE SKIP LOCKED and sends it through the async message sender
+(pooled connections, per-provider rate limits). A message gets one attempt
+per claim; failures are put back with exponential backoff by the queue,
+so a retry survives a restart, and dead-lettered once max_attempts is
+used up. When nothing is due a worker sleeps for
+OUTBOUND_QUEUE_POLL_INTERVAL_MS.
+
+A worker stopped mid-send leaves its batch leased; the messages go out
+again once OUTBOUND_QUEUE_LEASE_SECONDS have passed.
+
+Sent messages are purged after OUTBOUND_QUEUE_RETENTION_DAYS by
+`run_outbound_queue_purge`, registered with the scheduler.
+
+Usage:
+    python -m app.jobs.outbound_queue_worker [--once] [--workers 2]
+    python -m app.jobs.outbound_queue_worker --purge [--retention-days 30]
+"""
+from typing import Any, Dict, List, Optional
+from collections import deque
+from sqlalchemy import text
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..api.services.message_sender import DeliveryResult, OutboundMessage, message_sender
+from ..api.services.outbound_queue_service import OutboundQueueService
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_WINDOW_SECONDS = 60
+
+
+class OutboundQueueWorkers:
+    """Claims, sends and completes outbound messages in batches"""
+
+    def __init__(self, workers: int, batch_size: int, poll_interval_ms: int, lease_seconds: int):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_ms / 1000
+        self.lease_seconds = lease_seconds
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._recent = deque()  # (monotonic time, messages sent) within the throughput window
+        self.claimed = 0
+        self.sent = 0
+        self.retrying = 0
+        self.dead = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.promoted = 0
+        self.last_claim_lag_seconds = 0.0
+
+    def _claim(self, worker_id: str) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            self.promoted += OutboundQueueService.promote_scheduled(db, self.batch_size)
+            OutboundQueueService.release_expired_leases(db)
+            rows = OutboundQueueService.claim(db, worker_id, self.batch_size, self.lease_seconds)
+            db.commit()
+            return rows
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _complete(self, worker_id: str, results: List[DeliveryResult]) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            counts = OutboundQueueService.complete(db, worker_id, results)
+            db.commit()
+            return counts
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run_batch(self, worker_id: str) -> int:
+        """Claim and send one batch; returns the number of messages claimed"""
+        rows = await asyncio.to_thread(self._claim, worker_id)
+        if not rows:
+            return 0
+
+        self.claimed += len(rows)
+        self.last_claim_lag_seconds = round(max(float(row["lag_seconds"] or 0) for row in rows), 1)
+        messages = [
+            OutboundMessage(
+                key=row["message_id"],
+                channel=row["channel"],
+                recipient=row["recipient"],
+                body=row["body"],
+                subject=row["subject"],
+                template_name=row["template_name"],
+                parameters=row["parameters"] or []
+            )
+            for row in rows
+        ]
+        results = await message_sender.send_all(messages, max_attempts=1)
+        counts = await asyncio.to_thread(self._complete, worker_id, results)
+
+        self.batches += 1
+        self.sent += counts["sent"]
+        self.retrying += counts["retrying"]
+        self.dead += counts["dead"]
+        self._recent.append((time.monotonic(), counts["sent"]))
+        return len(rows)
+
+    async def _run(self, worker_id: str):
+        while True:
+            try:
+                claimed = await self.run_batch(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Unrecorded messages stay leased and are retried after the lease
+                self.failed_batches += 1
+                logger.error(f"Outbound queue worker {worker_id} failed: {str(e)}")
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start the worker tasks on the running loop"""
+        if any(not task.done() for task in self._tasks):
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(f"{self.name}/{n}"), name=f"outbound_queue:{n}")
+            for n in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} outbound queue workers")
+
+    async def stop(self):
+        """Cancel the workers and wait for them to exit"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+            self._recent.popleft()
+        return {
+            "workers": sum(1 for task in self._tasks if not task.done()),
+            "claimed": self.claimed,
+            "sent": self.sent,
+            "retrying": self.retrying,
+            "dead": self.dead,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "promoted_scheduled": self.promoted,
+            "sent_per_second": round(sum(count for _, count in self._recent) / THROUGHPUT_WINDOW_SECONDS, 2),
+            "last_claim_lag_seconds": self.last_claim_lag_seconds
+        }
+
+
+outbound_queue_workers = OutboundQueueWorkers(
+    workers=settings.OUTBOUND_QUEUE_WORKERS,
+    batch_size=settings.OUTBOUND_QUEUE_BATCH_SIZE,
+    poll_interval_ms=settings.OUTBOUND_QUEUE_POLL_INTERVAL_MS,
+    lease_seconds=settings.OUTBOUND_QUEUE_LEASE_SECONDS
+)
+
+
+def run_outbound_queue_purge(retention_days: Optional[int] = None) -> Dict[str, Any]:
+    """Delete sent messages older than the retention; dead letters are kept"""
+    retention_days = retention_days or settings.OUTBOUND_QUEUE_RETENTION_DAYS
+    db = SessionLocal()
+    try:
+        purged = db.execute(
+            text("SELECT system_config.purge_outbound_messages(:retention_days)"),
+            {"retention_days": retention_days}
+        ).scalar()
+        db.commit()
+        if purged:
+            logger.info(f"Outbound queue: purged {purged} sent messages older than {retention_days} days")
+        return {"status": "completed", "messages_purged": purged, "retention_days": retention_days}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Outbound queue purge failed: {str(e)}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+async def _drain(workers: OutboundQueueWorkers, once: bool) -> Dict[str, Any]:
+    try:
+        if once:
+            while await workers.run_batch(f"{workers.name}/cli") == workers.batch_size:
+                pass
+        else:
+            workers.start()
+            await asyncio.gather(*workers._tasks)
+    finally:
+        await workers.stop()
+        await message_sender.close()
+    return {"status": "completed", **workers.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send queued outbound messages")
+    parser.add_argument("--once", action="store_true", help="Send what is due now, then exit")
+    parser.add_argument("--workers", type=int, default=None, help="Defaults to OUTBOUND_QUEUE_WORKERS")
+    parser.add_argument("--purge", action="store_true", help="Purge old sent messages instead")
+    parser.add_argument("--retention-days", type=int, default=None,
+                        help="With --purge; defaults to OUTBOUND_QUEUE_RETENTION_DAYS")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.purge:
+        result = run_outbound_queue_purge(args.retention_days)
+    else:
+        workers = OutboundQueueWorkers(
+            workers=args.workers or settings.OUTBOUND_QUEUE_WORKERS or 1,
+            batch_size=settings.OUTBOUND_QUEUE_BATCH_SIZE,
+            poll_interval_ms=settings.OUTBOUND_QUEUE_POLL_INTERVAL_MS,
+            lease_seconds=settings.OUTBOUND_QUEUE_LEASE_SECONDS
+        )
+        try:
+            result = asyncio.run(_drain(workers, args.once))
+        except KeyboardInterrupt:
+            result = {"status": "stopped"}
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
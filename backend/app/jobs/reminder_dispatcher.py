@@ -0,0 +1,56 @@
+"""
+Reminder dispatcher
+Puts the pending deliveries of a reminder campaign on the outbound message
+queue, from where the queue workers send them and record their statuses.
+Routes queue a new campaign as they create it; the command line re-queues
+a campaign, e.g. to retry its failed deliveries once a provider problem is
+fixed.
+
+Usage:
+    python -m app.jobs.reminder_dispatcher --campaign-id 12 [--retry-failed]
+"""
+from typing import Any, Dict
+import argparse
+import json
+import logging
+
+from ..core.database import SessionLocal
+from ..api.services.outbound_queue_service import OutboundQueueService
+from ..api.services.reminder_campaign_service import ReminderCampaignService
+
+logger = logging.getLogger(__name__)
+
+
+def run_reminder_dispatch(campaign_id: int, retry_failed: bool = False) -> Dict[str, Any]:
+    """Queue a campaign's pending (and with retry_failed, failed) deliveries"""
+    db = SessionLocal()
+    try:
+        reset = ReminderCampaignService.reset_failed(db, campaign_id) if retry_failed else 0
+        queued = OutboundQueueService.enqueue_reminder_deliveries(db, campaign_id)
+        db.commit()
+
+        result = {"campaign_id": campaign_id, "status": "queued", "reset_failed": reset, "queued": queued}
+        logger.info(f"Reminder campaign {campaign_id}: {result}")
+        return result
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Queueing campaign {campaign_id} failed: {str(e)}")
+        return {"campaign_id": campaign_id, "status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue the pending deliveries of a reminder campaign")
+    parser.add_argument("--campaign-id", type=int, required=True)
+    parser.add_argument("--retry-failed", action="store_true", help="Queue failed deliveries again too")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_reminder_dispatch(args.campaign_id, args.retry_failed)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
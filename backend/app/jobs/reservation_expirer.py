@@ -0,0 +1,55 @@
+"""
+Stock reservation expirer
+Expires open stock reservations past their TTL so the reserved stock
+becomes sellable again. Works in limited batches, each in its own
+transaction, and skips rows locked by an in-flight invoice conversion.
+
+Usage:
+    python -m app.jobs.reservation_expirer [--org-id UUID] [--batch-size N]
+"""
+from typing import Any, Dict, Optional
+import argparse
+import json
+import logging
+
+from ..core.database import SessionLocal
+from ..api.services.stock_reservation_service import StockReservationService
+
+logger = logging.getLogger(__name__)
+
+
+def run_reservation_expiry(org_id: Optional[str] = None, batch_size: int = 1000) -> Dict[str, Any]:
+    """Expire stale reservations for one org, or for every org"""
+    db = SessionLocal()
+    try:
+        expired = 0
+        while True:
+            count = StockReservationService.expire_stale(db, org_id, limit=batch_size)
+            expired += count
+            if count < batch_size:
+                break
+
+        if expired:
+            logger.info(f"Expired {expired} stock reservations")
+        return {"org_id": org_id, "status": "completed", "reservations_expired": expired}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Reservation expiry failed: {str(e)}")
+        return {"org_id": org_id, "status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expire stock reservations past their TTL")
+    parser.add_argument("--org-id", help="Only expire reservations for this organization")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Reservations per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_reservation_expiry(args.org_id, args.batch_size)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Product stock summary reconciler
+Recomputes inventory.product_stock_summary from batches for each org,
+corrects drift and moves stock between the expired / near-expiry buckets
+as dates pass.
+
+Usage:
+    python -m app.jobs.stock_summary_reconciler [--org-id UUID] [--product-id ID ...]
+"""
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+import argparse
+import json
+import logging
+
+from ..core.database import SessionLocal
+from ..api.services.stock_summary_service import StockSummaryService
+
+logger = logging.getLogger(__name__)
+
+
+def run_stock_summary_reconciliation(
+    org_id: Optional[str] = None,
+    product_ids: Optional[List[int]] = None
+) -> List[Dict[str, Any]]:
+    """Reconcile one org, or every org with products; failures are isolated per org"""
+    db = SessionLocal()
+    try:
+        if org_id:
+            org_ids = [org_id]
+        else:
+            org_ids = [
+                str(row.org_id) for row in
+                db.execute(text("SELECT DISTINCT org_id FROM inventory.products"))
+            ]
+            db.commit()
+
+        results = []
+        for current_org in org_ids:
+            try:
+                drifted = StockSummaryService.reconcile(db, current_org, product_ids)
+                results.append({
+                    "org_id": current_org,
+                    "status": "completed",
+                    "products_corrected": len(drifted),
+                    "drifted": drifted
+                })
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Stock summary reconciliation failed for org {current_org}: {str(e)}")
+                results.append({"org_id": current_org, "status": "failed", "error": str(e)})
+        return results
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the product stock summary with batches")
+    parser.add_argument("--org-id", help="Only reconcile this organization")
+    parser.add_argument("--product-id", type=int, action="append", dest="product_ids",
+                        help="Only reconcile these products (repeatable)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = run_stock_summary_reconciliation(args.org_id, args.product_ids)
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
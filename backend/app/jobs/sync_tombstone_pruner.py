@@ -0,0 +1,56 @@
+"""
+Sync tombstone pruning
+Deletes leave a tombstone in system_config.sync_changes so that clients
+syncing deltas learn about them. Once a tombstone is older than the sync
+token retention, every client that could still need it has to resync in
+full anyway, so it is removed.
+
+Usage:
+    python -m app.jobs.sync_tombstone_pruner [--retention-days 30]
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+import argparse
+import json
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def run_sync_tombstone_prune(retention_days: Optional[int] = None) -> Dict[str, Any]:
+    """Delete sync tombstones older than the sync token retention"""
+    retention_days = retention_days or settings.SYNC_TOKEN_RETENTION_DAYS
+    db = SessionLocal()
+    try:
+        pruned = db.execute(
+            text("SELECT system_config.prune_sync_tombstones(:retention_days)"),
+            {"retention_days": retention_days}
+        ).scalar()
+        db.commit()
+        if pruned:
+            logger.info(f"Sync feed: pruned {pruned} tombstones older than {retention_days} days")
+        return {"status": "completed", "tombstones_pruned": pruned, "retention_days": retention_days}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Sync tombstone pruning failed: {str(e)}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune expired delta sync tombstones")
+    parser.add_argument("--retention-days", type=int, default=None,
+                        help="Defaults to SYNC_TOKEN_RETENTION_DAYS")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_sync_tombstone_prune(args.retention_days)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
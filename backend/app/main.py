@@ -1,39 +1,101 @@
 """
 FastAPI Main Application
 """
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
+from importlib import import_module
 import os
 
-# Import routers
-from .api.routes import (
-    auth, customers, products, sales, inventory, 
-    payments, dashboard, billing, api_wrapper, test_db
-)
-
-# Import additional routers that are actually available
-from .api.routes import (
-    customers_router, orders_router, inventory_router, billing_router, 
-    payments_router, invoices_router, order_items_router, users_router, 
-    suppliers_router, purchases_router, delivery_challan_router, 
-    dashboard_router, stock_adjustments_router, tax_entries_router,
-    purchase_upload_router, purchase_enhanced_router, sale_returns_api_router,
-    purchase_returns_router, stock_movements_router, party_ledger_router,
-    credit_debit_notes_router, sales_router, enterprise_orders_router,
-    collection_center_router
-)
-
-# Import additional routers not in __init__.py
-from .api.routes import stock_receive, enterprise_delivery_challan
+from .core.config import settings
+from .core.scheduler import scheduler
+from .jobs.expiry_sweeper import run_expiry_sweep
+from .jobs.stock_summary_reconciler import run_stock_summary_reconciliation
+from .jobs.reservation_expirer import run_reservation_expiry
+from .jobs.document_renderer import render_pool, run_render_gc
+from .jobs.api_usage_partitions import run_api_usage_partition_maintenance
+from .jobs.data_version_compactor import run_data_version_compaction
+from .jobs.sync_tombstone_pruner import run_sync_tombstone_prune
+from .jobs.outbound_queue_worker import outbound_queue_workers, run_outbound_queue_purge
+from .core.api_usage import ApiUsageMiddleware, api_usage_recorder
+from .core.audit import audit_log
+from .core.passwords import password_hasher
+from .api.services.message_sender import message_sender
 
 # Lifecycle management
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 Starting Pharma ERP Backend...")
+    print(f"🚀 Starting Pharma ERP Backend... (app loaded in {APP_IMPORT_MS} ms, {len(app.routes)} routes)")
+    if settings.SCHEDULER_ENABLED:
+        scheduler.register(
+            "expiry_sweep",
+            run_expiry_sweep,
+            interval_seconds=settings.EXPIRY_SWEEP_INTERVAL_MINUTES * 60,
+            initial_delay=60
+        )
+        scheduler.register(
+            "stock_summary_reconcile",
+            run_stock_summary_reconciliation,
+            interval_seconds=settings.STOCK_SUMMARY_RECONCILE_INTERVAL_MINUTES * 60,
+            initial_delay=300
+        )
+        scheduler.register(
+            "reservation_expiry",
+            run_reservation_expiry,
+            interval_seconds=settings.RESERVATION_EXPIRY_INTERVAL_MINUTES * 60,
+            initial_delay=30
+        )
+        scheduler.register(
+            "render_gc",
+            run_render_gc,
+            interval_seconds=settings.RENDER_GC_INTERVAL_MINUTES * 60,
+            initial_delay=600
+        )
+        scheduler.register(
+            "data_version_compaction",
+            run_data_version_compaction,
+            interval_seconds=settings.DATA_VERSION_COMPACT_INTERVAL_MINUTES * 60,
+            initial_delay=900
+        )
+        scheduler.register(
+            "sync_tombstone_prune",
+            run_sync_tombstone_prune,
+            interval_seconds=settings.SYNC_TOMBSTONE_PRUNE_INTERVAL_MINUTES * 60,
+            initial_delay=1200
+        )
+        scheduler.register(
+            "outbound_queue_purge",
+            run_outbound_queue_purge,
+            interval_seconds=settings.OUTBOUND_QUEUE_PURGE_INTERVAL_MINUTES * 60,
+            initial_delay=1500
+        )
+        if settings.API_USAGE_LOG_ENABLED:
+            scheduler.register(
+                "api_usage_partitions",
+                run_api_usage_partition_maintenance,
+                interval_seconds=settings.API_USAGE_PARTITION_INTERVAL_MINUTES * 60,
+                initial_delay=10
+            )
+        scheduler.start()
+    api_usage_recorder.start()
+    audit_log.start()
+    if settings.OUTBOUND_QUEUE_WORKERS > 0:
+        outbound_queue_workers.start()
     yield
     # Shutdown
+    await scheduler.stop()
+    await api_usage_recorder.stop()
+    await audit_log.stop()
+    render_pool.shutdown()
+    await outbound_queue_workers.stop()
+    await message_sender.close()
+    password_hasher.shutdown()
     print("👋 Shutting down...")
 
 # Create FastAPI app
@@ -62,6 +124,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON bodies; small ones are not worth the CPU
+if settings.GZIP_ENABLED:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.GZIP_MINIMUM_SIZE,
+        compresslevel=settings.GZIP_COMPRESS_LEVEL
+    )
+
+# Per-request usage metrics, buffered and flushed off the request path
+if settings.API_USAGE_LOG_ENABLED:
+    app.add_middleware(ApiUsageMiddleware)
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -84,88 +158,68 @@ async def health_check():
         "version": "2.0.0"
     }
 
-# API v2 prefix
-from fastapi import APIRouter
-api_v2 = APIRouter(prefix="/api/v2")
-
-# Register routes
-api_v2.include_router(auth.router, prefix="/auth", tags=["Authentication"])
-api_v2.include_router(customers.router, prefix="/customers", tags=["Customers"])
-api_v2.include_router(products.router, prefix="/products", tags=["Products"])
-api_v2.include_router(sales.router, prefix="/sales", tags=["Sales"])
-api_v2.include_router(inventory.router, prefix="/inventory", tags=["Inventory"])
-api_v2.include_router(payments.router, prefix="/payments", tags=["Payments"])
-api_v2.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
-api_v2.include_router(billing.router, prefix="/billing", tags=["Billing"])
-# Register additional routes from __init__.py
-api_v2.include_router(orders_router, tags=["Orders"])
-api_v2.include_router(invoices_router, tags=["Invoices"])
-api_v2.include_router(order_items_router, tags=["Order Items"])
-api_v2.include_router(users_router, tags=["Users"])
-api_v2.include_router(suppliers_router, tags=["Suppliers"])
-api_v2.include_router(purchases_router, tags=["Purchases"])
-api_v2.include_router(delivery_challan_router, tags=["Delivery Challan"])
-api_v2.include_router(stock_adjustments_router, tags=["Stock Adjustments"])
-api_v2.include_router(tax_entries_router, tags=["Tax Entries"])
-api_v2.include_router(purchase_upload_router, tags=["Purchase Upload"])
-api_v2.include_router(purchase_enhanced_router, tags=["Purchase Enhanced"])
-api_v2.include_router(sale_returns_api_router, tags=["Sale Returns"])
-api_v2.include_router(purchase_returns_router, tags=["Purchase Returns"])
-api_v2.include_router(stock_movements_router, tags=["Stock Movements"])
-api_v2.include_router(party_ledger_router, tags=["Party Ledger"])
-api_v2.include_router(credit_debit_notes_router, tags=["Credit/Debit Notes"])
-api_v2.include_router(enterprise_orders_router, tags=["Enterprise Orders"])
-api_v2.include_router(collection_center_router, tags=["Collection Center"])
-api_v2.include_router(stock_receive.router, tags=["Stock Receive"])
-api_v2.include_router(enterprise_delivery_challan.router, tags=["Enterprise Delivery Challan"])
+@app.get("/health/metrics")
+async def health_metrics():
+    """In-process queue depths and counters of the background workers"""
+    return {
+        "password_hashing": password_hasher.stats(),
+        "api_usage_log": api_usage_recorder.stats(),
+        "audit_log": audit_log.stats(),
+        "message_sender": message_sender.stats(),
+        "outbound_queue": outbound_queue_workers.stats(),
+        "startup": {"app_import_ms": APP_IMPORT_MS, "routes": len(app.routes)}
+    }
 
-# Include the PostgreSQL function wrappers
-api_v2.include_router(api_wrapper.router, prefix="/pg", tags=["PostgreSQL Functions"])
+# Routers served under both /api/v2 and /api/v1: (module in api.routes, prefix, tag)
+API_ROUTES = (
+    ("auth", "/auth", "Authentication"),
+    ("customers", "/customers", "Customers"),
+    ("products", "/products", "Products"),
+    ("sales", "/sales", "Sales"),
+    ("inventory", "/inventory", "Inventory"),
+    ("payments", "/payments", "Payments"),
+    ("dashboard", "/dashboard", "Dashboard"),
+    ("billing", "/billing", "Billing"),
+    ("orders", "", "Orders"),
+    ("invoices", "", "Invoices"),
+    ("order_items", "", "Order Items"),
+    ("users", "", "Users"),
+    ("suppliers", "", "Suppliers"),
+    ("purchases", "", "Purchases"),
+    ("delivery_challan", "", "Delivery Challan"),
+    ("stock_adjustments", "", "Stock Adjustments"),
+    ("tax_entries", "", "Tax Entries"),
+    ("purchase_upload", "", "Purchase Upload"),
+    ("purchase_enhanced", "", "Purchase Enhanced"),
+    ("sale_returns", "", "Sale Returns"),
+    ("purchase_returns", "", "Purchase Returns"),
+    ("stock_movements", "", "Stock Movements"),
+    ("party_ledger", "", "Party Ledger"),
+    ("credit_debit_notes", "", "Credit/Debit Notes"),
+    ("enterprise_orders", "", "Enterprise Orders"),
+    ("collection_center_simple", "", "Collection Center"),
+    ("stock_receive", "", "Stock Receive"),
+    ("enterprise_delivery_challan", "", "Enterprise Delivery Challan"),
+    ("sales_orders", "", "Sales Orders"),
+    ("sync", "", "Sync"),
+    ("messages", "", "Messages"),
+)
 
-# Include the v2 API
-app.include_router(api_v2)
 
-# Include test routes for debugging
-app.include_router(test_db.router)
+def _router(module_name: str) -> APIRouter:
+    return import_module(f".api.routes.{module_name}", __package__).router
+
+
+def include_api(version_prefix: str):
+    """Mount every router of API_ROUTES straight onto the app under one version prefix"""
+    for module_name, prefix, tag in API_ROUTES:
+        app.include_router(_router(module_name), prefix=f"{version_prefix}{prefix}", tags=[tag])
 
-# Also include v1 routes for backward compatibility
-api_v1 = APIRouter(prefix="/api/v1")
-api_v1.include_router(auth.router, prefix="/auth", tags=["Authentication"])
-api_v1.include_router(customers.router, prefix="/customers", tags=["Customers"])
-api_v1.include_router(products.router, prefix="/products", tags=["Products"])
-api_v1.include_router(sales.router, prefix="/sales", tags=["Sales"])
-api_v1.include_router(inventory.router, prefix="/inventory", tags=["Inventory"])
-api_v1.include_router(payments.router, prefix="/payments", tags=["Payments"])
-api_v1.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
-api_v1.include_router(billing.router, prefix="/billing", tags=["Billing"])
-# Register additional routes from __init__.py
-api_v1.include_router(orders_router, tags=["Orders"])
-api_v1.include_router(invoices_router, tags=["Invoices"])
-api_v1.include_router(order_items_router, tags=["Order Items"])
-api_v1.include_router(users_router, tags=["Users"])
-api_v1.include_router(suppliers_router, tags=["Suppliers"])
-api_v1.include_router(purchases_router, tags=["Purchases"])
-api_v1.include_router(delivery_challan_router, tags=["Delivery Challan"])
-api_v1.include_router(stock_adjustments_router, tags=["Stock Adjustments"])
-api_v1.include_router(tax_entries_router, tags=["Tax Entries"])
-api_v1.include_router(purchase_upload_router, tags=["Purchase Upload"])
-api_v1.include_router(purchase_enhanced_router, tags=["Purchase Enhanced"])
-api_v1.include_router(sale_returns_api_router, tags=["Sale Returns"])
-api_v1.include_router(purchase_returns_router, tags=["Purchase Returns"])
-api_v1.include_router(stock_movements_router, tags=["Stock Movements"])
-api_v1.include_router(party_ledger_router, tags=["Party Ledger"])
-api_v1.include_router(credit_debit_notes_router, tags=["Credit/Debit Notes"])
-api_v1.include_router(enterprise_orders_router, tags=["Enterprise Orders"])
-api_v1.include_router(collection_center_router, tags=["Collection Center"])
-api_v1.include_router(stock_receive.router, tags=["Stock Receive"])
-api_v1.include_router(enterprise_delivery_challan.router, tags=["Enterprise Delivery Challan"])
-
-app.include_router(api_v1)
 
 # PostgreSQL function wrapper endpoints
 # Since frontend expects REST but backend has PostgreSQL functions
 # We'll create wrapper endpoints
-@api_v2.get("/test-connection")
+@app.get("/api/v2/test-connection")
 async def test_connection():
     """Test if backend is properly connected"""
     return {
@@ -174,6 +228,20 @@ async def test_connection():
         "timestamp": "2024-01-15T12:00:00Z"
     }
 
+# Include the v2 API
+include_api("/api/v2")
+
+# Include the PostgreSQL function wrappers
+app.include_router(_router("api_wrapper"), prefix="/api/v2/pg", tags=["PostgreSQL Functions"])
+
+# Include test routes for debugging
+app.include_router(_router("test_db"))
+
+# Also include v1 routes for backward compatibility
+include_api("/api/v1")
+
+APP_IMPORT_MS = round((time.perf_counter() - _import_started) * 1000, 1)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
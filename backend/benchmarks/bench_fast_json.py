@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark list response encoding: FastAPI's standard path versus
+app.core.fast_json, per endpoint, on synthetic rows shaped like each
+endpoint's query (Decimal, date, datetime and UUID columns included)
+
+Standard path, as FastAPI runs it:
+  - dict endpoints: jsonable_encoder, then json.dumps (JSONResponse)
+  - list_customers: a CustomerResponse per row, CustomerListResponse,
+    response_model validation and model serialization, then json.dumps
+Fast path: fast_json.dumps on the row dicts (projected to the
+CustomerResponse fields for list_customers).
+
+Reports ms per response and the speed-up for each endpoint.
+
+Usage:
+    cd backend && python benchmarks/bench_fast_json.py [--rows 1000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core import fast_json
+from app.api.schemas.customer import CustomerListResponse, CustomerResponse
+
+ORG_ID = uuid.uuid4()
+NOW = datetime(2024, 6, 1, 10, 30, tzinfo=timezone.utc)
+
+
+def customer_rows(n):
+    return [{
+        "customer_id": i,
+        "org_id": ORG_ID,
+        "customer_code": f"CUST{i:05d}",
+        "customer_name": f"Customer {i}",
+        "customer_type": "pharmacy",
+        "contact_person": "Owner",
+        "phone": f"98{i:08d}",
+        "alternate_phone": None,
+        "email": f"customer{i}@example.com",
+        "city": "Pune",
+        "state": "Maharashtra",
+        "pincode": "411001",
+        "gstin": "27AAAPL1234C1Z5",
+        "pan_number": "AAAPL1234C",
+        "drug_license_number": f"DL-{i}",
+        "credit_limit": Decimal("50000.00"),
+        "credit_days": 30,
+        "discount_percent": Decimal("2.50"),
+        "is_active": True,
+        "notes": None,
+        "total_orders": i % 40,
+        "total_business": Decimal("125430.75"),
+        "last_order_date": date(2024, 5, 1) + timedelta(days=i % 30),
+        "outstanding_amount": Decimal("8200.10"),
+        "created_at": NOW,
+        "updated_at": NOW
+    } for i in range(n)]
+
+
+def movement_rows(n):
+    return [{
+        "movement_id": str(uuid.uuid4()),
+        "movement_number": f"SR-20240601-{i:06d}",
+        "movement_type": "receive" if i % 2 else "issue",
+        "movement_date": date(2024, 6, 1) - timedelta(days=i % 90),
+        "product_id": i % 500,
+        "product_name": f"Product {i % 500}",
+        "hsn_code": "30049099",
+        "batch_id": i,
+        "quantity": 10 + i % 7,
+        "unit_cost": Decimal("12.3400"),
+        "total_value": Decimal("123.40"),
+        "reason": "adjustment",
+        "notes": None,
+        "created_at": NOW
+    } for i in range(n)]
+
+
+def tax_entry_rows(n):
+    return [{
+        "entry_id": i,
+        "entry_type": "sales",
+        "entry_date": date(2024, 6, 1) - timedelta(days=i % 30),
+        "reference_id": i,
+        "party_id": i % 200,
+        "tax_type": "cgst",
+        "tax_rate": Decimal("6.00"),
+        "taxable_amount": Decimal("1000.00"),
+        "tax_amount": Decimal("60.00"),
+        "hsn_code": "30049099",
+        "party_name": f"Customer {i % 200}",
+        "party_gstin": "27AAAPL1234C1Z5",
+        "created_at": NOW
+    } for i in range(n)]
+
+
+def dashboard_rows(n):
+    return [{
+        "customer_id": i,
+        "customer_name": f"Customer {i}",
+        "customer_phone": f"98{i:08d}",
+        "total_orders": 12,
+        "total_spent": Decimal("48210.50"),
+        "avg_order_value": Decimal("4017.5416666666666667"),
+        "last_order_date": NOW
+    } for i in range(n)]
+
+
+def standard_dict(payload):
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def standard_customers(rows):
+    response = CustomerListResponse(
+        total=len(rows), page=1, per_page=len(rows),
+        customers=[CustomerResponse(**row) for row in rows]
+    )
+    validated = CustomerListResponse.model_validate(response, from_attributes=True)
+    return standard_dict(validated.model_dump(mode="json"))
+
+
+def fast_customers(rows):
+    return fast_json.dumps({
+        "total": len(rows), "page": 1, "per_page": len(rows),
+        "customers": [fast_json.project(row, CustomerResponse) for row in rows]
+    }, like_model=True)
+
+
+def timed(fn, arg, repeat):
+    fn(arg)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn(arg)
+    return (time.perf_counter() - start) * 1000 / repeat, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark standard vs fast JSON list responses")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    endpoints = [
+        ("list_customers", customer_rows(args.rows), standard_customers, fast_customers),
+        ("get_stock_movements", {"total": args.rows, "movements": movement_rows(args.rows)},
+         standard_dict, fast_json.dumps),
+        ("get_tax_entries", tax_entry_rows(args.rows), standard_dict, fast_json.dumps),
+        ("dashboard customer-analytics", dashboard_rows(args.rows), standard_dict, fast_json.dumps),
+    ]
+
+    encoder = "orjson" if fast_json.orjson is not None else "stdlib json"
+    print(f"\n{args.rows} rows per response, {args.repeat} repeats, fast path on {encoder}:")
+    print(f"  {'endpoint':<30} {'standard ms':>12} {'fast ms':>10} {'speed-up':>9} {'bytes':>10}")
+    for name, payload, standard, fast in endpoints:
+        standard_ms, size = timed(standard, payload, args.repeat)
+        fast_ms, _ = timed(fast, payload, args.repeat)
+        print(f"  {name:<30} {standard_ms:12.2f} {fast_ms:10.2f} {standard_ms / fast_ms:8.1f}x {size:10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark the batched GST calculator against the per-item Decimal loop it replaced
+
+Scenarios:
+  - one 500-line invoice
+  - 10,000 preview recalculations (5 lines each), per call and as one batch
+
+Usage:
+    cd backend && python benchmarks/bench_gst_calculator.py [--repeat N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.api.services.gst_calculator import GSTCalculator
+
+GST_RATES = [0, 5, 12, 18, 28]
+
+
+def legacy_gst_amounts(taxable_amount, gst_rate, interstate):
+    """GSTService.calculate_gst_amounts as it was before the batched engine"""
+    result = {
+        "cgst_rate": Decimal("0"), "sgst_rate": Decimal("0"), "igst_rate": Decimal("0"),
+        "cgst_amount": Decimal("0"), "sgst_amount": Decimal("0"), "igst_amount": Decimal("0"),
+        "total_tax": Decimal("0")
+    }
+    if gst_rate == 0:
+        return result
+    taxable_amount = Decimal(str(taxable_amount))
+    gst_rate = Decimal(str(gst_rate))
+    if not interstate:
+        cgst_rate = sgst_rate = gst_rate / 2
+        result["cgst_rate"] = cgst_rate
+        result["sgst_rate"] = sgst_rate
+        result["cgst_amount"] = (taxable_amount * cgst_rate / 100).quantize(Decimal("0.01"))
+        result["sgst_amount"] = (taxable_amount * sgst_rate / 100).quantize(Decimal("0.01"))
+        result["total_tax"] = result["cgst_amount"] + result["sgst_amount"]
+    else:
+        result["igst_rate"] = gst_rate
+        result["igst_amount"] = (taxable_amount * gst_rate / 100).quantize(Decimal("0.01"))
+        result["total_tax"] = result["igst_amount"]
+    return result
+
+
+def legacy_item_gst(item, interstate):
+    """GSTService.calculate_item_gst as it was before the batched engine"""
+    quantity = Decimal(str(item.get("quantity", 0)))
+    unit_price = Decimal(str(item.get("unit_price", 0)))
+    discount_percent = Decimal(str(item.get("discount_percent", 0)))
+    discount_amount = Decimal(str(item.get("discount_amount", 0)))
+    gst_rate = Decimal(str(item.get("tax_percent", 0)))
+
+    base_amount = quantity * unit_price
+    if discount_percent > 0:
+        discount_amount = (base_amount * discount_percent / 100).quantize(Decimal("0.01"))
+    taxable_amount = base_amount - discount_amount
+
+    gst_amounts = legacy_gst_amounts(taxable_amount, gst_rate, interstate)
+    return {
+        "quantity": quantity, "unit_price": unit_price, "base_amount": base_amount,
+        "discount_percent": discount_percent, "discount_amount": discount_amount,
+        "taxable_amount": taxable_amount, "gst_rate": gst_rate,
+        "cgst_rate": gst_amounts["cgst_rate"], "sgst_rate": gst_amounts["sgst_rate"],
+        "igst_rate": gst_amounts["igst_rate"], "cgst_amount": gst_amounts["cgst_amount"],
+        "sgst_amount": gst_amounts["sgst_amount"], "igst_amount": gst_amounts["igst_amount"],
+        "tax_amount": gst_amounts["total_tax"],
+        "total_amount": taxable_amount + gst_amounts["total_tax"]
+    }
+
+
+def legacy_invoice(items, interstate=False):
+    """Item loop of GSTService.calculate_invoice_gst before the batched engine"""
+    items_calculated = []
+    totals = {k: Decimal("0") for k in ("base", "discount", "taxable", "cgst", "sgst", "igst")}
+    for item in items:
+        calc = legacy_item_gst(item, interstate)
+        items_calculated.append(calc)
+        totals["base"] += calc["base_amount"]
+        totals["discount"] += calc["discount_amount"]
+        totals["taxable"] += calc["taxable_amount"]
+        totals["cgst"] += calc["cgst_amount"]
+        totals["sgst"] += calc["sgst_amount"]
+        totals["igst"] += calc["igst_amount"]
+    return items_calculated, totals
+
+
+def make_items(count, rng):
+    return [
+        {
+            "quantity": rng.randint(1, 200),
+            "unit_price": Decimal(rng.randint(100, 500000)) / 100,
+            "discount_percent": Decimal(rng.choice([0, 0, 2.5, 5, 10])),
+            "tax_percent": Decimal(rng.choice(GST_RATES))
+        }
+        for _ in range(count)
+    ]
+
+
+def timed(label, fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"  {label:<38} best {samples[0] * 1000:9.2f} ms   median {samples[len(samples) // 2] * 1000:9.2f} ms")
+    return samples[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batched GST calculator")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    # Scenario 1: one 500-line invoice
+    invoice = make_items(500, rng)
+    print("500-line invoice (line results + totals):")
+    legacy = timed("legacy per-item Decimal loop", lambda: legacy_invoice(invoice), args.repeat)
+    batched = timed("GSTCalculator, lines + totals",
+                    lambda: GSTCalculator.calculate_items(invoice).lines(), args.repeat)
+    totals_only = timed("GSTCalculator, totals only",
+                        lambda: GSTCalculator.calculate_items(invoice).totals(), args.repeat)
+    print(f"  speedup: {legacy / batched:.1f}x with lines, {legacy / totals_only:.1f}x totals only")
+
+    totals = GSTCalculator.calculate_items(invoice).totals()
+    legacy_totals = legacy_invoice(invoice)[1]
+    print(f"  taxable {totals['taxable_amount']} (legacy {legacy_totals['taxable']}), "
+          f"tax {totals['tax_amount']} (legacy {legacy_totals['cgst'] + legacy_totals['sgst']})")
+
+    # Scenario 2: 10k preview recalculations of 5 lines each
+    previews = [make_items(5, rng) for _ in range(10000)]
+    flat = [item for preview in previews for item in preview]
+    invoice_index = [i for i, preview in enumerate(previews) for _ in preview]
+
+    def batched_previews():
+        result = GSTCalculator.calculate(
+            quantities=[item["quantity"] for item in flat],
+            unit_prices=[item["unit_price"] for item in flat],
+            gst_percents=[item["tax_percent"] for item in flat],
+            discount_percents=[item["discount_percent"] for item in flat],
+            invoice_index=invoice_index
+        )
+        return [result.totals(i) for i in range(len(previews))]
+
+    print("\n10,000 preview recalculations (5 lines each):")
+    legacy = timed("legacy per-item Decimal loop",
+                   lambda: [legacy_invoice(p) for p in previews], args.repeat)
+    per_call = timed("GSTCalculator, one call per preview",
+                     lambda: [GSTCalculator.calculate_items(p).totals() for p in previews], args.repeat)
+    batched = timed("GSTCalculator, one batched call", batched_previews, args.repeat)
+    print(f"  speedup: {legacy / per_call:.1f}x per call, {legacy / batched:.1f}x batched")
+
+
+if __name__ == "__main__":
+    main()
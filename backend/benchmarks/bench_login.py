@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent logins: bcrypt verification inline on the event loop
+(what the login handler used to do) versus the bounded password pool
+
+In-process mode runs `--logins` verifications from `--concurrency`
+coroutines and, alongside them, a 10 ms ticker whose overshoot is the
+event-loop stall every other request would see. Reports logins/s,
+p50 / p99 login latency and the worst loop stall.
+
+With --url it instead fires concurrent form logins at a running server
+and reports throughput, latency and status codes (503 = pool full).
+
+Usage:
+    cd backend && python benchmarks/bench_login.py [--logins 200] [--concurrency 50] [--rounds 12]
+    cd backend && python benchmarks/bench_login.py --url http://localhost:8000/api/v2/auth/auth/login \\
+        --email user@example.com --password secret [--logins 200] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.jwt_auth import pwd_context
+from app.core.passwords import PasswordHasher
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def ticker(stop, lags, interval=0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_logins(verify, logins, concurrency):
+    """verify: coroutine function taking no arguments; returns latencies"""
+    latencies = []
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await verify()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def measure(label, verify, logins, concurrency):
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    latencies = await run_logins(verify, logins, concurrency)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    latencies.sort()
+    print(f"  {label:<10} {logins / elapsed:8.1f} logins/s   "
+          f"p50 {percentile(latencies, 50) * 1000:8.1f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:8.1f} ms   "
+          f"max loop stall {max(lags, default=0) * 1000:8.1f} ms")
+
+
+async def in_process(args):
+    context = pwd_context.copy(bcrypt__default_rounds=args.rounds, bcrypt__min_rounds=args.rounds,
+                               bcrypt__max_rounds=args.rounds)
+    password = "correct horse battery staple"
+    password_hash = context.hash(password)
+    hasher = PasswordHasher(workers=args.workers, max_pending=args.logins)
+
+    async def inline():
+        context.verify(password, password_hash)
+
+    async def pooled():
+        await asyncio.wrap_future(hasher._submit(context.verify, password, password_hash))
+
+    print(f"\n{args.logins} logins, {args.concurrency} concurrent, bcrypt cost {args.rounds}, "
+          f"{args.workers} pool workers:")
+    await measure("inline", inline, args.logins, args.concurrency)
+    await measure("pool", pooled, args.logins, args.concurrency)
+    print(f"  pool stats: {hasher.stats()}")
+    hasher.shutdown()
+
+
+async def against_server(args):
+    import httpx
+
+    statuses = Counter()
+    async with httpx.AsyncClient(timeout=60) as client:
+        async def login():
+            response = await client.post(args.url, data={"username": args.email, "password": args.password})
+            statuses[response.status_code] += 1
+
+        print(f"\n{args.logins} logins against {args.url}, {args.concurrency} concurrent:")
+        await measure("server", login, args.logins, args.concurrency)
+    print(f"  status codes: {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent login throughput")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost (in-process mode)")
+    parser.add_argument("--workers", type=int, default=4, help="Pool workers (in-process mode)")
+    parser.add_argument("--url", help="Login endpoint of a running server")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    if args.url:
+        if not (args.email and args.password):
+            parser.error("--email and --password are required with --url")
+        asyncio.run(against_server(args))
+    else:
+        asyncio.run(in_process(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark the two order execution modes against a real database: the
+service-layer pipeline (ORDER_EXECUTION_MODE=python) versus one
+api.place_order() call (ORDER_EXECUTION_MODE=procedure)
+
+Every sale runs inside a savepoint that is rolled back, so the database is
+left unchanged. Reports p50 / p99 latency and statements per sale for each
+basket size, and checks that both modes bill the same total.
+
+Requires DATABASE_URL pointing at a database with database/07-api loaded
+and the org's customers, products and in-stock batches.
+
+Usage:
+    cd backend && python benchmarks/bench_order_modes.py --org-id UUID --customer-id N \\
+        [--iterations 200] [--basket-sizes 1,5,20,50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event, text
+
+from app.core.database import SessionLocal, engine
+from app.api.services.quick_sale_service import EXECUTION_MODES, QuickSaleLine, QuickSaleService
+from bench_quick_sale import StatementCounter, percentile
+
+
+def place(db, mode, org_id, customer_id, lines):
+    return QuickSaleService.create_sale(db, org_id, customer_id, lines, mode=mode)
+
+
+def check_parity(db, org_id, customer_id, lines):
+    """Both modes must bill the same amounts for the same basket"""
+    totals = {}
+    for mode in EXECUTION_MODES:
+        savepoint = db.begin_nested()
+        result = place(db, mode, org_id, customer_id, lines)
+        totals[mode] = (result["total_amount"], result["item_count"])
+        savepoint.rollback()
+    if len(set(totals.values())) != 1:
+        sys.exit(f"Modes disagree: {totals}")
+
+
+def run(mode, db, org_id, customer_id, baskets, counter):
+    samples = []
+    statements = 0
+    for lines in baskets:
+        savepoint = db.begin_nested()
+        counter.count = 0
+        start = time.perf_counter()
+        place(db, mode, org_id, customer_id, lines)
+        samples.append(time.perf_counter() - start)
+        statements += counter.count
+        savepoint.rollback()
+    samples.sort()
+    print(f"  {mode:<12} p50 {percentile(samples, 50) * 1000:8.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1000:8.2f} ms   "
+          f"{statements / len(baskets):6.1f} statements/sale")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark python vs procedure order execution")
+    parser.add_argument("--org-id", required=True)
+    parser.add_argument("--customer-id", type=int, required=True)
+    parser.add_argument("--iterations", type=int, default=200, help="Sales per basket size and mode")
+    parser.add_argument("--basket-sizes", default="1,5,20,50")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+
+    db = SessionLocal()
+    try:
+        product_ids = [row.product_id for row in db.execute(text("""
+            SELECT product_id FROM inventory.batches
+            WHERE org_id = :org_id AND quantity_available > 0
+            AND (expiry_date IS NULL OR expiry_date > CURRENT_DATE)
+            GROUP BY product_id
+            HAVING SUM(quantity_available) >= 10
+        """), {"org_id": args.org_id})]
+        if not product_ids:
+            sys.exit("No products with stock for this org")
+
+        for size in (int(s) for s in args.basket_sizes.split(",")):
+            baskets = [
+                [QuickSaleLine(product_id=pid, quantity=1)
+                 for pid in rng.sample(product_ids, min(size, len(product_ids)))]
+                for _ in range(args.iterations)
+            ]
+            check_parity(db, args.org_id, args.customer_id, baskets[0])
+            print(f"\nBasket of {len(baskets[0])} items, {args.iterations} sales:")
+            for mode in EXECUTION_MODES:
+                run(mode, db, args.org_id, args.customer_id, baskets, counter)
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
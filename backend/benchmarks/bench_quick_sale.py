@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark quick-sale latency against a real database: the per-item query
+loop quick_sale used to run versus QuickSaleService's fixed round-trips
+
+Every sale runs inside a savepoint that is rolled back, so the database is
+left unchanged. Reports p50 / p99 latency and statements per sale for each
+basket size.
+
+Requires DATABASE_URL pointing at a database with the org's customers,
+products and in-stock batches.
+
+Usage:
+    cd backend && python benchmarks/bench_quick_sale.py --org-id UUID --customer-id N \\
+        [--iterations 200] [--basket-sizes 1,5,20,50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event, text
+
+from app.core.database import SessionLocal, engine
+from app.api.services.quick_sale_service import QuickSaleLine, QuickSaleService
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def legacy_quick_sale(db, org_id, customer_id, lines):
+    """The statements quick_sale.create_quick_sale issued per sale before the fast path"""
+    customer = db.execute(text("""
+        SELECT customer_id, customer_name, gst_number, state, state_code
+        FROM parties.customers WHERE customer_id = :customer_id AND org_id = :org_id
+    """), {"customer_id": customer_id, "org_id": org_id}).first()
+    prefix = f"ORD{time.strftime('%Y%m%d')}"
+    max_order = db.execute(text("""
+        SELECT MAX(order_number) FROM sales.orders WHERE org_id = :org_id AND order_number LIKE :prefix
+    """), {"org_id": org_id, "prefix": f"{prefix}%"}).scalar()
+    order_number = f"{prefix}{(int(max_order[-6:]) + 1) if max_order and max_order[-6:].isdigit() else 1:06d}"
+    db.execute(text("""
+        SELECT 1 FROM sales.orders WHERE order_number = :order_number AND org_id = :org_id
+    """), {"order_number": order_number, "org_id": org_id}).scalar()
+    order_id = db.execute(text("""
+        INSERT INTO sales.orders (org_id, customer_id, customer_name, order_number, order_type,
+            order_status, order_date, subtotal_amount, discount_amount, tax_amount, final_amount)
+        VALUES (:org_id, :customer_id, :customer_name, :order_number, 'sales', 'confirmed',
+            CURRENT_DATE, 0, 0, 0, 0)
+        RETURNING order_id
+    """), {"org_id": org_id, "customer_id": customer_id, "customer_name": customer.customer_name,
+           "order_number": order_number}).scalar()
+
+    subtotal = total_tax = Decimal("0")
+    for line in lines:
+        product = db.execute(text("""
+            SELECT product_id, product_name, mrp, sale_price, gst_percent
+            FROM inventory.products WHERE product_id = :product_id
+        """), {"product_id": line.product_id}).first()
+        db.execute(text("""
+            SELECT COALESCE(SUM(quantity_available), 0) FROM inventory.batches
+            WHERE product_id = :product_id AND org_id = :org_id
+            AND (expiry_date IS NULL OR expiry_date > CURRENT_DATE)
+        """), {"product_id": line.product_id, "org_id": org_id}).scalar()
+        price = product.sale_price or product.mrp
+        tax = line.quantity * price * (product.gst_percent or 12) / 100
+        subtotal += line.quantity * price
+        total_tax += tax
+        db.execute(text("""
+            INSERT INTO sales.order_items (order_id, product_id, quantity, selling_price, tax_percent,
+                tax_amount, total_price)
+            VALUES (:order_id, :product_id, :quantity, :price, :gst, :tax, :total)
+        """), {"order_id": order_id, "product_id": line.product_id, "quantity": line.quantity,
+               "price": price, "gst": product.gst_percent or 12, "tax": tax,
+               "total": line.quantity * price + tax})
+        batches = db.execute(text("""
+            SELECT batch_id, quantity_available FROM inventory.batches
+            WHERE product_id = :product_id AND org_id = :org_id AND quantity_available > 0
+            AND (expiry_date IS NULL OR expiry_date > CURRENT_DATE)
+            ORDER BY expiry_date ASC, batch_id ASC FOR UPDATE
+        """), {"product_id": line.product_id, "org_id": org_id}).fetchall()
+        remaining = line.quantity
+        for batch in batches:
+            if remaining <= 0:
+                break
+            take = min(remaining, batch.quantity_available)
+            db.execute(text("""
+                UPDATE inventory.batches
+                SET quantity_available = quantity_available - :qty, quantity_sold = quantity_sold + :qty
+                WHERE batch_id = :batch_id
+            """), {"qty": take, "batch_id": batch.batch_id})
+            remaining -= take
+
+    db.execute(text("""
+        UPDATE sales.orders SET subtotal_amount = :subtotal, tax_amount = :tax, final_amount = :final
+        WHERE order_id = :order_id
+    """), {"subtotal": subtotal, "tax": total_tax, "final": subtotal + total_tax, "order_id": order_id})
+    invoice_id = db.execute(text("""
+        INSERT INTO sales.invoices (org_id, invoice_number, order_id, customer_id, customer_name,
+            invoice_date, subtotal_amount, total_tax_amount, total_amount)
+        VALUES (:org_id, :invoice_number, :order_id, :customer_id, :customer_name,
+            CURRENT_DATE, :subtotal, :tax, :total)
+        RETURNING invoice_id
+    """), {"org_id": org_id, "invoice_number": f"INV{order_number[3:]}", "order_id": order_id,
+           "customer_id": customer_id, "customer_name": customer.customer_name,
+           "subtotal": subtotal, "tax": total_tax, "total": subtotal + total_tax}).scalar()
+    db.execute(text("""
+        INSERT INTO invoice_payments (payment_reference, invoice_id, payment_date, payment_mode,
+            amount, payment_amount)
+        VALUES (:reference, :invoice_id, CURRENT_DATE, 'cash', :amount, :amount)
+    """), {"reference": f"PAY-{invoice_id}", "invoice_id": invoice_id, "amount": subtotal + total_tax})
+    db.execute(text("UPDATE sales.orders SET paid_amount = final_amount WHERE order_id = :order_id"),
+               {"order_id": order_id})
+
+
+def fast_quick_sale(db, org_id, customer_id, lines):
+    QuickSaleService.create_sale(db, org_id, customer_id, lines)
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def run(label, fn, db, org_id, customer_id, baskets, counter):
+    samples = []
+    statements = 0
+    for lines in baskets:
+        savepoint = db.begin_nested()
+        counter.count = 0
+        start = time.perf_counter()
+        fn(db, org_id, customer_id, lines)
+        samples.append(time.perf_counter() - start)
+        statements += counter.count
+        savepoint.rollback()
+    samples.sort()
+    print(f"  {label:<12} p50 {percentile(samples, 50) * 1000:8.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1000:8.2f} ms   "
+          f"{statements / len(baskets):6.1f} statements/sale")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quick-sale latency")
+    parser.add_argument("--org-id", required=True)
+    parser.add_argument("--customer-id", type=int, required=True)
+    parser.add_argument("--iterations", type=int, default=200, help="Sales per basket size and mode")
+    parser.add_argument("--basket-sizes", default="1,5,20,50")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+
+    db = SessionLocal()
+    try:
+        # Products with enough sellable stock for repeated single-unit sales
+        product_ids = [row.product_id for row in db.execute(text("""
+            SELECT product_id FROM inventory.batches
+            WHERE org_id = :org_id AND quantity_available > 0
+            AND (expiry_date IS NULL OR expiry_date > CURRENT_DATE)
+            GROUP BY product_id
+            HAVING SUM(quantity_available) >= 10
+        """), {"org_id": args.org_id})]
+        if not product_ids:
+            sys.exit("No products with stock for this org")
+
+        for size in (int(s) for s in args.basket_sizes.split(",")):
+            baskets = [
+                [QuickSaleLine(product_id=pid, quantity=1)
+                 for pid in rng.sample(product_ids, min(size, len(product_ids)))]
+                for _ in range(args.iterations)
+            ]
+            print(f"\nBasket of {len(baskets[0])} items, {args.iterations} sales:")
+            run("legacy loop", legacy_quick_sale, db, args.org_id, args.customer_id, baskets, counter)
+            run("fast path", fast_quick_sale, db, args.org_id, args.customer_id, baskets, counter)
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
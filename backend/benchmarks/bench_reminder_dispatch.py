@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark reminder dispatch against the local stub provider: one blocking
+request per message on a fresh connection (how messaging.py sends) versus
+the async message sender with pooled connections, a token bucket for the
+provider and retries.
+
+The stub answers after --latency-ms and throttles or fails a share of
+requests, so the sender's retries are exercised; with --max-rps the stub
+enforces a rate limit and --rate sets the sender's bucket for it. Reports
+messages per second, retries and final failures, and the peak rate the
+stub saw.
+
+Usage:
+    cd backend && python benchmarks/bench_reminder_dispatch.py [--messages 500] [--latency-ms 80]
+        [--concurrency 50] [--rate 0] [--max-rps 0] [--throttle-rate 0.02] [--error-rate 0.02]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stub_message_provider import StubProvider, serve
+
+
+def sequential(url, messages):
+    """One urllib request per message, each on a new connection"""
+    sent = 0
+    for message in messages:
+        request = urllib.request.Request(
+            url, data=json.dumps(message).encode(), headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+            sent += 1
+        except urllib.error.URLError:
+            pass  # no retries on this path, as in messaging.py
+    return sent
+
+
+async def pooled(sender, messages, concurrency):
+    try:
+        return await sender.send_all(messages, concurrency=concurrency)
+    finally:
+        await sender.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk reminder dispatch against a stub provider")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--sequential-messages", type=int, default=100,
+                        help="Messages for the sequential baseline (it is slow)")
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=0, help="Sender token bucket, messages/second (0 = none)")
+    parser.add_argument("--max-rps", type=int, default=0, help="Rate limit enforced by the stub")
+    parser.add_argument("--throttle-rate", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.port}"
+    os.environ.update({"SMS_PROVIDER": "stub", "MESSAGING_STUB_URL": stub_url,
+                       "MESSAGE_RETRY_BASE_MS": "100"})
+    from app.api.services.message_sender import MessageSender, OutboundMessage
+
+    provider = StubProvider(args.latency_ms, args.throttle_rate, args.error_rate, args.max_rps)
+    server = serve(args.port, provider)
+    try:
+        baseline = [{"channel": "sms", "to": f"+9198{i:08d}", "body": "Payment reminder"}
+                    for i in range(args.sequential_messages)]
+        start = time.perf_counter()
+        sent = sequential(f"{stub_url}/messages", baseline)
+        sequential_rate = len(baseline) / (time.perf_counter() - start)
+        print(f"\nsequential, new connection per message: {len(baseline)} messages, "
+              f"{sent} sent, {sequential_rate:.1f} msg/s")
+
+        messages = [OutboundMessage(key=i, channel="sms", recipient=f"+9198{i:08d}", body="Payment reminder")
+                    for i in range(args.messages)]
+        sender = MessageSender(rate_limits=f"stub={args.rate}" if args.rate else "")
+        start = time.perf_counter()
+        results = asyncio.run(pooled(sender, messages, args.concurrency))
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for r in results if r.status != "sent")
+        stats = provider.stats()
+        print(f"async sender, {args.concurrency} in flight, pooled: {len(messages)} messages, "
+              f"{len(messages) - failed} sent, {failed} failed, {sender.retries} retries, "
+              f"{len(messages) / elapsed:.1f} msg/s ({len(messages) / elapsed / sequential_rate:.1f}x)")
+        print(f"stub saw: {json.dumps(stats)}")
+        if args.rate:
+            print(f"sender bucket {args.rate:g} msg/s, waited {sender.stats()['rate_limited_wait_seconds']}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Cold start profile: how long a fresh interpreter takes to import app.main
+(every router mounted under /api/v2 and /api/v1), and where that time goes
+
+Each run is a new process, as on a container start or an autoscale-up.
+The last run is repeated under `python -X importtime` to report the
+slowest modules (self and cumulative time) and the time per top-level
+package. Heavy optional dependencies (pdfplumber, twilio, boto3, pandas,
+openpyxl) are listed if anything pulls them in at startup; they should
+only load on first use.
+
+Exits 1 when the median cold start exceeds --target-ms (default 2000 ms,
+the target on a stock 1 vCPU container) so it can gate a deploy.
+
+Usage:
+    cd backend && python benchmarks/bench_startup.py [--runs 5] [--top 25] [--target-ms 2000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+HEAVY_MODULES = ("pdfplumber", "twilio", "boto3", "botocore", "pandas", "openpyxl", "numpy")
+
+# Imported and discarded: reads the route count without serving anything
+PROBE = "import app.main as m; print(len(m.app.routes), m.APP_IMPORT_MS)"
+
+
+def cold_start(importtime=False):
+    """(wall ms, stdout, stderr) of one fresh process importing app.main"""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", PROBE]
+    env = dict(os.environ, SCHEDULER_ENABLED="false")
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        sys.exit(f"import app.main failed:\n{result.stderr[-4000:]}")
+    return elapsed, result.stdout, result.stderr
+
+
+def cold_start_python():
+    """Wall ms of a fresh interpreter doing nothing, the floor under every start"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def package_of(module):
+    """Group app modules by their first two levels, everything else by top-level package"""
+    parts = module.split(".")
+    if parts[0] == "app":
+        return ".".join(parts[:3])
+    return parts[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the API's cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25, help="Slowest modules to list")
+    parser.add_argument("--target-ms", type=float, default=2000)
+    args = parser.parse_args()
+
+    baseline = statistics.median(cold_start_python() for _ in range(max(1, args.runs // 2)))
+    timings = []
+    for _ in range(args.runs):
+        elapsed, stdout, _ = cold_start()
+        timings.append(elapsed)
+    routes, app_import_ms = stdout.split()[-2:]  # the probe prints last
+    _, _, stderr = cold_start(importtime=True)
+    modules = parse_importtime(stderr)
+
+    print(f"\nTop {args.top} modules by self time:")
+    print(f"  {'self ms':>9} {'cumul ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda m: -m[1])[:args.top]:
+        print(f"  {self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in modules:
+        by_package[package_of(name)] += self_us
+    print(f"\nSelf time by package (top {args.top}):")
+    for package, self_us in sorted(by_package.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+
+    loaded = {name.split(".")[0] for name, _, _ in modules}
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    print(f"\nHeavy optional modules imported at startup: {', '.join(heavy) if heavy else 'none'}")
+
+    median = statistics.median(timings)
+    print(f"\n{args.runs} cold starts, {routes} routes: median {median:.0f} ms, "
+          f"min {min(timings):.0f} ms, max {max(timings):.0f} ms "
+          f"(bare interpreter {baseline:.0f} ms, app.main import {app_import_ms} ms)")
+    if median > args.target_ms:
+        print(f"FAIL: median cold start {median:.0f} ms exceeds the {args.target_ms:.0f} ms target")
+        sys.exit(1)
+    print(f"OK: under the {args.target_ms:.0f} ms target")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Local stub SMS/WhatsApp/email provider for exercising the message sender
+without sending anything. Accepts POST /messages (the "stub" provider's
+request), answers after --latency-ms, and can be told to throttle (429
+with Retry-After) or fail (503) a share of requests, or to enforce its own
+rate limit so the sender's token buckets can be checked. GET /stats
+returns what it received.
+
+Point the app at it with SMS_PROVIDER=stub (and/or WHATSAPP_PROVIDER,
+EMAIL_PROVIDER) and MESSAGING_STUB_URL=http://127.0.0.1:8025.
+
+Usage:
+    cd backend && python benchmarks/stub_message_provider.py [--port 8025] [--latency-ms 80]
+        [--throttle-rate 0.02] [--error-rate 0.02] [--max-rps 0]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubProvider:
+    """Behaviour and counters shared by the request handler threads"""
+
+    def __init__(self, latency_ms=80, throttle_rate=0.0, error_rate=0.0, max_rps=0):
+        self.latency_ms = latency_ms
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.counts = Counter()
+        self.recent = deque()  # accept times within the last second
+        self.peak_rps = 0
+        self.lock = threading.Lock()
+
+    def decide(self):
+        """HTTP status for the next request"""
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] > 1:
+                self.recent.popleft()
+            if self.max_rps and len(self.recent) >= self.max_rps:
+                status = 429
+            elif random.random() < self.throttle_rate:
+                status = 429
+            elif random.random() < self.error_rate:
+                status = 503
+            else:
+                status = 200
+                self.recent.append(now)
+                self.peak_rps = max(self.peak_rps, len(self.recent))
+            self.counts[status] += 1
+        return status
+
+    def stats(self):
+        with self.lock:
+            return {"accepted": self.counts[200], "throttled": self.counts[429],
+                    "failed": self.counts[503], "peak_rps": self.peak_rps}
+
+
+def make_handler(provider):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like a real provider
+
+        def _reply(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(provider.latency_ms / 1000)
+            status = provider.decide()
+            if status == 200:
+                self._reply(200, {"message_id": uuid.uuid4().hex, "status": "accepted"})
+            elif status == 429:
+                self._reply(429, {"error": "rate limited"}, {"Retry-After": "1"})
+            else:
+                self._reply(503, {"error": "temporarily unavailable"})
+
+        def do_GET(self):
+            self._reply(200, provider.stats())
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port, provider):
+    """Start the stub on a background thread; returns the server"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(provider))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub messaging provider")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 503")
+    parser.add_argument("--max-rps", type=int, default=0, help="Answer 429 above this rate (0 = no limit)")
+    args = parser.parse_args()
+
+    provider = StubProvider(args.latency_ms, args.throttle_rate, args.error_rate, args.max_rps)
+    server = serve(args.port, provider)
+    print(f"Stub provider on http://127.0.0.1:{args.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(json.dumps(provider.stats()))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ CREATE TABLE master.organizations (
     
     -- Regulatory Information
     gst_number TEXT UNIQUE,
+    gst_state_code TEXT, -- from the GSTIN, maintained by trigger
     pan_number TEXT,
     drug_license_number TEXT,
     drug_license_validity DATE,
@@ -27,6 +27,9 @@ CREATE TABLE parties.customers (
     
     -- Business information
     gst_number TEXT,
+    gst_state_code TEXT, -- from the GSTIN, maintained by trigger
+    gstin_checksum_valid BOOLEAN,
+    supply_type TEXT, -- 'intra_state', 'inter_state' against the organization
     pan_number TEXT,
     drug_license_number TEXT,
     drug_license_validity DATE,
@@ -51,6 +54,7 @@ CREATE TABLE parties.customers (
     territory_id INTEGER,
     route_id INTEGER,
     area_code TEXT,
+    state_code TEXT, -- place of supply when there is no GSTIN
     
     -- Sales information
     assigned_salesperson_id INTEGER REFERENCES master.org_users(user_id),
@@ -120,6 +124,9 @@ CREATE TABLE parties.suppliers (
     
     -- Business information
     gst_number TEXT,
+    gst_state_code TEXT, -- from the GSTIN, maintained by trigger
+    gstin_checksum_valid BOOLEAN,
+    supply_type TEXT, -- 'intra_state', 'inter_state' against the organization
     pan_number TEXT,
     drug_license_number TEXT,
     drug_license_validity DATE,
@@ -279,6 +279,7 @@ CREATE TABLE inventory.batches (
     recall_status TEXT, -- 'none', 'voluntary', 'mandatory'
     recall_date DATE,
     recall_reason TEXT,
+    stock_summary_bucket TEXT, -- 'sellable', 'near_expiry', 'expired': where product_stock_summary counts it
     
     -- Additional tracking
     serial_numbers TEXT[], -- For high-value items
@@ -376,7 +377,7 @@ CREATE TABLE inventory.stock_reservations (
     -- What is reserved
     product_id INTEGER NOT NULL REFERENCES inventory.products(product_id),
     batch_id INTEGER REFERENCES inventory.batches(batch_id),
-    location_id INTEGER NOT NULL REFERENCES inventory.storage_locations(location_id),
+    location_id INTEGER REFERENCES inventory.storage_locations(location_id), -- NULL for batch-level reservations
     
     -- Reservation details
     reserved_quantity NUMERIC(15,3) NOT NULL,
@@ -397,7 +398,7 @@ CREATE TABLE inventory.stock_reservations (
     reservation_status TEXT DEFAULT 'active', -- 'active', 'partial', 'fulfilled', 'cancelled', 'expired'
     
     -- Audit
-    reserved_by INTEGER NOT NULL REFERENCES master.org_users(user_id),
+    reserved_by INTEGER REFERENCES master.org_users(user_id),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     
     CONSTRAINT positive_reservation CHECK (reserved_quantity > 0)
@@ -590,12 +591,91 @@ CREATE TABLE inventory.reorder_suggestions (
     UNIQUE(product_id, suggestion_status)
 );
 
+-- 14. Expiry Sweep Progress
+CREATE TABLE inventory.expiry_sweep_progress (
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    sweep_date DATE NOT NULL, -- Expiry cut-off the sweep runs against
+    
+    -- Resume point (keyset over batch_id)
+    last_batch_id INTEGER NOT NULL DEFAULT 0,
+    
+    -- Totals
+    chunks_processed INTEGER DEFAULT 0,
+    batches_expired INTEGER DEFAULT 0,
+    quantity_expired NUMERIC(15,3) DEFAULT 0,
+    
+    -- Status
+    sweep_status TEXT DEFAULT 'running', -- 'running', 'completed', 'failed'
+    last_error_message TEXT,
+    
+    -- Audit
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    
+    PRIMARY KEY (org_id, sweep_date)
+);
+
+-- 15. Expiry Calendar (one row per batch with stock, bucketed by expiry month)
+CREATE TABLE inventory.expiry_calendar (
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    expiry_month DATE NOT NULL, -- First day of the expiry month
+    batch_id INTEGER NOT NULL REFERENCES inventory.batches(batch_id) ON DELETE CASCADE,
+    product_id INTEGER NOT NULL REFERENCES inventory.products(product_id),
+    
+    expiry_date DATE NOT NULL,
+    quantity_available NUMERIC(15,3) NOT NULL,
+    cost_per_unit NUMERIC(15,4) NOT NULL DEFAULT 0,
+    stock_value NUMERIC(15,2) NOT NULL DEFAULT 0,
+    
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (org_id, expiry_month, batch_id)
+);
+
+-- 16. Expiry Calendar Monthly Totals
+CREATE TABLE inventory.expiry_calendar_months (
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    expiry_month DATE NOT NULL,
+    
+    batch_count INTEGER NOT NULL DEFAULT 0,
+    quantity NUMERIC(15,3) NOT NULL DEFAULT 0,
+    stock_value NUMERIC(15,2) NOT NULL DEFAULT 0,
+    
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (org_id, expiry_month)
+);
+
+-- 17. Product Stock Summary (one row per org and product)
+CREATE TABLE inventory.product_stock_summary (
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    product_id INTEGER NOT NULL REFERENCES inventory.products(product_id) ON DELETE CASCADE,
+    
+    -- Quantities across all batches of the product
+    on_hand_quantity NUMERIC(15,3) NOT NULL DEFAULT 0,
+    sellable_quantity NUMERIC(15,3) NOT NULL DEFAULT 0, -- Unexpired, unreserved
+    reserved_quantity NUMERIC(15,3) NOT NULL DEFAULT 0,
+    expired_quantity NUMERIC(15,3) NOT NULL DEFAULT 0,
+    near_expiry_quantity NUMERIC(15,3) NOT NULL DEFAULT 0, -- Expiring within 90 days
+    batch_count INTEGER NOT NULL DEFAULT 0, -- Batches with stock on hand
+    
+    -- Reconciliation
+    last_reconciled_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (org_id, product_id)
+);
+
 -- Create indexes for performance
 CREATE INDEX idx_products_org ON inventory.products(org_id);
 CREATE INDEX idx_products_category ON inventory.products(category_id);
 CREATE INDEX idx_products_search ON inventory.products USING gin(search_keywords);
 CREATE INDEX idx_batches_product ON inventory.batches(product_id);
 CREATE INDEX idx_batches_expiry ON inventory.batches(expiry_date) WHERE batch_status = 'active';
+CREATE INDEX idx_batches_org_expiry_sweep ON inventory.batches(org_id, batch_id) 
+    WHERE quantity_available > 0 AND batch_status != 'expired';
+CREATE UNIQUE INDEX idx_expiry_calendar_batch ON inventory.expiry_calendar(batch_id);
 CREATE INDEX idx_location_stock_product_batch ON inventory.location_wise_stock(product_id, batch_id);
 CREATE INDEX idx_location_stock_available ON inventory.location_wise_stock(location_id) 
     WHERE quantity_available > 0;
@@ -603,6 +683,10 @@ CREATE INDEX idx_movements_date ON inventory.inventory_movements(movement_date);
 CREATE INDEX idx_movements_reference ON inventory.inventory_movements(reference_type, reference_id);
 CREATE INDEX idx_reservations_active ON inventory.stock_reservations(product_id, location_id) 
     WHERE reservation_status = 'active';
+CREATE INDEX idx_reservations_reference ON inventory.stock_reservations(org_id, reference_type, reference_id)
+    WHERE reservation_status IN ('active', 'partial');
+CREATE INDEX idx_reservations_open_expiry ON inventory.stock_reservations(expires_at)
+    WHERE reservation_status IN ('active', 'partial');
 CREATE INDEX idx_reorder_suggestions_urgency ON inventory.reorder_suggestions(urgency) 
     WHERE suggestion_status = 'pending';
 
@@ -610,4 +694,8 @@ CREATE INDEX idx_reorder_suggestions_urgency ON inventory.reorder_suggestions(ur
 COMMENT ON TABLE inventory.products IS 'Master product catalog with Indian pharma specific fields';
 COMMENT ON TABLE inventory.batches IS 'Batch/lot tracking with expiry management';
 COMMENT ON TABLE inventory.location_wise_stock IS 'Real-time stock levels at each storage location';
-COMMENT ON TABLE inventory.product_pack_configurations IS 'Complex pack hierarchies (tablet→strip→box→case)';
\ No newline at end of file
+COMMENT ON TABLE inventory.product_pack_configurations IS 'Complex pack hierarchies (tablet→strip→box→case)';
+COMMENT ON TABLE inventory.expiry_sweep_progress IS 'Resumable per-org progress of the scheduled batch expiry sweep';
+COMMENT ON TABLE inventory.expiry_calendar IS 'Batches with stock bucketed by expiry month, maintained by trigger_maintain_expiry_calendar';
+COMMENT ON TABLE inventory.expiry_calendar_months IS 'Per-org monthly expiry totals (quantity and cost value at risk)';
+COMMENT ON TABLE inventory.product_stock_summary IS 'Per-product stock availability, maintained by trigger_maintain_product_stock_summary';
@@ -269,6 +269,8 @@ CREATE TABLE sales.invoice_items (
     
     -- Tax calculation
     taxable_amount NUMERIC(15,2),
+    gst_percent NUMERIC(5,2), -- combined rate, as written by the backend
+    tax_percent NUMERIC(5,2), -- combined rate, older backend paths
     igst_rate NUMERIC(5,2) DEFAULT 0,
     igst_amount NUMERIC(15,2) DEFAULT 0,
     cgst_rate NUMERIC(5,2) DEFAULT 0,
@@ -728,6 +730,77 @@ CREATE TABLE sales.customer_visits (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 14. Document Render Blobs (content-addressed print payloads / PDFs)
+CREATE TABLE sales.document_render_blobs (
+    content_hash TEXT PRIMARY KEY, -- sha256 of the rendered content
+    content_type TEXT NOT NULL DEFAULT 'application/json',
+    content BYTEA NOT NULL,
+    byte_size INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 15. Document Renders (current render of each printable document)
+CREATE TABLE sales.document_renders (
+    document_type TEXT NOT NULL, -- 'invoice', 'sale', 'note'
+    document_id TEXT NOT NULL,
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    content_hash TEXT NOT NULL REFERENCES sales.document_render_blobs(content_hash),
+    pdf_url TEXT, -- PDF generated for this exact content
+    render_ms INTEGER,
+    rendered_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (org_id, document_type, document_id)
+);
+
+-- 16. Document Export Jobs (bulk print-payload exports)
+CREATE TABLE sales.document_export_jobs (
+    job_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    document_type TEXT NOT NULL DEFAULT 'invoice',
+    from_date DATE NOT NULL,
+    to_date DATE NOT NULL,
+    
+    -- Progress
+    status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'running', 'completed', 'failed'
+    total_documents INTEGER,
+    processed_documents INTEGER NOT NULL DEFAULT 0,
+    failed_documents INTEGER NOT NULL DEFAULT 0,
+    
+    -- Output
+    file_path TEXT,
+    byte_size BIGINT,
+    error_message TEXT,
+    
+    requested_by INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 17. Challan Invoicing Runs (bulk challan to invoice conversion)
+CREATE TABLE sales.challan_invoicing_runs (
+    run_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    from_date DATE NOT NULL,
+    to_date DATE NOT NULL,
+    invoice_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    
+    -- Progress
+    status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'running', 'completed', 'completed_with_errors', 'failed'
+    total_customers INTEGER,
+    processed_customers INTEGER NOT NULL DEFAULT 0,
+    failed_customers INTEGER NOT NULL DEFAULT 0,
+    invoices_created INTEGER NOT NULL DEFAULT 0,
+    challans_invoiced INTEGER NOT NULL DEFAULT 0,
+    failures JSONB NOT NULL DEFAULT '[]', -- [{customer_id, error}]
+    error_message TEXT,
+    
+    requested_by INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
 -- Create indexes for performance
 CREATE INDEX idx_orders_customer ON sales.orders(customer_id);
 CREATE INDEX idx_orders_date ON sales.orders(order_date);
@@ -744,6 +817,10 @@ CREATE INDEX idx_schemes_validity ON sales.sales_schemes(start_date, end_date);
 CREATE INDEX idx_targets_period ON sales.sales_targets(target_year, period_type);
 CREATE INDEX idx_visits_date ON sales.customer_visits(visit_date);
 CREATE INDEX idx_visits_customer ON sales.customer_visits(customer_id);
+CREATE INDEX idx_document_renders_hash ON sales.document_renders(content_hash);
+CREATE INDEX idx_document_renders_document ON sales.document_renders(document_type, document_id);
+CREATE INDEX idx_document_export_jobs_org ON sales.document_export_jobs(org_id, created_at);
+CREATE INDEX idx_challan_invoicing_runs_org ON sales.challan_invoicing_runs(org_id, created_at);
 
 -- Add comments
 COMMENT ON TABLE sales.orders IS 'Sales orders with multi-level approval workflow';
@@ -751,4 +828,8 @@ COMMENT ON TABLE sales.invoices IS 'Tax invoices with GST compliance and e-invoi
 COMMENT ON TABLE sales.delivery_challans IS 'Delivery challans with e-way bill integration';
 COMMENT ON TABLE sales.sales_returns IS 'Sales returns and credit note management';
 COMMENT ON TABLE sales.sales_schemes IS 'Promotional schemes with complex rules';
-COMMENT ON TABLE sales.sales_targets IS 'Sales targets and achievement tracking';
\ No newline at end of file
+COMMENT ON TABLE sales.sales_targets IS 'Sales targets and achievement tracking';
+COMMENT ON TABLE sales.document_render_blobs IS 'Rendered print payloads stored once per content hash';
+COMMENT ON TABLE sales.document_renders IS 'Current render of each printable document; deleted when the document changes';
+COMMENT ON TABLE sales.document_export_jobs IS 'Bulk invoice print exports with progress';
+COMMENT ON TABLE sales.challan_invoicing_runs IS 'Bulk challan to invoice conversions with per-customer failures';
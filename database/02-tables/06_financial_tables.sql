@@ -593,6 +593,56 @@ CREATE TABLE financial.cash_flow_forecast (
     UNIQUE(org_id, forecast_date)
 );
 
+-- 16. Reminder Campaigns (bulk payment reminders from the collection center)
+CREATE TABLE financial.reminder_campaigns (
+    campaign_id SERIAL PRIMARY KEY,
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    
+    -- What was sent, to whom
+    channel TEXT NOT NULL, -- 'sms', 'whatsapp', 'email'
+    template_code TEXT, -- system_config.email_templates code, if one was used
+    message_template TEXT NOT NULL,
+    subject_template TEXT,
+    filters JSONB DEFAULT '{}', -- aging filters the parties were selected by
+    
+    -- Progress
+    status TEXT DEFAULT 'queued', -- 'queued', 'sending', 'completed'
+    total_count INTEGER DEFAULT 0,
+    sent_count INTEGER DEFAULT 0,
+    failed_count INTEGER DEFAULT 0,
+    
+    -- Audit
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    created_by INTEGER
+);
+
+-- 17. Reminder Deliveries (one message per party and campaign)
+CREATE TABLE financial.reminder_deliveries (
+    delivery_id BIGSERIAL PRIMARY KEY,
+    campaign_id INTEGER NOT NULL REFERENCES financial.reminder_campaigns(campaign_id) ON DELETE CASCADE,
+    org_id UUID NOT NULL,
+    customer_id INTEGER NOT NULL REFERENCES parties.customers(customer_id),
+    
+    -- Rendered message
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT,
+    message TEXT NOT NULL,
+    outstanding_amount NUMERIC(15,2),
+    days_overdue INTEGER,
+    
+    -- Delivery
+    status TEXT DEFAULT 'pending', -- 'pending', 'sent', 'failed'
+    provider TEXT,
+    provider_message_id TEXT,
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT,
+    sent_at TIMESTAMP WITH TIME ZONE,
+    
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for performance
 CREATE INDEX idx_payments_party ON financial.payments(party_type, party_id);
 CREATE INDEX idx_payments_date ON financial.payments(payment_date);
@@ -601,6 +651,10 @@ CREATE INDEX idx_payment_allocations_reference ON financial.payment_allocations(
 CREATE INDEX idx_customer_outstanding_customer ON financial.customer_outstanding(customer_id);
 CREATE INDEX idx_customer_outstanding_status ON financial.customer_outstanding(status);
 CREATE INDEX idx_customer_outstanding_aging ON financial.customer_outstanding(aging_bucket);
+CREATE INDEX idx_customer_outstanding_open ON financial.customer_outstanding(org_id, customer_id) WHERE status IN ('open', 'partial');
+CREATE INDEX idx_reminder_campaigns_org ON financial.reminder_campaigns(org_id, created_at);
+CREATE INDEX idx_reminder_deliveries_campaign ON financial.reminder_deliveries(campaign_id, status);
+CREATE INDEX idx_reminder_deliveries_customer ON financial.reminder_deliveries(customer_id, created_at);
 CREATE INDEX idx_supplier_outstanding_supplier ON financial.supplier_outstanding(supplier_id);
 CREATE INDEX idx_journal_entries_date ON financial.journal_entries(journal_date);
 CREATE INDEX idx_journal_entries_reference ON financial.journal_entries(reference_type, reference_id);
@@ -614,4 +668,6 @@ COMMENT ON TABLE financial.payments IS 'Unified payment and receipt management';
 COMMENT ON TABLE financial.customer_outstanding IS 'Customer receivables with aging analysis';
 COMMENT ON TABLE financial.journal_entries IS 'Double-entry bookkeeping journal entries';
 COMMENT ON TABLE financial.pdc_management IS 'Post-dated cheque tracking and management';
-COMMENT ON TABLE financial.cash_flow_forecast IS 'Cash flow projections and actuals';
\ No newline at end of file
+COMMENT ON TABLE financial.cash_flow_forecast IS 'Cash flow projections and actuals';
+COMMENT ON TABLE financial.reminder_campaigns IS 'Bulk payment reminder campaigns selected by receivables aging';
+COMMENT ON TABLE financial.reminder_deliveries IS 'Per-party reminder messages and their delivery status';
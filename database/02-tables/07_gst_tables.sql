@@ -2,7 +2,7 @@
 -- GST & TAX MANAGEMENT TABLES
 -- =============================================
 -- Schema: gst
--- Tables: 12
+-- Tables: 16
 -- Purpose: GST compliance, returns, and reconciliation
 -- =============================================
 
@@ -547,6 +547,85 @@ CREATE TABLE gst.compliance_calendar (
     UNIQUE(org_id, compliance_type, period)
 );
 
+-- 13. GST Period Ledger (each posted document's contribution to the period rollups)
+CREATE TABLE gst.gst_period_ledger (
+    ledger_id BIGSERIAL PRIMARY KEY,
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    
+    -- Source document
+    document_type TEXT NOT NULL, -- 'invoice', 'credit_note', 'supplier_invoice', 'debit_note'
+    document_id INTEGER NOT NULL,
+    
+    -- Rollup key
+    return_period DATE NOT NULL, -- First day of the month
+    section TEXT NOT NULL, -- 'b2b', 'b2c', 'cdnr', 'cdnur', 'itc', 'itc_reversal'
+    counterparty_gstin TEXT NOT NULL DEFAULT '', -- '' for unregistered parties
+    hsn_code TEXT NOT NULL DEFAULT '',
+    gst_rate NUMERIC(5,2) NOT NULL DEFAULT 0,
+    
+    -- Amounts
+    quantity NUMERIC(15,3) DEFAULT 0,
+    taxable_value NUMERIC(15,2) DEFAULT 0,
+    igst_amount NUMERIC(15,2) DEFAULT 0,
+    cgst_amount NUMERIC(15,2) DEFAULT 0,
+    sgst_amount NUMERIC(15,2) DEFAULT 0,
+    cess_amount NUMERIC(15,2) DEFAULT 0,
+    document_value NUMERIC(15,2) DEFAULT 0, -- Same on every line of a document
+    
+    posted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 14. GST Period Rollups (per org, month, section, GSTIN, HSN and rate)
+CREATE TABLE gst.gst_period_rollups (
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    return_period DATE NOT NULL,
+    section TEXT NOT NULL,
+    counterparty_gstin TEXT NOT NULL DEFAULT '',
+    hsn_code TEXT NOT NULL DEFAULT '',
+    gst_rate NUMERIC(5,2) NOT NULL DEFAULT 0,
+    
+    document_count INTEGER DEFAULT 0,
+    quantity NUMERIC(15,3) DEFAULT 0,
+    taxable_value NUMERIC(15,2) DEFAULT 0,
+    igst_amount NUMERIC(15,2) DEFAULT 0,
+    cgst_amount NUMERIC(15,2) DEFAULT 0,
+    sgst_amount NUMERIC(15,2) DEFAULT 0,
+    cess_amount NUMERIC(15,2) DEFAULT 0,
+    
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (org_id, return_period, section, counterparty_gstin, hsn_code, gst_rate)
+);
+
+-- 15. GST Period Party Totals (per org, month, section and GSTIN)
+CREATE TABLE gst.gst_period_party_totals (
+    org_id UUID NOT NULL REFERENCES master.organizations(org_id) ON DELETE CASCADE,
+    return_period DATE NOT NULL,
+    section TEXT NOT NULL,
+    counterparty_gstin TEXT NOT NULL DEFAULT '',
+    
+    document_count INTEGER DEFAULT 0,
+    document_value NUMERIC(15,2) DEFAULT 0,
+    taxable_value NUMERIC(15,2) DEFAULT 0,
+    igst_amount NUMERIC(15,2) DEFAULT 0,
+    cgst_amount NUMERIC(15,2) DEFAULT 0,
+    sgst_amount NUMERIC(15,2) DEFAULT 0,
+    cess_amount NUMERIC(15,2) DEFAULT 0,
+    
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (org_id, return_period, section, counterparty_gstin)
+);
+
+-- 16. GST Posting Queue (documents to re-post at commit)
+CREATE TABLE gst.gst_posting_queue (
+    document_type TEXT NOT NULL,
+    document_id INTEGER NOT NULL,
+    queued_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (document_type, document_id)
+);
+
 -- Create indexes for performance
 CREATE INDEX idx_hsn_sac_code ON gst.hsn_sac_codes(code);
 CREATE INDEX idx_gst_rates_product ON gst.gst_rates(product_id);
@@ -558,6 +637,8 @@ CREATE INDEX idx_eway_bills_number ON gst.eway_bills(eway_bill_number);
 CREATE INDEX idx_gst_liability_period ON gst.gst_liability(tax_period);
 CREATE INDEX idx_gst_credit_ledger_date ON gst.gst_credit_ledger(transaction_date);
 CREATE INDEX idx_compliance_calendar_due ON gst.compliance_calendar(due_date);
+CREATE INDEX idx_gst_period_ledger_document ON gst.gst_period_ledger(document_type, document_id);
+CREATE INDEX idx_gst_period_ledger_period ON gst.gst_period_ledger(org_id, return_period);
 
 -- Add comments
 COMMENT ON TABLE gst.hsn_sac_codes IS 'HSN/SAC master with GST rates';
@@ -566,4 +647,8 @@ COMMENT ON TABLE gst.gstr2a_data IS 'GSTR-2A auto-populated inward supplies';
 COMMENT ON TABLE gst.gstr3b_data IS 'GSTR-3B summary return data';
 COMMENT ON TABLE gst.eway_bills IS 'E-way bill generation and tracking';
 COMMENT ON TABLE gst.gst_liability IS 'Monthly GST liability calculation';
-COMMENT ON TABLE gst.compliance_calendar IS 'GST compliance due dates and tracking';
\ No newline at end of file
+COMMENT ON TABLE gst.compliance_calendar IS 'GST compliance due dates and tracking';
+COMMENT ON TABLE gst.gst_period_ledger IS 'Per-document contribution lines behind the GST period rollups';
+COMMENT ON TABLE gst.gst_period_rollups IS 'Monthly GST totals by section, GSTIN, HSN and rate';
+COMMENT ON TABLE gst.gst_period_party_totals IS 'Monthly GST document counts and totals by section and GSTIN';
+COMMENT ON TABLE gst.gst_posting_queue IS 'Documents changed in the current transaction, re-posted at commit';
@@ -81,8 +81,8 @@ CREATE TABLE system_config.audit_logs (
     new_values JSONB,
     changed_fields TEXT[],
     
-    -- User and session
-    user_id INTEGER NOT NULL REFERENCES master.org_users(user_id),
+    -- User and session (user_id is NULL for system / unauthenticated actions)
+    user_id INTEGER REFERENCES master.org_users(user_id),
     user_name TEXT NOT NULL,
     session_id TEXT,
     
@@ -112,6 +112,9 @@ CREATE TABLE system_config.audit_logs (
 CREATE INDEX idx_audit_logs_timestamp ON system_config.audit_logs(activity_timestamp);
 CREATE INDEX idx_audit_logs_entity ON system_config.audit_logs(entity_type, entity_id);
 CREATE INDEX idx_audit_logs_user ON system_config.audit_logs(user_id);
+-- Head lookup and verification of each org's hash chain
+CREATE INDEX idx_audit_logs_chain ON system_config.audit_logs(org_id, audit_id)
+    WHERE current_audit_hash IS NOT NULL;
 
 -- 3. System Notifications
 CREATE TABLE system_config.system_notifications (
@@ -681,7 +684,81 @@ CREATE TABLE system_config.api_usage_log_2024_01 PARTITION OF system_config.api_
     FOR VALUES FROM ('2024-01-01') TO ('2024-02-01');
 CREATE TABLE system_config.api_usage_log_2024_02 PARTITION OF system_config.api_usage_log
     FOR VALUES FROM ('2024-02-01') TO ('2024-03-01');
--- Add more partitions as needed
+-- Later months are created (and old ones dropped) by
+-- system_config.maintain_api_usage_partitions()
+
+-- 17. Data Versions (change counters behind conditional GETs)
+-- Bumped once per writing statement by trigger_data_version_* triggers.
+-- Each backend counts in its own row (slot = pg_backend_pid()), so
+-- concurrent writers never wait on one another; a resource's version is
+-- SUM(version) over its rows. Rows of ended backends are folded into
+-- slot 0 by system_config.compact_data_versions().
+CREATE TABLE system_config.data_versions (
+    resource TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (resource, slot)
+);
+
+-- 18. Sync Changes (change feed behind /sync/{entity})
+-- One row per synced entity row, rewritten by trigger_sync_change_* on
+-- every change: change_id comes from a sequence, txid is the writing
+-- transaction. Deletes leave the row behind with operation = 'D' as a
+-- tombstone until system_config.prune_sync_tombstones() removes it.
+CREATE TABLE system_config.sync_changes (
+    org_id UUID NOT NULL,
+    entity TEXT NOT NULL, -- 'products', 'batches', 'stock', 'customers', 'prices'
+    entity_id INTEGER NOT NULL,
+    operation CHAR(1) NOT NULL, -- 'U' insert/update, 'D' delete
+    change_id BIGSERIAL NOT NULL,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (org_id, entity, entity_id)
+);
+
+-- 19. Outbound Messages (durable SMS/WhatsApp/email queue)
+-- Endpoints only insert here. Queue workers claim due rows with
+-- FOR UPDATE SKIP LOCKED, so any number of them share the queue without
+-- two taking the same message; a claimed row is leased until
+-- locked_until and goes back to the queue if its worker dies. Failed sends
+-- are retried with exponential backoff until max_attempts, then parked as
+-- 'dead' for inspection and manual requeue.
+CREATE TABLE system_config.outbound_messages (
+    message_id BIGSERIAL PRIMARY KEY,
+    org_id UUID NOT NULL,
+    
+    -- Message
+    channel TEXT NOT NULL, -- 'sms', 'whatsapp', 'email'
+    recipient TEXT NOT NULL,
+    subject TEXT,
+    body TEXT NOT NULL,
+    template_name TEXT, -- provider template (WATI)
+    parameters JSONB DEFAULT '[]',
+    
+    -- Origin
+    source_type TEXT NOT NULL DEFAULT 'api', -- 'api', 'reminder_delivery', 'scheduled_notification'
+    source_id BIGINT,
+    dedupe_key TEXT UNIQUE, -- enqueueing the same key again is a no-op
+    
+    -- Delivery
+    status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'sending', 'sent', 'dead'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 8,
+    next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_until TIMESTAMP WITH TIME ZONE,
+    locked_by TEXT,
+    provider TEXT,
+    provider_message_id TEXT,
+    last_error TEXT,
+    sent_at TIMESTAMP WITH TIME ZONE,
+    
+    -- Audit
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    created_by INTEGER
+);
 
 -- Create indexes for new tables
 CREATE INDEX idx_workflow_instances_status ON system_config.workflow_instances(instance_status, org_id);
@@ -690,6 +767,14 @@ CREATE INDEX idx_workflow_instances_sla ON system_config.workflow_instances(sla_
 CREATE INDEX idx_api_log_timestamp ON system_config.api_usage_log(request_timestamp);
 CREATE INDEX idx_api_log_endpoint ON system_config.api_usage_log(endpoint, method);
 CREATE INDEX idx_api_log_user ON system_config.api_usage_log(user_id, request_timestamp);
+CREATE INDEX idx_sync_changes_feed ON system_config.sync_changes(org_id, entity, txid, change_id);
+CREATE INDEX idx_sync_changes_tombstones ON system_config.sync_changes(changed_at) WHERE operation = 'D';
+CREATE INDEX idx_outbound_messages_due ON system_config.outbound_messages(next_attempt_at) WHERE status = 'queued';
+CREATE INDEX idx_outbound_messages_leases ON system_config.outbound_messages(locked_until) WHERE status = 'sending';
+CREATE INDEX idx_outbound_messages_sent ON system_config.outbound_messages(sent_at) WHERE status = 'sent';
+CREATE INDEX idx_outbound_messages_dead ON system_config.outbound_messages(org_id, created_at) WHERE status = 'dead';
+CREATE INDEX idx_outbound_messages_source ON system_config.outbound_messages(source_type, source_id);
+CREATE INDEX idx_scheduled_notifications_due ON system_config.scheduled_notifications(scheduled_for) WHERE status = 'pending';
 
 -- Add comments
 COMMENT ON TABLE system_config.system_settings IS 'Configurable system settings at various scopes';
@@ -699,4 +784,7 @@ COMMENT ON TABLE system_config.scheduled_jobs IS 'Background job scheduling and
 COMMENT ON TABLE system_config.feature_flags IS 'Feature toggle and A/B testing configuration';
 COMMENT ON TABLE system_config.workflow_definitions IS 'Workflow templates for approval processes';
 COMMENT ON TABLE system_config.workflow_instances IS 'Active workflow instances for approvals';
-COMMENT ON TABLE system_config.api_usage_log IS 'API usage tracking for performance and security';
\ No newline at end of file
+COMMENT ON TABLE system_config.api_usage_log IS 'API usage tracking for performance and security';
+COMMENT ON TABLE system_config.data_versions IS 'Per-resource change counters used to build ETags for list and report endpoints';
+COMMENT ON TABLE system_config.sync_changes IS 'Latest change per synced row (with delete tombstones) for the delta sync feed';
+COMMENT ON TABLE system_config.outbound_messages IS 'Durable outbound SMS/WhatsApp/email queue with retries and dead-lettering';
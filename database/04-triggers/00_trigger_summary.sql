@@ -81,7 +81,7 @@
 -- - update_performance_benchmarks: Industry benchmark comparison
 -- - refresh_dashboard_cache: Dashboard cache management
 
--- 9. SYSTEM TRIGGERS (7 triggers)
+-- 9. SYSTEM TRIGGERS (10 triggers)
 -- Location: 09_system_triggers.sql
 -- - track_configuration_changes: System configuration audit
 -- - manage_notification_lifecycle: Notification delivery and escalation
@@ -90,6 +90,9 @@
 -- - enforce_api_rate_limits: API rate limiting
 -- - manage_backup_lifecycle: Backup retention management
 -- - manage_user_sessions: Session security management
+-- - bump_data_version: Change counters for ETags (statement-level, 8 tables)
+-- - log_sync_change: Delta sync change feed with delete tombstones (row-level, 5 tables)
+-- - log_price_list_sync_change: Re-syncs or tombstones all items of a changed or deleted price list
 
 -- 10. PRICING TRIGGERS (7 triggers)
 -- Location: 10_pricing_triggers.sql
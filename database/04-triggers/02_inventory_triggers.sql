@@ -129,8 +129,14 @@ RETURNS TRIGGER AS $$
 DECLARE
     v_available_stock NUMERIC;
     v_location RECORD;
+    v_remaining NUMERIC;
 BEGIN
     IF TG_OP = 'INSERT' THEN
+        -- Batch-level reservations are tracked on inventory.batches only
+        IF NEW.location_id IS NULL THEN
+            RETURN NEW;
+        END IF;
+        
         -- Check available stock
         SELECT SUM(quantity_available - COALESCE(quantity_reserved, 0))
         INTO v_available_stock
@@ -145,6 +151,7 @@ BEGIN
         END IF;
         
         -- Reserve stock using FIFO
+        v_remaining := NEW.reserved_quantity;
         FOR v_location IN
             SELECT 
                 stock_id,
@@ -162,18 +169,19 @@ BEGIN
             UPDATE inventory.location_wise_stock
             SET 
                 quantity_reserved = COALESCE(quantity_reserved, 0) + 
-                    LEAST(v_location.available_qty, NEW.reserved_quantity),
+                    LEAST(v_location.available_qty, v_remaining),
                 last_updated = CURRENT_TIMESTAMP
             WHERE stock_id = v_location.stock_id;
             
-            NEW.reserved_quantity := NEW.reserved_quantity - 
-                LEAST(v_location.available_qty, NEW.reserved_quantity);
+            v_remaining := v_remaining - 
+                LEAST(v_location.available_qty, v_remaining);
             
-            EXIT WHEN NEW.reserved_quantity <= 0;
+            EXIT WHEN v_remaining <= 0;
         END LOOP;
         
     ELSIF TG_OP = 'UPDATE' THEN
-        IF NEW.reservation_status = 'cancelled' AND OLD.reservation_status != 'cancelled' THEN
+        IF NEW.reservation_status = 'cancelled' AND OLD.reservation_status != 'cancelled'
+           AND OLD.location_id IS NOT NULL THEN
             -- Release reserved stock
             UPDATE inventory.location_wise_stock lws
             SET 
@@ -715,6 +723,301 @@ CREATE TRIGGER trigger_validate_stock_transfer
     FOR EACH ROW
     EXECUTE FUNCTION validate_stock_transfer();
 
+-- =============================================
+-- 8. EXPIRY CALENDAR MAINTENANCE
+-- =============================================
+-- Keeps inventory.expiry_calendar and its monthly totals in step with
+-- batch stock, so every receive, sale, write-off and expiry updates the
+-- calendar in the same transaction that changed the batch.
+CREATE OR REPLACE FUNCTION maintain_expiry_calendar()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_month DATE;
+    v_new_month DATE;
+    v_old_qty NUMERIC := 0;
+    v_new_qty NUMERIC := 0;
+    v_old_value NUMERIC := 0;
+    v_new_value NUMERIC := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND COALESCE(OLD.quantity_available, 0) > 0 THEN
+        v_old_month := date_trunc('month', OLD.expiry_date)::DATE;
+        v_old_qty := OLD.quantity_available;
+        v_old_value := ROUND(OLD.quantity_available * COALESCE(OLD.cost_per_unit, 0), 2);
+    END IF;
+    
+    IF TG_OP IN ('INSERT', 'UPDATE') AND COALESCE(NEW.quantity_available, 0) > 0 THEN
+        v_new_month := date_trunc('month', NEW.expiry_date)::DATE;
+        v_new_qty := NEW.quantity_available;
+        v_new_value := ROUND(NEW.quantity_available * COALESCE(NEW.cost_per_unit, 0), 2);
+    END IF;
+    
+    -- Remove the old contribution
+    IF v_old_month IS NOT NULL THEN
+        UPDATE inventory.expiry_calendar_months
+        SET 
+            batch_count = batch_count - 1,
+            quantity = quantity - v_old_qty,
+            stock_value = stock_value - v_old_value,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE org_id = OLD.org_id AND expiry_month = v_old_month;
+        
+        IF v_new_month IS NULL OR v_new_month != v_old_month THEN
+            DELETE FROM inventory.expiry_calendar
+            WHERE org_id = OLD.org_id
+            AND expiry_month = v_old_month
+            AND batch_id = OLD.batch_id;
+        END IF;
+    END IF;
+    
+    -- Add the new contribution
+    IF v_new_month IS NOT NULL THEN
+        INSERT INTO inventory.expiry_calendar_months (
+            org_id, expiry_month, batch_count, quantity, stock_value
+        ) VALUES (
+            NEW.org_id, v_new_month, 1, v_new_qty, v_new_value
+        )
+        ON CONFLICT (org_id, expiry_month) DO UPDATE
+        SET 
+            batch_count = inventory.expiry_calendar_months.batch_count + 1,
+            quantity = inventory.expiry_calendar_months.quantity + EXCLUDED.quantity,
+            stock_value = inventory.expiry_calendar_months.stock_value + EXCLUDED.stock_value,
+            updated_at = CURRENT_TIMESTAMP;
+        
+        INSERT INTO inventory.expiry_calendar (
+            org_id, expiry_month, batch_id, product_id,
+            expiry_date, quantity_available, cost_per_unit, stock_value
+        ) VALUES (
+            NEW.org_id, v_new_month, NEW.batch_id, NEW.product_id,
+            NEW.expiry_date, v_new_qty, COALESCE(NEW.cost_per_unit, 0), v_new_value
+        )
+        ON CONFLICT (org_id, expiry_month, batch_id) DO UPDATE
+        SET 
+            expiry_date = EXCLUDED.expiry_date,
+            quantity_available = EXCLUDED.quantity_available,
+            cost_per_unit = EXCLUDED.cost_per_unit,
+            stock_value = EXCLUDED.stock_value,
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_maintain_expiry_calendar
+    AFTER INSERT OR DELETE OR UPDATE OF quantity_available, expiry_date, cost_per_unit
+    ON inventory.batches
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_expiry_calendar();
+
+-- =============================================
+-- 9. PRODUCT STOCK SUMMARY MAINTENANCE
+-- =============================================
+-- Applies each batch change to inventory.product_stock_summary as a delta,
+-- so concurrent stock changes on one product never overwrite each other.
+-- Expired / near-expiry buckets depend on the date, so each batch records
+-- the bucket it was last counted in (batches.stock_summary_bucket) and the
+-- old state is taken out of that bucket, not the one it would fall in
+-- today. Batches that aged without a write are re-bucketed by the expiry
+-- sweeper or the daily refresh_product_stock_summary() run.
+CREATE OR REPLACE FUNCTION stock_summary_bucket(p_batch_status TEXT, p_expiry_date DATE)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_batch_status = 'expired' OR p_expiry_date <= CURRENT_DATE THEN 'expired'
+        WHEN p_expiry_date <= CURRENT_DATE + 90 THEN 'near_expiry'
+        ELSE 'sellable'
+    END
+$$ LANGUAGE sql STABLE;
+
+-- Runs after trigger_batch_expiry_status (BEFORE triggers fire in name
+-- order), so the bucket sees the batch_status that trigger sets
+CREATE OR REPLACE FUNCTION stamp_stock_summary_bucket()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.stock_summary_bucket := stock_summary_bucket(NEW.batch_status, NEW.expiry_date);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_stamp_stock_summary_bucket
+    BEFORE INSERT OR UPDATE OF quantity_available, quantity_reserved, batch_status, expiry_date, product_id
+    ON inventory.batches
+    FOR EACH ROW
+    EXECUTE FUNCTION stamp_stock_summary_bucket();
+
+-- Adds one set of counter deltas to a product's summary row
+CREATE OR REPLACE FUNCTION apply_product_stock_summary_delta(
+    p_org_id UUID,
+    p_product_id INTEGER,
+    p_on_hand NUMERIC,
+    p_sellable NUMERIC,
+    p_reserved NUMERIC,
+    p_expired NUMERIC,
+    p_near_expiry NUMERIC,
+    p_batches INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    IF p_on_hand = 0 AND p_sellable = 0 AND p_reserved = 0 
+       AND p_expired = 0 AND p_near_expiry = 0 AND p_batches = 0 THEN
+        RETURN;
+    END IF;
+    
+    INSERT INTO inventory.product_stock_summary (
+        org_id, product_id,
+        on_hand_quantity, sellable_quantity, reserved_quantity,
+        expired_quantity, near_expiry_quantity, batch_count
+    ) VALUES (
+        p_org_id, p_product_id,
+        p_on_hand, p_sellable, p_reserved,
+        p_expired, p_near_expiry, p_batches
+    )
+    ON CONFLICT (org_id, product_id) DO UPDATE
+    SET 
+        on_hand_quantity = inventory.product_stock_summary.on_hand_quantity + EXCLUDED.on_hand_quantity,
+        sellable_quantity = inventory.product_stock_summary.sellable_quantity + EXCLUDED.sellable_quantity,
+        reserved_quantity = inventory.product_stock_summary.reserved_quantity + EXCLUDED.reserved_quantity,
+        expired_quantity = inventory.product_stock_summary.expired_quantity + EXCLUDED.expired_quantity,
+        near_expiry_quantity = inventory.product_stock_summary.near_expiry_quantity + EXCLUDED.near_expiry_quantity,
+        batch_count = inventory.product_stock_summary.batch_count + EXCLUDED.batch_count,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_product_stock_summary()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_on_hand NUMERIC := 0;
+    v_sellable NUMERIC := 0;
+    v_reserved NUMERIC := 0;
+    v_expired NUMERIC := 0;
+    v_near_expiry NUMERIC := 0;
+    v_batches INTEGER := 0;
+    v_qty NUMERIC;
+    v_res NUMERIC;
+    v_bucket TEXT;
+BEGIN
+    -- Subtract the old batch state from the bucket it was counted in
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_qty := GREATEST(COALESCE(OLD.quantity_available, 0), 0);
+        v_res := LEAST(GREATEST(COALESCE(OLD.quantity_reserved, 0), 0), v_qty);
+        v_on_hand := v_on_hand - v_qty;
+        v_reserved := v_reserved - v_res;
+        v_batches := v_batches - (CASE WHEN v_qty > 0 THEN 1 ELSE 0 END);
+        v_bucket := COALESCE(OLD.stock_summary_bucket, stock_summary_bucket(OLD.batch_status, OLD.expiry_date));
+        IF v_bucket = 'expired' THEN
+            v_expired := v_expired - v_qty;
+        ELSE
+            v_sellable := v_sellable - (v_qty - v_res);
+            IF v_bucket = 'near_expiry' THEN
+                v_near_expiry := v_near_expiry - v_qty;
+            END IF;
+        END IF;
+    END IF;
+    
+    -- A batch moved to another product or organization leaves its old
+    -- row first; the new state is then added to the new row alone
+    IF TG_OP = 'UPDATE' AND (OLD.org_id, OLD.product_id) IS DISTINCT FROM (NEW.org_id, NEW.product_id) THEN
+        PERFORM apply_product_stock_summary_delta(
+            OLD.org_id, OLD.product_id,
+            v_on_hand, v_sellable, v_reserved,
+            v_expired, v_near_expiry, v_batches
+        );
+        v_on_hand := 0;
+        v_sellable := 0;
+        v_reserved := 0;
+        v_expired := 0;
+        v_near_expiry := 0;
+        v_batches := 0;
+    END IF;
+    
+    -- Add the new batch state
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_qty := GREATEST(COALESCE(NEW.quantity_available, 0), 0);
+        v_res := LEAST(GREATEST(COALESCE(NEW.quantity_reserved, 0), 0), v_qty);
+        v_on_hand := v_on_hand + v_qty;
+        v_reserved := v_reserved + v_res;
+        v_batches := v_batches + (CASE WHEN v_qty > 0 THEN 1 ELSE 0 END);
+        v_bucket := COALESCE(NEW.stock_summary_bucket, stock_summary_bucket(NEW.batch_status, NEW.expiry_date));
+        IF v_bucket = 'expired' THEN
+            v_expired := v_expired + v_qty;
+        ELSE
+            v_sellable := v_sellable + (v_qty - v_res);
+            IF v_bucket = 'near_expiry' THEN
+                v_near_expiry := v_near_expiry + v_qty;
+            END IF;
+        END IF;
+    END IF;
+    
+    PERFORM apply_product_stock_summary_delta(
+        COALESCE(NEW.org_id, OLD.org_id), COALESCE(NEW.product_id, OLD.product_id),
+        v_on_hand, v_sellable, v_reserved,
+        v_expired, v_near_expiry, v_batches
+    );
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_maintain_product_stock_summary
+    AFTER INSERT OR DELETE OR UPDATE OF quantity_available, quantity_reserved, batch_status, expiry_date, product_id, org_id
+    ON inventory.batches
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_product_stock_summary();
+
+-- =============================================
+-- 10. BATCH RESERVED QUANTITY MAINTENANCE
+-- =============================================
+-- Keeps inventory.batches.quantity_reserved equal to the open (active or
+-- partial, not yet fulfilled) reservations against each batch. The batch
+-- update in turn feeds the per-product reserved / sellable counters in
+-- inventory.product_stock_summary.
+CREATE OR REPLACE FUNCTION maintain_batch_reserved_quantity()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_open NUMERIC := 0;
+    v_new_open NUMERIC := 0;
+    v_delta NUMERIC;
+    v_batch RECORD;
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.batch_id IS DISTINCT FROM NEW.batch_id THEN
+        RAISE EXCEPTION 'Reservation % cannot be moved to another batch', NEW.reservation_id;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND OLD.batch_id IS NOT NULL
+       AND OLD.reservation_status IN ('active', 'partial') THEN
+        v_old_open := OLD.reserved_quantity - COALESCE(OLD.fulfilled_quantity, 0);
+    END IF;
+
+    IF NEW.batch_id IS NOT NULL AND NEW.reservation_status IN ('active', 'partial') THEN
+        v_new_open := NEW.reserved_quantity - COALESCE(NEW.fulfilled_quantity, 0);
+    END IF;
+
+    v_delta := v_new_open - v_old_open;
+    IF v_delta = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE inventory.batches
+    SET quantity_reserved = GREATEST(0, COALESCE(quantity_reserved, 0) + v_delta),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE batch_id = NEW.batch_id
+    RETURNING quantity_available, quantity_reserved INTO v_batch;
+
+    IF v_delta > 0 AND v_batch.quantity_reserved > v_batch.quantity_available THEN
+        RAISE EXCEPTION 'Insufficient stock in batch % for reservation. Available: %, Reserved: %',
+            NEW.batch_id, v_batch.quantity_available, v_batch.quantity_reserved;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_maintain_batch_reserved_quantity
+    AFTER INSERT OR UPDATE OF reservation_status, reserved_quantity, fulfilled_quantity, batch_id
+    ON inventory.stock_reservations
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_batch_reserved_quantity();
+
 -- =============================================
 -- SUPPORTING INDEXES
 -- =============================================
@@ -729,4 +1032,10 @@ CREATE INDEX idx_movements_product_date ON inventory.inventory_movements(product
 COMMENT ON FUNCTION sync_location_stock_with_batch() IS 'Synchronizes location-wise stock with batch totals';
 COMMENT ON FUNCTION calculate_pack_quantities() IS 'Calculates base quantities from pack hierarchy';
 COMMENT ON FUNCTION update_batch_expiry_status() IS 'Monitors batch expiry and creates alerts';
-COMMENT ON FUNCTION check_reorder_levels() IS 'Monitors stock levels and creates reorder suggestions';
\ No newline at end of file
+COMMENT ON FUNCTION check_reorder_levels() IS 'Monitors stock levels and creates reorder suggestions';
+COMMENT ON FUNCTION maintain_expiry_calendar() IS 'Maintains the month-bucketed expiry calendar from batch stock changes';
+COMMENT ON FUNCTION stock_summary_bucket(TEXT, DATE) IS 'Stock summary bucket (sellable, near_expiry, expired) a batch falls in today';
+COMMENT ON FUNCTION stamp_stock_summary_bucket() IS 'Records the stock summary bucket a batch is counted in';
+COMMENT ON FUNCTION maintain_product_stock_summary() IS 'Applies batch stock changes to the per-product stock summary';
+COMMENT ON FUNCTION apply_product_stock_summary_delta(UUID, INTEGER, NUMERIC, NUMERIC, NUMERIC, NUMERIC, NUMERIC, INTEGER) IS 'Adds counter deltas to one product stock summary row';
+COMMENT ON FUNCTION maintain_batch_reserved_quantity() IS 'Keeps batch reserved quantity equal to its open stock reservations';
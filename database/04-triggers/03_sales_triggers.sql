@@ -793,6 +793,63 @@ CREATE TRIGGER trigger_process_sales_return
     FOR EACH ROW
     EXECUTE FUNCTION process_sales_return();
 
+-- =============================================
+-- 7. PRINT RENDER INVALIDATION
+-- =============================================
+-- A cached invoice print is dropped when anything it shows changes:
+-- status (cancel), payment, totals or lines. Both the billing ('invoice')
+-- and direct-sale ('sale') renders are keyed by invoice_id.
+CREATE OR REPLACE FUNCTION invalidate_invoice_renders()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_invoice_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_invoice_id := OLD.invoice_id;
+    ELSE
+        v_invoice_id := NEW.invoice_id;
+    END IF;
+
+    DELETE FROM sales.document_renders
+    WHERE document_type IN ('invoice', 'sale')
+    AND document_id = v_invoice_id::TEXT;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_invalidate_invoice_renders
+    AFTER DELETE OR UPDATE OF invoice_status, payment_status, paid_amount, final_amount,
+        customer_id, invoice_date
+    ON sales.invoices
+    FOR EACH ROW
+    EXECUTE FUNCTION invalidate_invoice_renders();
+
+CREATE TRIGGER trigger_invalidate_invoice_item_renders
+    AFTER INSERT OR UPDATE OR DELETE ON sales.invoice_items
+    FOR EACH ROW
+    EXECUTE FUNCTION invalidate_invoice_renders();
+
+-- Every print carries the organization header (name, GSTIN, licences,
+-- address), so a change to it drops all of the organization's renders.
+CREATE OR REPLACE FUNCTION invalidate_org_renders()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM sales.document_renders
+    WHERE org_id = NEW.org_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_invalidate_org_renders
+    AFTER UPDATE OF org_name, legal_name, gst_number, pan_number, drug_license_number,
+        drug_license_validity, fssai_number, registered_address, correspondence_address,
+        contact_numbers, email_addresses, website, business_settings
+    ON master.organizations
+    FOR EACH ROW
+    EXECUTE FUNCTION invalidate_org_renders();
+
 -- =============================================
 -- SUPPORTING INDEXES
 -- =============================================
@@ -806,4 +863,6 @@ CREATE INDEX IF NOT EXISTS idx_sales_targets_entity ON sales.sales_targets(targe
 COMMENT ON FUNCTION calculate_order_totals() IS 'Calculates order totals from line items';
 COMMENT ON FUNCTION apply_dynamic_pricing() IS 'Applies customer-specific pricing and schemes';
 COMMENT ON FUNCTION allocate_batches_fefo() IS 'Allocates batches using First Expiry First Out';
-COMMENT ON FUNCTION update_sales_target_achievement() IS 'Tracks sales target achievement in real-time';
\ No newline at end of file
+COMMENT ON FUNCTION update_sales_target_achievement() IS 'Tracks sales target achievement in real-time';
+COMMENT ON FUNCTION invalidate_invoice_renders() IS 'Drops cached invoice prints when the invoice changes';
+COMMENT ON FUNCTION invalidate_org_renders() IS 'Drops cached prints when the organization header changes';
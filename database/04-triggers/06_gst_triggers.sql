@@ -950,6 +950,164 @@ CREATE TRIGGER trigger_audit_gstr3b
     FOR EACH ROW
     EXECUTE FUNCTION maintain_gst_audit_trail();
 
+-- =============================================
+-- 9. GST PERIOD ROLLUP MAINTENANCE
+-- =============================================
+-- Changes to invoices, credit notes and supplier documents queue the
+-- document once per transaction; a deferred trigger on the queue re-posts
+-- it to the GST period rollups at commit, so a document written line by
+-- line is posted once, with its final totals.
+CREATE OR REPLACE FUNCTION queue_gst_posting()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_row := to_jsonb(OLD);
+    ELSE
+        v_row := to_jsonb(NEW);
+    END IF;
+
+    -- TG_ARGV[0] = document type, TG_ARGV[1] = column holding the document id
+    INSERT INTO gst.gst_posting_queue (document_type, document_id)
+    VALUES (TG_ARGV[0], (v_row->>TG_ARGV[1])::INTEGER)
+    ON CONFLICT (document_type, document_id) DO NOTHING;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION process_gst_posting_queue()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM gst.gst_posting_queue
+    WHERE document_type = NEW.document_type
+    AND document_id = NEW.document_id;
+
+    IF FOUND THEN
+        PERFORM post_gst_document(NEW.document_type, NEW.document_id);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER trigger_process_gst_posting_queue
+    AFTER INSERT ON gst.gst_posting_queue
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW
+    EXECUTE FUNCTION process_gst_posting_queue();
+
+CREATE TRIGGER trigger_queue_gst_invoice
+    AFTER INSERT OR DELETE OR UPDATE OF invoice_status, invoice_date, customer_id, final_amount
+    ON sales.invoices
+    FOR EACH ROW
+    EXECUTE FUNCTION queue_gst_posting('invoice', 'invoice_id');
+
+CREATE TRIGGER trigger_queue_gst_invoice_item
+    AFTER INSERT OR UPDATE OR DELETE ON sales.invoice_items
+    FOR EACH ROW
+    EXECUTE FUNCTION queue_gst_posting('invoice', 'invoice_id');
+
+CREATE TRIGGER trigger_queue_gst_credit_note
+    AFTER INSERT OR DELETE OR UPDATE OF credit_note_status, credit_note_date, customer_id, total_amount
+    ON sales.sales_returns
+    FOR EACH ROW
+    EXECUTE FUNCTION queue_gst_posting('credit_note', 'return_id');
+
+CREATE TRIGGER trigger_queue_gst_credit_note_item
+    AFTER INSERT OR UPDATE OR DELETE ON sales.sales_return_items
+    FOR EACH ROW
+    EXECUTE FUNCTION queue_gst_posting('credit_note', 'return_id');
+
+CREATE TRIGGER trigger_queue_gst_supplier_invoice
+    AFTER INSERT OR UPDATE OR DELETE ON procurement.supplier_invoices
+    FOR EACH ROW
+    EXECUTE FUNCTION queue_gst_posting('supplier_invoice', 'supplier_invoice_id');
+
+CREATE TRIGGER trigger_queue_gst_debit_note
+    AFTER INSERT OR DELETE OR UPDATE OF debit_note_status, debit_note_date, supplier_id,
+        return_amount, igst_amount, cgst_amount, sgst_amount, total_amount
+    ON procurement.purchase_returns
+    FOR EACH ROW
+    EXECUTE FUNCTION queue_gst_posting('debit_note', 'return_id');
+
+-- =============================================
+-- 10. PARTY GST PROFILE MAINTENANCE
+-- =============================================
+-- Customers and suppliers carry their GSTIN state code, check-digit result
+-- and supply type (intra/inter-state against the organization), so place
+-- of supply is a field read. A party without a GSTIN is placed by its
+-- state_code (customers only; suppliers have no such column). An
+-- organization GSTIN change re-resolves every party of that organization.
+CREATE OR REPLACE FUNCTION resolve_party_gst_profile()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_org_state_code TEXT;
+    v_party_state_code TEXT;
+BEGIN
+    SELECT gst_state_code INTO v_org_state_code
+    FROM master.organizations
+    WHERE org_id = NEW.org_id;
+
+    NEW.gst_state_code := gst_state_code(NEW.gst_number);
+    NEW.gstin_checksum_valid := gstin_checksum_valid(NEW.gst_number);
+    v_party_state_code := COALESCE(NEW.gst_state_code, to_jsonb(NEW)->>'state_code');
+    NEW.supply_type := CASE
+        WHEN v_org_state_code IS NOT NULL
+             AND v_party_state_code IS NOT NULL
+             AND v_party_state_code <> v_org_state_code
+        THEN 'inter_state'
+        ELSE 'intra_state'
+    END;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_org_gst_profile()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.gst_state_code := gst_state_code(NEW.gst_number);
+
+    IF TG_OP = 'UPDATE' AND NEW.gst_state_code IS DISTINCT FROM OLD.gst_state_code THEN
+        UPDATE parties.customers
+        SET supply_type = CASE
+            WHEN NEW.gst_state_code IS NOT NULL AND COALESCE(gst_state_code, state_code) IS NOT NULL
+                 AND COALESCE(gst_state_code, state_code) <> NEW.gst_state_code
+            THEN 'inter_state' ELSE 'intra_state' END
+        WHERE org_id = NEW.org_id;
+
+        UPDATE parties.suppliers
+        SET supply_type = CASE
+            WHEN NEW.gst_state_code IS NOT NULL AND gst_state_code IS NOT NULL
+                 AND gst_state_code <> NEW.gst_state_code
+            THEN 'inter_state' ELSE 'intra_state' END
+        WHERE org_id = NEW.org_id;
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_customer_gst_profile
+    BEFORE INSERT OR UPDATE OF gst_number, state_code, org_id
+    ON parties.customers
+    FOR EACH ROW
+    EXECUTE FUNCTION resolve_party_gst_profile();
+
+CREATE TRIGGER trigger_supplier_gst_profile
+    BEFORE INSERT OR UPDATE OF gst_number, org_id
+    ON parties.suppliers
+    FOR EACH ROW
+    EXECUTE FUNCTION resolve_party_gst_profile();
+
+CREATE TRIGGER trigger_organization_gst_profile
+    BEFORE INSERT OR UPDATE OF gst_number
+    ON master.organizations
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_org_gst_profile();
+
 -- =============================================
 -- SUPPORTING INDEXES
 -- =============================================
@@ -965,4 +1123,8 @@ COMMENT ON FUNCTION calculate_gst_on_invoice_item() IS 'Calculates GST based on
 COMMENT ON FUNCTION populate_gstr1_on_invoice() IS 'Auto-populates GSTR-1 return from invoices';
 COMMENT ON FUNCTION reconcile_gstr2a_with_purchases() IS 'Matches GSTR-2A data with purchase invoices';
 COMMENT ON FUNCTION generate_eway_bill_on_dispatch() IS 'Generates e-way bill for dispatched goods';
-COMMENT ON FUNCTION compute_gstr3b_summary() IS 'Computes GSTR-3B summary from transactions';
\ No newline at end of file
+COMMENT ON FUNCTION compute_gstr3b_summary() IS 'Computes GSTR-3B summary from transactions';
+COMMENT ON FUNCTION queue_gst_posting() IS 'Queues a changed GST document for re-posting at commit';
+COMMENT ON FUNCTION process_gst_posting_queue() IS 'Re-posts queued GST documents to the period rollups';
+COMMENT ON FUNCTION resolve_party_gst_profile() IS 'Stores GSTIN state code, check digit and supply type on a customer or supplier';
+COMMENT ON FUNCTION refresh_org_gst_profile() IS 'Re-resolves party supply types when the organization GSTIN changes';
@@ -1064,11 +1064,192 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Session rows only; business audit entries are written by the backend writer
 CREATE TRIGGER trigger_manage_sessions
     BEFORE INSERT OR UPDATE ON system_config.audit_logs
     FOR EACH ROW
+    WHEN (NEW.activity_type IN ('login', 'logout'))
     EXECUTE FUNCTION manage_user_sessions();
 
+-- =============================================
+-- 8. DATA VERSION COUNTERS
+-- =============================================
+-- Statement-level: one counter bump per writing statement, whatever the
+-- row count. The bump commits (or rolls back) with the change itself, so
+-- a version read before a query never runs ahead of the data it returns.
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO system_config.data_versions (resource, slot, version, changed_at)
+    VALUES (TG_ARGV[0], pg_backend_pid(), 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (resource, slot) DO UPDATE
+    SET version = system_config.data_versions.version + 1,
+        changed_at = EXCLUDED.changed_at;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_data_version_products
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON inventory.products
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('products');
+
+CREATE TRIGGER trigger_data_version_batches
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON inventory.batches
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('stock');
+
+CREATE TRIGGER trigger_data_version_stock_summary
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON inventory.product_stock_summary
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('stock');
+
+CREATE TRIGGER trigger_data_version_customers
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON parties.customers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('customers');
+
+CREATE TRIGGER trigger_data_version_suppliers
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON parties.suppliers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('suppliers');
+
+CREATE TRIGGER trigger_data_version_orders
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sales.orders
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('orders');
+
+CREATE TRIGGER trigger_data_version_gst_rollups
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gst.gst_period_rollups
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('gst_periods');
+
+CREATE TRIGGER trigger_data_version_gst_party_totals
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gst.gst_period_party_totals
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version('gst_periods');
+
+-- =============================================
+-- 9. SYNC CHANGE FEED
+-- =============================================
+-- Row-level: keeps the latest change of each synced row in
+-- system_config.sync_changes. TG_ARGV[0] is the feed entity, TG_ARGV[1]
+-- the row's id column. Every change takes a new change_id and the
+-- writing transaction's txid, so a row changed again moves to the end of
+-- the feed instead of piling up history. No-op updates are skipped.
+CREATE OR REPLACE FUNCTION log_sync_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row JSONB;
+    v_org_id UUID;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_row := to_jsonb(OLD);
+    ELSE
+        v_row := to_jsonb(NEW);
+        IF TG_OP = 'UPDATE' AND v_row = to_jsonb(OLD) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    
+    v_org_id := (v_row->>'org_id')::UUID;
+    IF v_org_id IS NULL AND v_row ? 'price_list_id' THEN
+        -- Price list items carry their org on the price list. When the
+        -- whole list is being deleted it is already gone; its items'
+        -- tombstones were recorded by log_price_list_sync_change.
+        SELECT org_id INTO v_org_id
+        FROM sales.price_lists
+        WHERE price_list_id = (v_row->>'price_list_id')::INTEGER;
+        
+        IF v_org_id IS NULL THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    
+    INSERT INTO system_config.sync_changes (org_id, entity, entity_id, operation)
+    VALUES (
+        v_org_id,
+        TG_ARGV[0],
+        (v_row->>TG_ARGV[1])::INTEGER,
+        CASE WHEN TG_OP = 'DELETE' THEN 'D' ELSE 'U' END
+    )
+    ON CONFLICT (org_id, entity, entity_id) DO UPDATE
+    SET operation = EXCLUDED.operation,
+        change_id = nextval(pg_get_serial_sequence('system_config.sync_changes', 'change_id')),
+        txid = pg_current_xact_id(),
+        changed_at = CURRENT_TIMESTAMP;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_sync_change_products
+    AFTER INSERT OR UPDATE OR DELETE ON inventory.products
+    FOR EACH ROW
+    EXECUTE FUNCTION log_sync_change('products', 'product_id');
+
+CREATE TRIGGER trigger_sync_change_batches
+    AFTER INSERT OR UPDATE OR DELETE ON inventory.batches
+    FOR EACH ROW
+    EXECUTE FUNCTION log_sync_change('batches', 'batch_id');
+
+CREATE TRIGGER trigger_sync_change_stock_summary
+    AFTER INSERT OR UPDATE OR DELETE ON inventory.product_stock_summary
+    FOR EACH ROW
+    EXECUTE FUNCTION log_sync_change('stock', 'product_id');
+
+CREATE TRIGGER trigger_sync_change_customers
+    AFTER INSERT OR UPDATE OR DELETE ON parties.customers
+    FOR EACH ROW
+    EXECUTE FUNCTION log_sync_change('customers', 'customer_id');
+
+CREATE TRIGGER trigger_sync_change_price_list_items
+    AFTER INSERT OR UPDATE OR DELETE ON sales.price_list_items
+    FOR EACH ROW
+    EXECUTE FUNCTION log_sync_change('prices', 'price_list_item_id');
+
+-- A price list change (validity, status) changes the prices of all its
+-- items. Deleting a list tombstones its items before they cascade away,
+-- while the list and its org can still be read.
+CREATE OR REPLACE FUNCTION log_price_list_sync_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND to_jsonb(NEW) = to_jsonb(OLD) THEN
+        RETURN NULL;
+    END IF;
+    
+    INSERT INTO system_config.sync_changes (org_id, entity, entity_id, operation)
+    SELECT
+        CASE WHEN TG_OP = 'DELETE' THEN OLD.org_id ELSE NEW.org_id END,
+        'prices',
+        pli.price_list_item_id,
+        CASE WHEN TG_OP = 'DELETE' THEN 'D' ELSE 'U' END
+    FROM sales.price_list_items pli
+    WHERE pli.price_list_id = OLD.price_list_id
+    ON CONFLICT (org_id, entity, entity_id) DO UPDATE
+    SET operation = EXCLUDED.operation,
+        change_id = nextval(pg_get_serial_sequence('system_config.sync_changes', 'change_id')),
+        txid = pg_current_xact_id(),
+        changed_at = CURRENT_TIMESTAMP;
+    
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_sync_change_price_lists
+    AFTER UPDATE ON sales.price_lists
+    FOR EACH ROW
+    EXECUTE FUNCTION log_price_list_sync_change();
+
+CREATE TRIGGER trigger_sync_change_price_list_deletes
+    BEFORE DELETE ON sales.price_lists
+    FOR EACH ROW
+    EXECUTE FUNCTION log_price_list_sync_change();
+
 -- =============================================
 -- SUPPORTING INDEXES
 -- =============================================
@@ -1087,4 +1268,7 @@ COMMENT ON FUNCTION execute_workflow_step() IS 'Executes workflow steps and mana
 COMMENT ON FUNCTION monitor_system_health() IS 'Monitors system health metrics and creates alerts';
 COMMENT ON FUNCTION enforce_api_rate_limits() IS 'Enforces API rate limits and manages violations';
 COMMENT ON FUNCTION manage_backup_lifecycle() IS 'Manages backup retention and storage limits';
-COMMENT ON FUNCTION manage_user_sessions() IS 'Manages user session limits and security';
\ No newline at end of file
+COMMENT ON FUNCTION manage_user_sessions() IS 'Manages user session limits and security';
+COMMENT ON FUNCTION bump_data_version() IS 'Counts writing statements per resource for ETag versions';
+COMMENT ON FUNCTION log_sync_change() IS 'Records the latest change (or delete tombstone) of each synced row for the delta sync feed';
+COMMENT ON FUNCTION log_price_list_sync_change() IS 'Records a change (or delete tombstone) for every item of a changed or deleted price list';
@@ -887,6 +887,172 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- =============================================
+-- 8. EXPIRY CALENDAR REBUILD
+-- =============================================
+-- Backfills (or repairs) the expiry calendar for one org from batch stock.
+-- Day-to-day maintenance is done by trigger_maintain_expiry_calendar.
+CREATE OR REPLACE FUNCTION rebuild_expiry_calendar(
+    p_org_id UUID
+) RETURNS INTEGER AS $$
+DECLARE
+    v_batches INTEGER;
+BEGIN
+    DELETE FROM inventory.expiry_calendar WHERE org_id = p_org_id;
+    DELETE FROM inventory.expiry_calendar_months WHERE org_id = p_org_id;
+    
+    INSERT INTO inventory.expiry_calendar (
+        org_id, expiry_month, batch_id, product_id,
+        expiry_date, quantity_available, cost_per_unit, stock_value
+    )
+    SELECT 
+        b.org_id,
+        date_trunc('month', b.expiry_date)::DATE,
+        b.batch_id,
+        b.product_id,
+        b.expiry_date,
+        b.quantity_available,
+        COALESCE(b.cost_per_unit, 0),
+        ROUND(b.quantity_available * COALESCE(b.cost_per_unit, 0), 2)
+    FROM inventory.batches b
+    WHERE b.org_id = p_org_id
+    AND b.quantity_available > 0;
+    
+    GET DIAGNOSTICS v_batches = ROW_COUNT;
+    
+    INSERT INTO inventory.expiry_calendar_months (
+        org_id, expiry_month, batch_count, quantity, stock_value
+    )
+    SELECT org_id, expiry_month, COUNT(*), SUM(quantity_available), SUM(stock_value)
+    FROM inventory.expiry_calendar
+    WHERE org_id = p_org_id
+    GROUP BY org_id, expiry_month;
+    
+    RETURN v_batches;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================
+-- 9. PRODUCT STOCK SUMMARY RECONCILIATION
+-- =============================================
+-- Recomputes summary rows from batches for one org (optionally a product
+-- subset) and returns the products whose stored row had drifted.
+-- Summary rows are locked before batches are read, so trigger deltas from
+-- concurrent transactions are applied on top of the recomputed values.
+CREATE OR REPLACE FUNCTION refresh_product_stock_summary(
+    p_org_id UUID,
+    p_product_ids INTEGER[] DEFAULT NULL
+) RETURNS TABLE (
+    product_id INTEGER,
+    stored_sellable NUMERIC,
+    actual_sellable NUMERIC,
+    stored_on_hand NUMERIC,
+    actual_on_hand NUMERIC
+) AS $$
+#variable_conflict use_column
+BEGIN
+    PERFORM 1
+    FROM inventory.product_stock_summary s
+    WHERE s.org_id = p_org_id
+    AND (p_product_ids IS NULL OR s.product_id = ANY(p_product_ids))
+    FOR UPDATE;
+    
+    -- Record today's bucket on batches that aged since their last write.
+    -- Only stock_summary_bucket changes, so the summary trigger stays quiet.
+    UPDATE inventory.batches b
+    SET stock_summary_bucket = stock_summary_bucket(b.batch_status, b.expiry_date)
+    WHERE b.org_id = p_org_id
+    AND (p_product_ids IS NULL OR b.product_id = ANY(p_product_ids))
+    AND b.stock_summary_bucket IS DISTINCT FROM stock_summary_bucket(b.batch_status, b.expiry_date);
+    
+    RETURN QUERY
+    WITH actual AS (
+        SELECT 
+            b.product_id,
+            SUM(GREATEST(b.quantity_available, 0)) AS on_hand,
+            SUM(CASE 
+                WHEN b.stock_summary_bucket = 'expired' THEN 0
+                ELSE GREATEST(b.quantity_available, 0) 
+                    - LEAST(GREATEST(COALESCE(b.quantity_reserved, 0), 0), GREATEST(b.quantity_available, 0))
+            END) AS sellable,
+            SUM(LEAST(GREATEST(COALESCE(b.quantity_reserved, 0), 0), GREATEST(b.quantity_available, 0))) AS reserved,
+            SUM(CASE 
+                WHEN b.stock_summary_bucket = 'expired'
+                THEN GREATEST(b.quantity_available, 0) ELSE 0 
+            END) AS expired,
+            SUM(CASE 
+                WHEN b.stock_summary_bucket = 'near_expiry'
+                THEN GREATEST(b.quantity_available, 0) ELSE 0 
+            END) AS near_expiry,
+            COUNT(*) FILTER (WHERE b.quantity_available > 0)::INTEGER AS batches
+        FROM inventory.batches b
+        WHERE b.org_id = p_org_id
+        AND (p_product_ids IS NULL OR b.product_id = ANY(p_product_ids))
+        GROUP BY b.product_id
+    ),
+    merged AS (
+        SELECT 
+            COALESCE(a.product_id, s.product_id) AS product_id,
+            COALESCE(a.on_hand, 0) AS on_hand,
+            COALESCE(a.sellable, 0) AS sellable,
+            COALESCE(a.reserved, 0) AS reserved,
+            COALESCE(a.expired, 0) AS expired,
+            COALESCE(a.near_expiry, 0) AS near_expiry,
+            COALESCE(a.batches, 0) AS batches,
+            s.on_hand_quantity AS stored_on_hand,
+            s.sellable_quantity AS stored_sellable,
+            (s.product_id IS NULL
+                OR s.on_hand_quantity != COALESCE(a.on_hand, 0)
+                OR s.sellable_quantity != COALESCE(a.sellable, 0)
+                OR s.reserved_quantity != COALESCE(a.reserved, 0)
+                OR s.expired_quantity != COALESCE(a.expired, 0)
+                OR s.near_expiry_quantity != COALESCE(a.near_expiry, 0)
+                OR s.batch_count != COALESCE(a.batches, 0)) AS drifted
+        FROM actual a
+        FULL JOIN (
+            SELECT * FROM inventory.product_stock_summary ss
+            WHERE ss.org_id = p_org_id
+            AND (p_product_ids IS NULL OR ss.product_id = ANY(p_product_ids))
+        ) s ON s.product_id = a.product_id
+    ),
+    upserted AS (
+        INSERT INTO inventory.product_stock_summary AS pss (
+            org_id, product_id,
+            on_hand_quantity, sellable_quantity, reserved_quantity,
+            expired_quantity, near_expiry_quantity, batch_count,
+            last_reconciled_at
+        )
+        SELECT 
+            p_org_id, m.product_id,
+            m.on_hand, m.sellable, m.reserved,
+            m.expired, m.near_expiry, m.batches,
+            CURRENT_TIMESTAMP
+        FROM merged m
+        ON CONFLICT (org_id, product_id) DO UPDATE
+        SET 
+            on_hand_quantity = EXCLUDED.on_hand_quantity,
+            sellable_quantity = EXCLUDED.sellable_quantity,
+            reserved_quantity = EXCLUDED.reserved_quantity,
+            expired_quantity = EXCLUDED.expired_quantity,
+            near_expiry_quantity = EXCLUDED.near_expiry_quantity,
+            batch_count = EXCLUDED.batch_count,
+            last_reconciled_at = CURRENT_TIMESTAMP,
+            updated_at = CASE 
+                WHEN pss.on_hand_quantity != EXCLUDED.on_hand_quantity
+                    OR pss.sellable_quantity != EXCLUDED.sellable_quantity
+                    OR pss.reserved_quantity != EXCLUDED.reserved_quantity
+                    OR pss.expired_quantity != EXCLUDED.expired_quantity
+                    OR pss.near_expiry_quantity != EXCLUDED.near_expiry_quantity
+                THEN CURRENT_TIMESTAMP
+                ELSE pss.updated_at
+            END
+    )
+    SELECT m.product_id, m.stored_sellable, m.sellable, m.stored_on_hand, m.on_hand
+    FROM merged m
+    WHERE m.drifted;
+END;
+$$ LANGUAGE plpgsql;
+
 -- =============================================
 -- INDEXES FOR FUNCTIONS
 -- =============================================
@@ -905,4 +1071,6 @@ COMMENT ON FUNCTION calculate_reorder_points IS 'Statistical reorder point calcu
 COMMENT ON FUNCTION analyze_stock_movements IS 'Detailed stock movement analysis with turnover';
 COMMENT ON FUNCTION trace_batch_movement IS 'Complete batch traceability - forward and backward';
 COMMENT ON FUNCTION manage_expiring_stock IS 'Proactive expiry management with actions';
-COMMENT ON FUNCTION perform_abc_analysis IS 'ABC analysis for inventory optimization';
\ No newline at end of file
+COMMENT ON FUNCTION perform_abc_analysis IS 'ABC analysis for inventory optimization';
+COMMENT ON FUNCTION rebuild_expiry_calendar IS 'Rebuild the expiry calendar for an organization from batch stock';
+COMMENT ON FUNCTION refresh_product_stock_summary IS 'Recompute the per-product stock summary and report drifted products';
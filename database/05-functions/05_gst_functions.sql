@@ -1082,6 +1082,368 @@ CREATE TABLE IF NOT EXISTS gst.advance_receipts (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- =============================================
+-- 6. GST PERIOD DOCUMENT LINES
+-- =============================================
+-- GST rate of an invoice line. The backend writes the combined rate to
+-- gst_percent (or tax_percent on older paths) and only the amounts per
+-- tax head, so the per-head rates are the last resort.
+CREATE OR REPLACE FUNCTION gst_line_rate(ii sales.invoice_items)
+RETURNS TABLE (gst_rate NUMERIC, interstate BOOLEAN) AS $$
+    SELECT
+        COALESCE(
+            NULLIF(ii.gst_percent, 0),
+            NULLIF(ii.tax_percent, 0),
+            COALESCE(ii.igst_rate, 0) + COALESCE(ii.cgst_rate, 0) + COALESCE(ii.sgst_rate, 0)
+        ),
+        COALESCE(ii.igst_amount, 0) > 0 OR COALESCE(ii.igst_rate, 0) > 0;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- The rollup lines a set of documents contributes in their current state.
+-- Drafts, cancelled invoices and unissued notes contribute nothing.
+CREATE OR REPLACE FUNCTION gst_document_lines(
+    p_document_type TEXT,
+    p_document_ids INTEGER[]
+)
+RETURNS TABLE (
+    org_id UUID,
+    document_type TEXT,
+    document_id INTEGER,
+    return_period DATE,
+    section TEXT,
+    counterparty_gstin TEXT,
+    hsn_code TEXT,
+    gst_rate NUMERIC,
+    quantity NUMERIC,
+    taxable_value NUMERIC,
+    igst_amount NUMERIC,
+    cgst_amount NUMERIC,
+    sgst_amount NUMERIC,
+    cess_amount NUMERIC,
+    document_value NUMERIC
+) AS $$
+#variable_conflict use_column
+BEGIN
+    IF p_document_type = 'invoice' THEN
+        RETURN QUERY
+        SELECT
+            i.org_id, p_document_type, i.invoice_id,
+            DATE_TRUNC('month', i.invoice_date)::DATE,
+            CASE WHEN NULLIF(c.gst_number, '') IS NOT NULL THEN 'b2b' ELSE 'b2c' END,
+            COALESCE(NULLIF(c.gst_number, ''), ''),
+            COALESCE(ii.hsn_code, ''),
+            r.gst_rate,
+            SUM(ii.quantity),
+            SUM(COALESCE(ii.taxable_amount, 0)),
+            SUM(COALESCE(ii.igst_amount, 0)),
+            SUM(COALESCE(ii.cgst_amount, 0)),
+            SUM(COALESCE(ii.sgst_amount, 0)),
+            SUM(COALESCE(ii.cess_amount, 0)),
+            i.final_amount
+        FROM sales.invoices i
+        JOIN parties.customers c ON c.customer_id = i.customer_id
+        JOIN sales.invoice_items ii ON ii.invoice_id = i.invoice_id
+        CROSS JOIN LATERAL gst_line_rate(ii) r
+        WHERE i.invoice_id = ANY(p_document_ids)
+        AND i.invoice_status NOT IN ('draft', 'cancelled')
+        GROUP BY i.org_id, i.invoice_id, i.invoice_date, c.gst_number, ii.hsn_code,
+                 r.gst_rate, i.final_amount;
+
+    ELSIF p_document_type = 'credit_note' THEN
+        -- Sales returns with an issued credit note; HSN and rate come from
+        -- the original invoice line
+        RETURN QUERY
+        SELECT
+            sr.org_id, p_document_type, sr.return_id,
+            DATE_TRUNC('month', sr.credit_note_date)::DATE,
+            CASE WHEN NULLIF(c.gst_number, '') IS NOT NULL THEN 'cdnr' ELSE 'cdnur' END,
+            COALESCE(NULLIF(c.gst_number, ''), ''),
+            COALESCE(ii.hsn_code, ''),
+            r.gst_rate,
+            SUM(sri.return_quantity),
+            SUM(COALESCE(sri.return_value, 0)),
+            SUM(CASE WHEN r.interstate THEN COALESCE(sri.tax_amount, 0) ELSE 0 END),
+            SUM(CASE WHEN r.interstate THEN 0
+                     ELSE ROUND(COALESCE(sri.tax_amount, 0) / 2, 2) END),
+            SUM(CASE WHEN r.interstate THEN 0
+                     ELSE COALESCE(sri.tax_amount, 0) - ROUND(COALESCE(sri.tax_amount, 0) / 2, 2) END),
+            0::NUMERIC,
+            sr.total_amount
+        FROM sales.sales_returns sr
+        JOIN parties.customers c ON c.customer_id = sr.customer_id
+        JOIN sales.sales_return_items sri ON sri.return_id = sr.return_id
+        LEFT JOIN sales.invoice_items ii ON ii.invoice_item_id = sri.invoice_item_id
+        LEFT JOIN LATERAL gst_line_rate(ii) r ON TRUE
+        WHERE sr.return_id = ANY(p_document_ids)
+        AND sr.credit_note_status IN ('issued', 'adjusted', 'refunded')
+        AND sr.credit_note_date IS NOT NULL
+        GROUP BY sr.org_id, sr.return_id, sr.credit_note_date, c.gst_number, ii.hsn_code,
+                 r.gst_rate, r.interstate, sr.total_amount;
+
+    ELSIF p_document_type = 'supplier_invoice' THEN
+        -- Input tax credit is claimed at invoice level
+        RETURN QUERY
+        SELECT
+            si.org_id, p_document_type, si.supplier_invoice_id,
+            DATE_TRUNC('month', si.invoice_date)::DATE,
+            'itc'::TEXT,
+            COALESCE(NULLIF(s.gst_number, ''), ''),
+            ''::TEXT,
+            0::NUMERIC,
+            0::NUMERIC,
+            si.taxable_amount,
+            COALESCE(si.igst_amount, 0),
+            COALESCE(si.cgst_amount, 0),
+            COALESCE(si.sgst_amount, 0),
+            COALESCE(si.cess_amount, 0),
+            si.invoice_total
+        FROM procurement.supplier_invoices si
+        JOIN parties.suppliers s ON s.supplier_id = si.supplier_id
+        WHERE si.supplier_invoice_id = ANY(p_document_ids)
+        AND si.invoice_status IN ('verified', 'approved');
+
+    ELSIF p_document_type = 'debit_note' THEN
+        -- Purchase returns reverse the input tax credit claimed
+        RETURN QUERY
+        SELECT
+            pr.org_id, p_document_type, pr.return_id,
+            DATE_TRUNC('month', pr.debit_note_date)::DATE,
+            'itc_reversal'::TEXT,
+            COALESCE(NULLIF(s.gst_number, ''), ''),
+            ''::TEXT,
+            0::NUMERIC,
+            0::NUMERIC,
+            COALESCE(pr.return_amount, 0),
+            COALESCE(pr.igst_amount, 0),
+            COALESCE(pr.cgst_amount, 0),
+            COALESCE(pr.sgst_amount, 0),
+            0::NUMERIC,
+            pr.total_amount
+        FROM procurement.purchase_returns pr
+        JOIN parties.suppliers s ON s.supplier_id = pr.supplier_id
+        WHERE pr.return_id = ANY(p_document_ids)
+        AND pr.debit_note_status IN ('issued', 'accepted')
+        AND pr.debit_note_date IS NOT NULL;
+    END IF;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- =============================================
+-- 7. GST PERIOD ROLLUP POSTING
+-- =============================================
+-- Applies ledger lines to the rollups with a sign: +1 to add, -1 to remove.
+-- Every document contributes at most one line per rollup key and one
+-- party total per (section, GSTIN), so counts move by exactly one.
+CREATE OR REPLACE FUNCTION apply_gst_ledger_lines(
+    p_lines JSONB,
+    p_sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO gst.gst_period_rollups AS r (
+        org_id, return_period, section, counterparty_gstin, hsn_code, gst_rate,
+        document_count, quantity, taxable_value,
+        igst_amount, cgst_amount, sgst_amount, cess_amount
+    )
+    SELECT
+        l.org_id, l.return_period, l.section, l.counterparty_gstin, l.hsn_code, l.gst_rate,
+        p_sign * COUNT(*), p_sign * SUM(l.quantity), p_sign * SUM(l.taxable_value),
+        p_sign * SUM(l.igst_amount), p_sign * SUM(l.cgst_amount),
+        p_sign * SUM(l.sgst_amount), p_sign * SUM(l.cess_amount)
+    FROM jsonb_to_recordset(p_lines) AS l(
+        org_id UUID, return_period DATE, section TEXT, counterparty_gstin TEXT,
+        hsn_code TEXT, gst_rate NUMERIC, quantity NUMERIC, taxable_value NUMERIC,
+        igst_amount NUMERIC, cgst_amount NUMERIC, sgst_amount NUMERIC, cess_amount NUMERIC
+    )
+    GROUP BY l.org_id, l.return_period, l.section, l.counterparty_gstin, l.hsn_code, l.gst_rate
+    ON CONFLICT (org_id, return_period, section, counterparty_gstin, hsn_code, gst_rate) DO UPDATE
+    SET document_count = r.document_count + EXCLUDED.document_count,
+        quantity = r.quantity + EXCLUDED.quantity,
+        taxable_value = r.taxable_value + EXCLUDED.taxable_value,
+        igst_amount = r.igst_amount + EXCLUDED.igst_amount,
+        cgst_amount = r.cgst_amount + EXCLUDED.cgst_amount,
+        sgst_amount = r.sgst_amount + EXCLUDED.sgst_amount,
+        cess_amount = r.cess_amount + EXCLUDED.cess_amount,
+        updated_at = CURRENT_TIMESTAMP;
+
+    INSERT INTO gst.gst_period_party_totals AS t (
+        org_id, return_period, section, counterparty_gstin,
+        document_count, document_value, taxable_value,
+        igst_amount, cgst_amount, sgst_amount, cess_amount
+    )
+    SELECT
+        d.org_id, d.return_period, d.section, d.counterparty_gstin,
+        p_sign * COUNT(*), p_sign * SUM(d.document_value), p_sign * SUM(d.taxable_value),
+        p_sign * SUM(d.igst_amount), p_sign * SUM(d.cgst_amount),
+        p_sign * SUM(d.sgst_amount), p_sign * SUM(d.cess_amount)
+    FROM (
+        SELECT
+            l.org_id, l.return_period, l.section, l.counterparty_gstin,
+            l.document_type, l.document_id,
+            MAX(l.document_value) AS document_value,
+            SUM(l.taxable_value) AS taxable_value,
+            SUM(l.igst_amount) AS igst_amount,
+            SUM(l.cgst_amount) AS cgst_amount,
+            SUM(l.sgst_amount) AS sgst_amount,
+            SUM(l.cess_amount) AS cess_amount
+        FROM jsonb_to_recordset(p_lines) AS l(
+            org_id UUID, return_period DATE, section TEXT, counterparty_gstin TEXT,
+            document_type TEXT, document_id INTEGER, document_value NUMERIC,
+            taxable_value NUMERIC, igst_amount NUMERIC, cgst_amount NUMERIC,
+            sgst_amount NUMERIC, cess_amount NUMERIC
+        )
+        GROUP BY l.org_id, l.return_period, l.section, l.counterparty_gstin,
+                 l.document_type, l.document_id
+    ) d
+    GROUP BY d.org_id, d.return_period, d.section, d.counterparty_gstin
+    ON CONFLICT (org_id, return_period, section, counterparty_gstin) DO UPDATE
+    SET document_count = t.document_count + EXCLUDED.document_count,
+        document_value = t.document_value + EXCLUDED.document_value,
+        taxable_value = t.taxable_value + EXCLUDED.taxable_value,
+        igst_amount = t.igst_amount + EXCLUDED.igst_amount,
+        cgst_amount = t.cgst_amount + EXCLUDED.cgst_amount,
+        sgst_amount = t.sgst_amount + EXCLUDED.sgst_amount,
+        cess_amount = t.cess_amount + EXCLUDED.cess_amount,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Re-posts one document: removes its previous ledger lines from the
+-- rollups and adds the lines for its current state. Idempotent.
+CREATE OR REPLACE FUNCTION post_gst_document(
+    p_document_type TEXT,
+    p_document_id INTEGER
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_old_lines JSONB;
+    v_new_lines JSONB;
+BEGIN
+    WITH removed AS (
+        DELETE FROM gst.gst_period_ledger
+        WHERE document_type = p_document_type
+        AND document_id = p_document_id
+        RETURNING *
+    )
+    SELECT jsonb_agg(to_jsonb(removed)) INTO v_old_lines FROM removed;
+
+    IF v_old_lines IS NOT NULL THEN
+        PERFORM apply_gst_ledger_lines(v_old_lines, -1);
+    END IF;
+
+    WITH added AS (
+        INSERT INTO gst.gst_period_ledger (
+            org_id, document_type, document_id, return_period, section,
+            counterparty_gstin, hsn_code, gst_rate, quantity, taxable_value,
+            igst_amount, cgst_amount, sgst_amount, cess_amount, document_value
+        )
+        SELECT * FROM gst_document_lines(p_document_type, ARRAY[p_document_id])
+        RETURNING *
+    )
+    SELECT jsonb_agg(to_jsonb(added)) INTO v_new_lines FROM added;
+
+    IF v_new_lines IS NOT NULL THEN
+        PERFORM apply_gst_ledger_lines(v_new_lines, 1);
+    END IF;
+
+    RETURN COALESCE(jsonb_array_length(v_new_lines), 0);
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================
+-- 8. GST PERIOD RECOMPUTE
+-- =============================================
+-- Rebuilds one org's month from source documents. Used for corrections
+-- (late master-data fixes, backfills) and to seed the store.
+CREATE OR REPLACE FUNCTION recompute_gst_period(
+    p_org_id UUID,
+    p_return_period DATE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_period DATE := DATE_TRUNC('month', p_return_period)::DATE;
+    v_next DATE := (DATE_TRUNC('month', p_return_period) + INTERVAL '1 month')::DATE;
+    v_lines INTEGER;
+BEGIN
+    -- One recompute per org and period at a time
+    PERFORM pg_advisory_xact_lock(hashtext('gst_period:' || p_org_id || ':' || v_period));
+
+    DELETE FROM gst.gst_period_ledger WHERE org_id = p_org_id AND return_period = v_period;
+    DELETE FROM gst.gst_period_rollups WHERE org_id = p_org_id AND return_period = v_period;
+    DELETE FROM gst.gst_period_party_totals WHERE org_id = p_org_id AND return_period = v_period;
+
+    INSERT INTO gst.gst_period_ledger (
+        org_id, document_type, document_id, return_period, section,
+        counterparty_gstin, hsn_code, gst_rate, quantity, taxable_value,
+        igst_amount, cgst_amount, sgst_amount, cess_amount, document_value
+    )
+    SELECT * FROM gst_document_lines('invoice', ARRAY(
+        SELECT invoice_id FROM sales.invoices
+        WHERE org_id = p_org_id AND invoice_date >= v_period AND invoice_date < v_next
+    ))
+    UNION ALL
+    SELECT * FROM gst_document_lines('credit_note', ARRAY(
+        SELECT return_id FROM sales.sales_returns
+        WHERE org_id = p_org_id AND credit_note_date >= v_period AND credit_note_date < v_next
+    ))
+    UNION ALL
+    SELECT * FROM gst_document_lines('supplier_invoice', ARRAY(
+        SELECT supplier_invoice_id FROM procurement.supplier_invoices
+        WHERE org_id = p_org_id AND invoice_date >= v_period AND invoice_date < v_next
+    ))
+    UNION ALL
+    SELECT * FROM gst_document_lines('debit_note', ARRAY(
+        SELECT return_id FROM procurement.purchase_returns
+        WHERE org_id = p_org_id AND debit_note_date >= v_period AND debit_note_date < v_next
+    ));
+    GET DIAGNOSTICS v_lines = ROW_COUNT;
+
+    PERFORM apply_gst_ledger_lines(
+        (SELECT jsonb_agg(to_jsonb(l)) FROM gst.gst_period_ledger l
+         WHERE l.org_id = p_org_id AND l.return_period = v_period),
+        1
+    );
+
+    RETURN v_lines;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================
+-- 9. GSTIN PROFILE RESOLUTION
+-- =============================================
+-- Format and mod-36 check digit of a GSTIN; mirrors parse_gstin in the
+-- backend so rows written by either side agree.
+CREATE OR REPLACE FUNCTION gstin_checksum_valid(p_gstin TEXT)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_charset CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ';
+    v_gstin TEXT := upper(trim(p_gstin));
+    v_total INTEGER := 0;
+    v_product INTEGER;
+BEGIN
+    IF v_gstin IS NULL
+       OR v_gstin !~ '^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$' THEN
+        RETURN FALSE;
+    END IF;
+
+    FOR i IN 1..14 LOOP
+        v_product := (strpos(v_charset, substr(v_gstin, i, 1)) - 1)
+                     * CASE WHEN i % 2 = 0 THEN 2 ELSE 1 END;
+        v_total := v_total + v_product / 36 + v_product % 36;
+    END LOOP;
+
+    RETURN substr(v_charset, (36 - v_total % 36) % 36 + 1, 1) = substr(v_gstin, 15, 1);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION gst_state_code(p_gstin TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN upper(trim(p_gstin)) ~ '^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$'
+        THEN substr(p_gstin, 1, 2)
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
 -- =============================================
 -- SUPPORTING INDEXES
 -- =============================================
@@ -1106,4 +1468,11 @@ COMMENT ON FUNCTION generate_gstr1_data IS 'Generates GSTR-1 return data in requ
 COMMENT ON FUNCTION reconcile_gstr2a IS 'Reconciles GSTR-2A data with purchase records';
 COMMENT ON FUNCTION generate_eway_bill IS 'Generates e-way bill data for invoices above threshold';
 COMMENT ON FUNCTION calculate_gstr3b_summary IS 'Calculates GSTR-3B summary for filing';
-COMMENT ON FUNCTION get_gst_compliance_status IS 'Provides comprehensive GST compliance dashboard';
\ No newline at end of file
+COMMENT ON FUNCTION get_gst_compliance_status IS 'Provides comprehensive GST compliance dashboard';
+COMMENT ON FUNCTION gst_line_rate IS 'GST rate and inter-state flag of an invoice line as the backend stores them';
+COMMENT ON FUNCTION gst_document_lines IS 'Rollup lines a set of GST documents contributes in their current state';
+COMMENT ON FUNCTION apply_gst_ledger_lines IS 'Adds or removes ledger lines from the GST period rollups';
+COMMENT ON FUNCTION post_gst_document IS 'Re-posts one document to the GST period rollups';
+COMMENT ON FUNCTION recompute_gst_period IS 'Rebuilds the GST period rollups for one org and month';
+COMMENT ON FUNCTION gstin_checksum_valid IS 'Validates GSTIN format and mod-36 check digit';
+COMMENT ON FUNCTION gst_state_code IS 'State code a GSTIN is registered in, NULL when malformed';
@@ -991,6 +991,137 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- =============================================
+-- 6. API USAGE LOG PARTITION MAINTENANCE
+-- =============================================
+-- Creates the monthly partitions of system_config.api_usage_log for the
+-- current month and p_months_ahead months after it, and drops partitions
+-- older than p_retention_months full months. Partitions are named
+-- api_usage_log_YYYY_MM; run daily from the backend scheduler.
+CREATE OR REPLACE FUNCTION system_config.maintain_api_usage_partitions(
+    p_months_ahead INTEGER DEFAULT 2,
+    p_retention_months INTEGER DEFAULT 6
+)
+RETURNS TABLE (
+    partition_name TEXT,
+    change TEXT
+) AS $$
+DECLARE
+    v_month DATE;
+    v_name TEXT;
+    v_cutoff DATE;
+    v_partition RECORD;
+BEGIN
+    FOR i IN 0..GREATEST(p_months_ahead, 0) LOOP
+        v_month := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+        v_name := 'api_usage_log_' || to_char(v_month, 'YYYY_MM');
+        IF to_regclass('system_config.' || v_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE system_config.%I PARTITION OF system_config.api_usage_log FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_month, (v_month + INTERVAL '1 month')::DATE
+            );
+            partition_name := v_name;
+            change := 'created';
+            RETURN NEXT;
+        END IF;
+    END LOOP;
+
+    -- 0 or NULL keeps everything
+    IF COALESCE(p_retention_months, 0) > 0 THEN
+        v_cutoff := (date_trunc('month', CURRENT_DATE) - make_interval(months => p_retention_months))::DATE;
+        FOR v_partition IN
+            SELECT c.relname
+            FROM pg_inherits inh
+            JOIN pg_class c ON c.oid = inh.inhrelid
+            WHERE inh.inhparent = 'system_config.api_usage_log'::REGCLASS
+            AND c.relname ~ '^api_usage_log_[0-9]{4}_[0-9]{2}$'
+            AND to_date(right(c.relname, 7), 'YYYY_MM') < v_cutoff
+            ORDER BY c.relname
+        LOOP
+            EXECUTE format('DROP TABLE system_config.%I', v_partition.relname);
+            partition_name := v_partition.relname;
+            change := 'dropped';
+            RETURN NEXT;
+        END LOOP;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================
+-- 7. DATA VERSION COMPACTION
+-- =============================================
+-- Folds the data_versions rows of backends that no longer exist into
+-- slot 0 of their resource. The delete and the re-insert happen in one
+-- statement, so readers see the same SUM(version) before and after.
+CREATE OR REPLACE FUNCTION system_config.compact_data_versions()
+RETURNS INTEGER AS $$
+DECLARE
+    v_folded INTEGER;
+BEGIN
+    WITH folded AS (
+        DELETE FROM system_config.data_versions dv
+        WHERE dv.slot <> 0
+        AND NOT EXISTS (SELECT 1 FROM pg_stat_activity a WHERE a.pid = dv.slot)
+        RETURNING dv.resource, dv.version
+    ),
+    totals AS (
+        INSERT INTO system_config.data_versions (resource, slot, version, changed_at)
+        SELECT resource, 0, SUM(version), CURRENT_TIMESTAMP
+        FROM folded
+        GROUP BY resource
+        ON CONFLICT (resource, slot) DO UPDATE
+        SET version = system_config.data_versions.version + EXCLUDED.version
+        RETURNING 1
+    )
+    SELECT COUNT(*) INTO v_folded FROM folded;
+    
+    RETURN v_folded;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================
+-- 8. SYNC TOMBSTONE PRUNING
+-- =============================================
+-- Removes delete tombstones older than the retention window. Sync tokens
+-- issued before the window are refused by the API (the client resyncs
+-- from scratch), so no client can still need a pruned tombstone.
+CREATE OR REPLACE FUNCTION system_config.prune_sync_tombstones(
+    p_retention_days INTEGER DEFAULT 30
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_pruned INTEGER;
+BEGIN
+    DELETE FROM system_config.sync_changes
+    WHERE operation = 'D'
+    AND changed_at < CURRENT_TIMESTAMP - make_interval(days => p_retention_days);
+    
+    GET DIAGNOSTICS v_pruned = ROW_COUNT;
+    RETURN v_pruned;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================
+-- 9. OUTBOUND MESSAGE PURGE
+-- =============================================
+-- Sent messages are only kept for reference; dead ones stay until they
+-- are requeued or handled by hand.
+CREATE OR REPLACE FUNCTION system_config.purge_outbound_messages(
+    p_retention_days INTEGER DEFAULT 30
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_purged INTEGER;
+BEGIN
+    DELETE FROM system_config.outbound_messages
+    WHERE status = 'sent'
+    AND sent_at < CURRENT_TIMESTAMP - make_interval(days => p_retention_days);
+    
+    GET DIAGNOSTICS v_purged = ROW_COUNT;
+    RETURN v_purged;
+END;
+$$ LANGUAGE plpgsql;
+
 -- =============================================
 -- SUPPORTING TABLES
 -- =============================================
@@ -1080,4 +1211,8 @@ CREATE INDEX idx_settings_org ON system_config.system_settings(org_id, setting_k
 -- COMMENT ON FUNCTION manage_system_settings IS 'System configuration management with validation'; -- Function doesn't exist
 -- COMMENT ON FUNCTION manage_notifications IS 'Notification creation and delivery management'; -- Function doesn't exist
 -- COMMENT ON FUNCTION monitor_system_health IS 'System health monitoring and alerting'; -- Function doesn't exist
--- COMMENT ON FUNCTION manage_backup_recovery IS 'Backup and recovery operations management'; -- Function doesn't exist
\ No newline at end of file
+-- COMMENT ON FUNCTION manage_backup_recovery IS 'Backup and recovery operations management'; -- Function doesn't exist
+COMMENT ON FUNCTION system_config.maintain_api_usage_partitions IS 'Create upcoming and drop expired monthly api_usage_log partitions';
+COMMENT ON FUNCTION system_config.compact_data_versions IS 'Fold data_versions rows of ended backends into slot 0; returns rows folded';
+COMMENT ON FUNCTION system_config.prune_sync_tombstones IS 'Delete sync_changes tombstones older than the sync token retention; returns rows pruned';
+COMMENT ON FUNCTION system_config.purge_outbound_messages IS 'Delete sent outbound messages older than the retention; returns rows purged';
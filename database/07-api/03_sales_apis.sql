@@ -649,6 +649,336 @@ BEGIN
 END;
 $$;
 
+-- =============================================
+-- PLACE ORDER API (quick sale pipeline)
+-- =============================================
+-- One call creates the order, its items, the FEFO batch decrements, the
+-- invoice and the payment. Used by the backend when ORDER_EXECUTION_MODE
+-- is 'procedure'; amounts follow the backend GSTCalculator rounding (each
+-- line rounded to the paisa per step, CGST takes the odd paisa).
+--
+-- p_order: {"org_id", "customer_id", "items": [{"product_id", "quantity",
+--           "unit_price"?, "discount_percent"?}], "payment_mode"?,
+--           "payment_amount"?, "discount_amount"?, "notes"?}
+-- Errors come back as {"success": false, "error", "sqlstate"}; sqlstate
+-- P0002 means a customer or product was not found.
+CREATE OR REPLACE FUNCTION api.place_order(
+    p_order JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_org_id UUID := (p_order->>'org_id')::UUID;
+    v_customer RECORD;
+    v_interstate BOOLEAN;
+    v_lines JSONB;
+    v_missing_product INTEGER;
+    v_short_product TEXT;
+    v_short_available NUMERIC;
+    v_allocations JSONB;
+    v_totals RECORD;
+    v_discount NUMERIC := COALESCE((p_order->>'discount_amount')::NUMERIC, 0);
+    v_final NUMERIC;
+    v_paid NUMERIC;
+    v_payment_mode TEXT := lower(COALESCE(NULLIF(p_order->>'payment_mode', ''), 'cash'));
+    v_payment_status TEXT;
+    v_invoice_status TEXT;
+    v_invoice_prefix TEXT := 'INV' || to_char(CURRENT_DATE, 'YYYYMMDD');
+    v_invoice_seq INTEGER;
+    v_result RECORD;
+BEGIN
+    -- Validate request
+    IF jsonb_array_length(COALESCE(p_order->'items', '[]'::JSONB)) = 0 THEN
+        RAISE EXCEPTION 'At least one item is required';
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(p_order->'items') AS e(item)
+        WHERE COALESCE((e.item->>'quantity')::INTEGER, 0) <= 0
+    ) THEN
+        RAISE EXCEPTION 'Item quantity must be greater than zero';
+    END IF;
+
+    SELECT c.customer_id, c.customer_name, c.primary_phone, c.gst_number,
+           c.state, c.state_code, c.address, c.city, c.pincode,
+           c.supply_type, COALESCE(c.gst_state_code, c.state_code) AS party_state_code
+    INTO v_customer
+    FROM parties.customers c
+    WHERE c.customer_id = (p_order->>'customer_id')::INTEGER
+    AND c.org_id = v_org_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Customer not found' USING ERRCODE = 'no_data_found';
+    END IF;
+
+    -- Place of supply: persisted profile first, else compare state codes
+    SELECT COALESCE(
+        v_customer.supply_type = 'inter_state',
+        COALESCE(o.gst_state_code, left(o.gst_number, 2), o.business_settings->>'state_code')
+            <> v_customer.party_state_code,
+        FALSE
+    )
+    INTO v_interstate
+    FROM parties.organizations o
+    WHERE o.org_id = v_org_id;
+    v_interstate := COALESCE(v_interstate, FALSE);
+
+    -- Price every line; a zero price or GST rate falls back like the Python path
+    SELECT
+        jsonb_agg(jsonb_build_object(
+            'line_no', e.line_no,
+            'product_id', v.product_id,
+            'product_name', p.product_name,
+            'quantity', v.quantity,
+            'selling_price', v.selling_price,
+            'discount_percent', v.discount_percent,
+            'tax_percent', v.tax_percent,
+            'base_amount', b.base_amount,
+            'discount_amount', d.discount_amount,
+            'taxable_amount', b.base_amount - d.discount_amount,
+            'tax_amount', t.tax_amount,
+            'cgst_amount', s.cgst_amount,
+            'sgst_amount', t.tax_amount - s.cgst_amount - s.igst_amount,
+            'igst_amount', s.igst_amount,
+            'total_price', b.base_amount - d.discount_amount + t.tax_amount
+        ) ORDER BY e.line_no),
+        MIN(v.product_id) FILTER (WHERE p.product_id IS NULL)
+    INTO v_lines, v_missing_product
+    FROM jsonb_array_elements(p_order->'items') WITH ORDINALITY AS e(item, line_no)
+    LEFT JOIN inventory.products p ON p.product_id = (e.item->>'product_id')::INTEGER
+    CROSS JOIN LATERAL (
+        SELECT (e.item->>'product_id')::INTEGER AS product_id,
+               (e.item->>'quantity')::INTEGER AS quantity,
+               COALESCE(NULLIF((e.item->>'unit_price')::NUMERIC, 0), p.sale_price, p.mrp) AS selling_price,
+               COALESCE((e.item->>'discount_percent')::NUMERIC, 0) AS discount_percent,
+               COALESCE(NULLIF(p.gst_percent, 0), 12) AS tax_percent
+    ) v
+    CROSS JOIN LATERAL (SELECT ROUND(v.quantity * v.selling_price, 2) AS base_amount) b
+    CROSS JOIN LATERAL (SELECT ROUND(b.base_amount * v.discount_percent / 100, 2) AS discount_amount) d
+    CROSS JOIN LATERAL (
+        SELECT ROUND((b.base_amount - d.discount_amount) * v.tax_percent / 100, 2) AS tax_amount
+    ) t
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN v_interstate THEN 0 ELSE ROUND(t.tax_amount / 2, 2) END AS cgst_amount,
+               CASE WHEN v_interstate THEN t.tax_amount ELSE 0 END AS igst_amount
+    ) s;
+
+    IF v_missing_product IS NOT NULL THEN
+        RAISE EXCEPTION 'Product % not found', v_missing_product USING ERRCODE = 'no_data_found';
+    END IF;
+
+    -- FEFO allocation over the sellable batches, locked until commit; stock
+    -- reserved for approved orders is not free to sell
+    WITH requested AS (
+        SELECT product_id, MIN(product_name) AS product_name, SUM(quantity) AS quantity
+        FROM jsonb_to_recordset(v_lines) AS l(product_id INTEGER, product_name TEXT, quantity INTEGER)
+        GROUP BY product_id
+    ),
+    locked AS (
+        SELECT b.batch_id, b.product_id, b.expiry_date,
+               b.quantity_available - COALESCE(b.quantity_reserved, 0) AS free_quantity
+        FROM inventory.batches b
+        WHERE b.product_id IN (SELECT product_id FROM requested)
+        AND b.org_id = v_org_id
+        AND b.quantity_available > COALESCE(b.quantity_reserved, 0)
+        AND (b.expiry_date IS NULL OR b.expiry_date > CURRENT_DATE)
+        FOR UPDATE
+    ),
+    running AS (
+        SELECT l.batch_id, l.product_id, l.free_quantity, r.quantity AS requested,
+               SUM(l.free_quantity) OVER (
+                   PARTITION BY l.product_id ORDER BY l.expiry_date ASC, l.batch_id ASC
+               ) - l.free_quantity AS allocated_before
+        FROM locked l
+        JOIN requested r ON r.product_id = l.product_id
+    )
+    SELECT
+        (SELECT jsonb_agg(jsonb_build_object(
+                    'batch_id', batch_id,
+                    'quantity', LEAST(free_quantity, requested - allocated_before)
+                ))
+         FROM running
+         WHERE allocated_before < requested),
+        short.product_name, short.available
+    INTO v_allocations, v_short_product, v_short_available
+    FROM (SELECT 1) one
+    LEFT JOIN LATERAL (
+        SELECT r.product_name, COALESCE(SUM(l.free_quantity), 0) AS available
+        FROM requested r
+        LEFT JOIN locked l ON l.product_id = r.product_id
+        GROUP BY r.product_id, r.product_name, r.quantity
+        HAVING COALESCE(SUM(l.free_quantity), 0) < r.quantity
+        ORDER BY r.product_id
+        LIMIT 1
+    ) short ON TRUE;
+
+    IF v_short_product IS NOT NULL THEN
+        RAISE EXCEPTION 'Insufficient stock for %. Available: %', v_short_product, v_short_available;
+    END IF;
+
+    -- Totals and payment
+    SELECT SUM(base_amount) AS subtotal, SUM(discount_amount) AS discount_amount,
+           SUM(taxable_amount) AS taxable_amount, SUM(tax_amount) AS tax_amount,
+           SUM(cgst_amount) AS cgst_amount, SUM(sgst_amount) AS sgst_amount,
+           SUM(igst_amount) AS igst_amount, SUM(total_price) AS total_amount
+    INTO v_totals
+    FROM jsonb_to_recordset(v_lines) AS l(
+        base_amount NUMERIC, discount_amount NUMERIC, taxable_amount NUMERIC, tax_amount NUMERIC,
+        cgst_amount NUMERIC, sgst_amount NUMERIC, igst_amount NUMERIC, total_price NUMERIC
+    );
+
+    v_final := v_totals.total_amount - v_discount;
+    v_paid := COALESCE((p_order->>'payment_amount')::NUMERIC, v_final);
+    v_payment_status := CASE WHEN v_paid >= v_final THEN 'paid'
+                             WHEN v_paid > 0 THEN 'partial'
+                             ELSE 'pending' END;
+    v_invoice_status := CASE WHEN v_paid >= v_final THEN 'paid' ELSE 'generated' END;
+
+    -- Order and invoice numbers are the day's MAX + 1, allocated one org at
+    -- a time; same locks and invoice sequence as allocate_invoice_numbers
+    PERFORM pg_advisory_xact_lock(hashtext('order_number:' || v_org_id));
+    PERFORM pg_advisory_xact_lock(hashtext('invoice_number:' || v_org_id));
+    SELECT COALESCE(MAX(
+        CASE WHEN substr(invoice_number, length(v_invoice_prefix) + 1) ~ '^[0-9]+$'
+             THEN substr(invoice_number, length(v_invoice_prefix) + 1)::INTEGER END
+    ), 0) + 1
+    INTO v_invoice_seq
+    FROM sales.invoices
+    WHERE org_id = v_org_id
+    AND invoice_number LIKE v_invoice_prefix || '%';
+
+    -- Order, items, stock, invoice and payment in one statement
+    WITH order_number AS (
+        SELECT 'ORD' || to_char(CURRENT_DATE, 'YYYYMMDD') || lpad((COALESCE(MAX(
+            CASE WHEN right(order_number, 6) ~ '^[0-9]{6}$' THEN right(order_number, 6)::INTEGER END
+        ), 0) + 1)::TEXT, 6, '0') AS value
+        FROM sales.orders
+        WHERE org_id = v_org_id
+        AND order_number LIKE 'ORD' || to_char(CURRENT_DATE, 'YYYYMMDD') || '%'
+    ),
+    new_order AS (
+        INSERT INTO sales.orders (
+            org_id, customer_id, customer_name, customer_phone, order_number, order_type, order_status,
+            order_date, delivery_date,
+            subtotal_amount, discount_amount, tax_amount, final_amount,
+            paid_amount, payment_mode, payment_status,
+            notes, created_at, updated_at
+        )
+        SELECT
+            v_org_id, v_customer.customer_id, v_customer.customer_name, v_customer.primary_phone,
+            value, 'sales', 'confirmed',
+            CURRENT_DATE, CURRENT_DATE,
+            v_totals.subtotal, v_totals.discount_amount + v_discount, v_totals.tax_amount, v_final,
+            v_paid, v_payment_mode, v_payment_status,
+            COALESCE(p_order->>'notes', ''), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM order_number
+        RETURNING order_id, order_number
+    ),
+    new_items AS (
+        INSERT INTO sales.order_items (
+            order_id, product_id, quantity, selling_price,
+            discount_percent, discount_amount,
+            tax_percent, tax_amount,
+            total_price
+        )
+        SELECT o.order_id, l.product_id, l.quantity, l.selling_price,
+               l.discount_percent, l.discount_amount,
+               l.tax_percent, l.tax_amount,
+               l.total_price
+        FROM new_order o
+        CROSS JOIN jsonb_to_recordset(v_lines) AS l(
+            line_no INTEGER, product_id INTEGER, quantity INTEGER, selling_price NUMERIC,
+            discount_percent NUMERIC, discount_amount NUMERIC,
+            tax_percent NUMERIC, tax_amount NUMERIC, total_price NUMERIC
+        )
+        ORDER BY l.line_no
+        RETURNING 1
+    ),
+    stock_out AS (
+        UPDATE inventory.batches b
+        SET quantity_available = b.quantity_available - a.quantity,
+            quantity_sold = b.quantity_sold + a.quantity,
+            updated_at = CURRENT_TIMESTAMP
+        FROM jsonb_to_recordset(v_allocations) AS a(batch_id INTEGER, quantity INTEGER)
+        WHERE b.batch_id = a.batch_id
+        RETURNING 1
+    ),
+    new_invoice AS (
+        INSERT INTO sales.invoices (
+            org_id, invoice_number, order_id, customer_id,
+            customer_name, customer_gstin,
+            billing_name, billing_address, billing_city, billing_state, billing_pincode,
+            invoice_date, due_date,
+            gst_type, place_of_supply,
+            subtotal_amount, discount_amount, taxable_amount,
+            cgst_amount, sgst_amount, igst_amount, total_tax_amount,
+            total_amount, paid_amount, invoice_status,
+            created_at, updated_at
+        )
+        SELECT
+            v_org_id,
+            v_invoice_prefix || lpad(v_invoice_seq::TEXT, GREATEST(4, length(v_invoice_seq::TEXT)), '0'),
+            order_id, v_customer.customer_id,
+            v_customer.customer_name, COALESCE(v_customer.gst_number, ''),
+            v_customer.customer_name, COALESCE(v_customer.address, 'N/A'), COALESCE(v_customer.city, 'N/A'),
+            COALESCE(v_customer.state, 'Karnataka'), COALESCE(v_customer.pincode, '000000'),
+            CURRENT_TIMESTAMP, CURRENT_TIMESTAMP,
+            CASE WHEN v_interstate THEN 'igst' ELSE 'cgst_sgst' END, COALESCE(v_customer.state_code, '29'),
+            v_totals.subtotal, v_totals.discount_amount + v_discount, v_totals.taxable_amount,
+            v_totals.cgst_amount, v_totals.sgst_amount, v_totals.igst_amount, v_totals.tax_amount,
+            v_final, v_paid, v_invoice_status,
+            CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM new_order
+        RETURNING invoice_id, invoice_number, order_id
+    ),
+    payment AS (
+        INSERT INTO invoice_payments (
+            payment_reference, invoice_id,
+            payment_date, payment_mode, amount, payment_amount,
+            notes
+        )
+        SELECT 'PAY-' || invoice_number, invoice_id,
+               CURRENT_DATE, v_payment_mode, v_paid, v_paid,
+               'Quick sale payment'
+        FROM new_invoice
+        WHERE v_paid > 0
+        RETURNING 1
+    )
+    SELECT i.invoice_id, i.invoice_number, i.order_id, o.order_number,
+           (SELECT COUNT(*) FROM new_items) AS item_count,
+           (SELECT COUNT(*) FROM stock_out) AS batches_updated
+    INTO v_result
+    FROM new_invoice i
+    JOIN new_order o ON o.order_id = i.order_id;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'order_id', v_result.order_id,
+        'order_number', v_result.order_number,
+        'invoice_id', v_result.invoice_id,
+        'invoice_number', v_result.invoice_number,
+        'customer_name', v_customer.customer_name,
+        'total_amount', v_final,
+        'tax_amount', v_totals.tax_amount,
+        'paid_amount', v_paid,
+        'payment_status', v_payment_status,
+        'invoice_status', v_invoice_status,
+        'item_count', v_result.item_count,
+        'batches_updated', v_result.batches_updated
+    );
+
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', SQLERRM,
+            'sqlstate', SQLSTATE
+        );
+END;
+$$;
+
 -- Grant execute permissions
 GRANT EXECUTE ON FUNCTION api.search_customers TO authenticated_user;
 GRANT EXECUTE ON FUNCTION api.create_sales_order TO authenticated_user;
@@ -656,10 +986,12 @@ GRANT EXECUTE ON FUNCTION api.get_sales_orders TO authenticated_user;
 GRANT EXECUTE ON FUNCTION api.create_invoice TO authenticated_user;
 GRANT EXECUTE ON FUNCTION api.get_invoices TO authenticated_user;
 GRANT EXECUTE ON FUNCTION api.get_sales_dashboard TO authenticated_user;
+GRANT EXECUTE ON FUNCTION api.place_order TO authenticated_user;
 
 COMMENT ON FUNCTION api.search_customers IS 'Search customers with credit and outstanding info';
 COMMENT ON FUNCTION api.create_sales_order IS 'Create a new sales order with items';
 COMMENT ON FUNCTION api.get_sales_orders IS 'Get sales orders with filters';
 COMMENT ON FUNCTION api.create_invoice IS 'Create invoice with automatic batch allocation';
 COMMENT ON FUNCTION api.get_invoices IS 'Get invoices with optional item details';
-COMMENT ON FUNCTION api.get_sales_dashboard IS 'Get comprehensive sales analytics dashboard';
\ No newline at end of file
+COMMENT ON FUNCTION api.get_sales_dashboard IS 'Get comprehensive sales analytics dashboard';
+COMMENT ON FUNCTION api.place_order IS 'Create order, items, FEFO stock allocation, invoice and payment in one call';
\ No newline at end of file
@@ -80,6 +80,86 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- =============================================
+-- TEST FIXTURES
+-- =============================================
+
+-- Function to create an organization (with a branch and a user) owned by
+-- one test; the test removes it with testing.drop_test_org()
+CREATE OR REPLACE FUNCTION testing.create_test_org(
+    p_org_code TEXT
+)
+RETURNS UUID AS $$
+DECLARE
+    v_org_id UUID;
+BEGIN
+    INSERT INTO master.organizations (
+        org_code, org_name, legal_name, gst_number, registered_address
+    ) VALUES (
+        p_org_code, p_org_code, p_org_code, NULL,
+        '{"state": "Maharashtra", "state_code": "27"}'::jsonb
+    ) RETURNING org_id INTO v_org_id;
+    
+    INSERT INTO master.org_branches (org_id, branch_code, branch_name, address)
+    VALUES (v_org_id, 'MAIN', 'Main Branch', '{}'::jsonb);
+    
+    INSERT INTO master.org_users (org_id, username, email, mobile_number, first_name)
+    VALUES (v_org_id, 'tester', lower(p_org_code) || '@test.local', '9999999999', 'Tester');
+    
+    RETURN v_org_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to create a product with one batch of stock
+CREATE OR REPLACE FUNCTION testing.create_test_batch(
+    p_org_id UUID,
+    p_product_code TEXT,
+    p_expiry_date DATE,
+    p_quantity NUMERIC
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_product_id INTEGER;
+    v_batch_id INTEGER;
+BEGIN
+    INSERT INTO inventory.products (org_id, product_code, product_name)
+    VALUES (p_org_id, p_product_code, p_product_code)
+    RETURNING product_id INTO v_product_id;
+    
+    INSERT INTO inventory.batches (
+        org_id, product_id, batch_number, expiry_date,
+        initial_quantity, quantity_available, mrp_per_unit, source_type
+    ) VALUES (
+        p_org_id, v_product_id, p_product_code || '-B1', p_expiry_date,
+        p_quantity, p_quantity, 100, 'purchase'
+    ) RETURNING batch_id INTO v_batch_id;
+    
+    RETURN v_batch_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to remove a test organization and everything it owns
+CREATE OR REPLACE FUNCTION testing.drop_test_org(
+    p_org_id UUID
+)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM sales.invoice_items
+    WHERE invoice_id IN (SELECT invoice_id FROM sales.invoices WHERE org_id = p_org_id);
+    DELETE FROM sales.invoices WHERE org_id = p_org_id;
+    DELETE FROM inventory.stock_reservations WHERE org_id = p_org_id;
+    DELETE FROM inventory.inventory_movements WHERE org_id = p_org_id;
+    DELETE FROM inventory.batches WHERE org_id = p_org_id;
+    DELETE FROM inventory.product_stock_summary WHERE org_id = p_org_id;
+    DELETE FROM inventory.products WHERE org_id = p_org_id;
+    DELETE FROM parties.customers WHERE org_id = p_org_id;
+    DELETE FROM gst.gst_period_ledger WHERE org_id = p_org_id;
+    DELETE FROM gst.gst_period_rollups WHERE org_id = p_org_id;
+    DELETE FROM gst.gst_period_party_totals WHERE org_id = p_org_id;
+    DELETE FROM master.organizations WHERE org_id = p_org_id;
+END;
+$$ LANGUAGE plpgsql;
+
 -- =============================================
 -- INVENTORY MODULE TESTS
 -- =============================================
@@ -191,6 +271,314 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Test: Reserving stock for an order, then fulfilling the order
+CREATE OR REPLACE FUNCTION testing.test_stock_reservation_fulfilment()
+RETURNS VOID AS $$
+DECLARE
+    v_org_id UUID;
+    v_batch_id INTEGER;
+    v_product_id INTEGER;
+    v_reservation_id INTEGER;
+BEGIN
+    v_org_id := testing.create_test_org('TEST-RESERVE');
+    v_batch_id := testing.create_test_batch(v_org_id, 'TEST-RES-PROD', CURRENT_DATE + 365, 100);
+    SELECT product_id INTO v_product_id FROM inventory.batches WHERE batch_id = v_batch_id;
+    
+    -- Approving an order reserves stock against the batch
+    INSERT INTO inventory.stock_reservations (
+        org_id, product_id, batch_id, reserved_quantity,
+        reference_type, reference_id, expires_at
+    ) VALUES (
+        v_org_id, v_product_id, v_batch_id, 30,
+        'order', 1, CURRENT_TIMESTAMP + INTERVAL '24 hours'
+    ) RETURNING reservation_id INTO v_reservation_id;
+    
+    PERFORM testing.assert_equals(
+        30::NUMERIC,
+        (SELECT quantity_reserved FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Batch reserved quantity after reserving'
+    );
+    PERFORM testing.assert_equals(
+        30::NUMERIC,
+        (SELECT reserved_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary reserved quantity after reserving'
+    );
+    PERFORM testing.assert_equals(
+        70::NUMERIC,
+        (SELECT sellable_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary sellable quantity after reserving'
+    );
+    
+    -- Fulfilling closes the reservation and deducts the reserved stock once
+    UPDATE inventory.stock_reservations
+    SET fulfilled_quantity = reserved_quantity,
+        reservation_status = 'fulfilled'
+    WHERE reservation_id = v_reservation_id;
+    
+    UPDATE inventory.batches
+    SET quantity_available = quantity_available - 30,
+        quantity_sold = COALESCE(quantity_sold, 0) + 30
+    WHERE batch_id = v_batch_id;
+    
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT quantity_reserved FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Batch reserved quantity after fulfilment'
+    );
+    PERFORM testing.assert_equals(
+        70::NUMERIC,
+        (SELECT quantity_available FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Batch available quantity after fulfilment'
+    );
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT reserved_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary reserved quantity after fulfilment'
+    );
+    PERFORM testing.assert_equals(
+        70::NUMERIC,
+        (SELECT sellable_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary sellable quantity after fulfilment'
+    );
+    
+    -- Clean up
+    PERFORM testing.drop_test_org(v_org_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Test: An order shipped on a challan keeps its stock held until the challan is invoiced
+CREATE OR REPLACE FUNCTION testing.test_challan_order_fulfilment()
+RETURNS VOID AS $$
+DECLARE
+    v_org_id UUID;
+    v_batch_id INTEGER;
+    v_product_id INTEGER;
+BEGIN
+    v_org_id := testing.create_test_org('TEST-CHALLAN');
+    v_batch_id := testing.create_test_batch(v_org_id, 'TEST-CHL-PROD', CURRENT_DATE + 365, 100);
+    SELECT product_id INTO v_product_id FROM inventory.batches WHERE batch_id = v_batch_id;
+    
+    -- Approval reserved 40 with a TTL that has since run out
+    INSERT INTO inventory.stock_reservations (
+        org_id, product_id, batch_id, reserved_quantity,
+        reference_type, reference_id, expires_at
+    ) VALUES (
+        v_org_id, v_product_id, v_batch_id, 40,
+        'order', 2, CURRENT_TIMESTAMP - INTERVAL '1 hour'
+    );
+    
+    -- Converting to a challan holds the reservation until invoicing
+    -- (StockReservationService.hold_until_invoiced)
+    UPDATE inventory.stock_reservations
+    SET expires_at = NULL
+    WHERE org_id = v_org_id
+    AND reference_type = 'order'
+    AND reference_id = 2
+    AND reservation_status IN ('active', 'partial');
+    
+    -- The expirer's predicate no longer matches a held reservation
+    PERFORM testing.assert_equals(
+        0::BIGINT,
+        (SELECT COUNT(*) FROM inventory.stock_reservations
+         WHERE org_id = v_org_id
+         AND reservation_status IN ('active', 'partial')
+         AND expires_at <= CURRENT_TIMESTAMP),
+        'Held reservation picked up by the expirer'
+    );
+    PERFORM testing.assert_equals(
+        40::NUMERIC,
+        (SELECT quantity_reserved FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Batch reserved quantity while the challan is uninvoiced'
+    );
+    
+    -- Invoicing the challan fulfils the order (StockReservationService.fulfill_order)
+    WITH open_reservations AS (
+        SELECT reservation_id, batch_id,
+               reserved_quantity - COALESCE(fulfilled_quantity, 0) AS quantity
+        FROM inventory.stock_reservations
+        WHERE org_id = v_org_id
+        AND reference_type = 'order'
+        AND reference_id = 2
+        AND reservation_status IN ('active', 'partial')
+        AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+        FOR UPDATE
+    ),
+    fulfilled AS (
+        UPDATE inventory.stock_reservations s
+        SET fulfilled_quantity = s.reserved_quantity,
+            reservation_status = 'fulfilled'
+        FROM open_reservations o
+        WHERE s.reservation_id = o.reservation_id
+        RETURNING s.reservation_id
+    ),
+    per_batch AS (
+        SELECT batch_id, SUM(quantity) AS quantity
+        FROM open_reservations
+        GROUP BY batch_id
+    )
+    UPDATE inventory.batches b
+    SET quantity_available = b.quantity_available - p.quantity,
+        quantity_sold = COALESCE(b.quantity_sold, 0) + p.quantity
+    FROM per_batch p
+    WHERE b.batch_id = p.batch_id;
+    
+    PERFORM testing.assert_equals(
+        'fulfilled'::TEXT,
+        (SELECT reservation_status::TEXT FROM inventory.stock_reservations
+         WHERE org_id = v_org_id AND reference_id = 2),
+        'Reservation status after invoicing'
+    );
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT quantity_reserved FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Batch reserved quantity after invoicing'
+    );
+    PERFORM testing.assert_equals(
+        60::NUMERIC,
+        (SELECT quantity_available FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Batch available quantity after invoicing'
+    );
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT reserved_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary reserved quantity after invoicing'
+    );
+    PERFORM testing.assert_equals(
+        60::NUMERIC,
+        (SELECT sellable_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary sellable quantity after invoicing'
+    );
+    
+    -- Clean up
+    PERFORM testing.drop_test_org(v_org_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Test: A batch that aged into expiry is reversed from the bucket it was counted in,
+-- and a batch moved to another product is reversed from its old product's row
+CREATE OR REPLACE FUNCTION testing.test_stock_summary_expiry_ageing()
+RETURNS VOID AS $$
+DECLARE
+    v_org_id UUID;
+    v_batch_id INTEGER;
+    v_product_id INTEGER;
+    v_moved_batch_id INTEGER;
+    v_other_product_id INTEGER;
+BEGIN
+    v_org_id := testing.create_test_org('TEST-AGEING');
+    v_batch_id := testing.create_test_batch(v_org_id, 'TEST-AGE-PROD', CURRENT_DATE + 365, 100);
+    SELECT product_id INTO v_product_id FROM inventory.batches WHERE batch_id = v_batch_id;
+    
+    PERFORM testing.assert_equals(
+        'sellable'::TEXT,
+        (SELECT stock_summary_bucket FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Bucket of a fresh batch'
+    );
+    
+    -- Let the batch age past its expiry date without a write: with triggers
+    -- off it stays stamped and counted as sellable
+    PERFORM set_config('session_replication_role', 'replica', true);
+    UPDATE inventory.batches SET expiry_date = CURRENT_DATE - 1 WHERE batch_id = v_batch_id;
+    PERFORM set_config('session_replication_role', 'origin', true);
+    
+    PERFORM testing.assert_equals(
+        100::NUMERIC,
+        (SELECT sellable_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Aged batch still counted as sellable'
+    );
+    
+    -- The expiry sweeper writes the batch off
+    UPDATE inventory.batches
+    SET quantity_available = 0,
+        batch_status = 'expired'
+    WHERE batch_id = v_batch_id;
+    
+    PERFORM testing.assert_equals(
+        'expired'::TEXT,
+        (SELECT stock_summary_bucket FROM inventory.batches WHERE batch_id = v_batch_id),
+        'Bucket after the write'
+    );
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT sellable_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary sellable quantity after write-off'
+    );
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT expired_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary expired quantity after write-off'
+    );
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT on_hand_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Summary on-hand quantity after write-off'
+    );
+    
+    -- A batch booked against the wrong product is moved to the right one
+    INSERT INTO inventory.batches (
+        org_id, product_id, batch_number, expiry_date,
+        initial_quantity, quantity_available, mrp_per_unit, source_type
+    ) VALUES (
+        v_org_id, v_product_id, 'TEST-AGE-PROD-B2', CURRENT_DATE + 365,
+        50, 50, 100, 'purchase'
+    ) RETURNING batch_id INTO v_moved_batch_id;
+    SELECT product_id INTO v_other_product_id
+    FROM inventory.batches
+    WHERE batch_id = testing.create_test_batch(v_org_id, 'TEST-AGE-OTHER', CURRENT_DATE + 365, 20);
+    
+    UPDATE inventory.batches SET product_id = v_other_product_id WHERE batch_id = v_moved_batch_id;
+    
+    PERFORM testing.assert_equals(
+        0::NUMERIC,
+        (SELECT on_hand_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Old product on-hand quantity after the move'
+    );
+    PERFORM testing.assert_equals(
+        0,
+        (SELECT batch_count FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_product_id),
+        'Old product batch count after the move'
+    );
+    PERFORM testing.assert_equals(
+        70::NUMERIC,
+        (SELECT on_hand_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_other_product_id),
+        'New product on-hand quantity after the move'
+    );
+    PERFORM testing.assert_equals(
+        70::NUMERIC,
+        (SELECT sellable_quantity FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_other_product_id),
+        'New product sellable quantity after the move'
+    );
+    PERFORM testing.assert_equals(
+        2,
+        (SELECT batch_count FROM inventory.product_stock_summary
+         WHERE org_id = v_org_id AND product_id = v_other_product_id),
+        'New product batch count after the move'
+    );
+    PERFORM testing.assert_equals(
+        0::BIGINT,
+        (SELECT COUNT(*) FROM refresh_product_stock_summary(v_org_id)),
+        'Products drifted from their batches'
+    );
+    
+    -- Clean up
+    PERFORM testing.drop_test_org(v_org_id);
+END;
+$$ LANGUAGE plpgsql;
+
 -- =============================================
 -- FINANCIAL MODULE TESTS
 -- =============================================
@@ -326,6 +714,70 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Test: Rebuilding a GST month takes each line's rate from gst_percent
+CREATE OR REPLACE FUNCTION testing.test_gst_period_recompute()
+RETURNS VOID AS $$
+DECLARE
+    v_org_id UUID;
+    v_product_id INTEGER;
+    v_customer_id INTEGER;
+    v_invoice_id INTEGER;
+    v_lines INTEGER;
+BEGIN
+    v_org_id := testing.create_test_org('TEST-GSTR');
+    SELECT product_id INTO v_product_id
+    FROM inventory.batches
+    WHERE batch_id = testing.create_test_batch(v_org_id, 'TEST-GST-PROD', CURRENT_DATE + 365, 100);
+    
+    INSERT INTO parties.customers (
+        org_id, customer_code, customer_name, customer_type, primary_phone, gst_number
+    ) VALUES (
+        v_org_id, 'TEST-GST-CUST', 'Test GST Customer', 'pharmacy', '9999999999', '27AAAPA1234A1Z5'
+    ) RETURNING customer_id INTO v_customer_id;
+    
+    INSERT INTO sales.invoices (
+        org_id, branch_id, invoice_number, invoice_date,
+        customer_id, customer_name, invoice_status, final_amount, created_by
+    ) VALUES (
+        v_org_id,
+        (SELECT branch_id FROM master.org_branches WHERE org_id = v_org_id),
+        'TEST-GST-INV-001', CURRENT_DATE,
+        v_customer_id, 'Test GST Customer', 'generated', 1120,
+        (SELECT user_id FROM master.org_users WHERE org_id = v_org_id)
+    ) RETURNING invoice_id INTO v_invoice_id;
+    
+    -- The backend writes the combined rate to gst_percent
+    INSERT INTO sales.invoice_items (
+        invoice_id, product_id, product_name, hsn_code,
+        quantity, uom, pack_type, unit_price,
+        taxable_amount, gst_percent, line_total
+    ) VALUES (
+        v_invoice_id, v_product_id, 'TEST-GST-PROD', '30049099',
+        10, 'strip', 'strip', 100,
+        1000, 12, 1120
+    );
+    
+    SELECT recompute_gst_period(v_org_id, CURRENT_DATE) INTO v_lines;
+    
+    PERFORM testing.assert_equals(1, v_lines, 'Ledger lines rebuilt for the month');
+    PERFORM testing.assert_equals(
+        12::NUMERIC,
+        (SELECT gst_rate FROM gst.gst_period_rollups
+         WHERE org_id = v_org_id AND section = 'b2b' AND hsn_code = '30049099'),
+        'Rollup GST rate'
+    );
+    PERFORM testing.assert_equals(
+        1000::NUMERIC,
+        (SELECT taxable_value FROM gst.gst_period_rollups
+         WHERE org_id = v_org_id AND section = 'b2b' AND hsn_code = '30049099'),
+        'Rollup taxable value'
+    );
+    
+    -- Clean up
+    PERFORM testing.drop_test_org(v_org_id);
+END;
+$$ LANGUAGE plpgsql;
+
 -- =============================================
 -- COMPLIANCE MODULE TESTS
 -- =============================================
@@ -442,6 +894,9 @@ BEGIN
     PERFORM testing.run_test('Product Creation', 'Inventory', 'testing.test_product_creation()');
     PERFORM testing.run_test('Stock Allocation FEFO', 'Inventory', 'testing.test_stock_allocation()');
     PERFORM testing.run_test('Inventory Movement', 'Inventory', 'testing.test_inventory_movement()');
+    PERFORM testing.run_test('Stock Reservation Fulfilment', 'Inventory', 'testing.test_stock_reservation_fulfilment()');
+    PERFORM testing.run_test('Challan Order Fulfilment', 'Inventory', 'testing.test_challan_order_fulfilment()');
+    PERFORM testing.run_test('Stock Summary Expiry Ageing', 'Inventory', 'testing.test_stock_summary_expiry_ageing()');
     
     -- Run financial tests
     PERFORM testing.run_test('Journal Validation', 'Financial', 'testing.test_journal_validation()');
@@ -449,6 +904,7 @@ BEGIN
     
     -- Run GST tests
     PERFORM testing.run_test('GST Calculation', 'GST', 'testing.test_gst_calculation()');
+    PERFORM testing.run_test('GST Period Recompute', 'GST', 'testing.test_gst_period_recompute()');
     
     -- Run compliance tests
     PERFORM testing.run_test('Narcotic Tracking', 'Compliance', 'testing.test_narcotic_tracking()');